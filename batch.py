@@ -0,0 +1,79 @@
+"""
+Answer a JSONL file of questions in bulk, e.g. for nightly jobs.
+Results are appended to the output file as they finish; re-running the same
+command skips questions already answered there, so an interrupted job resumes.
+
+    python batch.py questions.jsonl --output answers.jsonl --concurrency 16
+    python batch.py questions.jsonl --workers 4 --concurrency 32   # pre-forked worker processes
+"""
+
+import argparse
+import functools
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from nodes.agent_factory import get_agent, warm_up
+from nodes.batch_runner import BatchRunner, completed_ids, read_questions
+from nodes.instrumentation import get_instrumentation
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL file of questions through the agent")
+    parser.add_argument("input", help="JSONL file; one question per line")
+    parser.add_argument("--output", help="Results JSONL (default: <input>.answers.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("BATCH_CONCURRENCY", "8")))
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds allowed per question")
+    parser.add_argument("--id-field", help='Record id field (default: "id" or "request_id")')
+    parser.add_argument("--question-field", help='Question field (default: "question", or "title" + "body")')
+    parser.add_argument("--routing", help="Model routing spec (default: LLM_ROUTING)")
+    parser.add_argument("--progress", type=float, default=10.0, help="Seconds between progress lines")
+    parser.add_argument("--restart", action="store_true", help="Ignore existing results and answer everything")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("AGENT_WORKERS", "0")),
+                        help="Answer in this many worker processes sharing one cache (0: in this process)")
+    args = parser.parse_args()
+
+    if not args.workers:
+        # Build the agent while the previous results are scanned
+        warm_up(["react"], routing=args.routing)
+    output = args.output or os.path.splitext(args.input)[0] + ".answers.jsonl"
+    if args.restart and os.path.exists(output):
+        os.remove(output)
+    done = completed_ids(output)
+    if done:
+        print(f"⏭️ Resuming: {len(done)} questions already answered in {output}")
+
+    try:
+        if args.workers:
+            from nodes.worker_pool import create_worker_pool
+            # Forked before any agent threads start; each worker builds its own agent
+            factory = functools.partial(get_agent, "react", routing=args.routing)
+            agent = create_worker_pool(args.workers, factory=factory).start()
+        else:
+            agent = get_agent("react")
+    except Exception as e:
+        sys.exit(f"❌ Failed to initialize agent: {e}")
+
+    mode = f", {args.workers} worker processes" if args.workers else ""
+    print(f"🚀 Answering {args.input} -> {output} (concurrency={args.concurrency}{mode})")
+    runner = BatchRunner(agent, output, concurrency=args.concurrency, timeout=args.timeout,
+                         progress_interval=args.progress)
+    records = read_questions(args.input, id_field=args.id_field, question_field=args.question_field)
+    try:
+        counts = runner.run(records, skip=done)
+    except KeyboardInterrupt:
+        print(f"\n⏸️ Interrupted - re-run the same command to resume ({output})")
+        return
+    finally:
+        if args.workers:
+            agent.close()
+    get_instrumentation().print_summary()
+    if counts["failed"]:
+        print(f"⚠️ {counts['failed']} questions failed; re-run to retry them")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Offline benchmark of all four agent factories on a replayed query corpus.
+Each architecture runs the same questions against the scripted fake LLM
+(which follows a per-question tool plan) and the local SerpAPI stand-in, and
+reports throughput, p50/p95/p99 latency, LLM calls and tool calls per query.
+
+Run from the repository root:
+    python -m benchmarks.agent_bench --repeat 3 --concurrency 8
+    python -m benchmarks.agent_bench --corpus benchmarks/queries.jsonl requests.jsonl --json results.json
+    python -m benchmarks.agent_bench --baseline results.json   # exit 1 on regression
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from benchmarks.fakes import FakeSerpAPIServer, ScriptedChatModel, percentile
+from main import create_agent
+from main_centralized_llm import build_initial_state, create_centralized_llm_agent, create_hybrid_agent
+from main_react_agent import create_react_agent_app
+from nodes.instrumentation import Instrumentation, configure_instrumentation, get_instrumentation
+from nodes.search_cache import SearchCache
+from nodes.search_client import SearchClient
+from nodes.tools import configure_search_cache, get_tools
+
+
+def _messages_input(question: str) -> Dict[str, Any]:
+    return {"messages": [HumanMessage(content=question)]}
+
+
+# name -> (factory, input builder)
+ARCHITECTURES: Dict[str, Tuple[Callable, Callable[[str], Dict[str, Any]]]] = {
+    "react (main.py)": (create_agent, _messages_input),
+    "react_app": (create_react_agent_app, _messages_input),
+    "centralized": (create_centralized_llm_agent, _messages_input),
+    "hybrid": (create_hybrid_agent, build_initial_state),
+}
+
+
+def load_corpus(paths: List[str]) -> List[Dict[str, Any]]:
+    """
+    Read queries from JSONL files. Lines need a "question" (or a "title", so
+    the request backlog can be replayed); an optional "plan" scripts the fake
+    LLM's tool calls, otherwise it makes one web search.
+    """
+    queries = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                question = record.get("question") or record.get("title")
+                if question:
+                    queries.append({"id": record.get("id") or record.get("request_id") or str(len(queries)),
+                                    "question": question, "plan": record.get("plan")})
+    return queries
+
+
+def _run_query(agent, build_input, question: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    try:
+        messages = agent.invoke(build_input(question)).get("messages", [])
+        error = None
+    except Exception as e:
+        messages, error = [], str(e)
+    return {
+        "latency": time.perf_counter() - start,
+        "llm_calls": sum(isinstance(m, AIMessage) for m in messages),
+        "tool_calls": sum(isinstance(m, ToolMessage) for m in messages),
+        "error": error,
+    }
+
+
+def bench_architecture(name: str, queries: List[Dict[str, Any]], tools, args) -> Dict[str, Any]:
+    factory, build_input = ARCHITECTURES[name]
+    plans = {q["question"]: q["plan"] for q in queries if q["plan"] is not None}
+    agent = factory(llm=ScriptedChatModel(latency=args.llm_latency, plans=plans), tools=tools)
+
+    # Warm-up: first invoke pays for graph/pydantic setup
+    _run_query(agent, build_input, queries[0]["question"])
+
+    questions = [q["question"] for q in queries] * args.repeat
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        runs = list(pool.map(lambda q: _run_query(agent, build_input, q), questions))
+    elapsed = time.perf_counter() - start
+
+    latencies = [r["latency"] for r in runs]
+    return {
+        "architecture": name,
+        "queries": len(runs),
+        "throughput": len(runs) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "llm_calls_per_query": sum(r["llm_calls"] for r in runs) / len(runs),
+        "tool_calls_per_query": sum(r["tool_calls"] for r in runs) / len(runs),
+        "errors": sum(r["error"] is not None for r in runs),
+    }
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    print(f"{'architecture':<18}{'queries':>8}{'q/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'llm/q':>7}{'tools/q':>9}{'errors':>8}")
+    for r in results:
+        print(f"{r['architecture']:<18}{r['queries']:>8}{r['throughput']:>9.1f}{r['p50_ms']:>9.1f}"
+              f"{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['llm_calls_per_query']:>7.2f}"
+              f"{r['tool_calls_per_query']:>9.2f}{r['errors']:>8}")
+
+
+def regressions(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """Metrics that got worse than the baseline by more than `tolerance` (a fraction)."""
+    previous = {r["architecture"]: r for r in baseline}
+    found = []
+    for r in results:
+        base = previous.get(r["architecture"])
+        if base is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "llm_calls_per_query", "tool_calls_per_query"):
+            if r[metric] > base[metric] * (1 + tolerance) + 1e-9:
+                found.append(f"{r['architecture']}: {metric} {base[metric]:.2f} -> {r[metric]:.2f}")
+        if r["errors"] > base["errors"]:
+            found.append(f"{r['architecture']}: errors {base['errors']} -> {r['errors']}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", nargs="+", default=["benchmarks/queries.jsonl"])
+    parser.add_argument("--architectures", nargs="+", choices=list(ARCHITECTURES), default=list(ARCHITECTURES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.02)
+    parser.add_argument("--search-latency", type=float, default=0.02)
+    parser.add_argument("--instrument", action="store_true",
+                        help="Enable metrics collection to measure its overhead; prints the summary")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare against a previous --json file; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    queries = load_corpus(args.corpus)
+    if not queries:
+        sys.exit("❌ Corpus is empty")
+
+    # Repeats would otherwise be cache hits; measure the agent loop itself
+    configure_search_cache(SearchCache(max_entries=0))
+    configure_instrumentation(Instrumentation(enabled=args.instrument))
+
+    with FakeSerpAPIServer(latency=args.search_latency) as server:
+        client = SearchClient(api_key="bench", base_url=server.url, pool_size=max(args.concurrency, 8))
+        tools = get_tools(client)
+        print(f"{len(queries)} queries x {args.repeat}, concurrency={args.concurrency}, "
+              f"llm_latency={args.llm_latency}s, search_latency={args.search_latency}s\n")
+        results = [bench_architecture(name, queries, tools, args) for name in args.architectures]
+        client.close()
+
+    print_table(results)
+    get_instrumentation().print_summary()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        if found:
+            print("\n❌ Regressions:\n  " + "\n  ".join(found))
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
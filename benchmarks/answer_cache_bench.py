@@ -0,0 +1,78 @@
+"""
+Semantic answer cache benchmark: lookup latency of the exact NumPy index vs
+the LSH index as the cache grows, LSH recall against exact search, and the
+hit rate on paraphrased questions.
+
+Run from the repository root:
+    python -m benchmarks.answer_cache_bench --entries 1000 10000 --queries 1000
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.fakes import percentile
+from nodes.answer_cache import SemanticAnswerCache
+
+SUBJECTS = ["capital", "population", "currency", "official language", "largest city", "area",
+            "president", "national dish", "highest mountain", "longest river"]
+PLACES = ["France", "Japan", "Brazil", "Kenya", "Canada", "India", "Norway", "Peru", "Egypt", "Vietnam",
+          "Chile", "Spain", "Ghana", "Nepal", "Poland", "Mexico", "Turkey", "Sweden", "Italy", "Cuba"]
+ASK = ["What is the {s} of {p}?", "Tell me the {s} of {p}", "{p} {s}?", "What's the {s} of {p}",
+       "Can you tell me the {s} of {p}?"]
+
+
+def _questions(n: int, rng: random.Random):
+    """n distinct (subject, place, qualifier) questions with a paraphrase for each."""
+    pairs = []
+    for i in range(n):
+        s, p = SUBJECTS[i % len(SUBJECTS)], PLACES[(i // len(SUBJECTS)) % len(PLACES)]
+        qualifier = f"topic{i // (len(SUBJECTS) * len(PLACES))}"
+        stored, asked = rng.sample(ASK, 2)
+        pairs.append((stored.format(s=s, p=f"{p} {qualifier}"), asked.format(s=s, p=f"{p} {qualifier}")))
+    return pairs
+
+
+def bench(entries: int, queries: int, threshold: float, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    pairs = _questions(entries, rng)
+    caches = {name: SemanticAnswerCache(threshold=threshold, max_entries=entries, index=name)
+              for name in ("brute", "lsh")}
+    for cache in caches.values():
+        for i, (stored, _) in enumerate(pairs):
+            cache.store(stored, f"answer {i}")
+
+    probes = [rng.choice(pairs) for _ in range(queries)]
+    results = {}
+    for name, cache in caches.items():
+        timings, answers = [], []
+        for stored, asked in probes:
+            start = time.perf_counter()
+            hit = cache.lookup(asked)
+            timings.append(time.perf_counter() - start)
+            answers.append(hit["question"] if hit else None)
+        correct = sum(answer == stored for answer, (stored, _) in zip(answers, probes))
+        results[name] = answers
+        print(f"  {name:<5} p50={percentile(timings, 50) * 1e6:7.0f} us  p95={percentile(timings, 95) * 1e6:7.0f} us"
+              f"  paraphrase hits={sum(a is not None for a in answers) / queries:6.1%}"
+              f"  correct={correct / queries:6.1%}")
+
+    exact_hits = [(b, l) for b, l in zip(results["brute"], results["lsh"]) if b is not None]
+    if exact_hits:
+        recall = sum(b == l for b, l in exact_hits) / len(exact_hits)
+        print(f"  lsh recall vs exact: {recall:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--threshold", type=float, default=0.85)
+    args = parser.parse_args()
+    for entries in args.entries:
+        print(f"entries={entries} queries={args.queries} threshold={args.threshold}")
+        bench(entries, args.queries, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
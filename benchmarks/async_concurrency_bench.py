@@ -0,0 +1,58 @@
+"""
+Concurrency benchmark: blocking invoke loop vs ainvoke with many conversations in flight.
+Uses the scripted fake LLM and the local SerpAPI stand-in.
+
+Run from the repository root:
+    python -m benchmarks.async_concurrency_bench --conversations 100 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import time
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeSerpAPIServer, ScriptedChatModel
+from main import create_agent
+from nodes.async_runner import arun_many
+from nodes.search_cache import SearchCache
+from nodes.search_client import SearchClient
+from nodes.tools import configure_search_cache, get_tools
+
+
+def _conversations(n: int):
+    return [{"messages": [HumanMessage(content=f"question {i}")]} for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    # Every query is unique, but keep the cache out of the measurement anyway
+    configure_search_cache(SearchCache(max_entries=0))
+
+    with FakeSerpAPIServer(latency=args.search_latency) as server:
+        client = SearchClient(api_key="bench", base_url=server.url, pool_size=args.concurrency)
+        agent = create_agent(llm=ScriptedChatModel(latency=args.llm_latency), tools=get_tools(client))
+
+        start = time.perf_counter()
+        for conversation in _conversations(args.conversations):
+            agent.invoke(conversation)
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = asyncio.run(arun_many(agent, _conversations(args.conversations), args.concurrency))
+        concurrent = time.perf_counter() - start
+        failures = sum(isinstance(r, Exception) for r in results)
+
+    print(f"sequential invoke : {sequential:7.2f} s  ({args.conversations / sequential:7.1f} conv/s)")
+    print(f"async x{args.concurrency:<4}       : {concurrent:7.2f} s  ({args.conversations / concurrent:7.1f} conv/s)"
+          f"  failures={failures}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Offline benchmark of the batch runner (batch.py): throughput, memory and resume.
+Generates a synthetic question file, answers it with the scripted fake LLM and
+the local SerpAPI stand-in at several concurrency levels, and records peak
+Python heap (tracemalloc) for two input sizes to show memory stays flat. The
+resume check interrupts a run half way, re-runs it and verifies every
+question was answered exactly once.
+
+Run from the repository root:
+    python -m benchmarks.batch_bench --questions 2000 --concurrency 1 8 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+from benchmarks.fakes import FakeSerpAPIServer, ScriptedChatModel
+from main import create_agent
+from nodes.batch_runner import BatchRunner, completed_ids, read_questions
+from nodes.search_cache import SearchCache
+from nodes.search_client import SearchClient
+from nodes.tools import configure_search_cache, get_tools
+
+
+def write_questions(path: str, count: int) -> None:
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({"id": f"q{i}", "question": f"What happened in city {i} in {1900 + i % 120}?"}) + "\n")
+
+
+def run_batch(agent, questions: str, output: str, concurrency: int, stop_after: int = 0) -> dict:
+    """Answer `questions`; with `stop_after`, cancel the run once that many results are written."""
+    runner = BatchRunner(agent, output, concurrency=concurrency, echo=False)
+
+    async def go():
+        task = asyncio.create_task(runner.arun(read_questions(questions), skip=completed_ids(output)))
+        while stop_after and not task.done():
+            await asyncio.sleep(0.01)
+            if runner.counts["answered"] >= stop_after:
+                task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    start = time.perf_counter()
+    asyncio.run(go())
+    return {**runner.counts, "seconds": time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--llm-latency", type=float, default=0.02)
+    parser.add_argument("--search-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    configure_search_cache(SearchCache(max_entries=0))
+    with FakeSerpAPIServer(latency=args.search_latency) as server, tempfile.TemporaryDirectory() as tmp:
+        client = SearchClient(api_key="bench", base_url=server.url, pool_size=max(args.concurrency))
+        agent = create_agent(llm=ScriptedChatModel(latency=args.llm_latency), tools=get_tools(client))
+        questions = os.path.join(tmp, "questions.jsonl")
+        write_questions(questions, args.questions)
+
+        print(f"{'concurrency':>12}{'questions':>11}{'seconds':>9}{'q/s':>9}{'failed':>8}")
+        for concurrency in args.concurrency:
+            output = os.path.join(tmp, f"answers_{concurrency}.jsonl")
+            r = run_batch(agent, questions, output, concurrency)
+            print(f"{concurrency:>12}{r['answered']:>11}{r['seconds']:>9.2f}{r['answered'] / r['seconds']:>9.1f}"
+                  f"{r['failed']:>8}")
+
+        concurrency = max(args.concurrency)
+        print("\nPeak heap while answering (tracemalloc):")
+        for count in (args.questions // 4, args.questions):
+            path = os.path.join(tmp, f"memory_{count}.jsonl")
+            write_questions(path, count)
+            tracemalloc.start()
+            run_batch(agent, path, path + ".out", concurrency)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  {count:>7} questions: {peak / 1e6:.1f} MB")
+
+        output = os.path.join(tmp, "resume.jsonl")
+        first = run_batch(agent, questions, output, concurrency, stop_after=args.questions // 2)
+        second = run_batch(agent, questions, output, concurrency)
+        with open(output) as f:
+            ids = Counter(json.loads(line)["id"] for line in f if line.strip())
+        duplicates = sum(n > 1 for n in ids.values())
+        print(f"\nResume: first run {first['answered']} answered before interrupt, second run "
+              f"{second['answered']} answered / {second['skipped']} skipped; "
+              f"{len(ids)}/{args.questions} ids present, {duplicates} duplicated")
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Tail-latency benchmark for per-request budgets (nodes/budget.py).
+Runs a mixed workload through ainvoke, as the HTTP server does: most
+questions need one search, but a --runaway fraction keep asking for another
+web_search for --runaway-rounds rounds. Compares the agent without budgets
+against a time limit and an LLM-call cap, and reports latency percentiles,
+total wall time and how many answers were partial.
+
+Run from the repository root:
+    python -m benchmarks.budget_bench --questions 200 --runaway 0.1 --time-limit 1.0
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Dict, List
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeSerpAPIServer, ScriptedChatModel, percentile
+from main_centralized_llm import create_hybrid_agent
+from main import create_agent
+from nodes.budget import request_budget
+from nodes.search_cache import SearchCache
+from nodes.search_client import SearchClient
+from nodes.tools import configure_search_cache, get_tools
+
+FACTORIES = {"react": create_agent, "hybrid": create_hybrid_agent}
+
+
+async def run_workload(agent, questions: List[str], concurrency: int, limits: Dict[str, Any]) -> Dict[str, Any]:
+    slots = asyncio.Semaphore(concurrency)
+    latencies, partial = [], 0
+
+    async def ask(question: str):
+        nonlocal partial
+        async with slots:
+            start = time.perf_counter()
+            with request_budget(**limits):
+                result = await agent.ainvoke({"messages": [HumanMessage(content=question)]})
+            latencies.append(time.perf_counter() - start)
+            partial += bool(result.get("budget_exhausted"))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(ask(q) for q in questions))
+    return {"wall": time.perf_counter() - start, "latencies": latencies, "partial": partial}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--runaway", type=float, default=0.1, help="Fraction of questions that never stop searching")
+    # Kept under AGENT_MESSAGE_WINDOW / 2: the scripted LLM counts rounds in the windowed history
+    parser.add_argument("--runaway-rounds", type=int, default=25)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    parser.add_argument("--time-limit", type=float, default=1.0)
+    parser.add_argument("--max-llm-calls", type=int, default=6)
+    parser.add_argument("--architecture", choices=list(FACTORIES), default="react")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    questions, plans = [], {}
+    for i in range(args.questions):
+        question = f"Question {i}"
+        if rng.random() < args.runaway:
+            plans[question] = [[("web_search", f"{question} detail {r}")] for r in range(args.runaway_rounds)]
+        else:
+            plans[question] = [[("web_search", question)]]
+        questions.append(question)
+
+    configure_search_cache(SearchCache(max_entries=0))
+    configurations = [
+        ("no budget", {}),
+        (f"time_limit={args.time_limit:g}s", {"time_limit": args.time_limit}),
+        (f"max_llm_calls={args.max_llm_calls}", {"max_llm_calls": args.max_llm_calls}),
+    ]
+    with FakeSerpAPIServer(latency=args.search_latency) as server:
+        client = SearchClient(api_key="bench", base_url=server.url, pool_size=args.concurrency)
+        tools = get_tools(client)
+        agent = FACTORIES[args.architecture](llm=ScriptedChatModel(latency=args.llm_latency, plans=plans), tools=tools)
+        runaway = sum(len(plan) > 1 for plan in plans.values())
+        print(f"{args.architecture}: {args.questions} questions ({runaway} runaway x {args.runaway_rounds} rounds), "
+              f"concurrency={args.concurrency}\n")
+        print(f"{'configuration':<22}{'wall s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'partial':>9}")
+        for name, limits in configurations:
+            r = asyncio.run(run_workload(agent, questions, args.concurrency, limits))
+            ms = [latency * 1000 for latency in r["latencies"]]
+            print(f"{name:<22}{r['wall']:>8.2f}{percentile(ms, 50):>9.0f}{percentile(ms, 95):>9.0f}"
+                  f"{percentile(ms, 99):>9.0f}{max(ms):>9.0f}{r['partial']:>9}")
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Micro-benchmark: legacy regex + eval calculator vs the AST expression engine.
+
+Run from the repository root:
+    python -m benchmarks.calculator_bench --expressions 5000
+"""
+
+import argparse
+import random
+import re
+import time
+
+from nodes.calculator import calculate, calculate_over, compile_expression, parse
+from nodes.tools import calculator_function
+
+
+def legacy_calculator(expression: str) -> str:
+    """The calculator as it was before the expression engine (kept for comparison)."""
+    try:
+        expression = expression.lower()
+        math_patterns = [
+            r'calculate\s+(.+)',
+            r'what\s+is\s+(.+)',
+            r'compute\s+(.+)',
+            r'solve\s+(.+)',
+            r'(\d+(?:\.\d+)?\s*[+\-*/]\s*\d+(?:\.\d+)?(?:\s*[+\-*/]\s*\d+(?:\.\d+)?)*)',
+            r'(\d+(?:\.\d+)?(?:\s*%|\s+percent))',
+        ]
+        math_expression = None
+        for pattern in math_patterns:
+            match = re.search(pattern, expression)
+            if match:
+                math_expression = match.group(1).strip()
+                break
+        if not math_expression:
+            math_expression = expression
+        if '%' in math_expression or 'percent' in math_expression:
+            numbers = re.findall(r'\d+(?:\.\d+)?', math_expression)
+            if len(numbers) >= 2:
+                base = float(numbers[0])
+                percentage = float(numbers[1])
+                return f"Result: {percentage}% of {base} = {(base * percentage) / 100}"
+        allowed_chars = "0123456789+-*/.() "
+        clean_expression = ''.join(c for c in math_expression if c in allowed_chars)
+        if not clean_expression.strip():
+            return "No valid mathematical expression found."
+        result = eval(clean_expression, {"__builtins__": {}})
+        return f"Calculation: {clean_expression} = {result}"
+    except Exception as e:
+        return f"Calculation error: {str(e)}."
+
+
+_PREFIX_RE = re.compile(r"^(calculate|what is|compute) ")
+
+
+def _random_expression(rng: random.Random, depth: int = 0) -> str:
+    if depth > 2 or rng.random() < 0.3:
+        return str(rng.randint(1, 999))
+    op = rng.choice(["+", "-", "*", "/"])
+    left = _random_expression(rng, depth + 1)
+    right = _random_expression(rng, depth + 1)
+    return f"({left} {op} {right})" if rng.random() < 0.3 else f"{left} {op} {right}"
+
+
+def _corpus(n: int, unique_ratio: float, seed: int = 7):
+    rng = random.Random(seed)
+    pool = [_random_expression(rng) for _ in range(max(1, int(n * unique_ratio)))]
+    prefixes = ["", "calculate ", "what is ", "compute "]
+    return [rng.choice(prefixes) + rng.choice(pool) for _ in range(n)]
+
+
+def _time(label: str, fn, corpus) -> float:
+    start = time.perf_counter()
+    for expression in corpus:
+        fn(expression)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<22} {elapsed * 1e6 / len(corpus):8.2f} us/expr")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--expressions", type=int, default=5000)
+    args = parser.parse_args()
+
+    for label, unique_ratio in (("all unique", 1.0), ("10% unique (repeats)", 0.1)):
+        corpus = _corpus(args.expressions, unique_ratio)
+        print(f"{label} - {len(corpus)} expressions")
+        _time("legacy regex + eval", legacy_calculator, corpus)
+        parse.cache_clear()
+        compile_expression.cache_clear()
+        _time("engine (tool)", calculator_function, corpus)
+        _time("engine (tool, warm)", calculator_function, corpus)
+        bare = [_PREFIX_RE.sub("", e) for e in corpus]
+        parse.cache_clear()
+        compile_expression.cache_clear()
+        _time("engine (calculate)", calculate, bare)
+
+    # Batch mode: one vectorized call vs one call per input
+    inputs = [i * 0.5 for i in range(args.expressions)]
+    print(f"batch - one expression over {len(inputs)} inputs")
+    start = time.perf_counter()
+    for x in inputs:
+        calculate("1000 * (1 + x / 100) ** 10", {"x": x})
+    per_item = time.perf_counter() - start
+    start = time.perf_counter()
+    calculate_over("1000 * (1 + x / 100) ** 10", "x", inputs)
+    vectorized = time.perf_counter() - start
+    print(f"  {'per-item calculate':<22} {per_item * 1000:8.2f} ms")
+    print(f"  {'calculate_over':<22} {vectorized * 1000:8.2f} ms")
+
+    # Correctness against Python's own arithmetic on the bare expression (trusted input)
+    wrong = {"legacy": 0, "engine": 0}
+    corpus = _corpus(500, 1.0, seed=11)
+    for expression in corpus:
+        expected = eval(_PREFIX_RE.sub("", expression), {"__builtins__": {}})
+        for label, fn in (("legacy", legacy_calculator), ("engine", calculator_function)):
+            got = fn(expression).rsplit("=", 1)[-1].strip()
+            if got != str(expected):
+                wrong[label] += 1
+    print(f"wrong results out of {len(corpus)}: legacy={wrong['legacy']} engine={wrong['engine']}")
+
+if __name__ == "__main__":
+    main()
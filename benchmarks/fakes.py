@@ -0,0 +1,407 @@
+"""
+In-process stand-ins used by the benchmarks.
+Nothing here talks to the network beyond localhost.
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from nodes.memory import estimate_tokens
+from nodes.query_planner import PLANNER_NAME, PLANNER_PROMPT
+
+
+class _SerpAPIHandler(BaseHTTPRequestHandler):
+    """Answers SerpAPI-shaped JSON for any query, or 429 when the configured quota is exceeded."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up on the request (e.g. a cancelled tool call)
+
+    def _throttled(self) -> bool:
+        server = self.server
+        now = time.monotonic()
+        with server.lock:
+            server.request_count += 1
+            while server.recent and now - server.recent[0] >= 1.0:
+                server.recent.popleft()
+            over = (server.max_rps is not None and len(server.recent) >= server.max_rps) \
+                or (server.max_concurrent is not None and server.in_flight >= server.max_concurrent) \
+                or server.random.random() < server.error_rate
+            if over:
+                server.throttled_count += 1
+            else:
+                server.recent.append(now)
+                server.in_flight += 1
+            return over
+
+    def do_GET(self):
+        server = self.server
+        if self._throttled():
+            body = b'{"error": "Rate limit exceeded"}'
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        try:
+            time.sleep(server.latency)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+        query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+        body = json.dumps({
+            "organic_results": [
+                {"title": f"Result {i} for {query}", "link": f"{server.link_base}/{i}",
+                 "snippet": f"Snippet {i} about {query}."}
+                for i in range(1, 4)
+            ]
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeSerpAPIServer:
+    """
+    Local HTTP server that mimics the SerpAPI search endpoint.
+    Requests beyond `max_rps` per second or `max_concurrent` in flight, plus a
+    random `error_rate` fraction, are answered 429 with Retry-After: 1.
+    """
+
+    def __init__(self, latency: float = 0.0, max_rps: Optional[int] = None,
+                 max_concurrent: Optional[int] = None, error_rate: float = 0.0, seed: int = 0,
+                 link_base: str = "http://example.invalid"):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _SerpAPIHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.lock = threading.Lock()
+        self.httpd.request_count = 0
+        self.httpd.throttled_count = 0
+        self.httpd.in_flight = 0
+        self.httpd.recent = deque()
+        self.httpd.max_rps = max_rps
+        self.httpd.max_concurrent = max_concurrent
+        self.httpd.error_rate = error_rate
+        self.httpd.random = random.Random(seed)
+        self.httpd.link_base = link_base  # result links are <link_base>/1, /2, /3
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}/search"
+
+    @property
+    def request_count(self) -> int:
+        return self.httpd.request_count
+
+    @property
+    def throttled_count(self) -> int:
+        return self.httpd.throttled_count
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+_BOILERPLATE = """<nav><ul><li><a href="/">Home</a></li><li><a href="/news">News</a></li>
+<li><a href="/about">About us</a></li></ul></nav><script>window.analytics = {track: function () {}};</script>
+<aside>Subscribe to our newsletter for weekly updates on everything that matters to you.</aside>"""
+
+
+def fake_article(number: int, kb: int) -> bytes:
+    """An HTML article of about `kb` KiB: boilerplate around numbered paragraphs."""
+    paragraphs = []
+    size = 0
+    while size < kb * 1024:
+        text = (f"Paragraph {len(paragraphs) + 1} of page {number} explains topic {number} in depth, "
+                f"with details on measurements, history and the people involved in topic {number}.")
+        paragraphs.append(f"<p>{text}</p>")
+        size += len(text) + 7
+    return (f"<!doctype html><html><head><title>Page {number}</title><style>p {{margin: 0}}</style></head>"
+            f"<body>{_BOILERPLATE}<article><h1>Topic {number}</h1>{''.join(paragraphs)}</article>"
+            f"<footer>Copyright 2024 Example Media. All rights reserved worldwide.</footer></body></html>").encode()
+
+
+class _WebHandler(BaseHTTPRequestHandler):
+    """Serves /<n> as an HTML article with an ETag and Last-Modified; /big/<n> is `big_kb` KiB."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionResetError:
+            pass  # clients drop idle keep-alive connections and abandon capped bodies
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+            server.in_flight += 1
+            server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+        try:
+            time.sleep(server.latency)
+            big = self.path.startswith("/big/")
+            number = int(self.path.rstrip("/").rsplit("/", 1)[-1] or 0)
+            etag = f'"page-{number}-v{server.version}"'
+            if self.headers.get("If-None-Match") == etag:
+                with server.lock:
+                    server.not_modified_count += 1
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = fake_article(number, server.big_kb if big else server.page_kb)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", "Mon, 01 Jan 2024 00:00:00 GMT")
+            self.end_headers()
+            try:
+                for start in range(0, len(body), 65536):
+                    self.wfile.write(body[start:start + 65536])
+                    with server.lock:
+                        server.bytes_sent += len(body[start:start + 65536])
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True  # the client stopped reading early
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeWebServer:
+    """
+    Local HTTP server standing in for the pages behind search results.
+    Each request sleeps `latency` seconds; pages carry validators, so a
+    conditional request for an unchanged page gets a 304 until
+    change_pages() is called.
+    """
+
+    def __init__(self, latency: float = 0.0, page_kb: int = 40, big_kb: int = 20000):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _WebHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.page_kb = page_kb
+        self.httpd.big_kb = big_kb
+        self.httpd.version = 1
+        self.httpd.lock = threading.Lock()
+        self.httpd.request_count = 0
+        self.httpd.not_modified_count = 0
+        self.httpd.bytes_sent = 0
+        self.httpd.in_flight = 0
+        self.httpd.peak_in_flight = 0
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def __getattr__(self, name: str) -> Any:
+        # request_count, not_modified_count, bytes_sent, peak_in_flight, ...
+        return getattr(self.__dict__["httpd"], name)
+
+    def change_pages(self) -> None:
+        with self.httpd.lock:
+            self.httpd.version += 1
+
+    def reset_counters(self) -> None:
+        with self.httpd.lock:
+            self.httpd.request_count = self.httpd.not_modified_count = self.httpd.bytes_sent = 0
+            self.httpd.peak_in_flight = 0
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def percentile(samples, pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic chat model for benchmarks.
+    On a fresh question it asks for `searches` web_search calls; once tool
+    results are in, it answers with a summary of them. Questions listed in
+    `plans` follow their own script instead: a list of rounds, each a list
+    of (tool_name, tool_input) calls made in one turn. With
+    `one_call_per_turn` it requests those calls one per turn, like a ReAct
+    loop searching one thing at a time, unless the query planner's prompt
+    (nodes/query_planner.py) asked it to plan the question. Sleeps `latency`
+    seconds per call plus `token_latency` per prompt token to stand in for
+    network and prefill time, spends `cpu_time` seconds of pure-Python work
+    per call (response parsing and post-processing that hold the GIL), and
+    reports estimated token usage.
+    """
+
+    latency: float = 0.0
+    token_latency: float = 0.0
+    cpu_time: float = 0.0
+    model_name: str = "scripted"
+    searches: int = 1
+    tool_name: str = "web_search"
+    plans: Dict[str, List[List[Tuple[str, str]]]] = {}
+    one_call_per_turn: bool = False
+    call_count: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    @staticmethod
+    def _tool_calls(calls: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        return [{"name": name, "args": {"__arg1": tool_input}, "id": f"call_{next(_call_ids)}", "type": "tool_call"}
+                for name, tool_input in calls]
+
+    def _delay(self, messages: List[BaseMessage]) -> float:
+        return self.latency + self.token_latency * _prompt_tokens(messages)
+
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        if self.cpu_time:
+            _burn(self.cpu_time)
+        message = self._script(messages)
+        output_tokens = estimate_tokens(message.content) + sum(
+            estimate_tokens(json.dumps(c["args"])) for c in message.tool_calls)
+        input_tokens = _prompt_tokens(messages)
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        message.usage_metadata = {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                                  "total_tokens": input_tokens + output_tokens}
+        message.response_metadata = {"model_name": self.model_name}
+        return message
+
+    def _script(self, messages: List[BaseMessage]) -> AIMessage:
+        self.call_count += 1
+        last = messages[-1] if messages else None
+        if self.plans:
+            turn_start = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+            plan = self.plans.get(messages[turn_start].content) if turn_start >= 0 else None
+            if plan is not None:
+                if self.one_call_per_turn and not _planned(messages, turn_start):
+                    plan = [[call] for calls in plan for call in calls]
+                rounds_done = sum(1 for m in messages[turn_start + 1:] if isinstance(m, AIMessage) and m.tool_calls)
+                if rounds_done < len(plan):
+                    return AIMessage(content="", tool_calls=self._tool_calls(plan[rounds_done]))
+                gathered = [m.content for m in messages[turn_start + 1:] if isinstance(m, ToolMessage)]
+                return AIMessage(content=f"Answer based on {len(gathered)} tool results.")
+        if isinstance(last, ToolMessage) or self.searches == 0:
+            gathered = [m.content for m in messages if isinstance(m, ToolMessage)]
+            return AIMessage(content=f"Answer based on {len(gathered)} tool results.")
+
+        question = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        return AIMessage(
+            content="",
+            tool_calls=self._tool_calls([(self.tool_name, f"{question} part {i}") for i in range(self.searches)]),
+        )
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self._delay(messages):
+            time.sleep(self._delay(messages))
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self._delay(messages):
+            await asyncio.sleep(self._delay(messages))
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    def _chunks(self, message: AIMessage) -> Iterator[ChatGenerationChunk]:
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                    for i, c in enumerate(message.tool_calls)
+                ],
+            ))
+            return
+        for word in message.content.split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        if self._delay(messages):
+            time.sleep(self._delay(messages))
+        for chunk in self._chunks(self._respond(messages)):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        if self._delay(messages):
+            await asyncio.sleep(self._delay(messages))
+        for chunk in self._chunks(self._respond(messages)):
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+_call_ids = itertools.count()
+
+
+def _burn(seconds: float) -> None:
+    deadline = time.thread_time() + seconds
+    while time.thread_time() < deadline:
+        sum(i * i for i in range(200))
+
+
+def _planned(messages: List[BaseMessage], turn_start: int) -> bool:
+    """True when this is the planner's turn or the planner already ran for the current question."""
+    return (bool(messages) and isinstance(messages[0], SystemMessage) and messages[0].content == PLANNER_PROMPT) \
+        or any(isinstance(m, AIMessage) and m.name == PLANNER_NAME for m in messages[turn_start + 1:])
+
+
+def _prompt_tokens(messages: List[BaseMessage]) -> int:
+    return sum(estimate_tokens(str(m.content)) for m in messages)
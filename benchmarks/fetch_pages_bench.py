@@ -0,0 +1,102 @@
+"""
+Benchmark of the fetch_pages tool against local stand-ins for SerpAPI and the web.
+Fetches --pages pages one by one and then concurrently (threads and asyncio)
+through nodes/page_fetcher.PageFetcher, checks the per-host connection cap,
+re-fetches after the cache expires to count 304 revalidations, reads a huge
+page under the byte cap, and runs the tool end to end from a query.
+
+Run from the repository root:
+    python -m benchmarks.fetch_pages_bench --pages 12 --latency 0.1
+"""
+
+import argparse
+import asyncio
+import time
+from urllib.parse import urlparse
+
+from benchmarks.fakes import FakeSerpAPIServer, FakeWebServer
+from nodes.memory import estimate_tokens
+from nodes.page_fetcher import PageCache, PageFetcher
+from nodes.search_client import SearchClient
+from nodes.tools import fetch_pages_function
+
+
+def fetcher(args, ttl: float = 3600.0, **kwargs) -> PageFetcher:
+    # The stand-in web server is on loopback, which the fetcher refuses by default
+    return PageFetcher(max_concurrency=args.concurrency, per_host=args.per_host,
+                       cache=PageCache(ttl=ttl), allow_private=True, **kwargs)
+
+
+def timed(label: str, server: FakeWebServer, fn) -> list:
+    server.reset_counters()
+    start = time.perf_counter()
+    pages = fn()
+    elapsed = time.perf_counter() - start
+    errors = sum(1 for page in pages if page.get("error"))
+    print(f"  {label:<28}{elapsed * 1000:>8.0f} ms   {server.request_count:>3} requests, "
+          f"{server.not_modified_count:>3} x 304, {server.bytes_sent / 1e3:>8.0f} KB sent, "
+          f"peak {server.peak_in_flight} in flight, {errors} errors")
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds the fake web server takes per page")
+    parser.add_argument("--page-kb", type=int, default=40)
+    parser.add_argument("--big-kb", type=int, default=20000, help="Size of the page read under the byte cap")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--budget", type=int, default=1200, help="fetch_pages output token budget (env default)")
+    args = parser.parse_args()
+
+    with FakeWebServer(latency=args.latency, page_kb=args.page_kb, big_kb=args.big_kb) as web:
+        # Two hosts (127.0.0.1 and localhost) so the per-host cap is visible
+        port = urlparse(web.url).port
+        urls = [f"http://{'127.0.0.1' if i % 2 else 'localhost'}:{port}/{i}" for i in range(1, args.pages + 1)]
+
+        print(f"Fetching {args.pages} pages of ~{args.page_kb} KB ({args.latency * 1000:.0f} ms each):")
+        sequential = fetcher(args)
+        timed("sequential", web, lambda: [sequential.fetch(url) for url in urls])
+        timed("concurrent (threads)", web, lambda: fetcher(args).fetch_many(urls))
+        timed("concurrent (asyncio)", web, lambda: asyncio.run(fetcher(args).afetch_many(urls)))
+        print(f"  per-host cap {args.per_host}, {len({urlparse(u).netloc for u in urls})} hosts")
+
+        print("\nCache:")
+        cached = fetcher(args, ttl=0.0)  # every entry is immediately stale, so each re-fetch revalidates
+        first = timed("cold", web, lambda: cached.fetch_many(urls))
+        again = timed("expired -> revalidated", web, lambda: cached.fetch_many(urls))
+        assert [p["blocks"] for p in first] == [p["blocks"] for p in again]
+        fresh = fetcher(args)
+        fresh.fetch_many(urls)
+        timed("fresh (no request)", web, lambda: fresh.fetch_many(urls))
+        web.change_pages()
+        timed("changed -> re-downloaded", web, lambda: cached.fetch_many(urls))
+
+        print("\nByte and text caps on a huge page:")
+        for label, kwargs in (("max_bytes=1 MB", {"max_bytes": 1_000_000, "max_chars": 10 ** 9}),
+                              ("max_chars=20000", {})):
+            capped = fetcher(args, **kwargs)
+            start = time.perf_counter()
+            page = capped.fetch(f"{web.url}/big/1")
+            elapsed = time.perf_counter() - start
+            chars = sum(len(block) for block in page["blocks"])
+            print(f"  {label:<28}{elapsed * 1000:>8.0f} ms   read {page['bytes'] / 1e3:.0f} of {args.big_kb} KB, "
+                  f"{chars} chars extracted, truncated={page['truncated']}")
+
+        print("\nfetch_pages tool from a query (top results of the fake SerpAPI):")
+        with FakeSerpAPIServer(link_base=web.url) as serp:
+            client = SearchClient(api_key="bench", base_url=serp.url)
+            tool_fetcher = fetcher(args)
+            for label in ("first call", "repeat"):
+                web.reset_counters()
+                start = time.perf_counter()
+                text = fetch_pages_function("topic 2 measurements history", fetcher=tool_fetcher, client=client)
+                elapsed = time.perf_counter() - start
+                print(f"  {label:<28}{elapsed * 1000:>8.0f} ms   {serp.request_count} SerpAPI calls so far, "
+                      f"{web.request_count} page requests, {estimate_tokens(text)} tokens returned")
+            client.close()
+
+
+if __name__ == "__main__":
+    main()
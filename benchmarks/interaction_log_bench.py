@@ -0,0 +1,182 @@
+"""
+Benchmark of the interaction log (nodes/interaction_log.py).
+Records --records turns (a third of them with feedback) from --threads
+threads and reports what the caller pays per record: the write-behind log
+against writing each record synchronously to SQLite or to a JSONL file.
+Then reports drain throughput, bytes on disk against the raw JSON, segment
+rotation, query latency by tool, rating and time range, and what a burst
+larger than the queue costs the callers.
+
+Run from the repository root:
+    python -m benchmarks.interaction_log_bench --records 50000 --threads 8
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.fakes import percentile
+from nodes.interaction_log import InteractionLog
+
+TOOLS = ["web_search", "calculator", "fetch_pages", "local_search"]
+FEEDBACK = ["+", "+ great sources", "yes", "-", "- the numbers are out of date", "no", "could be shorter"]
+
+
+def make_turns(count: int, seed: int = 0) -> List[Dict]:
+    rng = random.Random(seed)
+    turns = []
+    for i in range(count):
+        words = " ".join(rng.choice(["population", "growth", "capital", "rate", "compare", "history", "price"])
+                         for _ in range(rng.randint(6, 14)))
+        answer = " ".join(f"{words} fact {j}." for j in range(rng.randint(3, 12)))
+        tools = rng.sample(TOOLS, rng.randint(0, 2))
+        turns.append({"question": f"Question {i}: {words}?", "answer": answer, "tools_used": tools,
+                      "question_tokens": len(words) // 4, "answer_tokens": len(answer) // 4})
+    return turns
+
+
+def timed_calls(turns: List[Dict], threads: int, record: Callable[[Dict, bool], None]) -> Dict:
+    """Run record(turn, with_feedback) for every turn across threads; per-call latency in microseconds."""
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def worker(part: List[Dict]):
+        local = []
+        for i, turn in enumerate(part):
+            start = time.perf_counter()
+            record(turn, i % 3 == 0)
+            local.append((time.perf_counter() - start) * 1e6)
+        with lock:
+            latencies.extend(local)
+
+    chunks = [turns[i::threads] for i in range(threads)]
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return {"wall": time.perf_counter() - start, "latencies": latencies}
+
+
+def report(label: str, result: Dict, extra: str = "") -> None:
+    us = result["latencies"]
+    print(f"  {label:<26}{percentile(us, 50):>8.1f}{percentile(us, 99):>9.1f}{max(us):>10.0f}"
+          f"{result['wall']:>8.2f}  {extra}")
+
+
+def sync_sqlite(path: str) -> Callable[[Dict, bool], None]:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("CREATE TABLE records (ts REAL, kind TEXT, data TEXT)")
+    lock = threading.Lock()
+
+    def record(turn: Dict, with_feedback: bool) -> None:
+        rows = [(time.time(), "turn", json.dumps(turn))]
+        if with_feedback:
+            rows.append((time.time(), "feedback", json.dumps({"feedback": "+", "question": turn["question"]})))
+        with lock, conn:
+            conn.executemany("INSERT INTO records VALUES (?, ?, ?)", rows)
+    return record
+
+
+def sync_jsonl(path: str) -> Callable[[Dict, bool], None]:
+    lock = threading.Lock()
+
+    def record(turn: Dict, with_feedback: bool) -> None:
+        lines = [json.dumps({"ts": time.time(), "kind": "turn", **turn})]
+        if with_feedback:
+            lines.append(json.dumps({"ts": time.time(), "kind": "feedback", "feedback": "+"}))
+        with lock, open(path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    return record
+
+
+def write_behind(log: InteractionLog) -> Callable[[Dict, bool], None]:
+    rng = random.Random(1)
+
+    def record(turn: Dict, with_feedback: bool) -> None:
+        turn = dict(turn)
+        log.record_turn(turn, session_id="bench")
+        if with_feedback:
+            log.record_feedback(turn, rng.choice(FEEDBACK), session_id="bench")
+    return record
+
+
+def disk_bytes(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def timed_query(label: str, fn, repeat: int = 20) -> None:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    size = len(result)
+    print(f"  {label:<40}{elapsed * 1000:>8.2f} ms   {size} {'records' if isinstance(result, list) else 'tools'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--segment-mb", type=float, default=4.0)
+    parser.add_argument("--burst-queue", type=int, default=1000, help="Queue size for the overflow run")
+    args = parser.parse_args()
+
+    turns = make_turns(args.records)
+    raw = sum(len(json.dumps(turn)) for turn in turns)
+    print(f"{args.records} turns ({raw / 1e6:.1f} MB as JSON), a third with feedback, {args.threads} threads\n")
+    print(f"  {'per record (caller)':<26}{'p50 us':>8}{'p99 us':>9}{'max us':>10}{'wall s':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sample = turns[:max(1, args.records // 10)]
+        report("sync SQLite commit", timed_calls(sample, args.threads, sync_sqlite(os.path.join(tmp, "sync.db"))),
+               f"(first {len(sample)} turns)")
+        report("sync JSONL + fsync", timed_calls(sample, args.threads, sync_jsonl(os.path.join(tmp, "sync.jsonl"))),
+               f"(first {len(sample)} turns)")
+
+        directory = os.path.join(tmp, "log")
+        log = InteractionLog(directory, queue_size=args.records * 2, segment_bytes=int(args.segment_mb * 1024 * 1024),
+                             max_segments=0)
+        result = timed_calls(turns, args.threads, write_behind(log))
+        enqueued = time.perf_counter()
+        log.flush(timeout=600)
+        drained = time.perf_counter() - enqueued
+        stats = log.stats()
+        report("write-behind log", result, f"drained {drained:.2f} s later")
+        print(f"\n  {stats['written']} records written ({stats['written'] / (result['wall'] + drained):,.0f}/s), "
+              f"{stats['dropped']} dropped, {stats['segments']} segments, "
+              f"{disk_bytes(directory) / 1e6:.1f} MB on disk vs {raw / 1e6:.1f} MB of turn JSON")
+
+        print("\nQueries:")
+        newest = log.query(limit=1)[0]["ts"]
+        oldest = log.query(limit=0, since=0)[-1]["ts"]
+        tenth = newest - (newest - oldest) / 10
+        timed_query("by tool (calculator, latest 100)", lambda: log.query(tool="calculator"))
+        timed_query("by rating (-1, latest 100)", lambda: log.query(rating=-1))
+        timed_query("by tool + rating, all", lambda: log.query(tool="web_search", rating=1, limit=0), repeat=3)
+        timed_query("time range (newest 10%), all", lambda: log.query(since=tenth, limit=0), repeat=3)
+        timed_query("rating summary per tool, all time", log.rating_summary, repeat=3)
+        log.close()
+
+        print(f"\nBurst into a {args.burst_queue}-record queue:")
+        burst = InteractionLog(os.path.join(tmp, "burst"), queue_size=args.burst_queue)
+        result = timed_calls(turns, args.threads, write_behind(burst))
+        burst.flush(timeout=600)
+        stats = burst.stats()
+        report("write-behind log", result, f"{stats['written']} written, {stats['dropped']} dropped")
+        burst.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark of the local BM25 index: indexing throughput, cold start and top-k query latency.
+Generates a synthetic corpus with a Zipf-distributed vocabulary, indexes it
+in batches (one segment per commit, as incremental indexing produces),
+reopens the index from disk and times queries before and after merge().
+
+Run from the repository root:
+    python -m benchmarks.local_index_bench --docs 20000 --batches 5 --queries 500
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.fakes import percentile
+from nodes.local_index import LocalIndex
+
+
+def synthetic_corpus(docs: int, vocabulary: int, words: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    vocab = np.array([f"w{i}" for i in range(vocabulary)])
+    # Zipf-like: a few very common words, a long tail of rare ones
+    weights = 1.0 / np.arange(1, vocabulary + 1)
+    weights /= weights.sum()
+    for i in range(docs):
+        text = " ".join(rng.choice(vocab, size=words, p=weights))
+        yield {"title": f"doc {i}", "text": text, "source": f"doc{i}.txt"}
+
+
+def time_queries(index: LocalIndex, queries, k: int):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, k=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--batches", type=int, default=5, help="Commits (segments) the corpus is indexed in")
+    parser.add_argument("--words", type=int, default=150, help="Words per document (one passage)")
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp(prefix="local_index_bench_")
+    try:
+        corpus = list(synthetic_corpus(args.docs, args.vocabulary, args.words))
+        index = LocalIndex(path)
+        start = time.perf_counter()
+        batch = -(-len(corpus) // args.batches)
+        for i in range(0, len(corpus), batch):
+            index.add_documents(corpus[i:i + batch])
+            index.commit()
+        elapsed = time.perf_counter() - start
+        print(f"Indexed {args.docs} docs in {args.batches} segments: {elapsed:.2f}s "
+              f"({args.docs / elapsed:.0f} docs/s)")
+        index.close()
+
+        rng = np.random.default_rng(1)
+        queries = [" ".join(f"w{w}" for w in rng.integers(10, 5000, size=rng.integers(2, 5)))
+                   for _ in range(args.queries)]
+
+        start = time.perf_counter()
+        index = LocalIndex(path)
+        opened = time.perf_counter() - start
+        first = time_queries(index, queries[:1], args.k)[0]
+        print(f"Cold start: open {opened * 1000:.2f} ms, first query {first:.2f} ms")
+
+        latencies = time_queries(index, queries, args.k)
+        print(f"{args.batches} segments: p50={percentile(latencies, 50):.2f} ms  "
+              f"p95={percentile(latencies, 95):.2f} ms  p99={percentile(latencies, 99):.2f} ms")
+
+        start = time.perf_counter()
+        index.merge()
+        print(f"merge(): {time.perf_counter() - start:.2f}s")
+        latencies = time_queries(index, queries, args.k)
+        print(f"1 segment:  p50={percentile(latencies, 50):.2f} ms  "
+              f"p95={percentile(latencies, 95):.2f} ms  p99={percentile(latencies, 99):.2f} ms")
+        index.close()
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
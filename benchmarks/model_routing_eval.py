@@ -0,0 +1,121 @@
+"""
+Offline evaluation of model routing (fast model for tool selection, strong model for answers).
+Runs the query corpus through the ReAct and hybrid agents with scripted fake
+models standing in for the fast and strong Gemini models, under four
+configurations: strong model only (the baseline), fast model only, and the
+"cascade" and "phase" routers. Reports latency, tokens per model, estimated
+cost, which model wrote the final answers and whether they match the baseline.
+
+Run from the repository root:
+    python -m benchmarks.model_routing_eval --corpus benchmarks/queries.jsonl --concurrency 8
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from benchmarks.agent_bench import _messages_input, load_corpus
+from benchmarks.fakes import FakeSerpAPIServer, ScriptedChatModel, percentile
+from main import create_agent
+from main_centralized_llm import build_initial_state, create_hybrid_agent
+from nodes.model_router import RoutedChatModel
+from nodes.search_cache import SearchCache
+from nodes.search_client import SearchClient
+from nodes.tools import configure_search_cache, get_tools
+
+CONFIGS = ("strong", "fast", "cascade", "phase")
+
+
+def _models(args, plans) -> Dict[str, ScriptedChatModel]:
+    return {
+        "fast": ScriptedChatModel(model_name="fast", latency=args.fast_latency,
+                                  token_latency=args.fast_token_latency, plans=plans),
+        "strong": ScriptedChatModel(model_name="strong", latency=args.strong_latency,
+                                    token_latency=args.strong_token_latency, plans=plans),
+    }
+
+
+def _llm(config: str, models: Dict[str, ScriptedChatModel]):
+    if config in models:
+        return models[config]
+    return RoutedChatModel(tool_selection=models["fast"], synthesis=models["strong"], strategy=config)
+
+
+def _build(architecture: str, llm, tools) -> Callable[[str], Dict[str, Any]]:
+    if architecture == "react":
+        agent = create_agent(llm=llm, tools=tools)
+        return lambda question: agent.invoke(_messages_input(question))
+    agent = create_hybrid_agent(tools=tools, routing={"agent": llm})
+    return lambda question: agent.invoke(build_initial_state(question))
+
+
+def evaluate(architecture: str, config: str, queries: List[Dict[str, Any]], tools, args) -> Dict[str, Any]:
+    plans = {q["question"]: q["plan"] for q in queries if q["plan"] is not None}
+    models = _models(args, plans)
+    run = _build(architecture, _llm(config, models), tools)
+
+    def timed(question: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        final = run(question)["messages"][-1]
+        return {"question": question, "latency": time.perf_counter() - start, "answer": final.content,
+                "answered_by": final.response_metadata.get("model_name")}
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        runs = list(pool.map(timed, [q["question"] for q in queries]))
+
+    latencies = [r["latency"] for r in runs]
+    tokens = {name: model.input_tokens + model.output_tokens for name, model in models.items()}
+    cost = sum((models[name].input_tokens * getattr(args, f"{name}_input_price")
+                + models[name].output_tokens * getattr(args, f"{name}_output_price")) / 1e6
+               for name in models)
+    return {
+        "architecture": architecture, "config": config,
+        "p50_ms": percentile(latencies, 50) * 1000, "p95_ms": percentile(latencies, 95) * 1000,
+        "fast_calls": models["fast"].call_count, "strong_calls": models["strong"].call_count,
+        "fast_tokens": tokens["fast"], "strong_tokens": tokens["strong"], "cost": cost,
+        "strong_answers": sum(r["answered_by"] == "strong" for r in runs) / len(runs),
+        "answers": {r["question"]: r["answer"] for r in runs},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", nargs="+", default=["benchmarks/queries.jsonl"])
+    parser.add_argument("--architectures", nargs="+", choices=["react", "hybrid"], default=["react", "hybrid"])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--fast-latency", type=float, default=0.03, help="Seconds per fast-model call")
+    parser.add_argument("--strong-latency", type=float, default=0.15, help="Seconds per strong-model call")
+    parser.add_argument("--fast-token-latency", type=float, default=0.00002, help="Seconds per prompt token")
+    parser.add_argument("--strong-token-latency", type=float, default=0.0001)
+    # USD per million tokens; defaults are in the ratio of Gemini Flash to Pro list prices
+    parser.add_argument("--fast-input-price", type=float, default=0.075)
+    parser.add_argument("--fast-output-price", type=float, default=0.30)
+    parser.add_argument("--strong-input-price", type=float, default=1.25)
+    parser.add_argument("--strong-output-price", type=float, default=5.00)
+    parser.add_argument("--search-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    queries = load_corpus(args.corpus)
+    configure_search_cache(SearchCache(max_entries=0))
+    with FakeSerpAPIServer(latency=args.search_latency) as server:
+        client = SearchClient(api_key="bench", base_url=server.url, pool_size=max(args.concurrency, 8))
+        tools = get_tools(client)
+        print(f"{len(queries)} queries, concurrency={args.concurrency}\n")
+        print(f"{'architecture':<14}{'config':<9}{'p50 ms':>8}{'p95 ms':>8}{'fast/strong calls':>19}"
+              f"{'fast tok':>10}{'strong tok':>11}{'cost $':>10}{'strong ans':>11}{'same ans':>9}")
+        for architecture in args.architectures:
+            baseline = None
+            for config in CONFIGS:
+                r = evaluate(architecture, config, queries, tools, args)
+                baseline = baseline or r
+                same = sum(r["answers"][q] == a for q, a in baseline["answers"].items()) / len(baseline["answers"])
+                calls = f"{r['fast_calls']}/{r['strong_calls']}"
+                print(f"{architecture:<14}{config:<9}{r['p50_ms']:>8.0f}{r['p95_ms']:>8.0f}{calls:>19}"
+                      f"{r['fast_tokens']:>10}{r['strong_tokens']:>11}{r['cost']:>10.4f}"
+                      f"{r['strong_answers']:>10.0%}{same:>9.0%}")
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark of the hybrid graph's query planner on the replayed query corpus.
+The scripted LLM follows each question's plan in benchmarks/queries.jsonl
+but, like a ReAct loop, requests one tool call per turn unless the planner
+prompt asks it to plan the question; then it issues each round's
+independent calls together. Reports LLM round-trips and latency per
+question for the ReAct agent, the hybrid graph without the planner and the
+hybrid graph with it, for all questions and for multi-lookup ones.
+
+Run from the repository root:
+    python -m benchmarks.planner_bench --llm-latency 0.3 --search-latency 0.1
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from benchmarks.agent_bench import load_corpus
+from benchmarks.fakes import FakeSerpAPIServer, ScriptedChatModel, percentile
+from main import create_agent
+from main_centralized_llm import create_hybrid_agent
+from nodes.search_cache import SearchCache
+from nodes.search_client import SearchClient
+from nodes.tools import configure_search_cache, get_tools
+
+CONFIGURATIONS = {
+    "react (main.py)": lambda llm, tools: create_agent(llm=llm, tools=tools),
+    "hybrid": lambda llm, tools: create_hybrid_agent(llm=llm, tools=tools, planner=False),
+    "hybrid + planner": lambda llm, tools: create_hybrid_agent(llm=llm, tools=tools, planner=True),
+}
+
+
+def run(agent, question: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    messages = agent.invoke({"messages": [HumanMessage(content=question)]})["messages"]
+    return {
+        "latency": time.perf_counter() - start,
+        "llm_calls": sum(isinstance(m, AIMessage) for m in messages),
+        "tool_calls": sum(isinstance(m, ToolMessage) for m in messages),
+    }
+
+
+def summarize(runs: List[Dict[str, Any]]) -> str:
+    latencies = [r["latency"] for r in runs]
+    return (f"{statistics.mean(r['llm_calls'] for r in runs):>7.2f}{statistics.mean(r['tool_calls'] for r in runs):>8.2f}"
+            f"{statistics.mean(latencies) * 1000:>9.0f}{percentile(latencies, 95) * 1000:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", nargs="+", default=["benchmarks/queries.jsonl"])
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--search-latency", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    queries = [q for q in load_corpus(args.corpus) if q["plan"] is not None]
+    plans = {q["question"]: q["plan"] for q in queries}
+    multi = {q["question"] for q in queries if sum(len(calls) for calls in q["plan"]) > 1}
+    configure_search_cache(SearchCache(max_entries=0))
+
+    with FakeSerpAPIServer(latency=args.search_latency) as server:
+        client = SearchClient(api_key="bench", base_url=server.url, pool_size=16)
+        tools = get_tools(client)
+        print(f"{len(queries)} questions ({len(multi)} with several lookups), "
+              f"llm_latency={args.llm_latency}s, search_latency={args.search_latency}s\n")
+        print(f"{'':<20}{'---------- all questions ----------':>33}   {'--------- multi-lookup ---------':>33}")
+        print(f"{'configuration':<20}" + f"{'llm/q':>7}{'tools/q':>8}{'mean ms':>9}{'p95 ms':>9}" * 2)
+        for name, factory in CONFIGURATIONS.items():
+            llm = ScriptedChatModel(latency=args.llm_latency, plans=plans, one_call_per_turn=True)
+            agent = factory(llm, tools)
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                runs = dict(zip(plans, pool.map(lambda question: run(agent, question), plans)))
+            print(f"{name:<20}{summarize(list(runs.values()))}   "
+                  f"{summarize([runs[question] for question in multi])}")
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
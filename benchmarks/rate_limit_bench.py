@@ -0,0 +1,111 @@
+"""
+Benchmark of the adaptive client-side rate limiter against a throttling SerpAPI.
+A burst of concurrent searches hits the local SerpAPI stand-in, which
+answers 429 beyond its per-second and concurrency quota. Runs once without
+a limiter and once with an AdaptiveLimiter configured above the real quota,
+reporting 429s, searches that failed outright (the error text the LLM would
+get), wall time and latency; then measures how interactive (high priority)
+searches fare while a batch job saturates the limiter.
+
+Run from the repository root:
+    python -m benchmarks.rate_limit_bench --searches 200 --workers 32 --max-rps 20
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fakes import FakeSerpAPIServer, percentile
+from nodes.rate_limiter import HIGH, LOW, AdaptiveLimiter, priority
+from nodes.search_client import SearchClient, SearchError
+
+
+def _timed_search(client: SearchClient, query: str, level: int) -> Dict[str, Any]:
+    start = time.perf_counter()
+    with priority(level):
+        try:
+            client.search_json(query)
+            error = None
+        except SearchError as e:
+            error = str(e)
+    return {"latency": time.perf_counter() - start, "error": error}
+
+
+def _summary(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = [r["latency"] for r in runs]
+    return {"n": len(runs), "failed": sum(r["error"] is not None for r in runs),
+            "p50_ms": percentile(latencies, 50) * 1000, "p95_ms": percentile(latencies, 95) * 1000}
+
+
+def burst(args, limiter: Optional[AdaptiveLimiter]) -> Dict[str, Any]:
+    """args.searches distinct searches from args.workers threads at once."""
+    with FakeSerpAPIServer(latency=args.search_latency, max_rps=args.max_rps,
+                           max_concurrent=args.max_concurrent) as server:
+        client = SearchClient(api_key="bench", base_url=server.url, pool_size=args.workers,
+                              rate_limiter=limiter)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            runs = list(pool.map(lambda i: _timed_search(client, f"query {i}", LOW), range(args.searches)))
+        elapsed = time.perf_counter() - start
+        client.close()
+        return {**_summary(runs), "elapsed": elapsed, "upstream": server.request_count,
+                "throttled": server.throttled_count}
+
+
+def mixed(args, limiter: AdaptiveLimiter) -> Dict[str, Dict[str, Any]]:
+    """Batch (low priority) searches saturate the limiter while interactive ones trickle in."""
+    with FakeSerpAPIServer(latency=args.search_latency, max_rps=args.max_rps,
+                           max_concurrent=args.max_concurrent) as server:
+        client = SearchClient(api_key="bench", base_url=server.url, pool_size=args.workers,
+                              rate_limiter=limiter)
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            batch = [pool.submit(_timed_search, client, f"batch {i}", LOW) for i in range(args.searches)]
+            interactive = []
+            with ThreadPoolExecutor(max_workers=4) as front:
+                for i in range(args.interactive):
+                    time.sleep(0.05)
+                    interactive.append(front.submit(_timed_search, client, f"user {i}", HIGH))
+            results = {"interactive": _summary([f.result() for f in interactive]),
+                       "batch": _summary([f.result() for f in batch])}
+        client.close()
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--interactive", type=int, default=20)
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    parser.add_argument("--max-rps", type=int, default=20, help="Upstream quota (requests per second)")
+    parser.add_argument("--max-concurrent", type=int, default=8, help="Upstream concurrency quota")
+    parser.add_argument("--limiter-rate", type=float, default=40.0,
+                        help="Limiter's configured rate; above the quota to exercise AIMD")
+    parser.add_argument("--limiter-concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    print(f"{args.searches} searches from {args.workers} workers; upstream quota {args.max_rps} req/s, "
+          f"{args.max_concurrent} concurrent\n")
+    print(f"{'mode':<10}{'elapsed s':>10}{'upstream':>10}{'429s':>7}{'failed':>8}{'p50 ms':>9}{'p95 ms':>9}")
+    for name in ("none", "adaptive"):
+        limiter = AdaptiveLimiter("serpapi", args.limiter_rate, burst=args.max_concurrent,
+                                  max_concurrency=args.limiter_concurrency) if name == "adaptive" else None
+        r = burst(args, limiter)
+        print(f"{name:<10}{r['elapsed']:>10.2f}{r['upstream']:>10}{r['throttled']:>7}{r['failed']:>8}"
+              f"{r['p50_ms']:>9.0f}{r['p95_ms']:>9.0f}")
+        if limiter is not None:
+            stats = limiter.stats()
+            print(f"{'':<10}limiter settled at {stats['rate']} req/s, concurrency {stats['limit']} "
+                  f"({stats['overloads']} overloads, {stats['successes']} successes)")
+
+    limiter = AdaptiveLimiter("serpapi", args.limiter_rate, burst=args.max_concurrent,
+                              max_concurrency=args.limiter_concurrency)
+    results = mixed(args, limiter)
+    print("\nPriority under batch load (adaptive limiter):")
+    for name, r in results.items():
+        print(f"  {name:<12} n={r['n']:<4} p50={r['p50_ms']:.0f}ms p95={r['p95_ms']:.0f}ms failed={r['failed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Latency benchmark: per-call HTTP setup vs the pooled SearchClient.
+
+Run from the repository root:
+    python -m benchmarks.search_client_bench --requests 500
+"""
+
+import argparse
+import time
+
+import requests
+
+from benchmarks.fakes import FakeSerpAPIServer, percentile
+from nodes.search_client import SearchClient, format_results
+
+
+def _per_call_search(url: str, query: str) -> str:
+    """What the old code path did: fresh session and connection for every query."""
+    with requests.Session() as session:
+        response = session.get(url, params={"q": query, "engine": "google", "api_key": "bench"}, timeout=10)
+        return format_results(response.json())
+
+
+def _measure(label: str, fn, n: int) -> None:
+    latencies = []
+    for i in range(n):
+        start = time.perf_counter()
+        fn(f"benchmark query {i}")
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<12} p50={percentile(latencies, 50):7.3f} ms  "
+          f"p99={percentile(latencies, 99):7.3f} ms  total={sum(latencies):9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0, help="Server-side latency in seconds")
+    args = parser.parse_args()
+
+    with FakeSerpAPIServer(latency=args.latency) as server:
+        client = SearchClient(api_key="bench", base_url=server.url)
+        _measure("per-call", lambda q: _per_call_search(server.url, q), args.requests)
+        _measure("pooled", client.search, args.requests)
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
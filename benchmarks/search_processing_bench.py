@@ -0,0 +1,94 @@
+"""
+Benchmark of search result post-processing: prompt tokens and CPU time per search.
+Builds SerpAPI-shaped responses with a knowledge panel, ten organic results,
+syndicated near-duplicates and news items, then compares the unprocessed
+result text with the parsed, de-duplicated, ranked and truncated text. The
+token saving is paid again on every later turn of the ReAct loop, because
+earlier ToolMessages are re-sent with each LLM call.
+
+Run from the repository root:
+    python -m benchmarks.search_processing_bench --responses 500 --budget 300
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.fakes import percentile
+from nodes.memory import estimate_tokens
+from nodes.search_client import format_results
+from nodes.search_processing import process_results
+
+_WORDS = ("market energy policy report growth city climate data research model price election team "
+          "season company launch study health water battery network science history court").split()
+
+
+def _sentence(rng: random.Random, topic: str, length: int) -> str:
+    words = [rng.choice(_WORDS) for _ in range(length)]
+    words.insert(rng.randrange(len(words)), topic)
+    return " ".join(words).capitalize() + "."
+
+
+def synthetic_response(rng: random.Random, topic: str, fact: str, duplicates: int) -> dict:
+    """SerpAPI-shaped JSON; `fact` is planted in one organic snippet."""
+    organic = [{"title": f"{topic} {rng.choice(_WORDS)}", "link": f"https://site{i}.example/{topic}",
+                "snippet": " ".join(_sentence(rng, topic, rng.randint(12, 24)) for _ in range(2))}
+               for i in range(10)]
+    organic[rng.randrange(10)]["snippet"] += f" {fact}"
+    for i in range(duplicates):
+        # Syndicated copy of an earlier snippet with one word changed
+        source = rng.choice(organic[:10])
+        words = source["snippet"].split()
+        words[rng.randrange(len(words))] = rng.choice(_WORDS)
+        organic.append({"title": source["title"], "link": f"https://mirror{i}.example/", "snippet": " ".join(words)})
+    return {
+        "knowledge_graph": {"title": topic.title(), "description": _sentence(rng, topic, 15),
+                            "founded": str(rng.randint(1800, 2020)), "headquarters": rng.choice(_WORDS).title()},
+        "organic_results": organic,
+        "news_results": [{"title": _sentence(rng, topic, 8), "link": f"https://news{i}.example/",
+                          "snippet": _sentence(rng, topic, 20)} for i in range(3)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--responses", type=int, default=500)
+    parser.add_argument("--budget", type=int, default=300, help="Token budget per search result")
+    parser.add_argument("--duplicates", type=int, default=4, help="Near-duplicate snippets per response")
+    parser.add_argument("--turns", type=int, default=3, help="Later LLM turns that re-send each result")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    raw_tokens, processed_tokens, raw_times, processed_times, kept_fact = [], [], [], [], 0
+    for i in range(args.responses):
+        topic = f"topic{i}"
+        fact = f"The {topic} headline figure is {rng.randint(100, 999)} units."
+        res = synthetic_response(rng, topic, fact, args.duplicates)
+        query = f"{topic} headline figure"
+
+        start = time.perf_counter()
+        raw = format_results(res)
+        raw_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        processed = process_results(res, query, args.budget)
+        processed_times.append(time.perf_counter() - start)
+
+        raw_tokens.append(estimate_tokens(raw))
+        processed_tokens.append(estimate_tokens(processed))
+        kept_fact += fact in processed
+
+    raw_avg = sum(raw_tokens) / len(raw_tokens)
+    processed_avg = sum(processed_tokens) / len(processed_tokens)
+    print(f"{args.responses} responses, budget={args.budget} tokens, {args.duplicates} near-duplicates each\n")
+    print(f"{'':<12}{'tokens avg':>11}{'tokens p95':>11}{'cpu p50 us':>12}{'cpu p95 us':>12}")
+    for label, tokens, times in (("raw", raw_tokens, raw_times), ("processed", processed_tokens, processed_times)):
+        print(f"{label:<12}{sum(tokens) / len(tokens):>11.0f}{percentile(tokens, 95):>11}"
+              f"{percentile(times, 50) * 1e6:>12.0f}{percentile(times, 95) * 1e6:>12.0f}")
+    saved = raw_avg - processed_avg
+    print(f"\nTokens saved per search: {saved:.0f} ({saved / raw_avg:.0%}), "
+          f"{saved * (args.turns + 1):.0f} over {args.turns} later turns")
+    print(f"Relevant snippet kept: {kept_fact / args.responses:.0%}")
+
+
+if __name__ == "__main__":
+    main()
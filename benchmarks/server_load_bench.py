@@ -0,0 +1,83 @@
+"""
+Load benchmark for the HTTP front end (server.py).
+Many concurrent sessions ask questions and post feedback against one shared
+agent built on the scripted fake LLM; the app runs in-process over httpx's
+ASGI transport unless --url points at a running server.
+
+Run from the repository root:
+    python -m benchmarks.server_load_bench --sessions 50 --questions 5
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.fakes import ScriptedChatModel, percentile
+from main import create_agent
+from nodes.search_cache import SearchCache
+from nodes.tools import configure_search_cache, get_tools
+from server import create_app
+
+
+async def _session(client: httpx.AsyncClient, index: int, questions: int, chat_times, feedback_times, errors):
+    session_id = (await client.post("/sessions")).json()["session_id"]
+    for q in range(questions):
+        start = time.perf_counter()
+        response = await client.post("/chat", json={"session_id": session_id,
+                                                    "question": f"session {index} question {q}"})
+        chat_times.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors.append(response.text)
+            continue
+
+        start = time.perf_counter()
+        response = await client.post("/feedback", json={"session_id": session_id,
+                                                        "turn_id": response.json()["turn_id"],
+                                                        "feedback": "yes"})
+        feedback_times.append(time.perf_counter() - start)
+        if response.status_code != 202:
+            errors.append(response.text)
+
+
+async def run(args) -> None:
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        configure_search_cache(SearchCache(max_entries=0))
+        agent = create_agent(llm=ScriptedChatModel(latency=args.llm_latency), tools=get_tools())
+        app = create_app(agent=agent, max_concurrency=args.max_concurrency)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    chat_times, feedback_times, errors = [], [], []
+    async with client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            _session(client, i, args.questions, chat_times, feedback_times, errors)
+            for i in range(args.sessions)
+        ))
+        elapsed = time.perf_counter() - start
+
+    total = len(chat_times) + len(feedback_times)
+    print(f"sessions={args.sessions} questions/session={args.questions} llm_latency={args.llm_latency}s")
+    print(f"requests : {total} in {elapsed:.2f} s  ({total / elapsed:.1f} req/s, "
+          f"{len(chat_times) / elapsed:.1f} answers/s)  errors={len(errors)}")
+    for name, samples in (("chat", chat_times), ("feedback", feedback_times)):
+        if samples:
+            print(f"{name:<9}: p50={percentile(samples, 50) * 1000:7.1f} ms  "
+                  f"p95={percentile(samples, 95) * 1000:7.1f} ms  p99={percentile(samples, 99) * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--max-concurrency", type=int, default=64)
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
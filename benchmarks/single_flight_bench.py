@@ -0,0 +1,83 @@
+"""
+Single-flight benchmark: many sessions searching the same trending topic at
+once, with and without request coalescing, on the threaded and asyncio paths.
+Reports upstream SerpAPI requests and caller latency.
+
+Run from the repository root:
+    python -m benchmarks.single_flight_bench --callers 200 --topics 5
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fakes import FakeSerpAPIServer, percentile
+from nodes.search_cache import SearchCache
+from nodes.search_client import SearchClient
+from nodes.single_flight import SingleFlight, coalesce_tool
+from nodes.tools import configure_search_cache, get_tools
+
+
+def _queries(callers: int, topics: int):
+    # Same topics with varying case/spacing, as different users would type them
+    return [f"{'  ' if i % 3 else ''}Trending Topic {i % topics}{'?' if i % 2 else ''}" for i in range(callers)]
+
+
+def run_threaded(tool, queries, workers: int):
+    latencies = []
+
+    def call(query):
+        start = time.perf_counter()
+        tool.invoke(query)
+        latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(call, queries))
+    return latencies
+
+
+async def run_async(tool, queries):
+    latencies = []
+
+    async def call(query):
+        start = time.perf_counter()
+        await tool.ainvoke(query)
+        latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(call(q) for q in queries))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--callers", type=int, default=200)
+    parser.add_argument("--topics", type=int, default=5)
+    parser.add_argument("--search-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # The result cache would hide the effect after the first response; measure the in-flight window only
+    configure_search_cache(SearchCache(max_entries=0))
+    queries = _queries(args.callers, args.topics)
+
+    print(f"{args.callers} concurrent callers over {args.topics} topics, search latency {args.search_latency}s")
+    for mode in ("threaded", "async"):
+        for coalesce in (False, True):
+            with FakeSerpAPIServer(latency=args.search_latency) as server:
+                client = SearchClient(api_key="bench", base_url=server.url, pool_size=args.callers)
+                flight = SingleFlight()
+                raw = get_tools(client, single_flight=False)[0]
+                tool = coalesce_tool(raw, flight) if coalesce else raw
+                if mode == "threaded":
+                    latencies = run_threaded(tool, queries, workers=args.callers)
+                else:
+                    latencies = asyncio.run(run_async(tool, queries))
+                upstream = server.request_count
+                client.close()
+            label = f"{mode:<8} {'single-flight' if coalesce else 'baseline':<13}"
+            print(f"{label} upstream={upstream:>4}  p50={percentile(latencies, 50) * 1000:7.1f} ms  "
+                  f"p99={percentile(latencies, 99) * 1000:7.1f} ms  coalesced={flight.stats()['coalesced']}")
+
+
+if __name__ == "__main__":
+    main()
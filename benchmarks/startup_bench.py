@@ -0,0 +1,99 @@
+"""
+Start-up benchmark for the entry points, measured in fresh interpreters.
+For each entry module it reports the `python -X importtime` total and the
+packages that dominate it, the wall time until each agent architecture is
+built (imports, LLM, tools, graph), and how long the first question waits
+for the agent with and without the background warm-up, given a user who
+takes --think seconds to type it.
+
+Run from the repository root:
+    python -m benchmarks.startup_bench --runs 5 --think 1.0
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import Counter
+from typing import Dict, Tuple
+
+ENTRY_POINTS = ("main", "main_react_agent", "main_centralized_llm", "server", "batch")
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# Builds the agent without a real key; nothing is sent to Gemini or SerpAPI
+_ENV = {**os.environ, "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY") or "startup-bench",
+        "SERPAPI_API_KEY": os.getenv("SERPAPI_API_KEY") or "startup-bench"}
+
+_READY = """
+import time
+start = time.perf_counter()
+from nodes.agent_factory import get_agent
+get_agent({kind!r})
+print(time.perf_counter() - start)
+"""
+
+_FIRST_QUESTION = """
+import time
+from main import start_session
+from nodes.agent_factory import in_background
+startup = in_background(start_session) if {warm} else None
+time.sleep({think})  # the user typing the first question
+asked = time.perf_counter()
+startup.result() if startup else start_session()
+print(time.perf_counter() - asked)
+"""
+
+
+def _python(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *flags, "-c", code], capture_output=True, text=True, env=_ENV,
+                          check=True)
+
+
+def import_profile(module: str) -> Tuple[float, Counter]:
+    """(total ms, ms of self time per top-level package) for importing `module`."""
+    lines = _IMPORTTIME_RE.findall(_python(f"import {module}", "-X", "importtime").stderr)
+    packages: Counter = Counter()
+    total = 0.0
+    for self_us, cumulative_us, indent, name in lines:
+        packages[name.split(".")[0]] += int(self_us) / 1000
+        if name == module and len(indent) == 1:
+            total = int(cumulative_us) / 1000
+    return total, packages
+
+
+def timed(code: str, runs: int) -> float:
+    return statistics.median(float(_python(code).stdout.strip().splitlines()[-1]) for _ in range(runs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modules", nargs="+", default=list(ENTRY_POINTS))
+    parser.add_argument("--architectures", nargs="+", default=["react", "react_app", "centralized", "hybrid"])
+    parser.add_argument("--think", type=float, default=1.0, help="Seconds the user takes to type the first question")
+    parser.add_argument("--top", type=int, default=6, help="Packages listed per entry point")
+    args = parser.parse_args()
+
+    print(f"Import time (median of {args.runs}, -X importtime):")
+    for module in args.modules:
+        profiles = [import_profile(module) for _ in range(args.runs)]
+        total = statistics.median(t for t, _ in profiles)
+        packages: Dict[str, float] = {name: statistics.median(p[name] for _, p in profiles)
+                                      for name in profiles[0][1]}
+        top = sorted(packages.items(), key=lambda item: -item[1])[:args.top]
+        print(f"  {module:<22}{total:>8.1f} ms   " + ", ".join(f"{name} {ms:.0f}" for name, ms in top))
+
+    print(f"\nAgent ready from a fresh interpreter (median of {args.runs}):")
+    for kind in args.architectures:
+        print(f"  {kind:<22}{timed(_READY.format(kind=kind), args.runs) * 1000:>8.0f} ms")
+
+    print(f"\nFirst question wait for the agent (main.py, user types for {args.think:.1f}s):")
+    for label, warm in (("built on first question", False), ("background warm-up", True)):
+        wait = timed(_FIRST_QUESTION.format(warm=warm, think=args.think), args.runs)
+        print(f"  {label:<26}{wait * 1000:>8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Memory and serialization benchmark for the agent state schema on long tool loops.
+Runs the hybrid graph's agent -> tools loop with a scripted model for N tool
+rounds under the previous schema (append-only operator.add messages plus
+every legacy field, as the old hybrid graph populated them) and under
+nodes/agent_state.AgentState, and reports wall time, peak Python heap, the
+serialized size of the final state and the total bytes checkpointed.
+
+Run from the repository root:
+    python -m benchmarks.state_bench --rounds 25 100 400
+"""
+
+import argparse
+import operator
+import time
+import tracemalloc
+from typing import Annotated, Any, Dict, List, TypedDict
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.graph import END, StateGraph
+from langgraph.managed import RemainingSteps
+
+from nodes.agent_state import AgentState
+
+
+class LegacyState(TypedDict):
+    """The schema before the slim AgentState, kept here for comparison."""
+    user_input: str
+    messages: Annotated[List[BaseMessage], operator.add]
+    processed_query: str
+    tools_to_use: List[str]
+    tool_results: List[Dict[str, Any]]
+    evaluation_result: str
+    final_answer: str
+    feedback: str
+    memory_context: Dict[str, Any]
+    remaining_steps: RemainingSteps
+
+
+def build(schema, rounds: int, result_chars: int, legacy: bool):
+    result_text = "x" * result_chars
+    legacy_fields = {"tools_to_use": []} if legacy else {}
+    turns = iter(range(rounds + 1))  # the scripted model's own count; state may be windowed
+
+    def agent(state) -> dict:
+        step = next(turns)
+        if step >= rounds:
+            response = AIMessage(content="final answer")
+            return {"messages": [response], "final_answer": response.content, **legacy_fields}
+        response = AIMessage(content="", tool_calls=[{"name": "web_search", "args": {"query": f"q{step}"},
+                                                       "id": f"call-{step}"}])
+        return {"messages": [response], **{k: ["web_search"] for k in legacy_fields}}
+
+    def tools(state) -> dict:
+        call = state["messages"][-1].tool_calls[0]
+        message = ToolMessage(content=result_text, tool_call_id=call["id"], name=call["name"])
+        update = {"messages": [message]}
+        if legacy:
+            # The old tool node also copied every result into tool_results
+            update["tool_results"] = [{"tool": call["name"], "result": result_text, "status": "success"}]
+        return update
+
+    def should_continue(state) -> str:
+        return "tools" if getattr(state["messages"][-1], "tool_calls", None) else END
+
+    workflow = StateGraph(schema)
+    workflow.add_node("agent", agent)
+    workflow.add_node("tools", tools)
+    workflow.set_entry_point("agent")
+    workflow.add_conditional_edges("agent", should_continue, {"tools": "tools", END: END})
+    workflow.add_edge("tools", "agent")
+    return workflow
+
+
+def initial_state(legacy: bool) -> dict:
+    question = "What happened?"
+    if not legacy:
+        return {"messages": [HumanMessage(content=question)]}
+    return {"user_input": question, "messages": [HumanMessage(content=question)], "processed_query": question,
+            "tools_to_use": [], "tool_results": [], "evaluation_result": "", "final_answer": "",
+            "feedback": "", "memory_context": {}}
+
+
+def run(name: str, schema, rounds: int, result_chars: int) -> Dict[str, Any]:
+    legacy = schema is LegacyState
+    saver = InMemorySaver()
+    app = build(schema, rounds, result_chars, legacy).compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": name}, "recursion_limit": rounds * 2 + 10}
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    final = app.invoke(initial_state(legacy), config)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    checkpointed = sum(len(blob) for _, blob in saver.blobs.values())
+    checkpointed += sum(len(value[1]) for writes in saver.writes.values() for value in writes.values())
+    return {
+        "seconds": elapsed,
+        "peak_mb": peak / 1e6,
+        "state_kb": len(JsonPlusSerializer().dumps_typed(final)[1]) / 1e3,
+        "checkpoint_mb": checkpointed / 1e6,
+        "messages": len(final["messages"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[25, 100, 400], help="Tool rounds per run")
+    parser.add_argument("--result-chars", type=int, default=1200, help="Characters per tool result")
+    args = parser.parse_args()
+
+    print(f"{'rounds':>7}{'schema':>9}{'seconds':>9}{'peak MB':>9}{'state KB':>10}{'checkpt MB':>12}{'messages':>10}")
+    for rounds in args.rounds:
+        for name, schema in (("legacy", LegacyState), ("slim", AgentState)):
+            r = run(f"{name}-{rounds}", schema, rounds, args.result_chars)
+            print(f"{rounds:>7}{name:>9}{r['seconds']:>9.2f}{r['peak_mb']:>9.1f}{r['state_kb']:>10.1f}"
+                  f"{r['checkpoint_mb']:>12.1f}{r['messages']:>10}")
+
+
+if __name__ == "__main__":
+    main()
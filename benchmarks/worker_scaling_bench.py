@@ -0,0 +1,102 @@
+"""
+Scaling benchmark of the pre-fork worker pool (nodes/worker_pool.py).
+Answers --questions questions, drawn with repeats from --topics topics, with
+the fake LLM (--llm-latency of I/O plus --cpu-ms of GIL-bound work per call)
+and the local SerpAPI stand-in. Runs them in one process, then through
+WorkerPool at each --workers count with the same total in flight
+(--in-flight), and reports throughput, latency and SerpAPI requests. A final
+run at the largest count gives each worker its own cache instead of the
+shared one, to show what sharing saves.
+
+Run from the repository root:
+    python -m benchmarks.worker_scaling_bench --workers 1 2 4 8 --questions 400
+"""
+
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeSerpAPIServer, ScriptedChatModel, percentile
+from main import create_agent
+from nodes.search_cache import SearchCache
+from nodes.search_client import SearchClient
+from nodes.tools import configure_search_cache, get_tools
+from nodes.worker_pool import WorkerPool
+
+
+def agent_factory(url: str, llm_latency: float, cpu_ms: float) -> Callable[[], object]:
+    def build():
+        llm = ScriptedChatModel(latency=llm_latency, cpu_time=cpu_ms / 1000)
+        return create_agent(llm=llm, tools=get_tools(SearchClient(api_key="bench", base_url=url, pool_size=16)))
+    return build
+
+
+def run(agent, questions: List[str], in_flight: int) -> Dict:
+    def ask(question: str) -> float:
+        start = time.perf_counter()
+        agent.invoke({"messages": [HumanMessage(content=question)]})
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=in_flight) as pool:
+        latencies = list(pool.map(ask, questions))
+    return {"wall": time.perf_counter() - start, "latencies": latencies}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--questions", type=int, default=400)
+    parser.add_argument("--topics", type=int, default=100, help="Distinct questions; the rest are repeats")
+    parser.add_argument("--in-flight", type=int, default=32, help="Questions in flight in every configuration")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--cpu-ms", type=float, default=10.0, help="GIL-bound work per LLM call")
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    questions = [f"Question about topic {rng.randrange(args.topics)}" for _ in range(args.questions)]
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    print(f"{args.questions} questions over {args.topics} topics, {args.in_flight} in flight, "
+          f"llm={args.llm_latency * 1000:.0f} ms + {args.cpu_ms:g} ms CPU per call, "
+          f"search={args.search_latency * 1000:.0f} ms, {cores} usable cores\n")
+    print(f"{'configuration':<28}{'q/s':>8}{'speedup':>9}{'p50 ms':>9}{'p95 ms':>9}{'searches':>10}")
+
+    with FakeSerpAPIServer(latency=args.search_latency) as server:
+        build = agent_factory(server.url, args.llm_latency, args.cpu_ms)
+        baseline = None
+
+        def report(label: str, result: Dict) -> None:
+            nonlocal baseline
+            rate = len(questions) / result["wall"]
+            baseline = baseline or rate
+            ms = [latency * 1000 for latency in result["latencies"]]
+            print(f"{label:<28}{rate:>8.1f}{rate / baseline:>8.2f}x{percentile(ms, 50):>9.0f}"
+                  f"{percentile(ms, 95):>9.0f}{server.request_count:>10}")
+
+        configure_search_cache(SearchCache())
+        server.httpd.request_count = 0
+        report("in-process", run(build(), questions, args.in_flight))
+
+        for count in args.workers:
+            threads = max(1, args.in_flight // count)
+            configure_search_cache(SearchCache())  # forked workers would inherit the warm one
+            server.httpd.request_count = 0
+            with WorkerPool(count, factory=build, threads=threads) as pool:
+                report(f"{count} workers x {threads} threads", run(pool, questions, args.in_flight))
+
+        count = max(args.workers)
+        threads = max(1, args.in_flight // count)
+        configure_search_cache(SearchCache())
+        server.httpd.request_count = 0
+        with WorkerPool(count, factory=build, threads=threads, share_cache=False) as pool:
+            report(f"{count} x {threads}, per-worker cache", run(pool, questions, args.in_flight))
+
+
+if __name__ == "__main__":
+    main()
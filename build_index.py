@@ -0,0 +1,38 @@
+"""
+Build or update the local full-text index used by the local_search tool.
+Only new and modified files are re-indexed; deleted files are dropped.
+"""
+
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+
+from nodes.local_index import LocalIndex
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index a directory of .txt/.md files for local_search")
+    parser.add_argument("docs", help="Directory of documents to index")
+    parser.add_argument("--index", default=os.getenv("LOCAL_INDEX_PATH", "local_index"),
+                        help="Index directory (default: LOCAL_INDEX_PATH or ./local_index)")
+    parser.add_argument("--merge", action="store_true", help="Compact all segments into one afterwards")
+    args = parser.parse_args()
+
+    index = LocalIndex(args.index)
+    start = time.perf_counter()
+    counts = index.index_directory(args.docs)
+    if args.merge:
+        index.merge()
+    print(f"📚 {counts['added']} added, {counts['updated']} updated, {counts['removed']} removed, "
+          f"{counts['unchanged']} unchanged ({counts['passages']} passages) in {time.perf_counter() - start:.2f}s")
+    print(f"✅ Index at {args.index}: {index.stats()}")
+    if os.getenv("LOCAL_INDEX_PATH") != args.index:
+        print(f"💡 Set LOCAL_INDEX_PATH={args.index} to give the agent the local_search tool")
+
+
+if __name__ == "__main__":
+    main()
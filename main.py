@@ -4,44 +4,61 @@ This is the recommended LangGraph approach using built-in functions.
 """
 
 import os
+import sys
+import asyncio
+from typing import TYPE_CHECKING, Optional, Tuple
 from dotenv import load_dotenv
-from langgraph.prebuilt import create_react_agent
-from langchain_core.messages import HumanMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from nodes.tools import get_tools
+from nodes.agent_factory import get_agent, in_background, shared_llm, shared_tools
+from nodes.async_runner import ainput, run_async
+
+# LangChain/LangGraph and the nodes built on them are imported where they are
+# used: the prompt comes up at once and the agent loads while the user types
+if TYPE_CHECKING:
+    from nodes.memory import ConversationMemory
 
 # Load environment variables
 load_dotenv()
 
-def create_agent():
+def create_agent(llm=None, tools=None, checkpointer=None, answer_cache=None, routing=None):
     """
     Create a ReAct agent using LangGraph's built-in function.
     This replaces the entire distributed node architecture with a single, powerful agent.
+    Pass `llm` / `tools` to swap in other models or stand-ins (e.g. for benchmarks).
+    `routing` picks the model per phase (see nodes/model_router.resolve_llm); by default
+    tool-selection turns go to the fast model and the final answer to the strong one.
+    With an `answer_cache` (or ANSWER_CACHE_ENABLED set), near-duplicate questions
+    are answered from the semantic cache without running the graph.
+    The LLM and tools default to the process-wide ones (nodes/agent_factory).
     """
+    from langgraph.prebuilt import create_react_agent
+    from nodes.agent_state import AgentState
+    from nodes.answer_cache import CachedAgent, get_answer_cache
+    from nodes.budget import with_budget
+    from nodes.instrumentation import get_instrumentation
     
-    # Verify API key
-    if not os.getenv("GOOGLE_API_KEY"):
-        raise ValueError("❌ Please set GOOGLE_API_KEY in your .env file")
-    
-    # Initialize LLM - single instance for the entire agent
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-pro",
-        google_api_key=os.getenv("GOOGLE_API_KEY"),
-        temperature=0.1
-    )
+    if llm is None:
+        # Verify API key
+        if not os.getenv("GOOGLE_API_KEY"):
+            raise ValueError("❌ Please set GOOGLE_API_KEY in your .env file")
+        
+        # Initialize LLM - one (routed) instance for the entire process
+        llm = shared_llm(routing)
     
     # Get tools
-    tools = get_tools()
+    if tools is None:
+        tools = shared_tools()
     
     # Create ReAct agent - this handles everything automatically!
     agent = create_react_agent(
         llm, 
         tools,
-        system_message="""You are a helpful AI research assistant with access to web search and calculator tools.
+        state_schema=AgentState,
+        prompt="""You are a helpful AI research assistant with access to web search and calculator tools.
 
 **Your Capabilities:**
 - Web Search: Get current information, facts, news, and research
 - Calculator: Perform mathematical calculations and analysis
+- Page Reading: Read the full text of the top results (fetch_pages) when snippets are not enough
 - Memory: Remember conversation context and learn from feedback
 
 **Guidelines:**
@@ -57,28 +74,140 @@ def create_agent():
 - Current events, facts, definitions → web_search
 - Math problems, percentages, conversions → calculator
 - Research questions → web_search
+- Details the snippets lack → fetch_pages (one call reads several pages at once)
 - Data analysis → calculator + web_search
 
-Always prioritize accuracy and provide the most helpful response possible."""
+Always prioritize accuracy and provide the most helpful response possible.""",
+        checkpointer=checkpointer
     )
     
+    # Node timings and LLM token usage when instrumentation is enabled
+    agent = get_instrumentation().instrument_graph(agent)
+    
+    # Per-request time/call/token budgets with a partial answer when they run out
+    agent = with_budget(agent, llm)
+    
+    answer_cache = answer_cache or get_answer_cache()
+    if answer_cache is not None:
+        agent = CachedAgent(agent, answer_cache)
+    
     return agent
 
-def collect_feedback(question: str, answer: str) -> str:
-    """Simple feedback collection for continuous improvement."""
-    try:
-        print("\n" + "="*50)
-        feedback = input("💭 Was this answer helpful? (yes/no/comments): ").strip()
-        if feedback:
-            print("📝 Feedback recorded - thank you!")
-            return feedback
-        return ""
-    except (EOFError, KeyboardInterrupt):
-        print("\n⏭️ Skipping feedback")
-        return ""
-
-def main():
-    """Main execution function using ReAct agent."""
+def create_memory() -> "ConversationMemory":
+    """Conversation memory sized by MEMORY_TOKEN_BUDGET (tokens of history per prompt)."""
+    from nodes.memory import ConversationMemory
+    return ConversationMemory(token_budget=int(os.getenv("MEMORY_TOKEN_BUDGET", "2000")))
+
+PROMPT = '\n💬 Ask a question, rate the last answer with + or - (or "quit" to exit): '
+
+def parse_feedback(text: str) -> Optional[str]:
+    """
+    The feedback in a prompt line, or None if it is a question: "+" / "-" on
+    their own or followed by a comment ("- the figures are out of date"), or
+    "/feedback <comment>".
+    """
+    if text in ("+", "-") or text[:2] in ("+ ", "- "):
+        return text
+    if text.lower().startswith("/feedback"):
+        return text[len("/feedback"):].strip()
+    return None
+
+def collect_feedback(turn: dict, feedback: str) -> None:
+    """Attach feedback to its turn and queue it for the interaction log - never waits on disk."""
+    from nodes.interaction_log import get_interaction_log
+    turn['feedback'] = feedback
+    log = get_interaction_log()
+    if log is not None:
+        log.record_feedback(turn, feedback)
+    print("📝 Feedback recorded - thank you!")
+
+def handle_result(result: dict, user_input: str, memory: "ConversationMemory", echo: bool = True) -> Optional[dict]:
+    """
+    Display the agent's answer and record it in memory. Returns the stored turn, if any.
+    Pass echo=False when the answer was already streamed to the terminal.
+    """
+    agent_messages = result.get("messages", [])
+    if not agent_messages:
+        print("❌ No response generated")
+        return None
+    
+    # Extract and display the final answer
+    final_message = agent_messages[-1]
+    answer = final_message.content
+    
+    if echo:
+        print('\n' + '='*60)
+        print('🎯 ANSWER:')
+        print('='*60)
+        print(answer)
+    
+    # Show tool usage
+    tool_calls_made = []
+    for msg in agent_messages:
+        if hasattr(msg, 'tool_calls') and msg.tool_calls:
+            for tool_call in msg.tool_calls:
+                tool_calls_made.append(tool_call.get('name', 'unknown'))
+    
+    if tool_calls_made and echo:
+        print(f'\n🛠️ Tools used: {", ".join(set(tool_calls_made))}')
+    if result.get("budget_exhausted"):
+        print(f'\n⏱️ Stopped early ({result["budget_exhausted"]} reached) - partial answer from the results so far')
+    if result.get("cache_hit"):
+        print(f'\n⚡ Answered from cache (similar to "{result["cache_hit"]["question"]}", '
+              f'similarity {result["cache_hit"]["similarity"]:.2f})')
+    
+    # Store in conversation memory and queue it for the interaction log
+    from nodes.interaction_log import get_interaction_log
+    turn = memory.add_turn(user_input, answer, tools_used=list(set(tool_calls_made)))
+    log = get_interaction_log()
+    if log is not None:
+        log.record_turn(turn, budget_exhausted=result.get("budget_exhausted"),
+                        cache_hit=bool(result.get("cache_hit")))
+    return turn
+
+def start_session() -> Tuple[object, object, "ConversationMemory"]:
+    """(checkpointer, agent, memory) for the CLI - the slow part of start-up, run in the background."""
+    from nodes.checkpoint import get_checkpointer
+    from nodes.interaction_log import get_interaction_log
+    checkpointer = get_checkpointer()
+    get_interaction_log()  # opens its segment here rather than on the first answer
+    return checkpointer, get_agent("react", checkpointer=checkpointer), create_memory()
+
+def ask(session: tuple, user_input: str, stream: bool = False) -> Optional[dict]:
+    """Answer one question with the session's agent and memory; returns the stored turn."""
+    from nodes.checkpoint import finish_thread, question_thread_id, resumable_call
+    from nodes.streaming import run_streaming
+    checkpointer, agent, memory = session
+    messages = memory.build_messages(user_input)
+    thread_id = question_thread_id(user_input)
+    inputs, config = resumable_call(agent, {"messages": messages}, thread_id, checkpointer)
+    if inputs is None:
+        print("♻️ Resuming interrupted run from its last checkpoint")
+    result = run_streaming(agent, inputs, config) if stream else agent.invoke(inputs, config)
+    finish_thread(result, thread_id, checkpointer)
+    return handle_result(result, user_input, memory, echo=not stream)
+
+async def aask(session: tuple, user_input: str, stream: bool = False) -> Optional[dict]:
+    """Async variant of ask()."""
+    from nodes.checkpoint import afinish_thread, aresumable_call, question_thread_id
+    from nodes.streaming import arun_streaming
+    checkpointer, agent, memory = session
+    messages = memory.build_messages(user_input)
+    thread_id = question_thread_id(user_input)
+    inputs, config = await aresumable_call(agent, {"messages": messages}, thread_id, checkpointer)
+    if inputs is None:
+        print("♻️ Resuming interrupted run from its last checkpoint")
+    result = await arun_streaming(agent, inputs, config) if stream else await agent.ainvoke(inputs, config)
+    await afinish_thread(result, thread_id, checkpointer)
+    return handle_result(result, user_input, memory, echo=not stream)
+
+def print_summary() -> None:
+    """Instrumentation summary (no-op unless METRICS_ENABLED)."""
+    from nodes.instrumentation import get_instrumentation
+    get_instrumentation().print_summary()
+
+def main(stream: bool = False):
+    """Main execution function using ReAct agent. With `stream`, tokens and tool calls print as they happen."""
     
     print("🤖 LangGraph AI Agent - ReAct Pattern")
     print("=" * 50)
@@ -88,84 +217,102 @@ def main():
     print("💡 Minimal code, maximum power")
     print("-" * 50)
     
-    try:
-        # Create the agent
-        agent = create_agent()
-        print("✅ Agent initialized successfully!")
-        
-        # Simple conversation memory
-        conversation_history = []
-        
-    except Exception as e:
-        print(f"❌ Failed to initialize agent: {e}")
-        return
+    # Build the agent and its token-budgeted memory while the first question is typed
+    startup = in_background(start_session)
+    session = None
+    last_turn = None
     
     # Main interaction loop
     while True:
         try:
-            user_input = input('\n💬 Ask a question (or "quit" to exit): ').strip()
+            user_input = input(PROMPT).strip()
             
             if user_input.lower() in ['quit', 'exit', 'q']:
+                if session is not None:
+                    print_summary()
                 print("👋 Goodbye!")
                 break
                 
             if not user_input:
                 continue
             
+            feedback = parse_feedback(user_input)
+            if feedback is not None:
+                if last_turn is None:
+                    print("💭 Nothing to rate yet - ask a question first")
+                else:
+                    collect_feedback(last_turn, feedback)
+                continue
+            
+            if session is None:
+                try:
+                    session = startup.result()
+                except Exception as e:
+                    print(f"❌ Failed to initialize agent: {e}")
+                    return
+            
             print("\n🔄 Processing your question...")
             print("-" * 40)
             
-            # Prepare messages with conversation history
-            messages = []
+            # Execute the agent
+            turn = ask(session, user_input, stream)
+            if turn:
+                last_turn = turn
+                
+        except KeyboardInterrupt:
+            print("\n\n👋 Exiting...")
+            break
+        except Exception as e:
+            print(f"\n❌ Error: {str(e)}")
+            print("Please try again with a different question.")
+            continue
+
+async def amain(stream: bool = False):
+    """Async execution path - drives the agent with ainvoke (astream_events with `stream`) so tools never block the loop."""
+    
+    print("🤖 LangGraph AI Agent - ReAct Pattern (async)")
+    print("=" * 50)
+    
+    startup = asyncio.wrap_future(in_background(start_session))
+    session = None
+    last_turn = None
+    
+    while True:
+        try:
+            user_input = (await ainput(PROMPT)).strip()
+            
+            if user_input.lower() in ['quit', 'exit', 'q']:
+                if session is not None:
+                    print_summary()
+                print("👋 Goodbye!")
+                break
+                
+            if not user_input:
+                continue
             
-            # Add recent conversation context (last 3 exchanges)
-            for exchange in conversation_history[-3:]:
-                messages.append(HumanMessage(content=exchange['question']))
-                messages.append(HumanMessage(content=f"Previous answer: {exchange['answer'][:200]}..."))
+            feedback = parse_feedback(user_input)
+            if feedback is not None:
+                if last_turn is None:
+                    print("💭 Nothing to rate yet - ask a question first")
+                else:
+                    collect_feedback(last_turn, feedback)
+                continue
             
-            # Add current question
-            messages.append(HumanMessage(content=user_input))
+            if session is None:
+                try:
+                    session = await startup
+                except Exception as e:
+                    print(f"❌ Failed to initialize agent: {e}")
+                    return
             
-            # Execute the agent
-            result = agent.invoke({"messages": messages})
+            print("\n🔄 Processing your question...")
+            print("-" * 40)
             
-            # Extract and display the final answer
-            agent_messages = result.get("messages", [])
-            if agent_messages:
-                final_message = agent_messages[-1]
-                answer = final_message.content
-                
-                print('\n' + '='*60)
-                print('🎯 ANSWER:')
-                print('='*60)
-                print(answer)
-                
-                # Show tool usage
-                tool_calls_made = []
-                for msg in agent_messages:
-                    if hasattr(msg, 'tool_calls') and msg.tool_calls:
-                        for tool_call in msg.tool_calls:
-                            tool_calls_made.append(tool_call.get('name', 'unknown'))
-                
-                if tool_calls_made:
-                    print(f'\n🛠️ Tools used: {", ".join(set(tool_calls_made))}')
+            turn = await aask(session, user_input, stream)
+            if turn:
+                last_turn = turn
                 
-                # Store in conversation history
-                conversation_history.append({
-                    'question': user_input,
-                    'answer': answer,
-                    'tools_used': list(set(tool_calls_made))
-                })
-                
-                # Collect feedback
-                feedback = collect_feedback(user_input, answer)
-                if feedback:
-                    conversation_history[-1]['feedback'] = feedback
-                
-            else:
-                print("❌ No response generated")
-                
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, EOFError):
             print("\n\n👋 Exiting...")
             break
         except Exception as e:
@@ -174,4 +321,8 @@ def main():
             continue
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    stream = "--stream" in sys.argv
+    if "--async" in sys.argv:
+        run_async(amain(stream=stream))
+    else:
+        main(stream=stream)
\ No newline at end of file
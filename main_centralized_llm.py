@@ -4,39 +4,43 @@ This demonstrates the centralized LLM pattern.
 """
 
 import os
+import sys
+import asyncio
 from dotenv import load_dotenv
-from langgraph.graph import StateGraph, END
-from langgraph.prebuilt import ToolExecutor, create_react_agent
-from typing import TypedDict, List, Dict, Annotated
-from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 # Load environment variables
 load_dotenv()
 
-# Import nodes and tools
-from nodes.agent_state import AgentState
-from nodes.tools import get_tools
+# Import nodes and tools - LangChain/LangGraph are imported inside the
+# factories so the menu comes up before they load (see main.py)
+from nodes.agent_factory import get_agent, in_background, shared_llm, shared_tools
+from nodes.async_runner import ainput, run_async
 
-def create_centralized_llm_agent():
+# menu choice -> architecture in nodes/agent_factory.ARCHITECTURES
+CHOICES = {"1": "centralized", "2": "hybrid", "3": "react"}
+
+def create_centralized_llm_agent(llm=None, tools=None, checkpointer=None, routing=None):
     """
     Create agent using centralized LLM approach with LangGraph's built-in functions.
     This is the most LangGraph-native approach.
+    `routing` picks the model per phase (see nodes/model_router.resolve_llm).
     """
+    from langgraph.prebuilt import create_react_agent
+    from nodes.agent_state import AgentState
+    from nodes.budget import with_budget
+    from nodes.instrumentation import get_instrumentation
     
-    # Verify API key
-    if not os.getenv("GOOGLE_API_KEY"):
-        raise ValueError("Please set GOOGLE_API_KEY in your .env file")
-    
-    # Initialize the centralized LLM
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-pro",
-        google_api_key=os.getenv("GOOGLE_API_KEY"),
-        temperature=0.1
-    )
+    if llm is None:
+        # Verify API key
+        if not os.getenv("GOOGLE_API_KEY"):
+            raise ValueError("Please set GOOGLE_API_KEY in your .env file")
+        
+        # Initialize the centralized LLM
+        llm = shared_llm(routing)
     
     # Get tools
-    tools = get_tools()
+    if tools is None:
+        tools = shared_tools()
     
     # Create ReAct agent using LangGraph's built-in function
     # This handles tool selection, execution, and reasoning automatically
@@ -44,38 +48,72 @@ def create_centralized_llm_agent():
         llm, 
         tools,
         state_schema=AgentState,
-        system_message="""You are a helpful AI assistant with access to web search and calculator tools.
+        prompt="""You are a helpful AI assistant with access to web search and calculator tools.
 
 Guidelines:
 1. Use web_search for any questions requiring current information, facts, or research
 2. Use calculator for mathematical calculations
-3. Provide comprehensive, accurate answers
-4. Cite sources when using web search results
-5. If you cannot find relevant information, acknowledge limitations clearly
+3. Use fetch_pages to read the full text of the top results when snippets are not enough
+4. Provide comprehensive, accurate answers
+5. Cite sources when using web search results
+6. If you cannot find relevant information, acknowledge limitations clearly
 
-Always think step by step and use the most appropriate tools for each query."""
+Always think step by step and use the most appropriate tools for each query.""",
+        checkpointer=checkpointer
     )
     
-    return agent
+    # Node timings and LLM token usage when instrumentation is enabled; per-request budgets
+    return with_budget(get_instrumentation().instrument_graph(agent), llm)
 
-def create_hybrid_agent():
+def create_hybrid_agent(llm=None, tools=None, max_parallel_tools: int = 8, tool_timeout: float = 30.0,
+                        checkpointer=None, routing=None, planner=None, search_concurrency=None):
     """
     Create agent using hybrid approach - centralized LLM with custom nodes.
     This gives more control while still using LangGraph patterns.
+    All tool calls from one LLM turn run in parallel, bounded by `max_parallel_tools`
+    and `tool_timeout` seconds per call; at most `search_concurrency` of them are
+    web searches (default: SEARCH_MAX_CONCURRENCY, 4; 0 for no separate cap), so a
+    wide fan-out leaves pool threads for the other tools.
+    A planner node first fans the question out into parallel sub-queries
+    (see nodes/query_planner.py) unless `planner` is False (default: AGENT_PLANNER, on).
+    `routing` maps node names to model specs (see nodes/model_router.resolve_llm),
+    e.g. {"agent": "cascade", "planner": "fast"}; nodes not listed use `llm`.
     """
+    from langchain_core.messages import SystemMessage
+    from langgraph.graph import StateGraph, END
+    from nodes.agent_state import AgentState
+    from nodes.budget import current_budget, with_budget
+    from nodes.instrumentation import get_instrumentation
+    from nodes.query_planner import current_question, plan_update, planning_enabled, planning_messages
+    from nodes.tool_executor import ParallelToolExecutor
     
-    # Initialize the centralized LLM
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-pro",
-        google_api_key=os.getenv("GOOGLE_API_KEY"),
-        temperature=0.1
-    )
+    routing = routing or {}
+    if planner is None:
+        planner = planning_enabled()
     
     # Get tools
-    tools = get_tools()
-    tool_executor = ToolExecutor(tools)
+    if tools is None:
+        tools = shared_tools()
+    if search_concurrency is None:
+        search_concurrency = int(os.getenv("SEARCH_MAX_CONCURRENCY", "4"))
+    tool_executor = ParallelToolExecutor(
+        tools,
+        max_workers=max_parallel_tools,
+        default_timeout=tool_timeout,
+        concurrency_limits={"web_search": search_concurrency} if search_concurrency > 0 else None,
+    )
+    # Initialize the centralized LLM (routed per node)
+    agent_llm = shared_llm(routing.get("agent", llm))
+    llm_with_tools = agent_llm.bind_tools(tools)
+    planner_llm = shared_llm(routing["planner"]).bind_tools(tools) if "planner" in routing else llm_with_tools
     
-    def agent_node(state: AgentState) -> AgentState:
+    def planner_node(state: AgentState) -> dict:
+        """Plan the question as one turn of parallel tool calls, or answer it if no tools are needed."""
+        messages = state.get('messages', [])
+        response = planner_llm.invoke(planning_messages(messages))
+        return plan_update(current_question(messages), response)
+    
+    def agent_node(state: AgentState) -> dict:
         """Main agent node with centralized LLM."""
         messages = state.get('messages', [])
         
@@ -85,79 +123,119 @@ def create_hybrid_agent():
             
 Available tools:
 - web_search: Search the web for current information
+- fetch_pages: Read the full text of the top results (or given URLs)
 - calculator: Perform mathematical calculations
 
-Use tools when needed and provide comprehensive answers.""")
+Use tools when needed and provide comprehensive answers. When several
+results are already in the conversation, combine them into one answer.""")
             messages = [system_msg] + messages
         
-        # Get LLM response
-        response = llm.invoke(messages)
-        messages.append(response)
-        state['messages'] = messages
-        
-        # Check if tools are needed (simplified logic)
-        if hasattr(response, 'tool_calls') and response.tool_calls:
-            state['tools_to_use'] = [call['name'] for call in response.tool_calls]
-        else:
-            state['tools_to_use'] = []
-            state['final_answer'] = response.content
-        
-        return state
+        # Get LLM response - only the new message is returned, the
+        # messages reducer appends it (tool calls need an unduplicated history)
+        response = llm_with_tools.invoke(messages)
+        if getattr(response, 'tool_calls', None):
+            return {'messages': [response]}
+        return {'messages': [response], 'final_answer': response.content}
     
-    def tool_node(state: AgentState) -> AgentState:
-        """Execute tools using ToolExecutor."""
-        tools_to_use = state.get('tools_to_use', [])
-        if not tools_to_use:
-            return state
+    def tool_node(state: AgentState) -> dict:
+        """Execute every tool call from the last LLM turn in parallel."""
+        messages = state.get('messages', [])
+        tool_calls = getattr(messages[-1], 'tool_calls', None) if messages else None
+        if not tool_calls:
+            return {}
         
-        # Execute tools (simplified)
-        tool_results = []
-        for tool_name in tools_to_use:
-            # This would use proper tool calling in practice
-            result = f"Mock result from {tool_name}"
-            tool_results.append({'tool': tool_name, 'result': result})
+        # Tools here run on the executor's own threads, so the request budget is charged directly
+        budget = current_budget()
+        if budget is not None:
+            budget.charge_tools(len(tool_calls))
         
-        state['tool_results'] = tool_results
-        return state
+        # All calls are dispatched at once; results come back in call order
+        return {'messages': tool_executor.execute(tool_calls, timeout=budget.remaining() if budget else None)}
     
     def should_continue(state: AgentState) -> str:
-        """Determine next step."""
-        if state.get('tools_to_use'):
+        """Determine next step: run the tools the last LLM turn asked for, or finish."""
+        messages = state.get('messages', [])
+        if messages and getattr(messages[-1], 'tool_calls', None):
             return "tools"
         return END
     
     # Build graph
+    instrumentation = get_instrumentation()
     workflow = StateGraph(AgentState)
-    workflow.add_node("agent", agent_node)
-    workflow.add_node("tools", tool_node)
+    workflow.add_node("agent", instrumentation.wrap_node("agent", agent_node))
+    workflow.add_node("tools", instrumentation.wrap_node("tools", tool_node))
     
-    workflow.set_entry_point("agent")
+    if planner:
+        # planner -> tools (all sub-queries at once) -> agent (synthesis, follow-ups if needed)
+        workflow.add_node("planner", instrumentation.wrap_node("planner", planner_node))
+        workflow.set_entry_point("planner")
+        workflow.add_conditional_edges("planner", should_continue, {"tools": "tools", END: END})
+    else:
+        workflow.set_entry_point("agent")
     workflow.add_conditional_edges("agent", should_continue, {"tools": "tools", END: END})
     workflow.add_edge("tools", "agent")
     
-    return workflow.compile()
+    # Nodes are timed by their wrappers; the graph callbacks add LLM latency and tokens
+    app = instrumentation.instrument_graph(workflow.compile(checkpointer=checkpointer), track_nodes=False)
+    return with_budget(app, agent_llm)
 
-def main():
-    """Main execution with different agent options."""
+def build_initial_state(user_input: str) -> dict:
+    """Initial graph state for one question."""
+    from langchain_core.messages import HumanMessage
+    return {'messages': [HumanMessage(content=user_input)]}
+
+def print_answer(choice: str, result: dict) -> None:
+    """Display the final answer for the chosen architecture."""
+    if CHOICES.get(choice) != "hybrid":
+        # ReAct agents return messages
+        messages = result.get('messages', [])
+        if messages:
+            print('\n' + '='*60)
+            print('🎯 FINAL ANSWER:')
+            print('='*60)
+            print(messages[-1].content)
+    else:
+        # Other approaches
+        print('\n' + '='*60)
+        print('🎯 FINAL ANSWER:')
+        print('='*60)
+        print(result.get('final_answer', 'No answer generated.'))
+
+def choose_app(choice: str):
+    """
+    Start building the agent for the chosen architecture in the background;
+    the future resolves to (checkpointer, app) by the time the question is typed.
+    """
+    if choice == "1":
+        print("\n🚀 Using Centralized LLM (ReAct Agent)")
+    elif choice == "2":
+        print("\n🚀 Using Hybrid Approach")
+    else:
+        # The distributed node graph has been replaced by main.py's ReAct agent
+        print("\n🚀 Using ReAct Agent (main.py)")
+    
+    def start():
+        from nodes.checkpoint import get_checkpointer
+        checkpointer = get_checkpointer()
+        return checkpointer, get_agent(CHOICES.get(choice, "react"), checkpointer=checkpointer)
     
+    return in_background(start)
+
+def print_menu() -> None:
+    """Show the architecture options."""
     print("🤖 LangGraph AI Agent - Architecture Comparison")
     print("-" * 60)
     print("1. Centralized LLM (ReAct Agent) - Most LangGraph-native")
     print("2. Hybrid Approach - More control")
-    print("3. Distributed LLM - Current approach")
+    print("3. ReAct Agent (main.py) - Default CLI agent")
+
+def main():
+    """Main execution with different agent options."""
     
+    print_menu()
     choice = input("\nChoose approach (1/2/3): ").strip()
-    
-    if choice == "1":
-        print("\n🚀 Using Centralized LLM (ReAct Agent)")
-        app = create_centralized_llm_agent()
-    elif choice == "2":
-        print("\n🚀 Using Hybrid Approach")
-        app = create_hybrid_agent()
-    else:
-        print("\n🚀 Using Distributed LLM (Current)")
-        from main import create_agent_workflow
-        app = create_agent_workflow()
+    startup = choose_app(choice)
+    app = None
     
     while True:
         try:
@@ -170,39 +248,21 @@ def main():
             if not user_input:
                 continue
             
-            # Initialize state
-            initial_state = {
-                'user_input': user_input,
-                'messages': [HumanMessage(content=user_input)],
-                'processed_query': user_input,
-                'tools_to_use': [],
-                'tool_results': [],
-                'evaluation_result': '',
-                'final_answer': '',
-                'feedback': '',
-                'memory_context': {}
-            }
+            if app is None:
+                try:
+                    checkpointer, app = startup.result()
+                except Exception as e:
+                    print(f"❌ Failed to initialize agent: {e}")
+                    return
             
             print("\n🔄 Processing...")
             
             # Execute the workflow
-            result = app.invoke(initial_state)
-            
-            # Display result
-            if choice == "1":
-                # ReAct agent returns messages
-                messages = result.get('messages', [])
-                if messages:
-                    print('\n' + '='*60)
-                    print('🎯 FINAL ANSWER:')
-                    print('='*60)
-                    print(messages[-1].content)
-            else:
-                # Other approaches
-                print('\n' + '='*60)
-                print('🎯 FINAL ANSWER:')
-                print('='*60)
-                print(result.get('final_answer', 'No answer generated.'))
+            from nodes.checkpoint import invoke_resumable, question_thread_id
+            result = invoke_resumable(
+                app, build_initial_state(user_input), question_thread_id(user_input, choice), checkpointer
+            )
+            print_answer(choice, result)
                 
         except KeyboardInterrupt:
             print("\n\nExiting... 👋")
@@ -211,5 +271,48 @@ def main():
             print(f"\n❌ Error occurred: {str(e)}")
             continue
 
+async def amain():
+    """Async execution path using app.ainvoke."""
+    
+    print_menu()
+    choice = (await ainput("\nChoose approach (1/2/3): ")).strip()
+    startup = asyncio.wrap_future(choose_app(choice))
+    app = None
+    
+    while True:
+        try:
+            user_input = (await ainput('\nAsk a question (or "quit" to exit): ')).strip()
+            
+            if user_input.lower() in ['quit', 'exit', 'q']:
+                print("Goodbye! 👋")
+                break
+                
+            if not user_input:
+                continue
+            
+            if app is None:
+                try:
+                    checkpointer, app = await startup
+                except Exception as e:
+                    print(f"❌ Failed to initialize agent: {e}")
+                    return
+            
+            print("\n🔄 Processing...")
+            from nodes.checkpoint import ainvoke_resumable, question_thread_id
+            result = await ainvoke_resumable(
+                app, build_initial_state(user_input), question_thread_id(user_input, choice), checkpointer
+            )
+            print_answer(choice, result)
+                
+        except (KeyboardInterrupt, EOFError):
+            print("\n\nExiting... 👋")
+            break
+        except Exception as e:
+            print(f"\n❌ Error occurred: {str(e)}")
+            continue
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if "--async" in sys.argv:
+        run_async(amain())
+    else:
+        main()
\ No newline at end of file
@@ -4,40 +4,46 @@ This is the most LangGraph-native way to build agents.
 """
 
 import os
+import sys
+import asyncio
 from dotenv import load_dotenv
-from langgraph.prebuilt import create_react_agent
-from langchain_core.messages import HumanMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from nodes.tools import get_tools
+from nodes.agent_factory import get_agent, in_background, shared_llm, shared_tools
+from nodes.async_runner import ainput, run_async
+
+# Heavy LangChain/LangGraph imports are deferred to where they are used (see main.py)
 
 # Load environment variables
 load_dotenv()
 
-def create_react_agent_app():
+def create_react_agent_app(llm=None, tools=None, checkpointer=None, routing=None):
     """
     Create a ReAct agent using LangGraph's built-in function.
     This is the recommended approach for most use cases.
+    `routing` picks the model per phase (see nodes/model_router.resolve_llm).
     """
+    from langgraph.prebuilt import create_react_agent
+    from nodes.agent_state import AgentState
+    from nodes.budget import with_budget
+    from nodes.instrumentation import get_instrumentation
     
-    # Verify API key
-    if not os.getenv("GOOGLE_API_KEY"):
-        raise ValueError("❌ Please set GOOGLE_API_KEY in your .env file")
-    
-    # Initialize LLM
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-pro",
-        google_api_key=os.getenv("GOOGLE_API_KEY"),
-        temperature=0.1
-    )
+    if llm is None:
+        # Verify API key
+        if not os.getenv("GOOGLE_API_KEY"):
+            raise ValueError("❌ Please set GOOGLE_API_KEY in your .env file")
+        
+        # Initialize LLM
+        llm = shared_llm(routing)
     
     # Get tools
-    tools = get_tools()
+    if tools is None:
+        tools = shared_tools()
     
     # Create ReAct agent - this handles everything automatically!
     agent = create_react_agent(
         llm, 
         tools,
-        system_message="""You are a helpful AI research assistant with access to web search and calculator tools.
+        state_schema=AgentState,
+        prompt="""You are a helpful AI research assistant with access to web search and calculator tools.
 
 **Guidelines:**
 1. **For factual questions**: Always use web_search to get current, accurate information
@@ -50,14 +56,83 @@ def create_react_agent_app():
 **Tool Usage:**
 - Use web_search for: current events, facts, research, definitions, recent developments
 - Use calculator for: math problems, percentages, conversions, statistical calculations
+- Use fetch_pages for: details the search snippets lack (reads the top results in one call)
 
-Always prioritize accuracy and provide the most helpful response possible."""
+Always prioritize accuracy and provide the most helpful response possible.""",
+        checkpointer=checkpointer
     )
     
-    return agent
+    # Node timings and LLM token usage when instrumentation is enabled; per-request budgets
+    return with_budget(get_instrumentation().instrument_graph(agent), llm)
+
+def print_result(result: dict) -> None:
+    """Display the final answer and a summary of the tools used."""
+    messages = result.get("messages", [])
+    if not messages:
+        print("❌ No response generated")
+        return
+    
+    final_message = messages[-1]
+    
+    print('\n' + '='*60)
+    print('🎯 ANSWER:')
+    print('='*60)
+    print(final_message.content)
+    
+    # Show tool usage if any
+    tool_calls_made = []
+    for msg in messages:
+        if hasattr(msg, 'tool_calls') and msg.tool_calls:
+            for tool_call in msg.tool_calls:
+                tool_calls_made.append(tool_call.get('name', 'unknown'))
+    
+    if tool_calls_made:
+        print(f'\n🛠️ Tools used: {", ".join(set(tool_calls_made))}')
+
+def start_session() -> tuple:
+    """(checkpointer, agent) - built in the background while the first question is typed."""
+    from nodes.checkpoint import get_checkpointer
+    checkpointer = get_checkpointer()
+    return checkpointer, get_agent("react_app", checkpointer=checkpointer)
 
-def main():
-    """Main execution function using ReAct agent."""
+def ask(session: tuple, user_input: str, stream: bool = False) -> None:
+    """Answer one question and print the result."""
+    from langchain_core.messages import HumanMessage
+    from nodes.checkpoint import finish_thread, question_thread_id, resumable_call
+    from nodes.streaming import run_streaming
+    checkpointer, agent = session
+    inputs = {"messages": [HumanMessage(content=user_input)]}
+    thread_id = question_thread_id(user_input)
+    inputs, config = resumable_call(agent, inputs, thread_id, checkpointer)
+    if inputs is None:
+        print("♻️ Resuming interrupted run from its last checkpoint")
+    if stream:
+        result = run_streaming(agent, inputs, config)
+    else:
+        result = agent.invoke(inputs, config)
+        print_result(result)
+    finish_thread(result, thread_id, checkpointer)
+
+async def aask(session: tuple, user_input: str, stream: bool = False) -> None:
+    """Async variant of ask()."""
+    from langchain_core.messages import HumanMessage
+    from nodes.checkpoint import afinish_thread, aresumable_call, question_thread_id
+    from nodes.streaming import arun_streaming
+    checkpointer, agent = session
+    inputs = {"messages": [HumanMessage(content=user_input)]}
+    thread_id = question_thread_id(user_input)
+    inputs, config = await aresumable_call(agent, inputs, thread_id, checkpointer)
+    if inputs is None:
+        print("♻️ Resuming interrupted run from its last checkpoint")
+    if stream:
+        result = await arun_streaming(agent, inputs, config)
+    else:
+        result = await agent.ainvoke(inputs, config)
+        print_result(result)
+    await afinish_thread(result, thread_id, checkpointer)
+
+def main(stream: bool = False):
+    """Main execution function using ReAct agent. With `stream`, tokens and tool calls print as they happen."""
     
     print("🤖 LangGraph ReAct Agent - Simplified & Powerful")
     print("=" * 55)
@@ -66,14 +141,9 @@ def main():
     print("🧠 ReAct (Reasoning + Acting) pattern")
     print("-" * 55)
     
-    try:
-        # Create the agent
-        agent = create_react_agent_app()
-        print("✅ Agent initialized successfully!")
-        
-    except Exception as e:
-        print(f"❌ Failed to initialize agent: {e}")
-        return
+    # Create the agent while the first question is typed
+    startup = in_background(start_session)
+    session = None
     
     # Main interaction loop
     while True:
@@ -87,37 +157,60 @@ def main():
             if not user_input:
                 continue
             
+            if session is None:
+                try:
+                    session = startup.result()
+                except Exception as e:
+                    print(f"❌ Failed to initialize agent: {e}")
+                    return
+            
             print("\n🔄 Processing your question...")
             print("-" * 40)
             
             # Execute the agent - simple one-liner!
-            result = agent.invoke({
-                "messages": [HumanMessage(content=user_input)]
-            })
-            
-            # Extract and display the final answer
-            messages = result.get("messages", [])
-            if messages:
-                final_message = messages[-1]
+            ask(session, user_input, stream)
                 
-                print('\n' + '='*60)
-                print('🎯 ANSWER:')
-                print('='*60)
-                print(final_message.content)
-                
-                # Show tool usage if any
-                tool_calls_made = []
-                for msg in messages:
-                    if hasattr(msg, 'tool_calls') and msg.tool_calls:
-                        for tool_call in msg.tool_calls:
-                            tool_calls_made.append(tool_call.get('name', 'unknown'))
+        except KeyboardInterrupt:
+            print("\n\n👋 Exiting...")
+            break
+        except Exception as e:
+            print(f"\n❌ Error: {str(e)}")
+            print("Please try again with a different question.")
+            continue
+
+async def amain(stream: bool = False):
+    """Async execution path using agent.ainvoke (astream_events with `stream`)."""
+    
+    print("🤖 LangGraph ReAct Agent - Async Mode")
+    print("=" * 55)
+    
+    startup = asyncio.wrap_future(in_background(start_session))
+    session = None
+    
+    while True:
+        try:
+            user_input = (await ainput('\n💬 Ask a question (or "quit" to exit): ')).strip()
+            
+            if user_input.lower() in ['quit', 'exit', 'q']:
+                print("👋 Goodbye!")
+                break
                 
-                if tool_calls_made:
-                    print(f'\n🛠️ Tools used: {", ".join(set(tool_calls_made))}')
-            else:
-                print("❌ No response generated")
+            if not user_input:
+                continue
+            
+            if session is None:
+                try:
+                    session = await startup
+                except Exception as e:
+                    print(f"❌ Failed to initialize agent: {e}")
+                    return
+            
+            print("\n🔄 Processing your question...")
+            print("-" * 40)
+            
+            await aask(session, user_input, stream)
                 
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, EOFError):
             print("\n\n👋 Exiting...")
             break
         except Exception as e:
@@ -126,4 +219,8 @@ def main():
             continue
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    stream = "--stream" in sys.argv
+    if "--async" in sys.argv:
+        run_async(amain(stream=stream))
+    else:
+        main(stream=stream)
\ No newline at end of file
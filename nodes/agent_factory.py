@@ -0,0 +1,162 @@
+"""
+Shared agent construction for the entry points.
+The LLM and the tool set are built once per process and shared by every
+agent; each architecture is compiled once and handed out by an AgentPool.
+The pool can build agents ahead of time on a background thread (warm pool),
+so the LangChain/LangGraph imports and graph compilation overlap with
+whatever the process does first: waiting for the first question, reading a
+batch file, or accepting connections.
+"""
+
+import importlib
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+# architecture -> "module:factory"; modules are imported on first use
+ARCHITECTURES = {
+    "react": "main:create_agent",
+    "react_app": "main_react_agent:create_react_agent_app",
+    "centralized": "main_centralized_llm:create_centralized_llm_agent",
+    "hybrid": "main_centralized_llm:create_hybrid_agent",
+}
+
+_shared_lock = threading.Lock()
+_shared_llms: Dict[Hashable, Any] = {}
+_shared_tools: Optional[List[Any]] = None
+
+
+def shared_llm(routing: Any = None):
+    """The process-wide chat model for a routing spec (see nodes/model_router.resolve_llm)."""
+    from nodes.model_router import resolve_llm
+
+    if not isinstance(routing, (str, type(None))):
+        return resolve_llm(routing)  # models and per-phase dicts are the caller's own
+    with _shared_lock:
+        if routing not in _shared_llms:
+            _shared_llms[routing] = resolve_llm(routing)
+        return _shared_llms[routing]
+
+
+def shared_tools() -> List[Any]:
+    """The process-wide tool set from nodes/tools.get_tools()."""
+    global _shared_tools
+    from nodes.tools import get_tools
+
+    with _shared_lock:
+        if _shared_tools is None:
+            _shared_tools = get_tools()
+        return _shared_tools
+
+
+def in_background(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """Run fn(*args, **kwargs) on a daemon thread; the Future holds its result or exception."""
+    future: Future = Future()
+
+    def run():
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=f"background-{getattr(fn, '__name__', 'call')}", daemon=True).start()
+    return future
+
+
+def _check(kind: str) -> None:
+    if kind not in ARCHITECTURES:
+        raise ValueError(f"Unknown agent architecture {kind!r}; expected one of {list(ARCHITECTURES)}")
+
+
+def _factory(kind: str) -> Callable[..., Any]:
+    _check(kind)
+    module, name = ARCHITECTURES[kind].split(":")
+    return getattr(importlib.import_module(module), name)
+
+
+class AgentPool:
+    """Agents built once per architecture, on demand or ahead of time."""
+
+    def __init__(self):
+        self._builds: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, kind: str) -> Tuple[Future, bool]:
+        """(future, owner): the build for `kind`, and whether the caller must run it."""
+        with self._lock:
+            future = self._builds.get(kind)
+            if future is not None:
+                return future, False
+            future = self._builds[kind] = Future()
+        return future, True
+
+    @staticmethod
+    def _build(future: Future, kind: str, kwargs: Dict[str, Any]) -> None:
+        try:
+            future.set_result(_factory(kind)(**kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    def warm(self, kinds: Iterable[str], **kwargs: Any) -> Future:
+        """
+        Build `kinds` on a background thread; get() waits for a build in progress.
+
+        Args:
+            kinds: Architecture names from ARCHITECTURES.
+            **kwargs: Factory arguments (e.g. checkpointer) for the agents built here.
+        """
+        kinds = list(kinds)
+        for kind in kinds:
+            _check(kind)  # fail in the caller, not on the background thread
+
+        def warm_pool():
+            for kind in kinds:
+                future, owner = self._start(kind)
+                if owner:
+                    self._build(future, kind, kwargs)
+
+        return in_background(warm_pool)
+
+    def get(self, kind: str = "react", **kwargs: Any):
+        """
+        The agent for `kind`, building it now if no build was started.
+        `kwargs` only apply to the first build of each architecture; a failed
+        build is not cached, so the next call retries it.
+        """
+        future, owner = self._start(kind)
+        if owner:
+            self._build(future, kind, kwargs)
+        try:
+            return future.result()
+        except BaseException:
+            with self._lock:
+                if self._builds.get(kind) is future:
+                    del self._builds[kind]
+            raise
+
+    def ready(self, kind: str) -> bool:
+        future = self._builds.get(kind)
+        return future is not None and future.done() and future.exception() is None
+
+
+_default_pool = AgentPool()
+
+
+def get_agent_pool() -> AgentPool:
+    return _default_pool
+
+
+def get_agent(kind: str = "react", **kwargs: Any):
+    """Shared agent for an architecture (see AgentPool.get)."""
+    return _default_pool.get(kind, **kwargs)
+
+
+def warm_up(kinds: Optional[Iterable[str]] = None, **kwargs: Any) -> Future:
+    """
+    Pre-build agents in the background. `kinds` defaults to AGENT_WARM_POOL
+    (comma-separated architecture names, default "react").
+    """
+    if kinds is None:
+        kinds = [k.strip() for k in os.getenv("AGENT_WARM_POOL", "react").split(",") if k.strip()]
+    return _default_pool.warm(kinds, **kwargs)
@@ -1,19 +1,91 @@
 """
 Define the agent state using LangGraph best practices.
+Messages are merged by id, like LangGraph's add_messages: a node returns only
+its new messages, re-sending a message replaces it and RemoveMessage deletes
+it. The merged list is kept to a window of recent messages, so a long tool
+loop does not copy (and checkpoint) an ever-growing history on every step.
+Other fields are optional and only present once a node sets them.
 """
 
-from typing import TypedDict, List, Dict, Any, Annotated
-from langchain_core.messages import BaseMessage
-import operator
+import os
+import uuid
+from typing import Annotated, List, NotRequired, Optional, Sequence, TypedDict, Union
+
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from langchain_core.messages import convert_to_messages
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from langgraph.managed import RemainingSteps
+
+# Messages kept in graph state; 0 disables the window
+MESSAGE_WINDOW = int(os.getenv("AGENT_MESSAGE_WINDOW", "64"))
+
+Messages = Union[BaseMessage, Sequence[BaseMessage], Sequence[dict]]
+
+
+def window_messages(messages: List[BaseMessage], window: int) -> List[BaseMessage]:
+    """
+    The last `window` messages, plus the leading system messages and the
+    current question if they fall outside it. The window never starts on a
+    tool result, since the model needs the tool call that produced it.
+    """
+    if not window or len(messages) <= window:
+        return messages
+    head = 0
+    while head < len(messages) and isinstance(messages[head], SystemMessage):
+        head += 1
+    start = max(head, len(messages) - (window - head))
+    while start < len(messages) and isinstance(messages[start], ToolMessage):
+        start += 1
+    tail = messages[start:]
+    question: List[BaseMessage] = []
+    if not any(isinstance(m, HumanMessage) for m in tail):
+        question = [m for m in messages[head:start] if isinstance(m, HumanMessage)][-1:]
+    return messages[:head] + question + tail
+
+
+def add_by_id(left: List[BaseMessage], right: Messages) -> List[BaseMessage]:
+    """
+    Append `right` to `left` by message id: messages whose id is already
+    present are replaced and RemoveMessage targets are dropped. Removing an
+    id that is no longer in the list (e.g. windowed out) is not an error.
+    """
+    right = convert_to_messages(right if isinstance(right, list) else [right])
+    for i in range(len(right) - 1, -1, -1):
+        if isinstance(right[i], RemoveMessage) and right[i].id == REMOVE_ALL_MESSAGES:
+            left, right = [], right[i + 1:]
+            break
+    for message in right:
+        if message.id is None:
+            message.id = str(uuid.uuid4())
+
+    merged: List[Optional[BaseMessage]] = list(left)
+    positions = {message.id: i for i, message in enumerate(left)}
+    for message in right:
+        i = positions.get(message.id)
+        if isinstance(message, RemoveMessage):
+            if i is not None:
+                merged[i] = None
+                del positions[message.id]
+        elif i is not None:
+            merged[i] = message
+        else:
+            positions[message.id] = len(merged)
+            merged.append(message)
+    return [m for m in merged if m is not None]
+
+
+def merge_messages(left: List[BaseMessage], right: Messages) -> List[BaseMessage]:
+    """Reducer for AgentState.messages: add_by_id, then keep MESSAGE_WINDOW messages."""
+    return window_messages(add_by_id(left, right), MESSAGE_WINDOW)
+
 
 class AgentState(TypedDict):
     """State definition for the LangGraph agent."""
-    user_input: str
-    messages: Annotated[List[BaseMessage], operator.add]
-    processed_query: str
-    tools_to_use: List[str]
-    tool_results: List[Dict[str, Any]]
-    evaluation_result: str
-    final_answer: str
-    feedback: str
-    memory_context: Dict[str, Any]
\ No newline at end of file
+    messages: Annotated[List[BaseMessage], merge_messages]
+    # Managed by LangGraph; create_react_agent requires it in custom state schemas
+    remaining_steps: RemainingSteps
+    # Set by the hybrid graph's planner: the question it planned for and the tool of each sub-query
+    processed_query: NotRequired[str]
+    tools_to_use: NotRequired[List[str]]
+    # Set by the hybrid graph's agent node once the model answers without tool calls
+    final_answer: NotRequired[str]
@@ -0,0 +1,354 @@
+"""
+Semantic answer cache for whole questions.
+Questions are embedded with a local hashing embedder (no model download, no
+network) and looked up in an in-memory vector index. A fresh entry whose
+cosine similarity passes the threshold, and whose question contains every
+content word of the new one, answers it without running the agent loop at
+all. Entries expire by age and are evicted LRU by count.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.messages import AIMessage, HumanMessage
+
+from nodes.search_cache import normalize_query
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an the is are was were be of in on at to for and or what whats which who whom how "
+    "do does did can could please tell me about i you s".split()
+)
+# Follow-up questions depend on earlier turns, so their answers are not reusable
+_CONTEXT_WORDS = frozenset("it its it's that this those these they them their he she his her him".split())
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _numbers(text: str) -> frozenset:
+    return frozenset(_NUMBER_RE.findall(text))
+
+
+def _content_words(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(normalize_query(text)) if w not in _STOPWORDS]
+
+
+@lru_cache(maxsize=65536)
+def _feature_hash(feature: str) -> int:
+    # Features repeat heavily across questions, so the digest is cached
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+
+
+class HashingEmbedder:
+    """
+    Offline text embedder: feature-hashes word unigrams, word bigrams and
+    character trigrams into a fixed-size, L2-normalized vector.
+    """
+
+    def __init__(self, dim: int = 512, char_ngrams: int = 3, char_weight: float = 0.5):
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+        self.char_weight = char_weight
+
+    def __call__(self, text: str) -> np.ndarray:
+        words = _content_words(text)
+        features: List[Tuple[str, float]] = [(w, 1.0) for w in words]
+        features += [(f"{a} {b}", 1.0) for a, b in zip(words, words[1:])]
+        n = self.char_ngrams
+        for w in words:
+            padded = f"#{w}#"
+            features += [(padded[i:i + n], self.char_weight) for i in range(len(padded) - n + 1)]
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if features:
+            hashes = np.fromiter((_feature_hash(f) for f, _ in features), dtype=np.uint64, count=len(features))
+            weights = np.fromiter((w for _, w in features), dtype=np.float32, count=len(features))
+            # Signed hashing keeps collisions from only ever adding similarity
+            signs = np.where(hashes >> np.uint64(63), 1.0, -1.0).astype(np.float32)
+            np.add.at(vector, (hashes % np.uint64(self.dim)).astype(np.int64), signs * weights)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class BruteForceIndex:
+    """Exact cosine search over a preallocated matrix of unit vectors."""
+
+    def __init__(self, dim: int, capacity: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.active = np.zeros(capacity, dtype=bool)
+
+    def add(self, slot: int, vector: np.ndarray) -> None:
+        self.vectors[slot] = vector
+        self.active[slot] = True
+
+    def remove(self, slot: int) -> None:
+        self.active[slot] = False
+
+    def search(self, vector: np.ndarray) -> Tuple[Optional[int], float]:
+        if not self.active.any():
+            return None, 0.0
+        scores = self.vectors @ vector
+        scores[~self.active] = -np.inf
+        slot = int(np.argmax(scores))
+        return slot, float(scores[slot])
+
+
+class LSHIndex(BruteForceIndex):
+    """
+    Approximate search with random-hyperplane LSH: only vectors sharing a
+    bucket with the query in at least one table are scored exactly.
+    """
+
+    def __init__(self, dim: int, capacity: int, tables: int = 16, bits: int = 8, seed: int = 0):
+        super().__init__(dim, capacity)
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((tables, bits, dim)).astype(np.float32)
+        self.powers = 1 << np.arange(bits)
+        self.buckets: List[Dict[int, set]] = [{} for _ in range(tables)]
+        self.keys: Dict[int, np.ndarray] = {}
+
+    def _keys(self, vector: np.ndarray) -> np.ndarray:
+        return ((self.planes @ vector) > 0).astype(np.int64) @ self.powers
+
+    def add(self, slot: int, vector: np.ndarray) -> None:
+        super().add(slot, vector)
+        keys = self.keys[slot] = self._keys(vector)
+        for table, key in zip(self.buckets, keys):
+            table.setdefault(int(key), set()).add(slot)
+
+    def remove(self, slot: int) -> None:
+        super().remove(slot)
+        keys = self.keys.pop(slot, None)
+        if keys is None:
+            return
+        for table, key in zip(self.buckets, keys):
+            bucket = table.get(int(key))
+            if bucket:
+                bucket.discard(slot)
+                if not bucket:
+                    del table[int(key)]
+
+    def search(self, vector: np.ndarray) -> Tuple[Optional[int], float]:
+        candidates = set()
+        for table, key in zip(self.buckets, self._keys(vector)):
+            candidates.update(table.get(int(key), ()))
+        if not candidates:
+            return None, 0.0
+        slots = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        scores = self.vectors[slots] @ vector
+        best = int(np.argmax(scores))
+        return int(slots[best]), float(scores[best])
+
+
+class SemanticAnswerCache:
+    """Question -> answer cache matched by embedding similarity."""
+
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        ttl: float = 3600.0,
+        max_entries: int = 2048,
+        embedder: Optional[Callable[[str], np.ndarray]] = None,
+        index: str = "brute",
+    ):
+        """
+        Args:
+            threshold: Minimum cosine similarity for a hit.
+            ttl: Seconds an answer stays fresh.
+            max_entries: Entries kept; the least recently used is evicted beyond this.
+            embedder: Text -> unit vector (default: HashingEmbedder).
+            index: "brute" for exact NumPy search, "lsh" for the approximate index.
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.embedder = embedder or HashingEmbedder()
+        dim = len(self.embedder("dimension probe"))
+        self.index = LSHIndex(dim, max_entries) if index == "lsh" else BruteForceIndex(dim, max_entries)
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+
+    @staticmethod
+    def cacheable(question: str) -> bool:
+        """False for follow-ups ("what about its population?") whose answer depends on context."""
+        return not _CONTEXT_WORDS.intersection(_WORD_RE.findall(question.lower()))
+
+    def _drop(self, slot: int) -> None:
+        self._entries.pop(slot, None)
+        self.index.remove(slot)
+        self._free.append(slot)
+
+    def lookup(self, question: str) -> Optional[Dict[str, Any]]:
+        """Fresh cached answer for a similar question: {"answer", "question", "similarity", ...} or None."""
+        if not self.cacheable(question):
+            return None
+        vector = self.embedder(question)
+        with self._lock:
+            slot, score = self.index.search(vector)
+            entry = self._entries.get(slot) if slot is not None else None
+            if entry is not None and time.monotonic() - entry["stored_at"] > self.ttl:
+                self._drop(slot)
+                self._stats["expired"] += 1
+                entry = None
+            # "2018 World Cup" vs "2022 World Cup" embed close together but need different answers,
+            # and so does a question adding a word ("first vice president" vs "first president")
+            if entry is None or score < self.threshold or entry["numbers"] != _numbers(question) \
+                    or not entry["words"].issuperset(_content_words(question)):
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(slot)
+            self._stats["hits"] += 1
+            return {**{k: v for k, v in entry.items() if k not in ("numbers", "words")}, "similarity": score}
+
+    def store(self, question: str, answer: str, **metadata: Any) -> bool:
+        """Cache an answer; returns False when the question is not cacheable or the answer is partial."""
+        if not answer or metadata.get("partial") or not self.cacheable(question):
+            return False
+        vector = self.embedder(question)
+        with self._lock:
+            slot, score = self.index.search(vector)
+            if slot is not None and score >= 0.999:
+                # Same question again - refresh it in place
+                self._drop(slot)
+            if not self._free:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._stats["evictions"] += 1
+            slot = self._free.pop()
+            self.index.add(slot, vector)
+            self._entries[slot] = {"question": question, "answer": answer, "numbers": _numbers(question),
+                                   "words": frozenset(_content_words(question)), "stored_at": time.monotonic(), **metadata}
+            self._stats["stores"] += 1
+        return True
+
+    def expire(self) -> int:
+        """Drop every entry older than ttl; returns how many were removed."""
+        cutoff = time.monotonic() - self.ttl
+        with self._lock:
+            stale = [slot for slot, entry in self._entries.items() if entry["stored_at"] < cutoff]
+            for slot in stale:
+                self._drop(slot)
+            self._stats["expired"] += len(stale)
+        return len(stale)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "size": len(self._entries)}
+
+    def clear(self) -> None:
+        with self._lock:
+            for slot in list(self._entries):
+                self._drop(slot)
+
+
+def _question(inputs: Optional[Dict[str, Any]]) -> Optional[str]:
+    for message in reversed((inputs or {}).get("messages", [])):
+        if isinstance(message, HumanMessage):
+            return message.content
+        if isinstance(message, tuple) and message[0] in ("user", "human"):
+            return message[1]
+    return None
+
+
+def is_partial(result: Optional[Dict[str, Any]]) -> bool:
+    """True for a run stopped by its budget (nodes/budget) - a partial answer must never be cached."""
+    if not result:
+        return False
+    if result.get("budget_exhausted"):
+        return True
+    messages = result.get("messages", [])
+    metadata = getattr(messages[-1], "response_metadata", None) if messages else None
+    return bool((metadata or {}).get("partial"))
+
+
+class CachedAgent:
+    """
+    Compiled agent graph fronted by a SemanticAnswerCache.
+    invoke/ainvoke answer near-duplicate questions from the cache; everything
+    else (get_state, stream, ...) is delegated to the wrapped graph.
+    """
+
+    def __init__(self, agent, cache: SemanticAnswerCache):
+        self.agent = agent
+        self.cache = cache
+
+    def __getattr__(self, name: str):
+        return getattr(self.agent, name)
+
+    def cached_result(self, inputs: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Graph-shaped result for a cache hit, or None."""
+        question = _question(inputs)
+        hit = self.cache.lookup(question) if question else None
+        if hit is None:
+            return None
+        return {"messages": list(inputs["messages"]) + [AIMessage(content=hit["answer"])],
+                "cache_hit": {"question": hit["question"], "similarity": hit["similarity"]}}
+
+    def remember(self, inputs: Optional[Dict[str, Any]], result: Dict[str, Any]) -> None:
+        if is_partial(result):
+            return
+        question = _question(inputs)
+        messages = result.get("messages", [])
+        if question and messages and isinstance(messages[-1], AIMessage) and not messages[-1].tool_calls:
+            self.cache.store(question, messages[-1].content)
+
+    def invoke(self, inputs, config=None, **kwargs):
+        # inputs is None when a checkpointed run is being resumed
+        cached = self.cached_result(inputs) if inputs is not None else None
+        if cached is not None:
+            return cached
+        result = self.agent.invoke(inputs, config, **kwargs)
+        if inputs is not None:
+            self.remember(inputs, result)
+        return result
+
+    async def ainvoke(self, inputs, config=None, **kwargs):
+        cached = self.cached_result(inputs) if inputs is not None else None
+        if cached is not None:
+            return cached
+        result = await self.agent.ainvoke(inputs, config, **kwargs)
+        if inputs is not None:
+            self.remember(inputs, result)
+        return result
+
+
+_default_cache: Optional[SemanticAnswerCache] = None
+
+
+def configure_answer_cache(cache: Optional[SemanticAnswerCache]) -> None:
+    """Replace the shared answer cache (e.g. with a cross-process one in the worker pool)."""
+    global _default_cache
+    _default_cache = cache
+
+
+def answer_cache_enabled() -> bool:
+    """ANSWER_CACHE_ENABLED env var (default off)."""
+    return os.getenv("ANSWER_CACHE_ENABLED", "").lower() in ("1", "true", "yes")
+
+
+def answer_cache_settings() -> Dict[str, Any]:
+    """SemanticAnswerCache arguments from the ANSWER_CACHE_* env vars."""
+    return {
+        "threshold": float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.85")),
+        "ttl": float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+        "max_entries": int(os.getenv("ANSWER_CACHE_SIZE", "2048")),
+        "index": os.getenv("ANSWER_CACHE_INDEX", "brute"),
+    }
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Shared answer cache when ANSWER_CACHE_ENABLED is set, otherwise None."""
+    global _default_cache
+    if not answer_cache_enabled():
+        return None
+    if _default_cache is None:
+        _default_cache = SemanticAnswerCache(**answer_cache_settings())
+    return _default_cache
@@ -0,0 +1,60 @@
+"""
+Asyncio driver for the compiled agent graphs.
+Runs conversations with agent.ainvoke so one process can serve many of them
+concurrently instead of blocking on each one in turn.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Dict, Iterable, List, Optional
+
+
+def run_async(main: Awaitable[Any]) -> Any:
+    """
+    asyncio.run(main), closing the shared search and page-fetch connection
+    pools before the loop ends - they are bound to it and would leak otherwise.
+    """
+    from nodes.tools import aclose_tool_clients
+
+    async def run():
+        try:
+            return await main
+        finally:
+            await aclose_tool_clients()
+
+    return asyncio.run(run())
+
+
+async def ainput(prompt: str) -> str:
+    """input() that does not block the event loop."""
+    return await asyncio.to_thread(input, prompt)
+
+
+async def arun_conversation(agent, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Run one conversation turn through the agent asynchronously."""
+    return await agent.ainvoke(inputs, config=config)
+
+
+async def astream_conversation(agent, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None):
+    """Yield intermediate graph states as each node finishes."""
+    async for state in agent.astream(inputs, config=config, stream_mode="values"):
+        yield state
+
+
+async def arun_many(
+    agent,
+    conversations: Iterable[Dict[str, Any]],
+    concurrency: int = 32,
+    config: Optional[Dict[str, Any]] = None,
+) -> List[Any]:
+    """
+    Run many conversations concurrently against one shared agent.
+    At most `concurrency` are in flight at once. Results come back in input
+    order; a failed conversation yields its exception instead of a state.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(inputs: Dict[str, Any]):
+        async with semaphore:
+            return await arun_conversation(agent, inputs, config=config)
+
+    return await asyncio.gather(*(run_one(c) for c in conversations), return_exceptions=True)
@@ -0,0 +1,189 @@
+"""
+Batch processing: answer a JSONL file of questions with one shared agent.
+Questions are streamed from the input and only `concurrency` of them are held
+at a time, so memory does not grow with the file. Each result is appended to
+the output JSONL as soon as it finishes; on a re-run, ids already answered
+there are skipped, so an interrupted job resumes where it stopped.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from langchain_core.messages import HumanMessage
+
+from nodes.rate_limiter import LOW, priority
+
+
+def _question_text(record: Dict[str, Any], question_field: Optional[str]) -> Optional[str]:
+    if question_field:
+        return record.get(question_field)
+    if record.get("question"):
+        return record["question"]
+    # Backlog-style records: {"title": ..., "body": ...}
+    parts = [record.get("title"), record.get("body")]
+    return "\n\n".join(p for p in parts if p) or None
+
+
+def read_questions(path: str, id_field: Optional[str] = None,
+                   question_field: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield {"id", "question"} records from a JSONL file, one line at a time.
+
+    Args:
+        path: Input JSONL file.
+        id_field: Field holding the record id (default: "id", then "request_id", then the line number).
+        question_field: Field holding the question (default: "question", then "title" + "body").
+    """
+    with open(path) as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            question = _question_text(record, question_field)
+            if not question:
+                continue
+            record_id = record.get(id_field) if id_field else (record.get("id") or record.get("request_id"))
+            yield {"id": str(record_id if record_id is not None else line_number), "question": question}
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids with a successful result in an existing output file; failed ones are retried."""
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue  # last line cut short by an interrupted run
+            if "error" not in result:
+                done.add(result["id"])
+    return done
+
+
+def _ends_mid_line(path: str) -> bool:
+    """True when a run killed mid-write left a partial last line."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+    except OSError:  # missing or empty
+        return False
+
+
+def _tools_used(messages: List[Any]) -> List[str]:
+    names = []
+    for msg in messages:
+        for call in getattr(msg, "tool_calls", None) or []:
+            if call.get("name") not in names:
+                names.append(call.get("name"))
+    return names
+
+
+class BatchRunner:
+    """Runs questions through a shared agent with at most `concurrency` in flight."""
+
+    def __init__(self, agent, output_path: str, concurrency: int = 8, timeout: Optional[float] = None,
+                 progress_interval: float = 10.0, echo: bool = True):
+        """
+        Args:
+            agent: Compiled agent graph taking {"messages": [...]} (e.g. main.create_agent()).
+            output_path: JSONL file results are appended to.
+            concurrency: Questions in flight at once.
+            timeout: Seconds allowed per question; None waits indefinitely.
+            progress_interval: Seconds between progress lines.
+            echo: Print progress lines and the summary.
+        """
+        self.agent = agent
+        self.output_path = output_path
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.progress_interval = progress_interval
+        self.echo = echo
+        self.counts = {"answered": 0, "failed": 0, "skipped": 0}
+        self._started = 0.0
+
+    async def _answer(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        result = {"id": record["id"], "question": record["question"]}
+        try:
+            # Batch work yields to interactive callers sharing the provider rate limits
+            with priority(LOW):
+                state = await asyncio.wait_for(
+                    self.agent.ainvoke({"messages": [HumanMessage(content=record["question"])]}), self.timeout
+                )
+            messages = state.get("messages", [])
+            result["answer"] = messages[-1].content if messages else ""
+            result["tools_used"] = _tools_used(messages)
+        except asyncio.TimeoutError:
+            result["error"] = f"timed out after {self.timeout}s"
+        except Exception as e:
+            result["error"] = str(e) or type(e).__name__
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        return result
+
+    def _progress(self, final: bool = False) -> str:
+        elapsed = time.perf_counter() - self._started
+        finished = self.counts["answered"] + self.counts["failed"]
+        rate = finished / elapsed if elapsed else 0.0
+        prefix = "✅ Done:" if final else "📊"
+        return (f"{prefix} {self.counts['answered']} answered, {self.counts['failed']} failed, "
+                f"{self.counts['skipped']} skipped in {elapsed:.1f}s ({rate:.2f} questions/s)")
+
+    async def _report(self) -> None:
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            print(self._progress(), flush=True)
+
+    async def arun(self, records: Iterable[Dict[str, Any]], skip: Optional[Set[str]] = None) -> Dict[str, int]:
+        """
+        Answer every record not in `skip`; returns the answered/failed/skipped counts.
+        The next record is only read once a worker is free.
+        """
+        skip = skip or set()
+        slots = asyncio.Semaphore(self.concurrency)
+        in_flight: Set[asyncio.Task] = set()
+        self._started = time.perf_counter()
+        reporter = asyncio.create_task(self._report()) if self.echo else None
+
+        with open(self.output_path, "a") as out:
+            if _ends_mid_line(self.output_path):
+                out.write("\n")
+
+            async def run_one(record: Dict[str, Any]) -> None:
+                try:
+                    result = await self._answer(record)
+                    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    out.flush()
+                    self.counts["failed" if "error" in result else "answered"] += 1
+                finally:
+                    slots.release()
+
+            try:
+                for record in records:
+                    if record["id"] in skip:
+                        self.counts["skipped"] += 1
+                        continue
+                    await slots.acquire()
+                    task = asyncio.create_task(run_one(record))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+                if in_flight:
+                    await asyncio.gather(*in_flight)
+            finally:
+                for task in in_flight:
+                    task.cancel()
+                if reporter:
+                    reporter.cancel()
+
+        if self.echo:
+            print(self._progress(final=True), flush=True)
+        return dict(self.counts)
+
+    def run(self, records: Iterable[Dict[str, Any]], skip: Optional[Set[str]] = None) -> Dict[str, int]:
+        from nodes.async_runner import run_async
+        return run_async(self.arun(records, skip))
@@ -0,0 +1,428 @@
+"""
+Per-request budgets for agent runs: a wall-clock time limit and caps on LLM
+calls, tool calls and tokens.
+BudgetedAgent fronts a compiled graph. Each invoke/ainvoke gets a fresh
+Budget (from the AGENT_* env vars, or `with request_budget(...)` for one
+request); a callback handler charges every LLM and tool call against it and
+stops the run once it is spent. The caller then gets the best answer
+available from what the run gathered so far instead of an error: a short
+LLM synthesis when time remains, otherwise the tool results themselves. On
+the async path in-flight tools are cancelled at the time limit; a sync run
+is abandoned at the limit and refused any further LLM or tool call.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+from nodes.instrumentation import token_usage
+
+logger = logging.getLogger(__name__)
+
+DEADLINE, LLM_CALLS, TOOL_CALLS, TOKENS = "time_limit", "max_llm_calls", "max_tool_calls", "max_tokens"
+
+_PARTIAL_PROMPT = """Question: {question}
+
+Information gathered so far:
+{gathered}
+
+The research was stopped before it finished ({reason}). Answer the question as well as you can
+from this information only, and say briefly what could not be checked."""
+
+
+class BudgetExceeded(Exception):
+    """Raised inside a run once one of its budgets is spent."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Request budget exhausted: {reason}")
+        self.reason = reason
+
+
+class _HideBudgetStops(logging.Filter):
+    """LangChain logs every exception raised by a callback; a spent budget is expected, not an error."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return "BudgetExceeded" not in record.getMessage()
+
+
+logging.getLogger("langchain_core.callbacks.manager").addFilter(_HideBudgetStops())
+
+
+class Budget:
+    """Limits for one agent run; None means unlimited. Spending past a limit is sticky."""
+
+    def __init__(self, time_limit: Optional[float] = None, max_llm_calls: Optional[int] = None,
+                 max_tool_calls: Optional[int] = None, max_tokens: Optional[int] = None):
+        """
+        Args:
+            time_limit: Seconds the run may take, from start().
+            max_llm_calls: LLM calls the graph may make.
+            max_tool_calls: Tool calls the graph may make.
+            max_tokens: Input plus output tokens the LLM calls may use.
+        """
+        self.time_limit = time_limit
+        self.max_llm_calls = max_llm_calls
+        self.max_tool_calls = max_tool_calls
+        self.max_tokens = max_tokens
+        self.llm_calls = 0
+        self.tool_calls = 0
+        self.tokens = 0
+        self.exhausted: Optional[str] = None
+        self._deadline: Optional[float] = None
+        self._started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def limited(self) -> bool:
+        return any(limit is not None for limit in
+                   (self.time_limit, self.max_llm_calls, self.max_tool_calls, self.max_tokens))
+
+    def start(self) -> "Budget":
+        self._started = time.monotonic()
+        if self.time_limit is not None:
+            self._deadline = self._started + self.time_limit
+        return self
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the time limit, or None without one."""
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - time.monotonic())
+
+    def exhaust(self, reason: str) -> None:
+        with self._lock:
+            self.exhausted = self.exhausted or reason
+
+    def check(self) -> None:
+        """Raise BudgetExceeded if the budget is spent or the time limit has passed."""
+        if self.exhausted is None and self._deadline is not None and time.monotonic() >= self._deadline:
+            self.exhaust(DEADLINE)
+        if self.exhausted is not None:
+            raise BudgetExceeded(self.exhausted)
+
+    def _charge(self, counter: str, limit: Optional[int], reason: str, amount: int) -> None:
+        self.check()
+        with self._lock:
+            if limit is not None and getattr(self, counter) + amount > limit:
+                self.exhausted = self.exhausted or reason
+                raise BudgetExceeded(reason)
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def charge_llm(self) -> None:
+        """Count one LLM call, or raise BudgetExceeded if it is not allowed."""
+        self._charge("llm_calls", self.max_llm_calls, LLM_CALLS, 1)
+
+    def charge_tools(self, count: int = 1) -> None:
+        """Count `count` tool calls, or raise BudgetExceeded if they are not all allowed."""
+        self._charge("tool_calls", self.max_tool_calls, TOOL_CALLS, count)
+
+    def add_tokens(self, tokens: int) -> None:
+        """Record tokens used; the next call is refused once max_tokens is reached."""
+        with self._lock:
+            self.tokens += tokens
+            if self.max_tokens is not None and self.tokens >= self.max_tokens:
+                self.exhausted = self.exhausted or TOKENS
+
+    def usage(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self._started if self._started is not None else 0.0
+        return {"elapsed": round(elapsed, 4), "llm_calls": self.llm_calls, "tool_calls": self.tool_calls,
+                "tokens": self.tokens, "exhausted": self.exhausted}
+
+
+def _env_number(name: str, kind=int):
+    value = os.getenv(name, "").strip()
+    if not value:
+        return None
+    try:
+        number = kind(value)
+    except ValueError:
+        logger.warning("Ignoring %s=%r: not a valid %s; the limit is off", name, value, kind.__name__)
+        return None
+    return number if number > 0 else None
+
+
+@functools.lru_cache(maxsize=None)
+def _env_limits() -> Dict[str, Any]:
+    """The AGENT_* limits, read once (the first run) rather than on every invoke."""
+    return {
+        "time_limit": _env_number("AGENT_TIME_LIMIT", float),
+        "max_llm_calls": _env_number("AGENT_MAX_LLM_CALLS"),
+        "max_tool_calls": _env_number("AGENT_MAX_TOOL_CALLS"),
+        "max_tokens": _env_number("AGENT_MAX_TOKENS"),
+    }
+
+
+def default_budget() -> Budget:
+    """Budget from AGENT_TIME_LIMIT / AGENT_MAX_LLM_CALLS / AGENT_MAX_TOOL_CALLS / AGENT_MAX_TOKENS (unset or 0: unlimited)."""
+    return Budget(**_env_limits())
+
+
+_request_budget: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "request_budget", default=None)
+_current: contextvars.ContextVar[Optional[Budget]] = contextvars.ContextVar("current_budget", default=None)
+
+
+@contextlib.contextmanager
+def request_budget(**limits: Any) -> Iterator[None]:
+    """
+    Run the enclosed agent calls with these limits instead of the env defaults,
+    e.g. `with request_budget(time_limit=5, max_llm_calls=4): agent.invoke(...)`.
+    Each run still gets its own Budget; unset limits are unlimited.
+    """
+    token = _request_budget.set(limits)
+    try:
+        yield
+    finally:
+        _request_budget.reset(token)
+
+
+def request_limits() -> Optional[Dict[str, Any]]:
+    """The limits set by an enclosing request_budget(), if any."""
+    return _request_budget.get()
+
+
+def new_budget() -> Budget:
+    """A fresh Budget for one run: request_budget() limits if set, else the env defaults."""
+    limits = _request_budget.get()
+    return Budget(**limits) if limits is not None else default_budget()
+
+
+def current_budget() -> Optional[Budget]:
+    """The Budget of the run this code is part of (graph nodes, tools), if any."""
+    return _current.get()
+
+
+class BudgetCallbackHandler(BaseCallbackHandler):
+    """Charges LLM and tool calls to a Budget; raising from a start event stops the call."""
+
+    raise_error = True
+
+    def __init__(self, budget: Budget):
+        self.budget = budget
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.budget.charge_llm()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.budget.charge_llm()
+
+    def on_llm_end(self, response, **kwargs):
+        self.budget.add_tokens(sum(token_usage(response).values()))
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self.budget.charge_tools()
+
+
+def _with_handler(config: Optional[Dict[str, Any]], budget: Budget) -> Dict[str, Any]:
+    config = dict(config or {})
+    callbacks = config.get("callbacks")
+    handler = BudgetCallbackHandler(budget)
+    if callbacks is None:
+        config["callbacks"] = [handler]
+    elif isinstance(callbacks, list):
+        config["callbacks"] = callbacks + [handler]
+    else:  # a callback manager
+        callbacks = callbacks.copy()
+        callbacks.add_handler(handler, inherit=True)
+        config["callbacks"] = callbacks
+    return config
+
+
+def _question_turn(messages: List[BaseMessage]) -> tuple:
+    start = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+    question = messages[start].content if start >= 0 else ""
+    return question, messages[start + 1:]
+
+
+def _gathered(turn: List[BaseMessage], max_chars: int = 600) -> List[str]:
+    results = []
+    for message in turn:
+        if isinstance(message, ToolMessage) and message.status != "error":
+            text = " ".join(str(message.content).split())
+            results.append(f"- {message.name}: {text[:max_chars]}{'...' if len(text) > max_chars else ''}")
+    return results
+
+
+_REASONS = {DEADLINE: "time limit reached", LLM_CALLS: "LLM call limit reached",
+            TOOL_CALLS: "tool call limit reached", TOKENS: "token limit reached"}
+
+
+class BudgetedAgent:
+    """
+    Compiled agent graph run under a per-request Budget.
+    invoke/ainvoke return a partial answer when the budget runs out;
+    stream/astream/astream_events enforce the same limits but raise
+    BudgetExceeded. Everything else is delegated to the wrapped graph.
+    """
+
+    def __init__(self, agent, llm=None):
+        """
+        Args:
+            agent: Compiled graph (or a wrapper with the same interface).
+            llm: Chat model for the partial-answer synthesis (None: tool results only).
+        """
+        self.agent = agent
+        self.llm = llm
+
+    def __getattr__(self, name: str):
+        return getattr(self.agent, name)
+
+    # -- partial answers ----------------------------------------------------
+
+    def _synthesis_prompt(self, state: Dict[str, Any], reason: str) -> Optional[str]:
+        question, turn = _question_turn(state.get("messages", []))
+        gathered = _gathered(turn)
+        if self.llm is None or not gathered:
+            return None
+        return _PARTIAL_PROMPT.format(question=question, gathered="\n".join(gathered), reason=_REASONS[reason])
+
+    @staticmethod
+    def _extractive(state: Dict[str, Any], reason: str) -> str:
+        _, turn = _question_turn(state.get("messages", []))
+        gathered = _gathered(turn)
+        if not gathered:
+            return (f"⏱️ I couldn't finish researching this ({_REASONS[reason]}). "
+                    "Please try again or ask a narrower question.")
+        return (f"⏱️ I couldn't finish researching this ({_REASONS[reason]}). "
+                "Here is what I found so far:\n" + "\n".join(gathered))
+
+    @staticmethod
+    def _result(state: Dict[str, Any], answer: str, budget: Budget) -> Dict[str, Any]:
+        message = AIMessage(content=answer, response_metadata={"partial": True})
+        return {**state, "messages": list(state.get("messages", [])) + [message], "final_answer": answer,
+                "budget_exhausted": budget.exhausted, "budget": budget.usage()}
+
+    @staticmethod
+    def _time_left(budget: Budget) -> bool:
+        return budget.exhausted != DEADLINE and budget.remaining() != 0.0
+
+    def partial_result(self, state: Dict[str, Any], budget: Budget) -> Dict[str, Any]:
+        """Best answer from a stopped run's last state; asks the LLM only if time remains."""
+        prompt = self._synthesis_prompt(state, budget.exhausted)
+        answer = None
+        if prompt is not None and self._time_left(budget):
+            outcome: Dict[str, str] = {}
+
+            def synthesize():
+                try:
+                    # Not charged to the spent budget and kept out of the graph's callbacks
+                    outcome["answer"] = self.llm.invoke([HumanMessage(content=prompt)], config={"callbacks": []}).content
+                except Exception:
+                    pass
+
+            # Like the run itself, the synthesis is abandoned at the time limit
+            worker = threading.Thread(target=synthesize, name="budgeted-partial-answer", daemon=True)
+            worker.start()
+            worker.join(budget.remaining())
+            answer = outcome.get("answer")
+        return self._result(state, answer or self._extractive(state, budget.exhausted), budget)
+
+    async def apartial_result(self, state: Dict[str, Any], budget: Budget) -> Dict[str, Any]:
+        """Async variant of partial_result."""
+        prompt = self._synthesis_prompt(state, budget.exhausted)
+        answer = None
+        if prompt is not None and self._time_left(budget):
+            try:
+                message = await asyncio.wait_for(
+                    self.llm.ainvoke([HumanMessage(content=prompt)], config={"callbacks": []}), budget.remaining())
+                answer = message.content
+            except Exception:
+                answer = None
+        return self._result(state, answer or self._extractive(state, budget.exhausted), budget)
+
+    # -- runs ---------------------------------------------------------------
+
+    def _run(self, inputs, config, budget: Budget, progress: Dict[str, Any]) -> None:
+        """Stream the graph, keeping the latest state in `progress` (runs in the budget's context)."""
+        token = _current.set(budget)
+        try:
+            for state in self.agent.stream(inputs, _with_handler(config, budget), stream_mode="values"):
+                progress["state"] = state
+        except BudgetExceeded:
+            pass
+        except Exception as e:
+            if budget.exhausted is None:
+                progress["error"] = e
+        finally:
+            _current.reset(token)
+
+    def invoke(self, inputs, config=None, **kwargs):
+        budget = new_budget()
+        if not budget.limited:
+            return self.agent.invoke(inputs, config, **kwargs)
+        budget.start()
+        progress: Dict[str, Any] = {"state": inputs or {}}
+        if budget.time_limit is None:
+            self._run(inputs, config, budget, progress)
+        else:
+            # The caller gets its answer at the time limit even if a call is still running;
+            # the abandoned run is refused every further LLM/tool call
+            context = contextvars.copy_context()
+            worker = threading.Thread(target=context.run, args=(self._run, inputs, config, budget, progress),
+                                      name="budgeted-run", daemon=True)
+            worker.start()
+            worker.join(budget.remaining())
+            if worker.is_alive():
+                budget.exhaust(DEADLINE)
+        if "error" in progress:
+            raise progress["error"]
+        if budget.exhausted is None:
+            return progress["state"]
+        return self.partial_result(progress["state"], budget)
+
+    async def _arun(self, inputs, config, budget: Budget, progress: Dict[str, Any]) -> None:
+        token = _current.set(budget)
+        try:
+            async for state in self.agent.astream(inputs, _with_handler(config, budget), stream_mode="values"):
+                progress["state"] = state
+        finally:
+            _current.reset(token)
+
+    async def ainvoke(self, inputs, config=None, **kwargs):
+        budget = new_budget()
+        if not budget.limited:
+            return await self.agent.ainvoke(inputs, config, **kwargs)
+        budget.start()
+        progress: Dict[str, Any] = {"state": inputs or {}}
+        try:
+            # wait_for cancels the run - and the tool calls in flight - at the time limit
+            await asyncio.wait_for(self._arun(inputs, config, budget, progress), budget.remaining())
+        except asyncio.TimeoutError:
+            budget.exhaust(DEADLINE)
+        except BudgetExceeded:
+            pass
+        except Exception:
+            if budget.exhausted is None:
+                raise
+        if budget.exhausted is None:
+            return progress["state"]
+        return await self.apartial_result(progress["state"], budget)
+
+    # -- streaming: same limits, but BudgetExceeded is raised ----------------
+
+    def _budgeted_config(self, config) -> Dict[str, Any]:
+        budget = new_budget()
+        return _with_handler(config, budget.start()) if budget.limited else config
+
+    def stream(self, inputs, config=None, **kwargs):
+        return self.agent.stream(inputs, self._budgeted_config(config), **kwargs)
+
+    def astream(self, inputs, config=None, **kwargs):
+        return self.agent.astream(inputs, self._budgeted_config(config), **kwargs)
+
+    def astream_events(self, inputs, config=None, **kwargs):
+        return self.agent.astream_events(inputs, self._budgeted_config(config), **kwargs)
+
+
+def with_budget(agent, llm=None) -> BudgetedAgent:
+    """Front a compiled agent with per-request budgets (see BudgetedAgent)."""
+    return BudgetedAgent(agent, llm)
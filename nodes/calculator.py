@@ -0,0 +1,447 @@
+"""
+Expression engine for the calculator tool.
+A small tokenizer and precedence-climbing parser build a tuple AST, which is
+compiled into closures with constant subtrees folded. Parsed and compiled
+expressions are kept in LRU caches. No eval() anywhere.
+
+List literals ([1, 2, 3]) and range() evaluate to NumPy arrays, so the same
+expressions work element-wise over many inputs, and aggregate functions
+(mean, median, std, percentile, describe, ...) reduce them in one call.
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Tokens: numbers (1, 2.5, .5, 1e3), names, operators; anything else is "bad"
+_TOKEN_RE = re.compile(
+    r"\s*(?:(?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)"
+    r"|(?P<name>[A-Za-z_][A-Za-z_0-9]*)"
+    r"|(?P<op>\*\*|//|[-+*/%^(),\[\]])"
+    r"|(?P<bad>\S))"
+)
+
+# Refuse powers whose result would need more bits than this - Python integers
+# never overflow, so (2**10000)**10000 would otherwise run for minutes
+MAX_RESULT_BITS = 100_000
+
+# Integers longer than this are shown in scientific notation; str() refuses
+# ones past sys.get_int_max_str_digits() (4300 by default) anyway
+MAX_EXACT_DIGITS = 4000
+
+# Largest list a single batch calculation will build
+MAX_BATCH_SIZE = 1_000_000
+
+
+class CalculatorError(ValueError):
+    """Raised for expressions that cannot be parsed or evaluated."""
+
+
+def _log(x, base=math.e):
+    if isinstance(x, np.ndarray):
+        return np.log(x) / np.log(base)
+    return math.log(x, base)
+
+
+def _result_bits(base, exponent) -> float:
+    """log2(|base ** exponent|), worked out without computing the power."""
+    if base == 0 or exponent == 0:
+        return 0.0
+    try:
+        return math.log2(abs(base)) * float(exponent)
+    except OverflowError:
+        # Exponent beyond the float range
+        return math.inf if (abs(base) > 1) == (exponent > 0) else -math.inf
+
+
+def _array_power(base, exponent) -> np.ndarray:
+    """Element-wise power; integer inputs stay integers while the result fits in int64."""
+    base, exponent = np.asarray(base), np.asarray(exponent)
+    # Object arrays (e.g. from huge Python ints) would fall back to unbounded integer math
+    if base.dtype.kind not in "iuf":
+        base = base.astype(float)
+    if exponent.dtype.kind not in "iuf":
+        exponent = exponent.astype(float)
+    if base.dtype.kind in "iu":
+        largest = int(np.max(np.abs(base), initial=0))
+        fits = exponent.dtype.kind in "iu" and np.min(exponent, initial=0) >= 0 and (
+            largest <= 1 or math.log2(largest) * int(np.max(exponent, initial=0)) < 63)
+        if not fits:
+            # Integer arrays overflow silently and reject negative exponents
+            base = base.astype(float)
+    return base ** exponent
+
+
+def _power(base, exponent):
+    if isinstance(base, np.ndarray) or isinstance(exponent, np.ndarray):
+        # Fixed-width, so large results overflow to inf instead of taking forever
+        return _array_power(base, exponent)
+    if _result_bits(base, exponent) > MAX_RESULT_BITS:
+        raise CalculatorError(f"Result of the power would exceed {MAX_RESULT_BITS} bits")
+    return base ** exponent
+
+
+def _elementwise(scalar_fn, array_fn):
+    """Use the math version for scalars and the NumPy ufunc for arrays."""
+    def apply(*args):
+        if any(isinstance(arg, np.ndarray) for arg in args):
+            return array_fn(*args)
+        return scalar_fn(*args)
+    return apply
+
+
+def _values(args: Sequence[Any]) -> np.ndarray:
+    """Flatten scalars and arrays passed to an aggregate into one 1-D array."""
+    arrays = [np.atleast_1d(np.asarray(arg)).ravel() for arg in args]
+    values = np.concatenate(arrays) if arrays else np.empty(0)
+    if values.size == 0:
+        raise CalculatorError("No values given")
+    return values
+
+
+def _scalar(value):
+    """Convert NumPy scalars back to plain Python numbers."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _aggregate(reducer):
+    return lambda *args: _scalar(reducer(_values(args)))
+
+
+def _sample_std(values: np.ndarray):
+    return np.std(values, ddof=1) if values.size > 1 else 0.0
+
+
+def _sample_var(values: np.ndarray):
+    return np.var(values, ddof=1) if values.size > 1 else 0.0
+
+
+def _percentile(*args):
+    """percentile(values..., q) - the last argument is the percentile (0-100)."""
+    if len(args) < 2:
+        raise CalculatorError("percentile needs values and a percentile, e.g. percentile([1, 2, 3], 90)")
+    return _scalar(np.percentile(_values(args[:-1]), args[-1]))
+
+
+def _describe(*args) -> Dict[str, Any]:
+    """Summary statistics for a list of values."""
+    values = _values(args)
+    p25, median, p75 = np.percentile(values, [25, 50, 75])
+    return {
+        "count": int(values.size),
+        "sum": _scalar(values.sum()),
+        "mean": _scalar(values.mean()),
+        "std": _scalar(_sample_std(values)),
+        "min": _scalar(values.min()),
+        "p25": _scalar(p25),
+        "median": _scalar(median),
+        "p75": _scalar(p75),
+        "max": _scalar(values.max()),
+    }
+
+
+def _range(*args):
+    if not 1 <= len(args) <= 3 or any(np.ndim(arg) for arg in args):
+        raise CalculatorError("range() takes 1 to 3 numbers: range(stop), range(start, stop[, step])")
+    start, stop, step = (0, args[0], 1) if len(args) == 1 else (list(args) + [1])[:3]
+    if step == 0:
+        raise CalculatorError("range() step must not be zero")
+    # Check the length before NumPy allocates the array
+    if math.ceil((stop - start) / step) > MAX_BATCH_SIZE:
+        raise CalculatorError(f"range() would produce more than {MAX_BATCH_SIZE} values")
+    return np.arange(start, stop, step)
+
+
+FUNCTIONS = {
+    "sqrt": _elementwise(math.sqrt, np.sqrt),
+    "log": _log,
+    "ln": _elementwise(math.log, np.log),
+    "log10": _elementwise(math.log10, np.log10),
+    "log2": _elementwise(math.log2, np.log2),
+    "exp": _elementwise(math.exp, np.exp),
+    "pow": _power,
+    "abs": _elementwise(abs, np.abs),
+    "round": _elementwise(round, np.round),
+    "floor": _elementwise(math.floor, np.floor),
+    "ceil": _elementwise(math.ceil, np.ceil),
+    "sin": _elementwise(math.sin, np.sin),
+    "cos": _elementwise(math.cos, np.cos),
+    "tan": _elementwise(math.tan, np.tan),
+    "range": _range,
+}
+
+# Aggregates reduce any mix of scalars and lists to one number
+AGGREGATES = {
+    "sum": _aggregate(np.sum),
+    "total": _aggregate(np.sum),
+    "product": _aggregate(np.prod),
+    "count": _aggregate(np.size),
+    "min": _aggregate(np.min),
+    "max": _aggregate(np.max),
+    "mean": _aggregate(np.mean),
+    "average": _aggregate(np.mean),
+    "avg": _aggregate(np.mean),
+    "median": _aggregate(np.median),
+    "std": _aggregate(_sample_std),
+    "stdev": _aggregate(_sample_std),
+    "pstdev": _aggregate(np.std),
+    "var": _aggregate(_sample_var),
+    "variance": _aggregate(_sample_var),
+    "percentile": _percentile,
+    "describe": _describe,
+    "stats": _describe,
+}
+FUNCTIONS.update(AGGREGATES)
+
+CONSTANTS = {"pi": math.pi, "e": math.e, "tau": math.tau}
+
+
+BINARY_PRECEDENCE = {"+": 1, "-": 1, "*": 2, "/": 2, "//": 2, "%": 2}
+
+BINARY_OPS = {
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+    "/": lambda a, b: a / b,
+    "//": lambda a, b: a // b,
+    "%": lambda a, b: a % b,
+    "**": _power,
+}
+
+
+def tokenize(expression: str) -> List[Tuple[str, str]]:
+    """Split an expression into (kind, text) tokens."""
+    # Every non-space character matches some group, so matches are contiguous
+    tokens = []
+    for match in _TOKEN_RE.finditer(expression):
+        kind = match.lastgroup
+        if kind == "bad":
+            raise CalculatorError(f"Unexpected character {match.group(kind)!r} at position {match.start(kind)}")
+        tokens.append((kind, match.group(kind)))
+    return tokens
+
+
+class _Parser:
+    """
+    Precedence-climbing parser. Binary operators come from BINARY_PRECEDENCE;
+    unary minus binds looser than "**" (so -2**2 == -4), and "**" / "^" are
+    right-associative.
+        atom := NUMBER | NAME | NAME "(" args ")" | "(" expr ")" | "[" args "]"
+    """
+
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> Optional[Tuple[str, str]]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self, text: Optional[str] = None) -> Tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            raise CalculatorError("Unexpected end of expression")
+        if text is not None and token[1] != text:
+            raise CalculatorError(f"Expected {text!r} but found {token[1]!r}")
+        self.pos += 1
+        return token
+
+    def at_op(self, *ops: str) -> bool:
+        token = self.peek()
+        return token is not None and token[0] == "op" and token[1] in ops
+
+    def parse(self):
+        if not self.tokens:
+            raise CalculatorError("Empty expression")
+        node = self.expr()
+        if self.peek() is not None:
+            raise CalculatorError(f"Unexpected token {self.peek()[1]!r}")
+        return node
+
+    def expr(self, min_precedence: int = 1):
+        node = self.unary()
+        while True:
+            token = self.peek()
+            if token is None or token[0] != "op":
+                return node
+            precedence = BINARY_PRECEDENCE.get(token[1])
+            if precedence is None or precedence < min_precedence:
+                return node
+            self.pos += 1
+            node = ("bin", token[1], node, self.expr(precedence + 1))
+
+    def unary(self):
+        if self.at_op("-", "+"):
+            op = self.take()[1]
+            operand = self.unary()
+            return ("neg", operand) if op == "-" else operand
+        node = self.atom()
+        if self.at_op("**", "^"):
+            self.pos += 1
+            node = ("bin", "**", node, self.unary())
+        return node
+
+    def args(self, closing: str) -> Tuple[Any, ...]:
+        """Comma-separated expressions up to and including the closing bracket."""
+        args = []
+        if not self.at_op(closing):
+            args.append(self.expr())
+            while self.at_op(","):
+                self.pos += 1
+                args.append(self.expr())
+        self.take(closing)
+        return tuple(args)
+
+    def atom(self):
+        kind, text = self.take()
+        if kind == "num":
+            value = float(text) if any(c in text for c in ".eE") else int(text)
+            return ("num", value)
+        if kind == "name":
+            if self.at_op("("):
+                self.pos += 1
+                return ("call", text, self.args(")"))
+            return ("var", text)
+        if text == "(":
+            node = self.expr()
+            self.take(")")
+            return node
+        if text == "[":
+            return ("list", self.args("]"))
+        raise CalculatorError(f"Unexpected token {text!r}")
+
+
+@lru_cache(maxsize=4096)
+def parse(expression: str):
+    """Parse an expression into a tuple AST (cached)."""
+    return _Parser(tokenize(expression)).parse()
+
+
+def _array(items: List[Any]) -> np.ndarray:
+    """Build an array from list items; nested lists are flattened."""
+    parts = [np.atleast_1d(item).ravel() for item in items]
+    if sum(part.size for part in parts) > MAX_BATCH_SIZE:
+        raise CalculatorError(f"A list may hold at most {MAX_BATCH_SIZE} values")
+    return np.concatenate(parts) if parts else np.empty(0)
+
+
+def _function(name: str):
+    func = FUNCTIONS.get(name)
+    if func is None:
+        raise CalculatorError(f"Unknown function {name!r}")
+    return func
+
+
+def _lookup(name: str, variables: Optional[Dict[str, Any]]):
+    if variables and name in variables:
+        return variables[name]
+    if name in CONSTANTS:
+        return CONSTANTS[name]
+    raise CalculatorError(f"Unknown name {name!r}")
+
+
+def _compile(node) -> Tuple[bool, Any]:
+    """
+    Turn an AST into (is_constant, value_or_closure). Constant subtrees are
+    folded at compile time; everything else becomes a closure over env.
+    """
+    kind = node[0]
+    if kind == "num":
+        return True, node[1]
+    if kind == "var":
+        name = node[1]
+        return False, lambda env: _lookup(name, env)
+    if kind == "neg":
+        const, inner = _compile(node[1])
+        if const:
+            return True, -inner
+        return False, lambda env: -inner(env)
+    if kind == "bin":
+        op = BINARY_OPS[node[1]]
+        left_const, left = _compile(node[2])
+        right_const, right = _compile(node[3])
+        if left_const and right_const:
+            return True, op(left, right)
+        if left_const:
+            return False, lambda env: op(left, right(env))
+        if right_const:
+            return False, lambda env: op(left(env), right)
+        return False, lambda env: op(left(env), right(env))
+    if kind == "call":
+        func = _function(node[1])
+        args = [_compile(arg) for arg in node[2]]
+        if all(const for const, _ in args):
+            return True, func(*(value for _, value in args))
+        parts = [(lambda env, v=value: v) if const else value for const, value in args]
+        return False, lambda env: func(*(part(env) for part in parts))
+    if kind == "list":
+        items = [_compile(item) for item in node[1]]
+        if all(const for const, _ in items):
+            return True, _array([value for _, value in items])
+        parts = [(lambda env, v=value: v) if const else value for const, value in items]
+        return False, lambda env: _array([part(env) for part in parts])
+    raise CalculatorError(f"Bad expression node {kind!r}")
+
+
+@lru_cache(maxsize=4096)
+def compile_expression(expression: str) -> Callable[[Optional[Dict[str, Any]]], Any]:
+    """Parse and compile an expression into a callable taking a variables dict (cached)."""
+    const, value = _compile(parse(expression))
+    if const:
+        return lambda env=None: value
+    return lambda env=None: value(env)
+
+
+def calculate(expression: str, variables: Optional[Dict[str, Any]] = None):
+    """Parse, compile and evaluate an expression."""
+    try:
+        return compile_expression(expression)(variables)
+    except CalculatorError:
+        raise
+    except (ArithmeticError, ValueError, TypeError) as e:
+        raise CalculatorError(str(e)) from e
+
+
+def calculate_over(expression: str, name: str, values) -> np.ndarray:
+    """
+    Evaluate one expression for many inputs in a single vectorized pass,
+    e.g. calculate_over("x**2 + 1", "x", [1, 2, 3]) -> array([2, 5, 10]).
+    """
+    values = np.atleast_1d(np.asarray(values))
+    if values.size > MAX_BATCH_SIZE:
+        raise CalculatorError(f"At most {MAX_BATCH_SIZE} inputs are allowed")
+    result = calculate(expression, {name: values})
+    if np.ndim(result) == 0:
+        # Expression does not depend on the variable
+        result = np.full(values.shape, result)
+    return result
+
+
+def _format_int(value: int) -> str:
+    """Exact digits, or a 16-significant-digit mantissa and exponent for very long integers."""
+    if value.bit_length() * math.log10(2) < MAX_EXACT_DIGITS:
+        return str(value)
+    sign, value = ("-" if value < 0 else ""), abs(value)
+    exponent = int(math.log10(value))
+    mantissa = value // 10 ** (exponent - 15)
+    # log10 of a huge integer can be off by one at a power of ten
+    if mantissa >= 10 ** 16:
+        exponent, mantissa = exponent + 1, mantissa // 10
+    elif mantissa < 10 ** 15:
+        exponent, mantissa = exponent - 1, value // 10 ** (exponent - 16)
+    digits = str(mantissa).rstrip("0") or "0"
+    return f"{sign}{digits[0]}.{digits[1:] or '0'}e+{exponent}"
+
+
+def format_result(value) -> str:
+    """Render scalars, arrays and describe() summaries for the tool output."""
+    if isinstance(value, dict):
+        return ", ".join(f"{key}={format_result(item)}" for key, item in value.items())
+    if isinstance(value, np.ndarray):
+        return str(value.tolist())
+    value = _scalar(value)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return _format_int(value)
+    return str(value)
@@ -0,0 +1,417 @@
+"""
+SQLite-backed checkpointing for the agent graphs.
+Checkpoints are served from memory and written to SQLite in batches by a
+background thread, which also prunes old checkpoints and evicts idle
+threads from memory. A crashed run can be resumed from its last flushed step;
+a run the request budget stopped is finished, not interrupted, so its thread
+is cleared instead. The async helpers do their SQLite work on a worker thread.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import InMemorySaver
+
+from nodes.answer_cache import is_partial
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL,
+    parent_id TEXT, type TEXT, checkpoint BLOB, metadata_type TEXT, metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, channel TEXT NOT NULL,
+    version TEXT NOT NULL, type TEXT, blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT, type TEXT, value BLOB,
+    task_path TEXT,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+_INSERTS = {
+    "checkpoints": "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+    "blobs": "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+    "writes": "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+}
+
+
+class SqliteCheckpointer(InMemorySaver):
+    """
+    Write-behind SQLite checkpointer.
+    Reads and writes go through the in-memory saver; new rows are queued and
+    committed in one transaction per batch. Threads not in memory are loaded
+    from SQLite on first access. A checkpoint may be lost only if the process
+    dies within `flush_interval` of writing it.
+    """
+
+    def __init__(
+        self,
+        path: str = "checkpoints.sqlite3",
+        batch_size: int = 64,
+        flush_interval: float = 0.5,
+        keep_last: int = 20,
+        prune_interval: float = 60.0,
+        idle_eviction: float = 600.0,
+    ):
+        """
+        Args:
+            path: SQLite database file.
+            batch_size: Pending rows that trigger an immediate flush.
+            flush_interval: Max seconds a row waits before being written.
+            keep_last: Checkpoints kept per thread when pruning (0 keeps all).
+            prune_interval: Seconds between background prune passes.
+            idle_eviction: Seconds after which an idle thread is dropped from memory.
+        """
+        super().__init__()
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.keep_last = keep_last
+        self.prune_interval = prune_interval
+        self.idle_eviction = idle_eviction
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+        self._lock = threading.RLock()
+        self._db_lock = threading.Lock()
+        self._pending: List[Tuple[str, tuple]] = []
+        self._loaded: Set[str] = set()
+        self._last_used: Dict[str, float] = {}
+        self._dirty: Set[str] = set()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._background, name="checkpoint-writer", daemon=True)
+        self._worker.start()
+
+    # -- loading ----------------------------------------------------------
+
+    def _hydrate(self, thread_id: str) -> None:
+        """Load a thread's rows from SQLite into memory if they are not there yet."""
+        if thread_id in self._loaded:
+            self._last_used[thread_id] = time.monotonic()
+            return
+        with self._db_lock:
+            checkpoints = self._conn.execute(
+                "SELECT checkpoint_ns, checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata "
+                "FROM checkpoints WHERE thread_id = ?", (thread_id,)
+            ).fetchall()
+            blobs = self._conn.execute(
+                "SELECT checkpoint_ns, channel, version, type, blob FROM blobs WHERE thread_id = ?", (thread_id,)
+            ).fetchall()
+            writes = self._conn.execute(
+                "SELECT checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path "
+                "FROM writes WHERE thread_id = ?", (thread_id,)
+            ).fetchall()
+
+        for ns, checkpoint_id, parent_id, typ, data, meta_type, meta in checkpoints:
+            self.storage[thread_id][ns][checkpoint_id] = ((typ, data), (meta_type, meta), parent_id)
+        for ns, channel, version, typ, data in blobs:
+            self.blobs[(thread_id, ns, channel, version)] = (typ, data)
+        for ns, checkpoint_id, task_id, idx, channel, typ, value, task_path in writes:
+            self.writes[(thread_id, ns, checkpoint_id)][(task_id, idx)] = (task_id, channel, (typ, value), task_path)
+
+        self._loaded.add(thread_id)
+        self._last_used[thread_id] = time.monotonic()
+
+    def _hydrate_all(self) -> None:
+        with self._db_lock:
+            thread_ids = [row[0] for row in self._conn.execute("SELECT DISTINCT thread_id FROM checkpoints")]
+        for thread_id in thread_ids:
+            self._hydrate(thread_id)
+
+    # -- BaseCheckpointSaver ----------------------------------------------
+
+    def get_tuple(self, config: RunnableConfig):
+        with self._lock:
+            self._hydrate(config["configurable"]["thread_id"])
+            return super().get_tuple(config)
+
+    def list(self, config: Optional[RunnableConfig], *, filter=None, before=None, limit=None):
+        with self._lock:
+            if config:
+                self._hydrate(config["configurable"]["thread_id"])
+            else:
+                self._hydrate_all()
+            # Materialize under the lock so background pruning cannot interleave
+            return iter(list(super().list(config, filter=filter, before=before, limit=limit)))
+
+    # The async variants run SQLite reads and deletes on a worker thread; puts only queue rows
+
+    async def aget_tuple(self, config: RunnableConfig):
+        if config["configurable"]["thread_id"] in self._loaded:
+            return self.get_tuple(config)
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter=None, before=None, limit=None):
+        for item in await asyncio.to_thread(self.list, config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def put(self, config: RunnableConfig, checkpoint, metadata, new_versions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            self._hydrate(thread_id)
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+
+            for channel, version in new_versions.items():
+                typ, data = self.blobs[(thread_id, checkpoint_ns, channel, version)]
+                self._pending.append(("blobs", (thread_id, checkpoint_ns, channel, str(version), typ, data)))
+            saved, meta, parent_id = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+            self._pending.append((
+                "checkpoints",
+                (thread_id, checkpoint_ns, checkpoint["id"], parent_id, saved[0], saved[1], meta[0], meta[1]),
+            ))
+            self._dirty.add(thread_id)
+            flush_now = len(self._pending) >= self.batch_size
+        if flush_now:
+            self._wake.set()
+        return next_config
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._lock:
+            self._hydrate(thread_id)
+            super().put_writes(config, writes, task_id, task_path)
+            for (write_task, idx), (_, channel, (typ, value), path) in self.writes[
+                (thread_id, checkpoint_ns, checkpoint_id)
+            ].items():
+                if write_task == task_id:
+                    self._pending.append((
+                        "writes",
+                        (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, typ, value, path),
+                    ))
+            flush_now = len(self._pending) >= self.batch_size
+        if flush_now:
+            self._wake.set()
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.flush()
+        with self._lock:
+            super().delete_thread(thread_id)
+            self._loaded.discard(thread_id)
+            self._last_used.pop(thread_id, None)
+            self._dirty.discard(thread_id)
+            with self._db_lock:
+                for table in ("checkpoints", "blobs", "writes"):
+                    self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+                self._conn.commit()
+
+    # -- background work --------------------------------------------------
+
+    def flush(self) -> int:
+        """Write all pending rows in one transaction. Returns the number of rows written."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        by_table: Dict[str, List[tuple]] = defaultdict(list)
+        for table, row in pending:
+            by_table[table].append(row)
+        with self._db_lock:
+            with self._conn:
+                for table, rows in by_table.items():
+                    self._conn.executemany(_INSERTS[table], rows)
+        return len(pending)
+
+    def prune(self) -> None:
+        """Keep only the newest `keep_last` checkpoints of threads written since the last pass."""
+        if not self.keep_last:
+            return
+        with self._lock:
+            threads, self._dirty = self._dirty, set()
+        self.flush()
+        for thread_id in threads:
+            with self._lock:
+                self._prune_thread(thread_id)
+
+    def _prune_thread(self, thread_id: str) -> None:
+        if thread_id not in self._loaded:
+            return
+        keep_blobs = set()
+        for checkpoint_ns, checkpoints in self.storage[thread_id].items():
+            ordered = sorted(checkpoints, reverse=True)
+            for checkpoint_id in ordered[self.keep_last:]:
+                del checkpoints[checkpoint_id]
+                self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            for saved, _, _ in checkpoints.values():
+                versions = self.serde.loads_typed(saved)["channel_versions"]
+                keep_blobs.update((checkpoint_ns, channel, str(version)) for channel, version in versions.items())
+
+        for key in [k for k in self.blobs if k[0] == thread_id]:
+            if (key[1], key[2], str(key[3])) not in keep_blobs:
+                del self.blobs[key]
+
+        kept = [(ns, cid) for ns, checkpoints in self.storage[thread_id].items() for cid in checkpoints]
+        with self._db_lock:
+            with self._conn:
+                self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_ids (ns TEXT, id TEXT)")
+                self._conn.execute("DELETE FROM keep_ids")
+                self._conn.executemany("INSERT INTO keep_ids VALUES (?, ?)", kept)
+                for table in ("checkpoints", "writes"):
+                    self._conn.execute(
+                        f"DELETE FROM {table} WHERE thread_id = ? AND NOT EXISTS "
+                        f"(SELECT 1 FROM keep_ids k WHERE k.ns = {table}.checkpoint_ns AND k.id = {table}.checkpoint_id)",
+                        (thread_id,),
+                    )
+                self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_blobs (ns TEXT, channel TEXT, version TEXT)")
+                self._conn.execute("DELETE FROM keep_blobs")
+                self._conn.executemany("INSERT INTO keep_blobs VALUES (?, ?, ?)", list(keep_blobs))
+                self._conn.execute(
+                    "DELETE FROM blobs WHERE thread_id = ? AND NOT EXISTS (SELECT 1 FROM keep_blobs k "
+                    "WHERE k.ns = blobs.checkpoint_ns AND k.channel = blobs.channel AND k.version = blobs.version)",
+                    (thread_id,),
+                )
+
+    def _evict_idle(self) -> None:
+        """Drop threads that have been idle for a while from memory (they stay in SQLite)."""
+        cutoff = time.monotonic() - self.idle_eviction
+        with self._lock:
+            if self._pending:
+                return
+            for thread_id in [t for t, used in self._last_used.items() if used < cutoff and t not in self._dirty]:
+                self.storage.pop(thread_id, None)
+                for key in [k for k in self.writes if k[0] == thread_id]:
+                    del self.writes[key]
+                for key in [k for k in self.blobs if k[0] == thread_id]:
+                    del self.blobs[key]
+                self._loaded.discard(thread_id)
+                del self._last_used[thread_id]
+
+    def _background(self) -> None:
+        last_prune = time.monotonic()
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if time.monotonic() - last_prune >= self.prune_interval:
+                    self.prune()
+                    self._evict_idle()
+                    last_prune = time.monotonic()
+            except sqlite3.Error:
+                # Rows stay in memory; the next pass retries with new rows only
+                pass
+
+    def close(self) -> None:
+        """Flush outstanding rows and stop the background thread."""
+        self._stop.set()
+        self._wake.set()
+        self._worker.join(timeout=5)
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+
+_default_checkpointer: Optional[SqliteCheckpointer] = None
+
+
+def get_checkpointer() -> Optional[SqliteCheckpointer]:
+    """Shared checkpointer when CHECKPOINT_DB is set, otherwise None (no persistence)."""
+    global _default_checkpointer
+    path = os.getenv("CHECKPOINT_DB")
+    if not path:
+        return None
+    if _default_checkpointer is None:
+        _default_checkpointer = SqliteCheckpointer(
+            path,
+            keep_last=int(os.getenv("CHECKPOINT_KEEP_LAST", "20")),
+        )
+    return _default_checkpointer
+
+
+def question_thread_id(question: str, prefix: str = "cli") -> str:
+    """Stable thread id for a question, so re-asking after a crash finds the interrupted run."""
+    digest = hashlib.sha1(" ".join(question.lower().split()).encode()).hexdigest()[:16]
+    return f"{prefix}-{digest}"
+
+
+def _resume_plan(app, thread_id: str, checkpointer) -> Tuple[Dict[str, Any], bool]:
+    config = {"configurable": {"thread_id": thread_id}}
+    snapshot = app.get_state(config)
+    if snapshot.values and snapshot.next:
+        return config, True
+    if snapshot.values:
+        # Finished earlier - start a fresh run instead of appending to it
+        checkpointer.delete_thread(thread_id)
+    return config, False
+
+
+def resumable_call(app, inputs: Dict[str, Any], thread_id: str, checkpointer) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    (inputs, config) to pass to invoke/stream for a thread. Inputs is None
+    when an interrupted run should be resumed from its last checkpoint (a
+    CLI can tell the user so); config is None without a checkpointer.
+    """
+    if checkpointer is None:
+        return inputs, None
+    config, resume = _resume_plan(app, thread_id, checkpointer)
+    if resume:
+        logger.info("Resuming interrupted run of thread %s from its last checkpoint", thread_id)
+        return None, config
+    return inputs, config
+
+
+async def aresumable_call(app, inputs: Dict[str, Any], thread_id: str, checkpointer) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """resumable_call for the event loop: reading the state may load the thread from SQLite."""
+    if checkpointer is None:
+        return inputs, None
+    return await asyncio.to_thread(resumable_call, app, inputs, thread_id, checkpointer)
+
+
+def finish_thread(result: Optional[Dict[str, Any]], thread_id: str, checkpointer) -> None:
+    """
+    Clear the thread of a run the budget stopped. Its last checkpoint still
+    has steps to run, so asking the same question again would otherwise
+    resume the stopped run instead of starting fresh.
+    """
+    if checkpointer is not None and result is not None and is_partial(result):
+        checkpointer.delete_thread(thread_id)
+
+
+async def afinish_thread(result: Optional[Dict[str, Any]], thread_id: str, checkpointer) -> None:
+    """Async variant of finish_thread."""
+    if checkpointer is not None and result is not None and is_partial(result):
+        await checkpointer.adelete_thread(thread_id)
+
+
+def invoke_resumable(app, inputs: Dict[str, Any], thread_id: str, checkpointer) -> Dict[str, Any]:
+    """
+    Run the graph on a thread, resuming from the last completed step if a
+    previous run was cut off. Without a checkpointer this is a plain invoke.
+    """
+    inputs, config = resumable_call(app, inputs, thread_id, checkpointer)
+    result = app.invoke(inputs, config)
+    finish_thread(result, thread_id, checkpointer)
+    return result
+
+
+async def ainvoke_resumable(app, inputs: Dict[str, Any], thread_id: str, checkpointer) -> Dict[str, Any]:
+    """Async variant of invoke_resumable."""
+    inputs, config = await aresumable_call(app, inputs, thread_id, checkpointer)
+    result = await app.ainvoke(inputs, config)
+    await afinish_thread(result, thread_id, checkpointer)
+    return result
@@ -0,0 +1,353 @@
+"""
+Latency and usage instrumentation for tools, graph nodes and LLM calls.
+Records wall time, token usage, cache hits and errors into histograms and
+counters, exports them as Prometheus text, and optionally writes one JSON
+line per span to a trace file.
+
+Disabled by default. When disabled, wrap_tool / wrap_node / instrument_graph
+hand back the original objects, so there is no per-call overhead at all.
+Enable with METRICS_ENABLED=1 or by setting TRACE_PATH.
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tools import BaseTool
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> Labels:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """Fixed-bucket histogram with Prometheus semantics (cumulative buckets, sum, count)."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (0 < q <= 1)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            running += n
+            if running >= target:
+                return bound
+        return float("inf")
+
+
+class TraceWriter:
+    """Buffered JSON-lines span writer; flushes every `buffer_size` spans and at exit."""
+
+    def __init__(self, path: str, buffer_size: int = 256):
+        self.path = path
+        self.buffer_size = buffer_size
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def write(self, span: Dict[str, Any]) -> None:
+        line = json.dumps(span, default=str)
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) < self.buffer_size:
+                return
+            lines, self._buffer = self._buffer, []
+        self._append(lines)
+
+    def flush(self) -> None:
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        if lines:
+            self._append(lines)
+
+    def _append(self, lines: List[str]) -> None:
+        with open(self.path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+class Instrumentation:
+    """Metric registry plus the wrappers that feed it."""
+
+    def __init__(self, enabled: bool = False, trace_path: Optional[str] = None,
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.enabled = enabled or bool(trace_path)
+        self.buckets = buckets
+        self.tracer = TraceWriter(trace_path) if trace_path else None
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    # Recording
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1.0, labels: Optional[Dict[str, str]] = None) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def register_collector(self, name: str, collector: Callable[[], Dict[str, float]]) -> None:
+        """Add (or replace) a callable whose {metric_name: value} snapshot is included in every export."""
+        self._collectors[name] = collector
+
+    def record_span(self, kind: str, name: str, started: float, error: Optional[str] = None, **fields: Any) -> None:
+        duration = time.perf_counter() - started
+        labels = {kind: name}
+        self.observe(f"agent_{kind}_seconds", duration, labels)
+        self.inc(f"agent_{kind}_calls_total", labels=labels)
+        if error:
+            self.inc(f"agent_{kind}_errors_total", labels=labels)
+        if self.tracer:
+            self.tracer.write({"ts": time.time(), "type": kind, "name": name,
+                               "duration_ms": round(duration * 1000, 3), "error": error, **fields})
+
+    # Wrappers
+
+    def wrap_tool(self, tool: BaseTool) -> BaseTool:
+        """Time every call of a func/coroutine tool; returns the tool itself when disabled."""
+        if not self.enabled:
+            return tool
+        update: Dict[str, Any] = {}
+        if getattr(tool, "func", None):
+            update["func"] = self._timed_sync("tool", tool.name, tool.func)
+        if getattr(tool, "coroutine", None):
+            update["coroutine"] = self._timed_async("tool", tool.name, tool.coroutine)
+        return tool.model_copy(update=update)
+
+    def wrap_tools(self, tools: List[BaseTool]) -> List[BaseTool]:
+        return [self.wrap_tool(tool) for tool in tools] if self.enabled else tools
+
+    def wrap_node(self, name: str, node: Callable) -> Callable:
+        """Time a graph node function; returns it unchanged when disabled."""
+        if not self.enabled:
+            return node
+        return self._timed_sync("node", name, node)
+
+    def instrument_graph(self, graph, track_nodes: bool = True):
+        """
+        Attach a callback handler to a compiled graph for LLM latency and token
+        usage (and node timings when track_nodes). Returns the graph unchanged
+        when disabled.
+        """
+        if not self.enabled:
+            return graph
+        return graph.with_config(callbacks=[MetricsCallbackHandler(self, track_nodes=track_nodes)])
+
+    def _timed_sync(self, kind: str, name: str, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self.record_span(kind, name, started, error=str(e))
+                raise
+            self.record_span(kind, name, started, error=_error_text(result))
+            return result
+        return timed
+
+    def _timed_async(self, kind: str, name: str, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                self.record_span(kind, name, started, error=str(e))
+                raise
+            self.record_span(kind, name, started, error=_error_text(result))
+            return result
+        return timed
+
+    # Export
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain-dict view: histogram count/sum/p50/p95 per series, counters and collector values."""
+        with self._lock:
+            histograms = {
+                f"{name}{_format_labels(labels)}": {
+                    "count": h.count, "sum": round(h.sum, 6),
+                    "p50": h.quantile(0.5), "p95": h.quantile(0.95),
+                }
+                for (name, labels), h in self._histograms.items()
+            }
+            counters = {f"{name}{_format_labels(labels)}": v for (name, labels), v in self._counters.items()}
+        for collector in list(self._collectors.values()):
+            counters.update(collector())
+        return {"histograms": histograms, "counters": counters}
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        typed = set()
+        for (name, labels), h in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            running = 0
+            for bound, n in zip(h.buckets, h.counts):
+                running += n
+                le = f'le="{bound}"'
+                lines.append(f"{name}_bucket{_format_labels(labels, le)} {running}")
+            le = 'le="+Inf"'
+            lines.append(f"{name}_bucket{_format_labels(labels, le)} {h.count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {h.sum}")
+            lines.append(f"{name}_count{_format_labels(labels)} {h.count}")
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for collector in list(self._collectors.values()):
+            for name, value in sorted(collector().items()):
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def print_summary(self) -> None:
+        """Per-series call counts and approximate p50/p95 latency, for the CLIs."""
+        histograms = self.snapshot()["histograms"]
+        if not histograms:
+            return
+        print("\n📊 Latency summary (bucket upper bounds):")
+        for series, h in sorted(histograms.items()):
+            print(f"   {series:<45} n={h['count']:<5} p50≤{h['p50']}s p95≤{h['p95']}s")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+# How the tools in nodes/tools.py start a failure message - they report errors as text rather than raising
+TOOL_ERROR_PREFIXES = (
+    "Web search encountered an error",
+    "Calculation error",
+    "Local search encountered an error",
+    "Page fetch encountered an error",
+)
+
+
+def _error_text(result: Any) -> Optional[str]:
+    """The tool's failure message, or None for a normal result (even one that mentions "error")."""
+    if isinstance(result, str) and result.startswith(TOOL_ERROR_PREFIXES):
+        return result[:200]
+    return None
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Feeds LLM latency/token usage and graph node timings into an Instrumentation."""
+
+    def __init__(self, instrumentation: Instrumentation, track_nodes: bool = True):
+        self.instrumentation = instrumentation
+        self.track_nodes = track_nodes
+        self._started: Dict[UUID, Tuple[float, str]] = {}
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # Only the node runnable itself, not the runnables nested inside it
+        if self.track_nodes and node and kwargs.get("name") == node:
+            self._started[run_id] = (time.perf_counter(), node)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started:
+            self.instrumentation.record_span("node", started[1], started[0])
+
+    def on_chain_error(self, error, *, run_id: UUID, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started:
+            self.instrumentation.record_span("node", started[1], started[0], error=str(error))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        name = (serialized or {}).get("name") or "chat_model"
+        self._started[run_id] = (time.perf_counter(), name)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        name = (serialized or {}).get("name") or "llm"
+        self._started[run_id] = (time.perf_counter(), name)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        started = self._started.pop(run_id, None)
+        if not started:
+            return
+        usage = token_usage(response)
+        self.instrumentation.record_span("llm", started[1], started[0], **usage)
+        for direction, tokens in usage.items():
+            self.instrumentation.inc("agent_llm_tokens_total", tokens,
+                                     {"llm": started[1], "direction": direction})
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started:
+            self.instrumentation.record_span("llm", started[1], started[0], error=str(error))
+
+
+def token_usage(response) -> Dict[str, int]:
+    """Input/output token counts from an LLMResult, if the provider reported them."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return {"input": usage.get("input_tokens", 0), "output": usage.get("output_tokens", 0)}
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return {"input": usage.get("prompt_tokens", 0), "output": usage.get("completion_tokens", 0)}
+    return {}
+
+
+_default = Instrumentation(
+    enabled=os.getenv("METRICS_ENABLED", "").lower() in ("1", "true", "yes"),
+    trace_path=os.getenv("TRACE_PATH") or None,
+)
+
+
+def get_instrumentation() -> Instrumentation:
+    """Process-wide instrumentation configured from METRICS_ENABLED / TRACE_PATH."""
+    return _default
+
+
+def configure_instrumentation(instrumentation: Instrumentation) -> None:
+    """Replace the process-wide instrumentation (before agents are built)."""
+    global _default
+    _default = instrumentation
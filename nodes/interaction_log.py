@@ -0,0 +1,362 @@
+"""
+Append-only log of answered turns and user feedback.
+Callers only put a record on a bounded in-memory queue, which never blocks and
+drops (and counts) records when full. A background thread writes batches to
+SQLite segment files, one transaction per batch, with the question/answer
+payload zlib-compressed and the columns needed for queries (time, kind,
+rating, tools) stored plain and indexed. A segment is closed once it passes
+`segment_bytes` and the oldest are deleted past `max_segments`. Queries scan
+only the segments whose time range overlaps the one asked for.
+"""
+
+import atexit
+import contextlib
+import glob
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY, ts REAL NOT NULL, kind TEXT NOT NULL,
+    session_id TEXT, turn_id TEXT, rating INTEGER, data BLOB
+);
+CREATE TABLE IF NOT EXISTS record_tools (record_id INTEGER NOT NULL, tool TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS records_ts ON records (ts);
+CREATE INDEX IF NOT EXISTS records_rating ON records (rating, ts);
+CREATE INDEX IF NOT EXISTS records_turn ON records (turn_id);
+CREATE INDEX IF NOT EXISTS record_tools_tool ON record_tools (tool, record_id);
+"""
+
+_SEGMENT_PATTERN = re.compile(r"interactions-(\d+)\.sqlite3$")
+
+_POSITIVE = {"+", "+1", "y", "yes", "good", "great", "helpful", "thanks", "correct", "👍"}
+_NEGATIVE = {"-", "-1", "n", "no", "bad", "wrong", "unhelpful", "incorrect", "👎"}
+
+_STOP = object()
+
+
+def parse_rating(feedback: str) -> Optional[int]:
+    """1 for positive feedback ("yes", "+", "good ..."), -1 for negative, None for a bare comment."""
+    words = feedback.strip().lower().split()
+    if not words:
+        return None
+    first = words[0].strip(".,!:;")
+    if first in _POSITIVE:
+        return 1
+    if first in _NEGATIVE:
+        return -1
+    return None
+
+
+class InteractionLog:
+    """
+    Write-behind interaction log over rotating SQLite segments.
+    record_turn() / record_feedback() return at once; a record reaches disk
+    within `flush_interval` (or when a batch fills). Records still queued are
+    lost only if the process dies without close() - get_interaction_log()
+    registers it at exit.
+    """
+
+    def __init__(
+        self,
+        directory: str = "logs/interactions",
+        queue_size: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        segment_bytes: int = 16 * 1024 * 1024,
+        max_segments: int = 64,
+    ):
+        """
+        Args:
+            directory: Folder holding the interactions-NNNNNN.sqlite3 segments.
+            queue_size: Records held in memory before new ones are dropped.
+            batch_size: Records written per transaction at most.
+            flush_interval: Max seconds a record waits in the queue once the writer has picked it up.
+            segment_bytes: Size past which the current segment is closed and a new one started.
+            max_segments: Segments kept on disk; the oldest are deleted (0 keeps all).
+        """
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.written = self.dropped = self.errors = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        # [path, first_ts, last_ts] per segment, oldest first; the last one is being written
+        self._segments: List[List[Any]] = [self._bounds(path) for path in self._segment_paths()]
+        self._conn: Optional[sqlite3.Connection] = None
+        self._open_segment(resume=True)
+        self._closed = False
+        self._worker = threading.Thread(target=self._background, name="interaction-log-writer", daemon=True)
+        self._worker.start()
+
+    # -- recording (any thread, never blocks) ------------------------------
+
+    def record(self, kind: str, data: Dict[str, Any], session_id: Optional[str] = None,
+               turn_id: Optional[str] = None, rating: Optional[int] = None, tools: Iterable[str] = ()) -> bool:
+        """Queue one record. Returns False (and counts it) if the queue is full or the log is closed."""
+        if self._closed:
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait((time.time(), kind, session_id, turn_id, rating, tuple(dict.fromkeys(tools)), data))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def record_turn(self, turn: Dict[str, Any], session_id: Optional[str] = None, **extra: Any) -> bool:
+        """
+        Log an answered turn (a ConversationMemory.add_turn record). Gives the
+        turn a `turn_id` if it has none, so feedback can point back at it.
+        """
+        turn_id = turn.setdefault("turn_id", uuid.uuid4().hex[:12])
+        data = {k: v for k, v in turn.items() if k not in ("turn_id", "feedback")}
+        return self.record("turn", {**data, **extra}, session_id=session_id, turn_id=turn_id,
+                           tools=turn.get("tools_used") or ())
+
+    def record_feedback(self, turn: Dict[str, Any], feedback: str, session_id: Optional[str] = None) -> bool:
+        """Log feedback on a turn, with the turn's question and tools so it can be queried on its own."""
+        return self.record("feedback", {"feedback": feedback, "question": turn.get("question", "")},
+                           session_id=session_id, turn_id=turn.get("turn_id"), rating=parse_rating(feedback),
+                           tools=turn.get("tools_used") or ())
+
+    # -- querying ----------------------------------------------------------
+
+    def query(self, kind: Optional[str] = None, tool: Optional[str] = None, rating: Optional[int] = None,
+              since: Optional[float] = None, until: Optional[float] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Flushed records matching every given filter, newest first.
+
+        Args:
+            kind: "turn" or "feedback".
+            tool: Only records whose turn used this tool.
+            rating: 1 or -1 (feedback records).
+            since: Earliest time.time() to include.
+            until: Latest time.time() to include.
+            limit: Records returned at most (0: no limit).
+        """
+        sql = "SELECT r.id, r.ts, r.kind, r.session_id, r.turn_id, r.rating, r.data FROM records r"
+        where, params = self._filters(kind, rating, since, until)
+        if tool is not None:
+            sql += " JOIN record_tools t ON t.record_id = r.id"
+            where.insert(0, "t.tool = ?")
+            params.insert(0, tool)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY r.ts DESC, r.id DESC"
+        results: List[Dict[str, Any]] = []
+        for path in self._overlapping(since, until, newest_first=True):
+            remaining = limit - len(results) if limit else -1
+            with self._reader(path) as conn:
+                rows = conn.execute(sql + " LIMIT ?", (*params, remaining)).fetchall()
+                tools = self._tools_of(conn, [row[0] for row in rows])
+            results.extend(self._decode(row, tools.get(row[0], [])) for row in rows)
+            if limit and len(results) >= limit:
+                break
+        return results
+
+    def rating_summary(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, Dict[str, int]]:
+        """Feedback counts per tool: {"web_search": {"feedback": 12, "positive": 9, "negative": 2}, ...}."""
+        where, params = self._filters("feedback", None, since, until)
+        sql = ("SELECT t.tool, COUNT(*), SUM(r.rating = 1), SUM(r.rating = -1) FROM records r "
+               "JOIN record_tools t ON t.record_id = r.id WHERE " + " AND ".join(where) + " GROUP BY t.tool")
+        summary: Dict[str, Dict[str, int]] = {}
+        for path in self._overlapping(since, until):
+            with self._reader(path) as conn:
+                for tool, count, positive, negative in conn.execute(sql, params):
+                    entry = summary.setdefault(tool, {"feedback": 0, "positive": 0, "negative": 0})
+                    entry["feedback"] += count
+                    entry["positive"] += positive or 0
+                    entry["negative"] += negative or 0
+        return summary
+
+    @staticmethod
+    def _filters(kind, rating, since, until) -> Tuple[List[str], List[Any]]:
+        where, params = [], []
+        for clause, value in (("r.kind = ?", kind), ("r.rating = ?", rating), ("r.ts >= ?", since), ("r.ts <= ?", until)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        return where, params
+
+    def _overlapping(self, since: Optional[float], until: Optional[float], newest_first: bool = False) -> List[str]:
+        with self._lock:
+            segments = [list(segment) for segment in self._segments]
+        paths = [path for path, first, last in segments
+                 if first is not None and (since is None or last >= since) and (until is None or first <= until)]
+        return paths[::-1] if newest_first else paths
+
+    @staticmethod
+    def _reader(path: str) -> "contextlib.closing[sqlite3.Connection]":
+        return contextlib.closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True))
+
+    @staticmethod
+    def _tools_of(conn: sqlite3.Connection, ids: List[int]) -> Dict[int, List[str]]:
+        tools: Dict[int, List[str]] = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = conn.execute(f"SELECT record_id, tool FROM record_tools WHERE record_id IN "
+                                f"({','.join('?' * len(chunk))})", chunk)
+            for record_id, tool in rows:
+                tools.setdefault(record_id, []).append(tool)
+        return tools
+
+    @staticmethod
+    def _decode(row: tuple, tools: List[str]) -> Dict[str, Any]:
+        _, ts, kind, session_id, turn_id, rating, data = row
+        return {**json.loads(zlib.decompress(data)), "ts": ts, "kind": kind, "session_id": session_id,
+                "turn_id": turn_id, "rating": rating, "tools": tools}
+
+    # -- segments ------------------------------------------------------------
+
+    def _segment_paths(self) -> List[str]:
+        paths = glob.glob(os.path.join(self.directory, "interactions-*.sqlite3"))
+        return sorted(p for p in paths if _SEGMENT_PATTERN.search(p))
+
+    @staticmethod
+    def _bounds(path: str) -> List[Any]:
+        conn = sqlite3.connect(path)
+        try:
+            first, last = conn.execute("SELECT MIN(ts), MAX(ts) FROM records").fetchone()
+        except sqlite3.Error:
+            first = last = None
+        finally:
+            conn.close()
+        return [path, first, last]
+
+    def _open_segment(self, resume: bool = False) -> None:
+        """Open the newest segment (resume) or start the next one, then apply retention."""
+        if self._conn is not None:
+            self._conn.close()
+        if not (resume and self._segments):
+            number = int(_SEGMENT_PATTERN.search(self._segments[-1][0]).group(1)) + 1 if self._segments else 1
+            path = os.path.join(self.directory, f"interactions-{number:06d}.sqlite3")
+            with self._lock:
+                self._segments.append([path, None, None])
+        self._conn = sqlite3.connect(self._segments[-1][0], check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        while self.max_segments and len(self._segments) > self.max_segments:
+            with self._lock:
+                path = self._segments.pop(0)[0]
+            for stale in (path, path + "-wal", path + "-shm"):
+                if os.path.exists(stale):
+                    os.remove(stale)
+
+    def _segment_size(self) -> int:
+        page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        return page_count * self._conn.execute("PRAGMA page_size").fetchone()[0]
+
+    # -- background writer -------------------------------------------------
+
+    def _write(self, batch: List[tuple]) -> None:
+        conn = self._conn
+        with conn:
+            for ts, kind, session_id, turn_id, rating, tools, data in batch:
+                blob = zlib.compress(json.dumps(data, default=str, ensure_ascii=False).encode())
+                record_id = conn.execute(
+                    "INSERT INTO records (ts, kind, session_id, turn_id, rating, data) VALUES (?, ?, ?, ?, ?, ?)",
+                    (ts, kind, session_id, turn_id, rating, blob),
+                ).lastrowid
+                conn.executemany("INSERT INTO record_tools VALUES (?, ?)", [(record_id, tool) for tool in tools])
+        with self._lock:
+            segment = self._segments[-1]
+            segment[1] = batch[0][0] if segment[1] is None else segment[1]
+            segment[2] = batch[-1][0]
+        self.written += len(batch)
+        if self._segment_size() >= self.segment_bytes:
+            self._open_segment()
+
+    def _background(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval
+            # Gather a batch: until it is full, the interval ends, or a flush/stop asks for it now
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stopping or waiters or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._write(batch)
+                except sqlite3.Error:
+                    # The batch is lost; later batches still go through
+                    self.errors += len(batch)
+            for waiter in waiters:
+                waiter.set()
+        self._conn.close()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far is on disk. Returns False on timeout."""
+        if self._closed:
+            return not self._worker.is_alive()
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            segments = len(self._segments)
+        return {"queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped,
+                "errors": self.errors, "segments": segments}
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write what is queued and stop the background thread."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._worker.join(timeout=timeout)
+
+
+_default_log: Optional[InteractionLog] = None
+_default_lock = threading.Lock()
+
+
+def get_interaction_log() -> Optional[InteractionLog]:
+    """Shared log in INTERACTION_LOG_DIR (default logs/interactions); None when set to an empty string."""
+    global _default_log
+    directory = os.getenv("INTERACTION_LOG_DIR", "logs/interactions")
+    if not directory:
+        return None
+    with _default_lock:
+        if _default_log is None:
+            _default_log = InteractionLog(
+                directory,
+                queue_size=int(os.getenv("INTERACTION_LOG_QUEUE", "10000")),
+                segment_bytes=int(float(os.getenv("INTERACTION_LOG_SEGMENT_MB", "16")) * 1024 * 1024),
+                max_segments=int(os.getenv("INTERACTION_LOG_MAX_SEGMENTS", "64")),
+            )
+            atexit.register(_default_log.close)
+    return _default_log
@@ -0,0 +1,423 @@
+"""
+On-disk BM25 full-text index over a local document corpus.
+The index is a directory of immutable segments plus a small manifest.
+Each segment stores its postings as flat NumPy arrays (term hashes, offsets,
+doc ids, term frequencies) that are memory-mapped on open, so a cold start
+only reads the manifest and the pages a query touches. New documents are
+added incrementally as new segments; changed or removed sources are
+tombstoned, and merge() compacts everything back into one segment.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import shutil
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_HEADING_RE = re.compile(r"^\s*#+\s*(.+)$", re.MULTILINE)
+_STOPWORDS = frozenset(
+    "a an the is are was were be been of in on at to for and or what which who how do does did "
+    "with by from as it its this that these those can will would should".split()
+)
+MANIFEST = "manifest.json"
+# source -> {"mtime", "docs": [[segment, local_id], ...]}; only indexing needs it, so it
+# lives in its own file and is not parsed when an index is opened for search
+SOURCES = "sources.json"
+_NONE = np.zeros(0, dtype=np.int64)
+
+
+def tokenize(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+
+
+@lru_cache(maxsize=1 << 18)
+def term_hash(term: str) -> int:
+    # 64-bit and process-stable, so segments written by one process are readable by another
+    return int.from_bytes(hashlib.blake2b(term.encode(), digest_size=8).digest(), "little") >> 1
+
+
+def split_passages(text: str, words: int = 150, overlap: int = 30) -> List[str]:
+    """Overlapping windows of about `words` words; answers are found per passage, not per file."""
+    tokens = text.split()
+    if len(tokens) <= words:
+        return [" ".join(tokens)] if tokens else []
+    step = max(1, words - overlap)
+    return [" ".join(tokens[i:i + words]) for i in range(0, len(tokens) - overlap, step)]
+
+
+class Segment:
+    """One immutable, memory-mapped slice of the index."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        self.term_hashes = load("term_hashes")
+        self.offsets = load("offsets")
+        self.doc_ids = load("doc_ids")
+        self.tfs = load("tfs")
+        self.doc_lengths = load("doc_lengths")
+        self.doc_offsets = load("doc_offsets")
+        self._file = open(os.path.join(path, "docs.jsonl"), "rb")
+        # mmap refuses empty files (a merge that left no live documents)
+        empty = os.fstat(self._file.fileno()).st_size == 0
+        self._docs = b"" if empty else mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        # Searches holding this segment; a merged-away segment is closed when the last one releases it
+        self.refs = 0
+        self.retired = False
+
+    @property
+    def size(self) -> int:
+        return len(self.doc_lengths)
+
+    def postings(self, hashed: int) -> Tuple[np.ndarray, np.ndarray]:
+        i = int(np.searchsorted(self.term_hashes, hashed))
+        if i < len(self.term_hashes) and self.term_hashes[i] == hashed:
+            start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+            return self.doc_ids[start:end], self.tfs[start:end]
+        return self.doc_ids[:0], self.tfs[:0]
+
+    def document(self, local_id: int) -> Dict[str, Any]:
+        start, end = int(self.doc_offsets[local_id]), int(self.doc_offsets[local_id + 1])
+        return json.loads(self._docs[start:end])
+
+    def close(self) -> None:
+        if isinstance(self._docs, mmap.mmap):
+            self._docs.close()
+        self._file.close()
+
+    def remove(self) -> None:
+        """Close the segment and delete its directory."""
+        self.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    @staticmethod
+    def write(path: str, docs: List[Dict[str, Any]]) -> None:
+        """Write documents ({"text", ...metadata}) as a new segment directory."""
+        term_hashes: List[int] = []
+        doc_ids: List[int] = []
+        tfs: List[int] = []
+        lengths = np.zeros(len(docs), dtype=np.uint32)
+        doc_offsets = np.zeros(len(docs) + 1, dtype=np.uint64)
+        tmp = path + ".tmp"
+        os.makedirs(tmp, exist_ok=True)
+        with open(os.path.join(tmp, "docs.jsonl"), "wb") as f:
+            for local_id, doc in enumerate(docs):
+                terms = Counter(tokenize(f"{doc.get('title', '')} {doc['text']}"))
+                lengths[local_id] = sum(terms.values())
+                term_hashes.extend(map(term_hash, terms))
+                tfs.extend(terms.values())
+                doc_ids.extend([local_id] * len(terms))
+                f.write(json.dumps(doc).encode() + b"\n")
+                doc_offsets[local_id + 1] = f.tell()
+
+        # Sort postings by (term, doc) so each term's list is one contiguous, doc-ordered slice
+        hashes = np.array(term_hashes, dtype=np.uint64)
+        ids = np.array(doc_ids, dtype=np.uint32)
+        order = np.lexsort((ids, hashes))
+        hashes = hashes[order]
+        unique, starts = np.unique(hashes, return_index=True)
+        arrays = {
+            "term_hashes": unique,
+            "offsets": np.append(starts, len(hashes)).astype(np.uint64),
+            "doc_ids": ids[order],
+            "tfs": np.minimum(np.array(tfs, dtype=np.uint32)[order], 65535).astype(np.uint16),
+            "doc_lengths": lengths,
+            "doc_offsets": doc_offsets,
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), array)
+        os.replace(tmp, path)
+
+
+class LocalIndex:
+    """Segmented BM25 index rooted at a directory; safe to search while another thread commits."""
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        """
+        Args:
+            path: Index directory (created on first commit).
+            k1: BM25 term-frequency saturation.
+            b: BM25 document-length normalization.
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        # Guards the segment reference counts; held only briefly, never while writing
+        self._refs_lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+        self._manifest = self._read_manifest()
+        self._sources_map: Optional[Dict[str, Dict[str, Any]]] = None
+        self._segments: List[Segment] = [Segment(os.path.join(path, s)) for s in self._manifest["segments"]]
+        self._refresh_stats()
+
+    # Manifest
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.path, MANIFEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"segments": [], "next_segment": 1, "deleted": {}}
+
+    @property
+    def _sources(self) -> Dict[str, Dict[str, Any]]:
+        if self._sources_map is None:
+            try:
+                with open(os.path.join(self.path, SOURCES)) as f:
+                    self._sources_map = json.load(f)
+            except FileNotFoundError:
+                self._sources_map = {}
+        return self._sources_map
+
+    def _write_json(self, name: str, data: Any) -> None:
+        tmp = os.path.join(self.path, name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, os.path.join(self.path, name))
+
+    def _write_manifest(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        # Sources first: a crash in between leaves extra mappings, never missing ones
+        if self._sources_map is not None:
+            self._write_json(SOURCES, self._sources_map)
+        self._write_json(MANIFEST, self._manifest)
+
+    def _refresh_stats(self) -> None:
+        deleted = self._manifest["deleted"]
+        self._deleted = {s.name: np.array(deleted.get(s.name, []), dtype=np.int64) for s in self._segments}
+        live_lengths = 0
+        live_docs = 0
+        for segment in self._segments:
+            lengths = np.asarray(segment.doc_lengths, dtype=np.float64)
+            dead = self._deleted[segment.name]
+            live_lengths += lengths.sum() - lengths[dead].sum()
+            live_docs += segment.size - len(dead)
+        self._doc_count = live_docs
+        self._avg_length = live_lengths / live_docs if live_docs else 1.0
+
+    # Indexing
+
+    def add_documents(self, docs: Iterable[Dict[str, Any]]) -> int:
+        """
+        Queue documents for the next commit(). Each needs "text"; "title",
+        "source" and any other keys are stored and returned with hits.
+        Documents with a "source" replace earlier ones from the same source.
+        """
+        added = 0
+        with self._lock:
+            for doc in docs:
+                if doc.get("text"):
+                    self._pending.append(doc)
+                    added += 1
+        return added
+
+    def delete_source(self, source: str) -> int:
+        """Tombstone every document indexed from `source`; returns how many."""
+        with self._lock:
+            removed = self._tombstone(source)
+            self._write_manifest()
+            self._refresh_stats()
+        return removed
+
+    def _tombstone(self, source: str) -> int:
+        entry = self._sources.pop(source, None)
+        if not entry:
+            return 0
+        for segment_name, local_id in entry["docs"]:
+            self._manifest["deleted"].setdefault(segment_name, []).append(local_id)
+        return len(entry["docs"])
+
+    def commit(self) -> Optional[str]:
+        """Write queued documents as a new segment; returns its name (None if nothing was queued)."""
+        with self._lock:
+            docs, self._pending = self._pending, []
+            if not docs:
+                return None
+            name = f"seg_{self._manifest['next_segment']:06d}"
+            Segment.write(os.path.join(self.path, name), docs)
+
+            # Documents from a source that was indexed before replace the old ones
+            for source in {doc["source"] for doc in docs if doc.get("source")}:
+                self._tombstone(source)
+            for local_id, doc in enumerate(docs):
+                if doc.get("source"):
+                    entry = self._sources.setdefault(doc["source"], {"docs": [], "mtime": doc.get("mtime")})
+                    entry["docs"].append([name, local_id])
+            self._manifest["segments"].append(name)
+            self._manifest["next_segment"] += 1
+            self._write_manifest()
+            self._segments = self._segments + [Segment(os.path.join(self.path, name))]
+            self._refresh_stats()
+            return name
+
+    def index_directory(self, directory: str, extensions: Tuple[str, ...] = (".txt", ".md"),
+                        passage_words: int = 150) -> Dict[str, int]:
+        """
+        Incrementally index text files under `directory` (the index's one corpus
+        root): new and modified files (by mtime) are split into passages and
+        committed, files that no longer exist are removed. Returns {"added", "updated", "removed", "unchanged", "passages"}.
+        """
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "passages": 0}
+        seen = set()
+        docs = []
+        empty: Dict[str, float] = {}  # files without a passage, e.g. emptied in place
+        for root, _, files in os.walk(directory):
+            for filename in sorted(files):
+                if not filename.endswith(extensions):
+                    continue
+                source = os.path.relpath(os.path.join(root, filename), directory)
+                seen.add(source)
+                mtime = os.path.getmtime(os.path.join(root, filename))
+                previous = self._sources.get(source)
+                if previous and previous.get("mtime") == mtime:
+                    counts["unchanged"] += 1
+                    continue
+                counts["updated" if previous else "added"] += 1
+                with open(os.path.join(root, filename), encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+                heading = _HEADING_RE.search(text)
+                title = heading.group(1).strip() if heading else os.path.splitext(filename)[0]
+                passages = split_passages(text, passage_words)
+                if not passages:
+                    empty[source] = mtime
+                for i, passage in enumerate(passages):
+                    docs.append({"title": title, "text": passage, "source": source, "passage": i, "mtime": mtime})
+
+        with self._lock:
+            gone = [s for s in self._sources if s not in seen]
+            for source in gone:
+                self._tombstone(source)
+            counts["removed"] = len(gone)
+            # No new passages to replace the old ones, so drop them here and record the mtime
+            for source, mtime in empty.items():
+                self._tombstone(source)
+                self._sources[source] = {"docs": [], "mtime": mtime}
+            if gone or empty:
+                self._write_manifest()
+                self._refresh_stats()
+        counts["passages"] = self.add_documents(docs)
+        self.commit()
+        return counts
+
+    def merge(self) -> None:
+        """Compact all segments into one, dropping tombstoned documents."""
+        with self._lock:
+            if len(self._segments) <= 1 and not any(len(d) for d in self._deleted.values()):
+                return
+            live = []
+            for segment in self._segments:
+                dead = set(self._deleted[segment.name].tolist())
+                live += [segment.document(i) for i in range(segment.size) if i not in dead]
+            name = f"seg_{self._manifest['next_segment']:06d}"
+            Segment.write(os.path.join(self.path, name), live)
+            old = self._segments
+            sources: Dict[str, Dict[str, Any]] = {}
+            for local_id, doc in enumerate(live):
+                if doc.get("source"):
+                    sources.setdefault(doc["source"], {"docs": [], "mtime": doc.get("mtime")})["docs"].append([name, local_id])
+            self._manifest = {"segments": [name], "next_segment": self._manifest["next_segment"] + 1,
+                              "deleted": {}}
+            self._sources_map = sources
+            self._write_manifest()
+            with self._refs_lock:
+                self._segments = [Segment(os.path.join(self.path, name))]
+                for segment in old:
+                    segment.retired = True
+                unused = [segment for segment in old if not segment.refs]
+            self._refresh_stats()
+        # Segments a search still holds are removed when it releases them
+        for segment in unused:
+            segment.remove()
+
+    # Search
+
+    def _acquire(self) -> List[Segment]:
+        with self._refs_lock:
+            segments = self._segments
+            for segment in segments:
+                segment.refs += 1
+        return segments
+
+    def _release(self, segments: List[Segment]) -> None:
+        with self._refs_lock:
+            for segment in segments:
+                segment.refs -= 1
+            unused = [segment for segment in segments if segment.retired and not segment.refs]
+        for segment in unused:
+            segment.remove()
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Top-k documents by BM25, best first, each with a "score"."""
+        segments = self._acquire()
+        try:
+            return self._search(segments, query, k)
+        finally:
+            self._release(segments)
+
+    def _search(self, segments: List[Segment], query: str, k: int) -> List[Dict[str, Any]]:
+        terms = Counter(tokenize(query))
+        deleted = self._deleted
+        if not terms or not segments:
+            return []
+        hashed = {term: term_hash(term) for term in terms}
+        postings = {(s.name, t): s.postings(hashed[t]) for s in segments for t in terms}
+        # Document frequencies include tombstoned documents until the next merge()
+        idf = {}
+        for term in terms:
+            df = sum(len(postings[(s.name, term)][0]) for s in segments)
+            idf[term] = np.log(1 + (self._doc_count - df + 0.5) / (df + 0.5)) if df else 0.0
+
+        candidates: List[Tuple[float, int, Segment]] = []
+        for segment in segments:
+            scores = None
+            for term, qtf in terms.items():
+                doc_ids, tfs = postings[(segment.name, term)]
+                if not len(doc_ids):
+                    continue
+                if scores is None:
+                    scores = np.zeros(segment.size, dtype=np.float32)
+                tf = tfs.astype(np.float32)
+                norm = self.k1 * (1 - self.b + self.b * segment.doc_lengths[doc_ids] / self._avg_length)
+                # doc ids are unique within a posting list, so fancy-index += is safe
+                scores[doc_ids] += qtf * idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            if scores is None:
+                continue
+            scores[deleted.get(segment.name, _NONE)] = 0
+            top = np.argpartition(-scores, k)[:k] if len(scores) > k else np.arange(len(scores))
+            candidates += [(float(scores[i]), int(i), segment) for i in top if scores[i] > 0]
+
+        candidates.sort(key=lambda c: -c[0])
+        return [{**segment.document(local_id), "score": score} for score, local_id, segment in candidates[:k]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"segments": len(self._segments), "documents": self._doc_count,
+                "sources": len(self._sources), "pending": len(self._pending),
+                "avg_length": round(float(self._avg_length), 1)}
+
+    def close(self) -> None:
+        for segment in self._segments:
+            segment.close()
+
+
+_default_index: Optional[LocalIndex] = None
+
+
+def get_local_index() -> Optional[LocalIndex]:
+    """Index at LOCAL_INDEX_PATH if that directory holds one, otherwise None."""
+    global _default_index
+    path = os.getenv("LOCAL_INDEX_PATH")
+    if not path or not os.path.exists(os.path.join(path, MANIFEST)):
+        return None
+    if _default_index is None or _default_index.path != path:
+        _default_index = LocalIndex(path)
+    return _default_index
@@ -0,0 +1,142 @@
+"""
+Token-budgeted conversation memory.
+Recent turns are kept verbatim with per-message token counts; older turns
+are folded into a rolling summary one at a time, so the prompt built for
+each question always fits a fixed token budget.
+"""
+
+import math
+import re
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+# (previous_summary, turn) -> new summary
+Summarizer = Callable[[str, Dict[str, Any]], str]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used when no tokenizer is given."""
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def _first_sentence(text: str, max_chars: int = 160) -> str:
+    sentence = _SENTENCE_END_RE.split(text.strip(), maxsplit=1)[0]
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars].rstrip() + "..."
+
+
+def extractive_summarizer(max_tokens: int = 300, token_counter: Callable[[str], int] = estimate_tokens) -> Summarizer:
+    """
+    Summarizer that appends one line per folded turn and drops the oldest
+    lines once the summary exceeds max_tokens. No LLM call needed.
+    """
+    def summarize(previous: str, turn: Dict[str, Any]) -> str:
+        lines = previous.splitlines() if previous else []
+        lines.append(f"- Q: {_first_sentence(turn['question'], 120)} A: {_first_sentence(turn['answer'])}")
+        while len(lines) > 1 and token_counter("\n".join(lines)) > max_tokens:
+            lines.pop(0)
+        return "\n".join(lines)
+    return summarize
+
+
+def llm_summarizer(llm, max_words: int = 150) -> Summarizer:
+    """Summarizer that asks an LLM to update the running summary with one new turn."""
+    def summarize(previous: str, turn: Dict[str, Any]) -> str:
+        prompt = (
+            f"Update the running summary of a conversation with one new exchange. "
+            f"Keep facts, numbers and user preferences; stay under {max_words} words.\n\n"
+            f"Current summary:\n{previous or '(empty)'}\n\n"
+            f"New exchange:\nUser: {turn['question']}\nAssistant: {turn['answer']}\n\n"
+            f"Updated summary:"
+        )
+        return llm.invoke([HumanMessage(content=prompt)]).content.strip()
+    return summarize
+
+
+class ConversationMemory:
+    """Recent turns verbatim plus a rolling summary, bounded by a token budget."""
+
+    def __init__(
+        self,
+        token_budget: int = 2000,
+        summarizer: Optional[Summarizer] = None,
+        token_counter: Callable[[str], int] = estimate_tokens,
+        max_turns: int = 20,
+    ):
+        """
+        Args:
+            token_budget: Max tokens for summary + recent turns + the new question.
+            summarizer: Folds one turn into the summary (default: extractive, no LLM).
+            token_counter: Counts tokens in a string (e.g. llm.get_num_tokens).
+            max_turns: Hard cap on verbatim turns, regardless of their size.
+        """
+        self.token_budget = token_budget
+        self.token_counter = token_counter
+        self.summarizer = summarizer or extractive_summarizer(
+            max_tokens=max(1, token_budget // 4), token_counter=token_counter
+        )
+        self.max_turns = max_turns
+        self.turns: deque = deque()
+        self.summary = ""
+        self.summary_tokens = 0
+        self.recent_tokens = 0
+        self.total_turns = 0
+
+    def _fold_oldest(self) -> None:
+        """Move the oldest verbatim turn into the rolling summary."""
+        turn = self.turns.popleft()
+        self.recent_tokens -= turn["question_tokens"] + turn["answer_tokens"]
+        self.summary = self.summarizer(self.summary, turn)
+        self.summary_tokens = self.token_counter(self.summary)
+
+    def _fit(self, reserve: int = 0) -> None:
+        """Fold turns until summary + recent turns + reserve fit the budget."""
+        while self.turns and (
+            len(self.turns) > self.max_turns
+            or self.summary_tokens + self.recent_tokens + reserve > self.token_budget
+        ):
+            self._fold_oldest()
+
+    def add_turn(self, question: str, answer: str, **metadata: Any) -> Dict[str, Any]:
+        """Record a finished exchange and return its record (metadata can be added later)."""
+        turn = {
+            "question": question,
+            "answer": answer,
+            "question_tokens": self.token_counter(question),
+            "answer_tokens": self.token_counter(answer),
+            **metadata,
+        }
+        self.turns.append(turn)
+        self.recent_tokens += turn["question_tokens"] + turn["answer_tokens"]
+        self.total_turns += 1
+        self._fit()
+        return turn
+
+    @property
+    def last_turn(self) -> Optional[Dict[str, Any]]:
+        return self.turns[-1] if self.turns else None
+
+    def build_messages(self, user_input: str) -> List[BaseMessage]:
+        """Messages for the next question: summary, recent turns, then the question itself."""
+        self._fit(reserve=self.token_counter(user_input))
+
+        messages: List[BaseMessage] = []
+        if self.summary:
+            messages.append(HumanMessage(content=f"Summary of our earlier conversation:\n{self.summary}"))
+        for turn in self.turns:
+            messages.append(HumanMessage(content=turn["question"]))
+            messages.append(AIMessage(content=turn["answer"]))
+        messages.append(HumanMessage(content=user_input))
+        return messages
+
+    def stats(self) -> Dict[str, int]:
+        """Token and turn counts for the current memory contents."""
+        return {
+            "total_turns": self.total_turns,
+            "recent_turns": len(self.turns),
+            "recent_tokens": self.recent_tokens,
+            "summary_tokens": self.summary_tokens,
+        }
@@ -0,0 +1,291 @@
+"""
+Model routing: a small, fast model for tool-selection turns and the large
+model only for the final answer.
+RoutedChatModel is a drop-in chat model for create_react_agent and the
+hybrid graph. With the "cascade" strategy the fast model drafts every turn;
+tool calls are used as-is, a text answer is discarded and the strong model
+writes the final answer. The "phase" strategy skips the draft once the
+question has tool results and sends those turns straight to the strong
+model: no discarded drafts, but any follow-up tool calls are strong-model
+turns too.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from nodes.budget import current_budget
+from nodes.instrumentation import get_instrumentation
+from nodes.memory import estimate_tokens
+from nodes.rate_limiter import llm_rate_limit_kwargs
+
+TOOL_SELECTION, SYNTHESIS = "tool_selection", "synthesis"
+STRATEGIES = ("cascade", "phase")
+
+# role -> (env var, default model)
+ROLE_MODELS = {
+    "fast": ("LLM_FAST_MODEL", "gemini-1.5-flash"),
+    "strong": ("LLM_STRONG_MODEL", "gemini-pro"),
+}
+
+# Inner calls must not inherit the graph's callbacks: streaming handlers would
+# forward a discarded draft's tokens, and metrics would count each call twice
+_ISOLATED = {"callbacks": []}
+
+ModelSpec = Union[str, BaseChatModel, Dict[str, Any], None]
+
+
+def build_llm(role: str = "strong") -> BaseChatModel:
+    """Gemini chat model for a role ("fast" or "strong"), paced by the shared rate limiter."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    env_var, default = ROLE_MODELS[role]
+    return ChatGoogleGenerativeAI(
+        model=os.getenv(env_var, default),
+        google_api_key=os.getenv("GOOGLE_API_KEY"),
+        temperature=0.1,
+        **llm_rate_limit_kwargs("gemini"),
+    )
+
+
+def conversation_phase(messages: List[BaseMessage]) -> str:
+    """SYNTHESIS once the current question has tool results, TOOL_SELECTION before."""
+    for message in reversed(messages):
+        if isinstance(message, ToolMessage):
+            return SYNTHESIS
+        if isinstance(message, HumanMessage):
+            break
+    return TOOL_SELECTION
+
+
+def _model_name(model: Any) -> str:
+    model = getattr(model, "bound", model)  # tools bound via bind_tools
+    return getattr(model, "model", None) or getattr(model, "model_name", None) or type(model).__name__
+
+
+def _usage(messages: List[BaseMessage], message: BaseMessage) -> Tuple[int, int]:
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    output = estimate_tokens(str(message.content))
+    output += sum(estimate_tokens(json.dumps(call.get("args", {}))) for call in getattr(message, "tool_calls", []))
+    return sum(estimate_tokens(str(m.content)) for m in messages), output
+
+
+def _charge_second_call() -> None:
+    """
+    The run's budget callback sees one LLM call per routed turn; charge the
+    strong-model call that follows a discarded draft as well, so
+    AGENT_MAX_LLM_CALLS counts every model invocation.
+    """
+    budget = current_budget()
+    if budget is not None:
+        budget.charge_llm()
+
+
+def _as_chunk(message: AIMessage) -> ChatGenerationChunk:
+    return ChatGenerationChunk(message=AIMessageChunk(
+        content=message.content,
+        tool_call_chunks=[
+            {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+            for i, c in enumerate(message.tool_calls)
+        ],
+        usage_metadata=message.usage_metadata,
+        response_metadata=message.response_metadata,
+    ))
+
+
+class RoutedChatModel(BaseChatModel):
+    """Chat model that routes each turn to `tool_selection` or `synthesis`."""
+
+    tool_selection: Any
+    synthesis: Any
+    strategy: str = "cascade"
+
+    _stats: Dict[str, Any] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed"
+
+    def bind_tools(self, tools, **kwargs):
+        # Both models need the tools: in cascade mode the strong model may still call one
+        return self.model_copy(update={
+            "tool_selection": self.tool_selection.bind_tools(tools, **kwargs),
+            "synthesis": self.synthesis.bind_tools(tools, **kwargs),
+        })
+
+    def _record(self, phase: str, model: Any, messages: List[BaseMessage], message: BaseMessage,
+                started: float, discarded: bool = False) -> None:
+        input_tokens, output_tokens = _usage(messages, message)
+        with self._lock:
+            entry = self._stats.setdefault(_model_name(model), {
+                "calls": 0, "seconds": 0.0, "input_tokens": 0, "output_tokens": 0, "discarded": 0,
+                TOOL_SELECTION: 0, SYNTHESIS: 0,
+            })
+            entry["calls"] += 1
+            entry[phase] += 1
+            entry["seconds"] += time.perf_counter() - started
+            entry["input_tokens"] += input_tokens
+            entry["output_tokens"] += output_tokens
+            entry["discarded"] += discarded
+
+    @staticmethod
+    def _merge_usage(message: AIMessage, draft: Optional[AIMessage], messages: List[BaseMessage]) -> AIMessage:
+        """Report the discarded draft's tokens too, so callers see the real spend."""
+        if draft is None:
+            return message
+        totals = [a + b for a, b in zip(_usage(messages, message), _usage(messages, draft))]
+        usage = {"input_tokens": totals[0], "output_tokens": totals[1], "total_tokens": sum(totals)}
+        return message.model_copy(update={"usage_metadata": usage})
+
+    def _draft(self, messages: List[BaseMessage], stop, **kwargs) -> Tuple[Optional[AIMessage], bool]:
+        """(draft, use_draft): a tool-selection turn to return as-is, or a draft to discard."""
+        phase = conversation_phase(messages)
+        if self.strategy == "phase" and phase == SYNTHESIS:
+            return None, False
+        started = time.perf_counter()
+        draft = self.tool_selection.invoke(messages, _ISOLATED, stop=stop, **kwargs)
+        use_draft = bool(draft.tool_calls)
+        self._record(TOOL_SELECTION if use_draft else phase, self.tool_selection, messages, draft, started,
+                     discarded=not use_draft)
+        return draft, use_draft
+
+    async def _adraft(self, messages: List[BaseMessage], stop, **kwargs) -> Tuple[Optional[AIMessage], bool]:
+        phase = conversation_phase(messages)
+        if self.strategy == "phase" and phase == SYNTHESIS:
+            return None, False
+        started = time.perf_counter()
+        draft = await self.tool_selection.ainvoke(messages, _ISOLATED, stop=stop, **kwargs)
+        use_draft = bool(draft.tool_calls)
+        self._record(TOOL_SELECTION if use_draft else phase, self.tool_selection, messages, draft, started,
+                     discarded=not use_draft)
+        return draft, use_draft
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        draft, use_draft = self._draft(messages, stop, **kwargs)
+        if use_draft:
+            return ChatResult(generations=[ChatGeneration(message=draft)])
+        if draft is not None:
+            _charge_second_call()
+        started = time.perf_counter()
+        answer = self.synthesis.invoke(messages, _ISOLATED, stop=stop, **kwargs)
+        self._record(SYNTHESIS, self.synthesis, messages, answer, started)
+        return ChatResult(generations=[ChatGeneration(message=self._merge_usage(answer, draft, messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        draft, use_draft = await self._adraft(messages, stop, **kwargs)
+        if use_draft:
+            return ChatResult(generations=[ChatGeneration(message=draft)])
+        if draft is not None:
+            _charge_second_call()
+        started = time.perf_counter()
+        answer = await self.synthesis.ainvoke(messages, _ISOLATED, stop=stop, **kwargs)
+        self._record(SYNTHESIS, self.synthesis, messages, answer, started)
+        return ChatResult(generations=[ChatGeneration(message=self._merge_usage(answer, draft, messages))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        # Tool-selection drafts are short and must be complete before they are
+        # used, so only the final answer is streamed token by token
+        draft, use_draft = self._draft(messages, stop, **kwargs)
+        if use_draft:
+            chunk = _as_chunk(draft)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            return
+        if draft is not None:
+            _charge_second_call()
+        started, answer = time.perf_counter(), None
+        for piece in self.synthesis.stream(messages, _ISOLATED, stop=stop, **kwargs):
+            answer = piece if answer is None else answer + piece
+            chunk = ChatGenerationChunk(message=piece)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        if answer is not None:
+            self._record(SYNTHESIS, self.synthesis, messages, answer, started)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        draft, use_draft = await self._adraft(messages, stop, **kwargs)
+        if use_draft:
+            chunk = _as_chunk(draft)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            return
+        if draft is not None:
+            _charge_second_call()
+        started, answer = time.perf_counter(), None
+        async for piece in self.synthesis.astream(messages, _ISOLATED, stop=stop, **kwargs):
+            answer = piece if answer is None else answer + piece
+            chunk = ChatGenerationChunk(message=piece)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        if answer is not None:
+            self._record(SYNTHESIS, self.synthesis, messages, answer, started)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model calls, seconds, tokens and how many turns each phase sent it."""
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._stats.items()}
+
+    def metrics(self) -> Dict[str, float]:
+        """Flat {model_router_<model>_<stat>: value} view for the instrumentation collectors."""
+        return {f"model_router_{name.replace('-', '_').replace('.', '_')}_{key}": value
+                for name, entry in self.stats().items() for key, value in entry.items()}
+
+
+def _resolve_role(spec: ModelSpec) -> BaseChatModel:
+    return spec if isinstance(spec, BaseChatModel) else build_llm(spec)
+
+
+def routed_llm(tool_selection: ModelSpec = "fast", synthesis: ModelSpec = "strong",
+               strategy: str = "cascade") -> RoutedChatModel:
+    """
+    Args:
+        tool_selection: Role name ("fast"/"strong") or chat model for tool-selection turns.
+        synthesis: Role name or chat model for the final answer.
+        strategy: "cascade" or "phase" (see module docstring).
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown routing strategy {strategy!r}; expected one of {STRATEGIES}")
+    router = RoutedChatModel(tool_selection=_resolve_role(tool_selection), synthesis=_resolve_role(synthesis),
+                             strategy=strategy)
+    instrumentation = get_instrumentation()
+    if instrumentation.enabled:
+        instrumentation.register_collector("model_router", router.metrics)
+    return router
+
+
+def resolve_llm(routing: ModelSpec = None) -> BaseChatModel:
+    """
+    Chat model for a routing spec:
+    - None: the LLM_ROUTING env var (default "cascade")
+    - "off" / "strong" / "fast": one model for every turn
+    - "cascade" / "phase": fast model for tool selection, strong model for the answer
+    - {"tool_selection": ..., "synthesis": ..., "strategy": ...}: explicit per-phase models
+    - a chat model: used as-is
+    """
+    if routing is None:
+        routing = os.getenv("LLM_ROUTING", "cascade")
+    if not isinstance(routing, (str, dict)):
+        return routing
+    if isinstance(routing, dict):
+        return routed_llm(**routing)
+    if routing in STRATEGIES:
+        return routed_llm(strategy=routing)
+    return build_llm("strong" if routing == "off" else routing)
@@ -0,0 +1,636 @@
+"""
+Concurrent page fetching and main-text extraction for the fetch_pages tool.
+Pages are fetched over one pooled client (requests for threads, httpx for
+asyncio) with a cap on connections per host. Bodies are streamed, decoded and
+parsed chunk by chunk, and reading stops once `max_bytes` have arrived or
+`max_chars` of text are extracted, so a huge page costs no more than a small
+one. Extracted pages are cached by URL and revalidated with
+If-None-Match / If-Modified-Since once they expire; a 304 reuses the cached
+text without downloading the body again.
+
+URLs come from the model, so before each request - and each redirect hop,
+which is followed by hand - the host is resolved and loopback, private,
+link-local and other non-public addresses are refused (allow_private=True
+lifts this, e.g. for an intranet or a local test server).
+"""
+
+import asyncio
+import codecs
+import ipaddress
+import os
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from nodes.memory import estimate_tokens
+from nodes.search_processing import rank
+
+if TYPE_CHECKING:  # httpx is only needed by the async path; imported on first use
+    import httpx
+
+USER_AGENT = "Mozilla/5.0 (compatible; langgraph-agent/1.0; +fetch_pages)"
+CHUNK_SIZE = 16384
+MAX_REDIRECTS = 5
+
+# Elements whose text is never main content
+_SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "nav", "header", "footer",
+              "aside", "form", "button", "select"}
+_BLOCK_TAGS = {"p", "div", "section", "article", "main", "li", "ul", "ol", "dd", "dt", "tr", "td", "th",
+               "table", "blockquote", "pre", "br", "hr", "figcaption", "h1", "h2", "h3", "h4", "h5", "h6"}
+_HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_CHARSET_RE = re.compile(r"charset=[\"']?([\w.:-]+)", re.I)
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)", re.I)
+
+
+class BlockedURL(ValueError):
+    """The URL is not http(s) or its host resolves to a non-public address."""
+
+
+def _target(url: str) -> Tuple[str, int]:
+    """(host, port) of an http(s) URL."""
+    try:
+        parts = urlparse(url)
+        port = parts.port
+    except ValueError as e:
+        raise BlockedURL(f"invalid URL {url!r}: {e}") from e
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise BlockedURL(f"only http(s) URLs can be fetched, not {url!r}")
+    return parts.hostname, port or (443 if parts.scheme == "https" else 80)
+
+
+def _check_addresses(host: str, infos: List[Tuple]) -> None:
+    for *_, sockaddr in infos:
+        address = ipaddress.ip_address(sockaddr[0].split("%")[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global:
+            raise BlockedURL(f"{host} resolves to the non-public address {address}")
+
+
+def check_public_url(url: str) -> None:
+    """Raise BlockedURL unless every address `url`'s host resolves to is public."""
+    host, port = _target(url)
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as e:
+        raise BlockedURL(f"cannot resolve {host}: {e}") from e
+    _check_addresses(host, infos)
+
+
+async def acheck_public_url(url: str) -> None:
+    """Async variant of check_public_url; resolves without blocking the event loop."""
+    host, port = _target(url)
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as e:
+        raise BlockedURL(f"cannot resolve {host}: {e}") from e
+    _check_addresses(host, infos)
+
+
+class _Blocks:
+    """Text blocks extracted so far, de-duplicated and capped at `max_chars`."""
+
+    def __init__(self, max_chars: int, min_words: int):
+        self.max_chars = max_chars
+        self.min_words = min_words
+        self.items: List[str] = []
+        self.chars = 0
+        self._seen = set()
+
+    @property
+    def full(self) -> bool:
+        return self.chars >= self.max_chars
+
+    def add(self, text: str, keep_short: bool = False) -> None:
+        text = " ".join(text.split())
+        if not text or self.full or text in self._seen:
+            return
+        if not keep_short and len(text.split()) < self.min_words:
+            return  # menus, buttons, bylines and other boilerplate
+        self._seen.add(text)
+        room = self.max_chars - self.chars
+        if len(text) > room:
+            text = text[:room].rsplit(" ", 1)[0]
+        self.items.append(text)
+        self.chars += len(text)
+
+
+class HTMLTextExtractor(HTMLParser):
+    """
+    Incremental main-text extractor: feed() decoded HTML as it arrives.
+    Keeps headings and paragraphs of at least `min_words` words outside
+    navigation, scripts, forms and similar chrome.
+    """
+
+    def __init__(self, max_chars: int = 20000, min_words: int = 8):
+        super().__init__(convert_charrefs=True)
+        self.blocks = _Blocks(max_chars, min_words)
+        self.title = ""
+        self._skip_depth = 0
+        self._in_title = False
+        self._heading = False
+        self._buffer: List[str] = []
+
+    @property
+    def full(self) -> bool:
+        return self.blocks.full
+
+    def _flush(self) -> None:
+        if self._buffer:
+            self.blocks.add("".join(self._buffer), keep_short=self._heading)
+            self._buffer = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in _BLOCK_TAGS:
+            self._flush()
+            self._heading = tag in _HEADING_TAGS
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "title":
+            self._in_title = False
+        elif tag in _BLOCK_TAGS:
+            self._flush()
+            self._heading = False
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title = " ".join((self.title + data).split())
+        elif not self._skip_depth:
+            self._buffer.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+class PlainTextExtractor:
+    """Incremental extractor for text/plain: paragraphs split on blank lines."""
+
+    def __init__(self, max_chars: int = 20000, min_words: int = 1):
+        self.blocks = _Blocks(max_chars, min_words)
+        self.title = ""
+        self._buffer = ""
+
+    @property
+    def full(self) -> bool:
+        return self.blocks.full
+
+    def feed(self, text: str) -> None:
+        self._buffer += text.replace("\r\n", "\n")
+        *paragraphs, self._buffer = self._buffer.split("\n\n")
+        for paragraph in paragraphs:
+            self.blocks.add(paragraph)
+
+    def close(self) -> None:
+        self.blocks.add(self._buffer)
+        self._buffer = ""
+
+
+def _charset(content_type: str) -> str:
+    match = _CHARSET_RE.search(content_type)
+    if match:
+        try:
+            return codecs.lookup(match.group(1)).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+def _max_age(headers) -> Optional[float]:
+    """Seconds from Cache-Control max-age; 0 for no-cache (always revalidate), None when absent."""
+    cache_control = headers.get("cache-control", "")
+    if "no-cache" in cache_control:
+        return 0.0
+    match = _MAX_AGE_RE.search(cache_control)
+    return float(match.group(1)) if match else None
+
+
+class _BodyReader:
+    """Decodes and extracts a streamed body; feed() returns False once enough has been read."""
+
+    def __init__(self, url: str, status: int, headers, max_bytes: int, max_chars: int):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.truncated = False
+        content_type = headers.get("content-type", "text/html")
+        self.decoder = codecs.getincrementaldecoder(_charset(content_type))(errors="replace")
+        if "html" in content_type or "xml" in content_type:
+            self.extractor = HTMLTextExtractor(max_chars)
+        elif content_type.startswith("text/"):
+            self.extractor = PlainTextExtractor(max_chars)
+        else:
+            self.extractor = None
+
+    @property
+    def supported(self) -> bool:
+        return self.extractor is not None
+
+    def feed(self, chunk: bytes) -> bool:
+        chunk = chunk[:self.max_bytes - self.bytes]
+        self.bytes += len(chunk)
+        self.extractor.feed(self.decoder.decode(chunk))
+        if self.extractor.full or self.bytes >= self.max_bytes:
+            self.truncated = True
+            return False
+        return True
+
+    def page(self) -> Dict[str, Any]:
+        self.extractor.feed(self.decoder.decode(b"", final=True))
+        self.extractor.close()
+        return {
+            "url": self.url,
+            "status": self.status,
+            "title": self.extractor.title,
+            "blocks": self.extractor.blocks.items,
+            "bytes": self.bytes,
+            "truncated": self.truncated,
+            "etag": self.headers.get("etag"),
+            "last_modified": self.headers.get("last-modified"),
+        }
+
+
+def _error_page(url: str, error: str, status: Optional[int] = None) -> Dict[str, Any]:
+    return {"url": url, "status": status, "title": "", "blocks": [], "bytes": 0, "truncated": False,
+            "error": error}
+
+
+def page_text(page: Dict[str, Any]) -> str:
+    """The extracted text of a page, one block per line."""
+    return "\n".join(page.get("blocks", []))
+
+
+def select_blocks(page: Dict[str, Any], token_budget: int, query: str = "", min_tokens: int = 12) -> List[str]:
+    """
+    The page's blocks that fit in `token_budget` tokens, in page order. With a
+    query, the blocks most relevant to it (BM25) are chosen first; the block
+    that crosses the budget is cut at a word boundary if `min_tokens` remain.
+    """
+    blocks = [{"kind": "page", "text": text, "title": "", "source": "", "position": i}
+              for i, text in enumerate(page.get("blocks", []))]
+    if query:
+        blocks = rank(blocks, query)
+    chosen: Dict[int, str] = {}
+    remaining = token_budget
+    for block in blocks:
+        cost = estimate_tokens(block["text"])
+        if cost > remaining:
+            if remaining >= min_tokens:
+                chosen[block["position"]] = block["text"][:remaining * 4].rsplit(" ", 1)[0] + "..."
+            break
+        chosen[block["position"]] = block["text"]
+        remaining -= cost
+    return [chosen[i] for i in sorted(chosen)]
+
+
+class PageCache:
+    """LRU cache of extracted pages by URL; expired entries are kept for revalidation."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0):
+        """
+        Args:
+            max_entries: Maximum number of pages kept in memory.
+            ttl: Seconds a page is served without asking the server, unless
+                the response set its own Cache-Control max-age.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, url: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """(page or None, fresh): an expired page is returned with fresh=False for revalidation."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None, False
+            self._entries.move_to_end(url)
+            page, expires = entry
+            return page, time.monotonic() < expires
+
+    def store(self, url: str, page: Dict[str, Any], max_age: Optional[float] = None) -> None:
+        """Cache `page`; with a max_age of 0 it is only kept if it can be revalidated."""
+        ttl = self.ttl if max_age is None else max_age
+        if ttl <= 0 and not (page.get("etag") or page.get("last_modified")):
+            return
+        with self._lock:
+            self._entries[url] = (page, time.monotonic() + ttl)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class PageFetcher:
+    """Fetches and extracts pages concurrently over a shared pool with per-host limits."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        per_host: int = 2,
+        timeout: float = 10.0,
+        connect_timeout: float = 3.05,
+        max_bytes: int = 1_000_000,
+        max_chars: int = 20000,
+        cache: Optional[PageCache] = None,
+        allow_private: bool = False,
+        max_redirects: int = MAX_REDIRECTS,
+    ):
+        """
+        Args:
+            max_concurrency: Pages fetched at once.
+            per_host: Connections allowed to a single host at once.
+            timeout: Read timeout in seconds.
+            connect_timeout: Connect timeout in seconds.
+            max_bytes: Body bytes read per page; the rest is never downloaded.
+            max_chars: Characters of text extracted per page.
+            cache: Page cache (default: an in-memory PageCache).
+            allow_private: Also fetch from loopback, private and link-local addresses.
+            max_redirects: Redirect hops followed per page.
+        """
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.timeout = (connect_timeout, timeout)
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.cache = cache if cache is not None else PageCache()
+        self.allow_private = allow_private
+        self.max_redirects = max_redirects
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "cache_hits": 0, "revalidated": 0, "errors": 0, "bytes": 0,
+                       "truncated": 0}
+
+        # Pool sized for every host slot; connections stay alive between calls
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=per_host)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # Async pools and host semaphores are bound to an event loop: one set per loop, created
+        # lazily and closed by aclose() on that loop before it ends
+        self._async_pools: Dict[asyncio.AbstractEventLoop, Tuple["httpx.AsyncClient", Dict[str, asyncio.Semaphore]]] = {}
+
+    # -- shared helpers ---------------------------------------------------
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                self._stats[name] += delta
+
+    def _cached(self, url: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        page, fresh = self.cache.lookup(url)
+        if fresh:
+            self._count(cache_hits=1)
+        return page, fresh
+
+    @staticmethod
+    def _conditional(page: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Revalidation headers for an expired cached page."""
+        headers = {}
+        if page and page.get("etag"):
+            headers["If-None-Match"] = page["etag"]
+        if page and page.get("last_modified"):
+            headers["If-Modified-Since"] = page["last_modified"]
+        return headers
+
+    def _not_modified(self, url: str, page: Dict[str, Any], headers) -> Dict[str, Any]:
+        self._count(revalidated=1)
+        self.cache.store(url, page, _max_age(headers))
+        return page
+
+    def _reader(self, url: str, status: int, headers) -> _BodyReader:
+        return _BodyReader(url, status, headers, self.max_bytes, self.max_chars)
+
+    def _finish(self, url: str, reader: _BodyReader) -> Dict[str, Any]:
+        page = reader.page()
+        self._count(bytes=reader.bytes, truncated=int(reader.truncated))
+        if "no-store" not in reader.headers.get("cache-control", ""):
+            self.cache.store(url, page, _max_age(reader.headers))
+        return page
+
+    def _failed(self, url: str, error: str, status: Optional[int] = None) -> Dict[str, Any]:
+        self._count(errors=1)
+        return _error_page(url, error, status)
+
+    # -- threaded path ----------------------------------------------------
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return slot
+
+    def _get(self, url: str, headers: Dict[str, str]) -> requests.Response:
+        """Streamed GET following redirects by hand, so every hop's address is checked."""
+        for _ in range(self.max_redirects + 1):
+            if not self.allow_private:
+                check_public_url(url)
+            response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True,
+                                        allow_redirects=False)
+            if not response.is_redirect:
+                return response
+            response.close()
+            # Revalidation headers belong to the original URL
+            url, headers = urljoin(url, response.headers["location"]), {}
+        raise requests.TooManyRedirects(f"more than {self.max_redirects} redirects")
+
+    def fetch(self, url: str) -> Dict[str, Any]:
+        """
+        Fetch one page and extract its text. Never raises: failures come back
+        as a page with an "error" message and no blocks.
+        """
+        cached, fresh = self._cached(url)
+        if fresh:
+            return cached
+        conditional = self._conditional(cached)
+        try:
+            with self._host_slot(url):
+                self._count(requests=1)
+                with self._get(url, conditional) as response:
+                    if response.status_code == 304 and conditional:
+                        return self._not_modified(url, cached, response.headers)
+                    if response.status_code >= 400:
+                        return self._failed(url, f"HTTP {response.status_code}", response.status_code)
+                    reader = self._reader(url, response.status_code, response.headers)
+                    if not reader.supported:
+                        return self._failed(url, f"unsupported content type {response.headers.get('content-type')}",
+                                            response.status_code)
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        if not reader.feed(chunk):
+                            break
+            return self._finish(url, reader)
+        except BlockedURL as e:
+            return self._failed(url, str(e))
+        except requests.RequestException as e:
+            return self._failed(url, f"{type(e).__name__}: {e}")
+
+    def fetch_many(self, urls: Iterable[str]) -> List[Dict[str, Any]]:
+        """Fetch pages concurrently; results are in the order of `urls`."""
+        urls = list(dict.fromkeys(urls))
+        if len(urls) <= 1:
+            return [self.fetch(url) for url in urls]
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="fetch-pages")
+        return list(self._executor.map(self.fetch, urls))
+
+    # -- asyncio path -----------------------------------------------------
+
+    def _get_async_client(self) -> "httpx.AsyncClient":
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pool = self._async_pools.get(loop)
+            if pool is None:
+                # A finished loop's pool can no longer be closed; forget it rather than keep it alive
+                for closed in [other for other in self._async_pools if other.is_closed()]:
+                    del self._async_pools[closed]
+                client = httpx.AsyncClient(
+                    timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+                    limits=httpx.Limits(max_connections=self.max_concurrency * self.per_host,
+                                        max_keepalive_connections=self.max_concurrency * self.per_host),
+                    headers={"User-Agent": USER_AGENT},
+                )
+                pool = self._async_pools[loop] = (client, {})
+            return pool[0]
+
+    def _async_host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        slots = self._async_pools[asyncio.get_running_loop()][1]
+        slot = slots.get(host)
+        if slot is None:
+            slot = slots[host] = asyncio.Semaphore(self.per_host)
+        return slot
+
+    async def _aget(self, client: "httpx.AsyncClient", url: str, headers: Dict[str, str]) -> "httpx.Response":
+        """Async variant of _get; the caller closes the streamed response."""
+        import httpx
+
+        for _ in range(self.max_redirects + 1):
+            if not self.allow_private:
+                await acheck_public_url(url)
+            response = await client.send(client.build_request("GET", url, headers=headers), stream=True)
+            if not response.is_redirect:
+                return response
+            await response.aclose()
+            url, headers = urljoin(url, response.headers["location"]), {}
+        raise httpx.TooManyRedirects(f"more than {self.max_redirects} redirects")
+
+    async def afetch(self, url: str) -> Dict[str, Any]:
+        """Async variant of fetch using a pooled httpx client."""
+        import httpx
+
+        cached, fresh = self._cached(url)
+        if fresh:
+            return cached
+        conditional = self._conditional(cached)
+        client = self._get_async_client()
+        try:
+            async with self._async_host_slot(url):
+                self._count(requests=1)
+                response = await self._aget(client, url, conditional)
+                try:
+                    if response.status_code == 304 and conditional:
+                        return self._not_modified(url, cached, response.headers)
+                    if response.status_code >= 400:
+                        return self._failed(url, f"HTTP {response.status_code}", response.status_code)
+                    reader = self._reader(url, response.status_code, response.headers)
+                    if not reader.supported:
+                        return self._failed(url, f"unsupported content type {response.headers.get('content-type')}",
+                                            response.status_code)
+                    async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                        if not reader.feed(chunk):
+                            break
+                finally:
+                    await response.aclose()
+            return self._finish(url, reader)
+        except BlockedURL as e:
+            return self._failed(url, str(e))
+        except httpx.HTTPError as e:
+            return self._failed(url, f"{type(e).__name__}: {e}")
+
+    async def afetch_many(self, urls: Iterable[str]) -> List[Dict[str, Any]]:
+        """Async variant of fetch_many; at most `max_concurrency` pages in flight."""
+        urls = list(dict.fromkeys(urls))
+        slots = asyncio.Semaphore(self.max_concurrency)
+
+        async def bounded(url: str) -> Dict[str, Any]:
+            async with slots:
+                return await self.afetch(url)
+
+        return list(await asyncio.gather(*(bounded(url) for url in urls)))
+
+    # -- housekeeping -----------------------------------------------------
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "cached_pages": len(self.cache)}
+
+    def close(self) -> None:
+        """Close pooled connections and the fetch threads."""
+        self.session.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def aclose(self) -> None:
+        """Close the running event loop's async connection pool; call it before the loop ends."""
+        with self._lock:
+            pool = self._async_pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool[0].aclose()
+
+
+_default_fetcher: Optional[PageFetcher] = None
+
+
+def get_page_fetcher() -> PageFetcher:
+    """Return the process-wide page fetcher, creating it on first use."""
+    global _default_fetcher
+    if _default_fetcher is None:
+        _default_fetcher = PageFetcher(
+            max_concurrency=int(os.getenv("PAGE_FETCH_CONCURRENCY", "8")),
+            per_host=int(os.getenv("PAGE_FETCH_PER_HOST", "2")),
+            timeout=float(os.getenv("PAGE_FETCH_TIMEOUT", "10")),
+            max_bytes=int(os.getenv("PAGE_MAX_BYTES", "1000000")),
+            max_chars=int(os.getenv("PAGE_MAX_CHARS", "20000")),
+            cache=PageCache(max_entries=int(os.getenv("PAGE_CACHE_SIZE", "256")),
+                            ttl=float(os.getenv("PAGE_CACHE_TTL", "3600"))),
+            allow_private=os.getenv("PAGE_FETCH_ALLOW_PRIVATE", "").lower() in ("1", "true", "yes"),
+        )
+    return _default_fetcher
+
+
+async def aclose_page_fetcher() -> None:
+    """Close the process-wide fetcher's pool for the running event loop, if the fetcher exists."""
+    if _default_fetcher is not None:
+        await _default_fetcher.aclose()
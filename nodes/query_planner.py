@@ -0,0 +1,90 @@
+"""
+Query planning for the hybrid graph.
+The planner node runs before the agent loop: one LLM turn, with the tools
+bound, asked to break the question into independent sub-queries and issue
+them all as parallel tool calls. The tools node runs them at once and the
+agent node writes the answer from the merged results, so a question with N
+independent lookups costs two sequential LLM round-trips instead of N + 1.
+Lookups that need an earlier result are left to the agent's own follow-ups.
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from nodes.search_cache import normalize_query
+
+# Parallel tool calls kept from one plan; 0 keeps them all
+MAX_SUB_QUERIES = int(os.getenv("PLANNER_MAX_SUBQUERIES", "6"))
+
+PLANNER_NAME = "planner"
+
+PLANNER_PROMPT = """You are the planning step of a research assistant with access to tools.
+
+Break the user's question into the independent lookups needed to answer it and request
+ALL of them now, as parallel tool calls in this single turn:
+- One specific web_search per entity, place, period or fact (e.g. "Compare the GDP of
+  France and Germany" -> "GDP of France" and "GDP of Germany")
+- One calculator call per calculation whose numbers are already known
+- Do not wait for one result before requesting another unless its input truly depends on it;
+  dependent steps can be requested after the results arrive
+- Never repeat the same lookup with different wording
+
+If the question needs no tools (greetings, thanks, general knowledge you are sure of),
+answer it directly instead."""
+
+
+def planning_enabled() -> bool:
+    """AGENT_PLANNER env var (default on)."""
+    return os.getenv("AGENT_PLANNER", "1").lower() not in ("0", "false", "no", "off")
+
+
+def current_question(messages: List[BaseMessage]) -> str:
+    """Text of the last human message."""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return message.content if isinstance(message.content, str) else str(message.content)
+    return ""
+
+
+def planning_messages(messages: List[BaseMessage]) -> List[BaseMessage]:
+    """The conversation with the planner prompt in place of any system message."""
+    return [SystemMessage(content=PLANNER_PROMPT)] + [m for m in messages if not isinstance(m, SystemMessage)]
+
+
+def _call_key(call: Dict[str, Any]) -> tuple:
+    args = call.get("args", {})
+    values = [normalize_query(v) if isinstance(v, str) else repr(v) for _, v in sorted(args.items())]
+    return (call["name"], *values)
+
+
+def dedupe_calls(tool_calls: List[Dict[str, Any]], max_calls: int = 0) -> List[Dict[str, Any]]:
+    """
+    Drop repeated sub-queries (same tool, same normalized input) and keep at
+    most `max_calls` of the rest (0 keeps them all), in the planner's order.
+    """
+    seen = set()
+    kept = []
+    for call in tool_calls:
+        key = _call_key(call)
+        if key in seen:
+            continue
+        seen.add(key)
+        kept.append(call)
+    return kept[:max_calls] if max_calls else kept
+
+
+def plan_update(question: str, response: AIMessage, max_calls: Optional[int] = None) -> Dict[str, Any]:
+    """
+    State update for the planner's response: the plan as one AIMessage of
+    parallel tool calls (named "planner"), `processed_query` and `tools_to_use`;
+    or the answer itself when the planner needed no tools.
+    """
+    tool_calls = getattr(response, "tool_calls", None)
+    if not tool_calls:
+        return {"messages": [response], "processed_query": question, "tools_to_use": [],
+                "final_answer": response.content}
+    calls = dedupe_calls(tool_calls, MAX_SUB_QUERIES if max_calls is None else max_calls)
+    plan = response.model_copy(update={"tool_calls": calls, "name": PLANNER_NAME})
+    return {"messages": [plan], "processed_query": question, "tools_to_use": [call["name"] for call in calls]}
@@ -0,0 +1,360 @@
+"""
+Client-side rate limiting with adaptive concurrency for upstream providers.
+Each provider (SerpAPI, Gemini) gets one AdaptiveLimiter combining a token
+bucket (requests per second) with a concurrency cap. Both are tuned by AIMD:
+every success nudges them up additively, every 429 cuts them
+multiplicatively, so callers back off before the provider starts rejecting.
+Waiters are served in priority order (interactive before batch).
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.rate_limiters import BaseRateLimiter
+
+# Lower value = served first
+HIGH, NORMAL, LOW = 0, 1, 2
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("rate_limit_priority", default=NORMAL)
+
+
+@contextlib.contextmanager
+def priority(level: int) -> Iterator[None]:
+    """Run the enclosed calls (and tasks/threads started with this context) at `level`."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    """The priority level calls made here run at."""
+    return _priority.get()
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "needs_slot", "event", "loop", "future", "granted", "cancelled")
+
+    def __init__(self, priority_level: int, seq: int, needs_slot: bool):
+        self.priority = priority_level
+        self.seq = seq
+        self.needs_slot = needs_slot
+        self.event: Optional[threading.Event] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.future: Optional[asyncio.Future] = None
+        self.granted = False
+        self.cancelled = False
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(True)
+
+
+class Permit:
+    """Handle for one admitted request; mark it overloaded when the provider pushes back."""
+
+    __slots__ = ("overload", "retry_after")
+
+    def __init__(self):
+        self.overload = False
+        self.retry_after: Optional[float] = None
+
+    def overloaded(self, retry_after: Optional[float] = None) -> None:
+        self.overload = True
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """Token bucket + AIMD concurrency limit with priority-ordered admission."""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float = 5.0,
+        burst: int = 10,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+        min_rate: Optional[float] = None,
+        decrease: float = 0.5,
+        cooldown: float = 1.0,
+    ):
+        """
+        Args:
+            name: Provider name, for stats.
+            rate: Maximum sustained requests per second.
+            burst: Bucket size - requests allowed back to back after idling.
+            max_concurrency: Upper bound for the adaptive concurrency limit.
+            min_concurrency: Floor the limit never drops below.
+            min_rate: Floor for the adaptive rate (default rate / 20).
+            decrease: Multiplicative factor applied to rate and limit on a 429.
+            cooldown: Seconds after a decrease during which further 429s (from
+                requests already in flight) do not cut again.
+        """
+        self.name = name
+        self.max_rate = rate
+        self.min_rate = min_rate or rate / 20
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(max_concurrency)
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._decreased_at = float("-inf")
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._heap: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._stats = {"admitted": 0, "successes": 0, "overloads": 0, "timeouts": 0, "wait_seconds": 0.0}
+
+    # Admission
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _schedule(self, delay: float) -> None:
+        if self._timer is None:
+            self._timer = threading.Timer(delay, self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Admit waiters from the head of the queue while tokens and slots allow (lock held)."""
+        now = time.monotonic()
+        self._refill(now)
+        while self._heap:
+            waiter = self._heap[0]
+            if waiter.cancelled:
+                heapq.heappop(self._heap)
+                continue
+            if waiter.needs_slot and self.in_flight >= max(self.min_concurrency, int(self.limit)):
+                return  # a release() will dispatch again
+            if now < self.paused_until:
+                self._schedule(self.paused_until - now)
+                return
+            if self.tokens < 1:
+                self._schedule((1 - self.tokens) / self.rate)
+                return
+            heapq.heappop(self._heap)
+            self.tokens -= 1
+            if waiter.needs_slot:
+                self.in_flight += 1
+            waiter.granted = True
+            self._stats["admitted"] += 1
+            if waiter.event is not None:
+                waiter.event.set()
+            else:
+                waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+
+    def acquire(self, needs_slot: bool = True, timeout: Optional[float] = None,
+                priority_level: Optional[int] = None) -> bool:
+        """Block until admitted; False if `timeout` passes first."""
+        started = time.monotonic()
+        waiter = _Waiter(_priority.get() if priority_level is None else priority_level, next(self._seq), needs_slot)
+        waiter.event = threading.Event()
+        with self._lock:
+            heapq.heappush(self._heap, waiter)
+            self._dispatch()
+        if not waiter.event.wait(timeout):
+            with self._lock:
+                if not waiter.granted:
+                    waiter.cancelled = True
+                    self._stats["timeouts"] += 1
+                    return False
+        with self._lock:
+            self._stats["wait_seconds"] += time.monotonic() - started
+        return True
+
+    async def aacquire(self, needs_slot: bool = True, priority_level: Optional[int] = None) -> None:
+        """Async variant of acquire; cancelling the caller gives up its place or slot."""
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(_priority.get() if priority_level is None else priority_level, next(self._seq), needs_slot)
+        waiter.loop, waiter.future = loop, loop.create_future()
+        with self._lock:
+            heapq.heappush(self._heap, waiter)
+            self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted and needs_slot:
+                    self.in_flight -= 1
+                    self._dispatch()
+                waiter.cancelled = True
+            raise
+        with self._lock:
+            self._stats["wait_seconds"] += time.monotonic() - started
+
+    # AIMD feedback
+
+    def feedback(self, overloaded: bool = False, retry_after: Optional[float] = None) -> None:
+        """Adjust rate and concurrency from one response (no slot is released)."""
+        with self._lock:
+            self._adjust(overloaded, retry_after)
+            self._dispatch()
+
+    def _adjust(self, overloaded: bool, retry_after: Optional[float]) -> None:
+        if overloaded:
+            self._stats["overloads"] += 1
+            now = time.monotonic()
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+            if now - self._decreased_at < self.cooldown:
+                return
+            self._decreased_at = now
+            self.limit = max(self.min_concurrency, self.limit * self.decrease)
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.tokens = min(self.tokens, 0.0)
+        else:
+            self._stats["successes"] += 1
+            # Additive increase spread over a window: +1 concurrency per `limit`
+            # successes, +1 req/s per `rate` successes (about one second's worth)
+            self.limit = min(self.max_concurrency, self.limit + 1 / max(self.limit, 1.0))
+            self.rate = min(self.max_rate, self.rate + 1 / max(self.rate, 1.0))
+
+    def release(self, overloaded: bool = False, retry_after: Optional[float] = None) -> None:
+        """Give back a slot taken by acquire(needs_slot=True) and record the outcome."""
+        with self._lock:
+            self.in_flight -= 1
+            self._adjust(overloaded, retry_after)
+            self._dispatch()
+
+    @contextlib.contextmanager
+    def slot(self, priority_level: Optional[int] = None) -> Iterator[Permit]:
+        """Hold a rate token and a concurrency slot for the enclosed request."""
+        self.acquire(priority_level=priority_level)
+        permit = Permit()
+        try:
+            yield permit
+        finally:
+            self.release(permit.overload, permit.retry_after)
+
+    @contextlib.asynccontextmanager
+    async def aslot(self, priority_level: Optional[int] = None):
+        """Async variant of slot()."""
+        await self.aacquire(priority_level=priority_level)
+        permit = Permit()
+        try:
+            yield permit
+        finally:
+            self.release(permit.overload, permit.retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "name": self.name, "rate": round(self.rate, 3), "limit": round(self.limit, 2),
+                    "in_flight": self.in_flight, "queued": len(self._heap)}
+
+
+class LangChainRateLimiter(BaseRateLimiter):
+    """
+    BaseRateLimiter adapter so chat models (rate_limiter=...) draw from an
+    AdaptiveLimiter's token bucket. Chat models only call acquire, so no
+    concurrency slot is held; AIMD feedback comes from RateLimitFeedback.
+    """
+
+    def __init__(self, limiter: AdaptiveLimiter):
+        self.limiter = limiter
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        return self.limiter.acquire(needs_slot=False, timeout=None if blocking else 0)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        if not blocking:
+            return self.limiter.acquire(needs_slot=False, timeout=0)
+        await self.limiter.aacquire(needs_slot=False)
+        return True
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """429 / quota errors across providers (Gemini raises ResourceExhausted)."""
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in ("429", "resourceexhausted", "rate limit", "quota"))
+
+
+class RateLimitFeedback(BaseCallbackHandler):
+    """Reports LLM successes and 429s to an AdaptiveLimiter."""
+
+    def __init__(self, limiter: AdaptiveLimiter):
+        self.limiter = limiter
+
+    def on_llm_end(self, response, **kwargs: Any) -> None:
+        self.limiter.feedback(overloaded=False)
+
+    def on_llm_error(self, error: BaseException, **kwargs: Any) -> None:
+        if is_rate_limit_error(error):
+            self.limiter.feedback(overloaded=True)
+
+
+# provider -> (requests/second, burst, max concurrency)
+DEFAULT_LIMITS = {
+    "serpapi": (5.0, 10, 16),
+    "gemini": (2.0, 10, 8),
+}
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def rate_limiting_enabled() -> bool:
+    return os.getenv("RATE_LIMIT_ENABLED", "1").lower() not in ("0", "false", "no")
+
+
+def get_rate_limiter(provider: str) -> Optional[AdaptiveLimiter]:
+    """
+    Shared limiter for a provider, or None when RATE_LIMIT_ENABLED=0.
+    Override the defaults with RATE_LIMIT_<PROVIDER>="rate,burst,max_concurrency".
+    """
+    if not rate_limiting_enabled():
+        return None
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            rate, burst, concurrency = DEFAULT_LIMITS.get(provider, (5.0, 10, 16))
+            override = os.getenv(f"RATE_LIMIT_{provider.upper()}")
+            if override:
+                parts = [p.strip() for p in override.split(",")]
+                rate = float(parts[0])
+                burst = int(parts[1]) if len(parts) > 1 else burst
+                concurrency = int(parts[2]) if len(parts) > 2 else concurrency
+            limiter = _limiters[provider] = AdaptiveLimiter(provider, rate, burst, concurrency)
+        return limiter
+
+
+def rate_limit_metrics() -> Dict[str, float]:
+    """Numeric stats of every shared limiter, as {rate_limit_<provider>_<stat>: value}."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {f"rate_limit_{limiter.name}_{key}": value
+            for limiter in limiters for key, value in limiter.stats().items() if key != "name"}
+
+
+def llm_rate_limit_kwargs(provider: str = "gemini") -> Dict[str, Any]:
+    """Chat model constructor kwargs that route its calls through the provider's limiter."""
+    limiter = get_rate_limiter(provider)
+    if limiter is None:
+        return {}
+    return {"rate_limiter": LangChainRateLimiter(limiter), "callbacks": [RateLimitFeedback(limiter)]}
@@ -0,0 +1,283 @@
+"""
+Search result cache for the web_search tool.
+Two tiers: an in-process LRU with per-entry TTL and an optional SQLite file
+that survives restarts. Supports stale-while-revalidate for hot queries.
+The SQLite file is opened on first use (and again in a forked child), and
+expired rows and the oldest ones past max_disk_entries are deleted as
+results are written. Memory hits never wait on the disk tier, and on the
+async path it is read and written on a worker thread, so the event loop
+never waits on SQLite.
+"""
+
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+# Disk-tier writes between deletes of expired and surplus rows
+PRUNE_EVERY = 64
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s?!.]+$")
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so near-identical repeats share a cache key."""
+    query = _WHITESPACE_RE.sub(" ", query.strip().lower())
+    return _TRAILING_PUNCT_RE.sub("", query)
+
+
+class SearchCache:
+    """LRU + TTL cache for search results with an optional on-disk tier."""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl: float = 900.0,
+        stale_ttl: float = 0.0,
+        db_path: Optional[str] = None,
+        max_disk_entries: int = 100_000,
+    ):
+        """
+        Args:
+            max_entries: Maximum number of entries kept in memory.
+            ttl: Seconds an entry is considered fresh.
+            stale_ttl: Extra seconds an expired entry may still be served while
+                it is refreshed in the background (0 disables stale-while-revalidate).
+            db_path: SQLite file for the persistent tier (None keeps it in memory only).
+            max_disk_entries: Rows kept in the SQLite file; the oldest go first (0: no cap).
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        # Strong references to background refresh tasks; the loop only keeps weak ones
+        self._tasks: Set[asyncio.Future] = set()
+        self._stats = {"hits": 0, "misses": 0, "stale_hits": 0, "evictions": 0, "disk_hits": 0}
+
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_pid: Optional[int] = None
+        # Handles inherited across fork(): SQLite forbids using (or closing) them in the child
+        self._inherited: List[sqlite3.Connection] = []
+        self._writes = 0
+        # Serializes the SQLite connection; disk I/O never happens under self._lock
+        self._db_lock = threading.Lock()
+
+    # -- internal helpers -------------------------------------------------
+
+    def _age(self, stored_at: float) -> float:
+        return time.time() - stored_at
+
+    def _connection(self) -> sqlite3.Connection:
+        """The SQLite connection, opened on first use and again in a forked child. Caller holds _db_lock."""
+        if self._db_pid != os.getpid():
+            if self._db is not None:
+                self._inherited.append(self._db)
+            self._db, self._db_pid = sqlite3.connect(self.db_path, check_same_thread=False), os.getpid()
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS search_cache_stored_at ON search_cache (stored_at)")
+            self._prune(self._db)
+            self._db.commit()
+        return self._db
+
+    def _prune(self, db: sqlite3.Connection) -> None:
+        """Delete expired rows, then the oldest past max_disk_entries. Caller holds _db_lock."""
+        db.execute("DELETE FROM search_cache WHERE stored_at < ?", (time.time() - self.ttl - self.stale_ttl,))
+        if self.max_disk_entries:
+            db.execute(
+                "DELETE FROM search_cache WHERE key IN "
+                "(SELECT key FROM search_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,),
+            )
+
+    def _lookup(self, key: str) -> Optional[Tuple[str, float]]:
+        """Find an entry in memory, falling back to the disk tier. Caller must not hold the lock."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if not self._has_disk_tier:
+            return None
+        entry = self._disk_lookup(key)
+        if entry is not None:
+            with self._lock:
+                self._store_memory(key, *entry)
+        return entry
+
+    def _disk_lookup(self, key: str) -> Optional[Tuple[str, float]]:
+        """(value, stored_at) from the disk tier if still servable, else None."""
+        with self._db_lock:
+            row = self._connection().execute(
+                "SELECT value, stored_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or self._age(row[1]) > self.ttl + self.stale_ttl:
+            return None
+        with self._lock:
+            self._stats["disk_hits"] += 1
+        return row[0], row[1]
+
+    def _store_memory(self, key: str, value: str, stored_at: float) -> None:
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _drop(self, key: str) -> None:
+        if self._entries.pop(key, None) is not None:
+            self._stats["evictions"] += 1
+
+    @property
+    def _has_disk_tier(self) -> bool:
+        return self.db_path is not None
+
+    def _persist(self, key: str, value: str, stored_at: float) -> None:
+        """Write an entry to the disk tier (no-op without one)."""
+        if self.db_path is not None:
+            with self._db_lock:
+                db = self._connection()
+                db.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, value, stored_at) VALUES (?, ?, ?)",
+                    (key, value, stored_at),
+                )
+                self._writes += 1
+                if self._writes % PRUNE_EVERY == 0:
+                    self._prune(db)
+                db.commit()
+
+    async def _acached_or_stale(self, key: str) -> Tuple[Optional[str], bool]:
+        """_cached_or_stale for the event loop; a memory miss that may hit the disk tier runs in a thread."""
+        if not self._has_disk_tier or key in self._entries:
+            return self._cached_or_stale(key)
+        return await asyncio.to_thread(self._cached_or_stale, key)
+
+    # -- public API -------------------------------------------------------
+
+    def get(self, query: str) -> Optional[str]:
+        """Return a fresh cached result for the query, or None."""
+        key = normalize_query(query)
+        entry = self._lookup(key)
+        with self._lock:
+            if entry is not None and self._age(entry[1]) <= self.ttl:
+                self._stats["hits"] += 1
+                return entry[0]
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, query: str, value: str) -> None:
+        """Store a result in both tiers."""
+        key = normalize_query(query)
+        stored_at = time.time()
+        with self._lock:
+            self._store_memory(key, value, stored_at)
+        self._persist(key, value, stored_at)
+
+    async def aset(self, query: str, value: str) -> None:
+        """Async variant of set; the disk write runs on a worker thread."""
+        key = normalize_query(query)
+        stored_at = time.time()
+        with self._lock:
+            self._store_memory(key, value, stored_at)
+        if self._has_disk_tier:
+            await asyncio.to_thread(self._persist, key, value, stored_at)
+
+    def _cached_or_stale(self, key: str) -> Tuple[Optional[str], bool]:
+        """Look up a key for get_or_compute. Returns (value, needs_refresh)."""
+        entry = self._lookup(key)
+        with self._lock:
+            if entry is not None:
+                age = self._age(entry[1])
+                if age <= self.ttl:
+                    self._stats["hits"] += 1
+                    return entry[0], False
+                if age <= self.ttl + self.stale_ttl:
+                    self._stats["stale_hits"] += 1
+                    needs_refresh = key not in self._refreshing
+                    self._refreshing.add(key)
+                    return entry[0], needs_refresh
+                self._drop(key)
+            self._stats["misses"] += 1
+            return None, False
+
+    def get_or_compute(self, query: str, compute: Callable[[str], str]) -> str:
+        """
+        Return the cached result for the query, calling compute(query) on a miss.
+        Expired entries inside the stale window are returned immediately and
+        refreshed on a background thread.
+        """
+        key = normalize_query(query)
+        value, needs_refresh = self._cached_or_stale(key)
+        if value is not None:
+            if needs_refresh:
+                threading.Thread(
+                    target=self._refresh, args=(key, query, compute), daemon=True
+                ).start()
+            return value
+
+        value = compute(query)
+        self.set(query, value)
+        return value
+
+    async def aget_or_compute(self, query: str, compute: Callable[[str], Awaitable[str]]) -> str:
+        """Async variant of get_or_compute; stale entries are refreshed in a task."""
+        key = normalize_query(query)
+        value, needs_refresh = await self._acached_or_stale(key)
+        if value is not None:
+            if needs_refresh:
+                task = asyncio.ensure_future(self._arefresh(key, query, compute))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return value
+
+        value = await compute(query)
+        await self.aset(query, value)
+        return value
+
+    def _refresh(self, key: str, query: str, compute: Callable[[str], str]) -> None:
+        """Background revalidation for stale-while-revalidate."""
+        try:
+            self.set(query, compute(query))
+        except Exception:
+            # Keep serving the stale value; the next miss will retry
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    async def _arefresh(self, key: str, query: str, compute: Callable[[str], Awaitable[str]]) -> None:
+        try:
+            await self.aset(query, await compute(query))
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters plus the current in-memory size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        return stats
+
+    def clear(self) -> None:
+        """Drop all entries from both tiers."""
+        with self._lock:
+            self._entries.clear()
+        if self.db_path is not None:
+            with self._db_lock:
+                db = self._connection()
+                db.execute("DELETE FROM search_cache")
+                db.commit()
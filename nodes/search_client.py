@@ -0,0 +1,281 @@
+"""
+Long-lived SerpAPI client shared by every agent.
+Keeps one keep-alive connection pool, applies timeouts, and retries
+transient failures with exponential backoff and full jitter.
+"""
+
+import asyncio
+import contextlib
+import os
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from nodes.rate_limiter import AdaptiveLimiter, Permit, get_rate_limiter
+from nodes.search_processing import process_results
+
+if TYPE_CHECKING:  # httpx is only needed by the async path; imported on first use
+    import httpx
+
+DEFAULT_BASE_URL = "https://serpapi.com/search"
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class SearchError(Exception):
+    """Raised when a search request fails after all retries."""
+
+
+def raise_for_error(res: Dict[str, Any]) -> None:
+    """SerpAPI reports some failures as an "error" key in a 200 response."""
+    if "error" in res:
+        raise SearchError(f"Got error from SerpAPI: {res['error']}")
+
+
+def _links(res: Dict[str, Any], n: int) -> List[str]:
+    return [r["link"] for r in res.get("organic_results", []) if r.get("link")][:n]
+
+
+def format_results(res: Dict[str, Any]) -> str:
+    """Unprocessed result text: every snippet, as SerpAPIWrapper.run returns it."""
+    raise_for_error(res)
+
+    answer_box = res.get("answer_box")
+    if isinstance(answer_box, list):
+        answer_box = answer_box[0] if answer_box else None
+    if isinstance(answer_box, dict):
+        for key in ("answer", "snippet"):
+            if answer_box.get(key):
+                return str(answer_box[key])
+        if answer_box.get("snippet_highlighted_words"):
+            return str(answer_box["snippet_highlighted_words"][0])
+
+    if res.get("sports_results", {}).get("game_spotlight"):
+        return str(res["sports_results"]["game_spotlight"])
+
+    snippets = []
+    knowledge_graph = res.get("knowledge_graph", {})
+    title = knowledge_graph.get("title", "")
+    if knowledge_graph.get("description"):
+        snippets.append(knowledge_graph["description"])
+    for key, value in knowledge_graph.items():
+        if isinstance(key, str) and isinstance(value, str) and key not in ("title", "description") \
+                and not key.endswith("_stick") and not key.endswith("link") and not value.startswith("http"):
+            snippets.append(f"{title} {key}: {value}.")
+
+    for result in res.get("organic_results", []):
+        if "snippet" in result:
+            snippets.append(result["snippet"])
+        elif "snippet_highlighted_words" in result:
+            snippets.append(result["snippet_highlighted_words"])
+        elif "rich_snippet" in result:
+            snippets.append(result["rich_snippet"])
+
+    if snippets:
+        return str(snippets)
+    return "No good search result found"
+
+
+def _retry_after(headers) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds form only)."""
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class SearchClient:
+    """Pooled HTTP client for SerpAPI with timeouts and jittered retries."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout: float = 10.0,
+        connect_timeout: float = 3.05,
+        max_retries: int = 3,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+        pool_size: int = 16,
+        engine: str = "google",
+        rate_limiter: Optional[AdaptiveLimiter] = None,
+        token_budget: int = 300,
+    ):
+        self.api_key = api_key if api_key is not None else os.getenv("SERPAPI_API_KEY")
+        self.base_url = base_url or os.getenv("SERPAPI_BASE_URL", DEFAULT_BASE_URL)
+        self.timeout = (connect_timeout, timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.engine = engine
+        # Paces every attempt and backs off adaptively on 429s
+        self.rate_limiter = rate_limiter
+        # Result text is ranked, de-duplicated and cut to this many tokens
+        self.token_budget = token_budget
+
+        # One session for the lifetime of the process - connections stay alive
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Async pools are bound to an event loop: one per loop, created lazily and
+        # closed by aclose() on that loop before it ends
+        self._pool_size = pool_size
+        self._async_clients: Dict[asyncio.AbstractEventLoop, "httpx.AsyncClient"] = {}
+        self._async_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """True when an API key is configured."""
+        return bool(self.api_key)
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for the given attempt."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _slot(self):
+        if self.rate_limiter is None:
+            return contextlib.nullcontext(Permit())
+        return self.rate_limiter.slot()
+
+    def _aslot(self):
+        if self.rate_limiter is None:
+            return contextlib.nullcontext(Permit())
+        return self.rate_limiter.aslot()
+
+    def search_json(self, query: str) -> Dict[str, Any]:
+        """Run a query and return the raw JSON response."""
+        params = {"q": query, "engine": self.engine, "api_key": self.api_key, "output": "json"}
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.max_retries + 1):
+            wait = None
+            try:
+                with self._slot() as permit:
+                    response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+                    if response.status_code == 429:
+                        wait = _retry_after(response.headers)
+                        permit.overloaded(wait)
+                if response.status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                    return response.json()
+                last_error = SearchError(f"SerpAPI returned HTTP {response.status_code}")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+            except requests.HTTPError as e:
+                raise SearchError(str(e)) from e
+
+            if attempt < self.max_retries:
+                time.sleep(max(wait or 0.0, self._backoff(attempt)))
+
+        raise SearchError(f"Search failed after {self.max_retries + 1} attempts: {last_error}")
+
+    def _process(self, query: str, res: Dict[str, Any]) -> str:
+        raise_for_error(res)
+        return process_results(res, query, self.token_budget)
+
+    def search(self, query: str) -> str:
+        """Run a query and return the processed result text."""
+        return self._process(query, self.search_json(query))
+
+    def top_links(self, query: str, n: int = 3) -> List[str]:
+        """URLs of the first `n` organic results for a query."""
+        res = self.search_json(query)
+        raise_for_error(res)
+        return _links(res, n)
+
+    def _get_async_client(self) -> "httpx.AsyncClient":
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                # A finished loop's pool can no longer be closed; forget it rather than keep it alive
+                for closed in [other for other in self._async_clients if other.is_closed()]:
+                    del self._async_clients[closed]
+                client = self._async_clients[loop] = httpx.AsyncClient(
+                    timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+                    limits=httpx.Limits(
+                        max_connections=self._pool_size,
+                        max_keepalive_connections=self._pool_size,
+                    ),
+                )
+            return client
+
+    async def asearch_json(self, query: str) -> Dict[str, Any]:
+        """Async variant of search_json using a pooled httpx client."""
+        import httpx
+
+        params = {"q": query, "engine": self.engine, "api_key": self.api_key, "output": "json"}
+        client = self._get_async_client()
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.max_retries + 1):
+            wait = None
+            try:
+                async with self._aslot() as permit:
+                    response = await client.get(self.base_url, params=params)
+                    if response.status_code == 429:
+                        wait = _retry_after(response.headers)
+                        permit.overloaded(wait)
+                if response.status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                    return response.json()
+                last_error = SearchError(f"SerpAPI returned HTTP {response.status_code}")
+            except (httpx.ConnectError, httpx.TimeoutException, httpx.RemoteProtocolError) as e:
+                last_error = e
+            except httpx.HTTPStatusError as e:
+                raise SearchError(str(e)) from e
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(max(wait or 0.0, self._backoff(attempt)))
+
+        raise SearchError(f"Search failed after {self.max_retries + 1} attempts: {last_error}")
+
+    async def asearch(self, query: str) -> str:
+        """Async variant of search."""
+        return self._process(query, await self.asearch_json(query))
+
+    async def atop_links(self, query: str, n: int = 3) -> List[str]:
+        """Async variant of top_links."""
+        res = await self.asearch_json(query)
+        raise_for_error(res)
+        return _links(res, n)
+
+    def close(self) -> None:
+        """Close pooled connections."""
+        self.session.close()
+
+    async def aclose(self) -> None:
+        """Close the running event loop's async connection pool; call it before the loop ends."""
+        with self._async_lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+_default_client: Optional[SearchClient] = None
+
+
+def get_search_client() -> SearchClient:
+    """Return the process-wide search client, creating it on first use."""
+    global _default_client
+    if _default_client is None:
+        _default_client = SearchClient(
+            timeout=float(os.getenv("SEARCH_TIMEOUT", "10")),
+            max_retries=int(os.getenv("SEARCH_MAX_RETRIES", "3")),
+            rate_limiter=get_rate_limiter("serpapi"),
+            token_budget=int(os.getenv("SEARCH_TOKEN_BUDGET", "300")),
+        )
+    return _default_client
+
+
+async def aclose_search_client() -> None:
+    """Close the process-wide client's pool for the running event loop, if the client exists."""
+    if _default_client is not None:
+        await _default_client.aclose()
@@ -0,0 +1,185 @@
+"""
+Post-processing of SerpAPI responses before they reach the LLM.
+Every ToolMessage is re-sent on each later turn of the ReAct loop, so the
+result text is kept small: snippets are parsed out of the JSON, near
+duplicates (syndicated copies, the same sentence on several sites) are
+dropped with MinHash over word shingles, the rest are ranked against the
+query with BM25 and cut to a per-call token budget.
+"""
+
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+
+from nodes.memory import estimate_tokens
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an the is are was were be been of in on at to for and or what which who how do does did "
+    "with by from as it its this that".split()
+)
+_PRIME = np.uint64((1 << 61) - 1)
+_MASK32 = (1 << 32) - 1
+
+# Answer boxes and knowledge panels are usually the most direct answer
+_KIND_PRIOR = {"answer_box": 2.0, "knowledge_graph": 1.0, "sports": 1.0}
+
+
+def _domain(link: Optional[str]) -> str:
+    netloc = urlparse(link).netloc if link else ""
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+def _snippet(kind: str, text: Any, position: int, title: str = "", link: Optional[str] = None) -> Dict[str, Any]:
+    if isinstance(text, list):
+        text = " ".join(str(t) for t in text)
+    return {"kind": kind, "text": " ".join(str(text).split()), "title": title, "source": _domain(link),
+            "position": position}
+
+
+def parse_results(res: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield snippets ({kind, text, title, source, position}) from a SerpAPI JSON response."""
+    answer_box = res.get("answer_box")
+    if isinstance(answer_box, list):
+        answer_box = answer_box[0] if answer_box else None
+    if isinstance(answer_box, dict):
+        text = answer_box.get("answer") or answer_box.get("snippet") or answer_box.get("snippet_highlighted_words")
+        if text:
+            yield _snippet("answer_box", text, 0, answer_box.get("title", ""), answer_box.get("link"))
+
+    spotlight = res.get("sports_results", {}).get("game_spotlight")
+    if spotlight:
+        yield _snippet("sports", spotlight, 0)
+
+    knowledge_graph = res.get("knowledge_graph", {})
+    if knowledge_graph:
+        title = knowledge_graph.get("title", "")
+        facts = [f"{key.replace('_', ' ')}: {value}" for key, value in knowledge_graph.items()
+                 if isinstance(key, str) and isinstance(value, str) and key not in ("title", "description", "type")
+                 and not key.endswith("_stick") and not key.endswith("link") and not value.startswith("http")]
+        parts = [knowledge_graph.get("description", "")] + facts
+        text = "; ".join(p.rstrip(".") for p in parts if p)
+        if text:
+            yield _snippet("knowledge_graph", f"{title}: {text}" if title else text, 0, title)
+
+    for position, result in enumerate(res.get("organic_results", []), start=1):
+        text = result.get("snippet") or result.get("snippet_highlighted_words") or result.get("rich_snippet")
+        if text:
+            yield _snippet("organic", text, position, result.get("title", ""), result.get("link"))
+
+    for position, result in enumerate(res.get("news_results", []) + res.get("top_stories", []), start=1):
+        text = result.get("snippet") or result.get("title")
+        if text:
+            yield _snippet("news", text, position, result.get("title", ""), result.get("link"))
+
+
+class MinHasher:
+    """MinHash signatures over word shingles; the fraction of equal slots estimates Jaccard similarity."""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # a, b < 2**32 keep a * h + b inside uint64 for 32-bit (crc32) shingle hashes
+        self.a = rng.integers(1, _MASK32, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _MASK32 >> 1, num_perm, dtype=np.uint64)
+        self.shingle_size = shingle_size
+
+    def signature(self, text: str) -> np.ndarray:
+        words = _WORD_RE.findall(text.lower())
+        k = self.shingle_size
+        shingles = {" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((np.outer(self.a, hashes) + self.b[:, None]) % _PRIME).min(axis=1)
+
+
+_default_hasher = MinHasher()
+
+
+def dedupe(snippets: Iterable[Dict[str, Any]], threshold: float = 0.6,
+           hasher: Optional[MinHasher] = None) -> Iterator[Dict[str, Any]]:
+    """Drop snippets whose estimated Jaccard similarity to an earlier one reaches `threshold`."""
+    hasher = hasher or _default_hasher
+    seen = set()
+    kept: List[np.ndarray] = []
+    for snippet in snippets:
+        key = " ".join(_WORD_RE.findall(snippet["text"].lower()))
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        signature = hasher.signature(snippet["text"])
+        if kept and (np.stack(kept) == signature).mean(axis=1).max() >= threshold:
+            continue
+        kept.append(signature)
+        yield snippet
+
+
+def _terms(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def rank(snippets: Iterable[Dict[str, Any]], query: str, k1: float = 1.2, b: float = 0.75) -> List[Dict[str, Any]]:
+    """
+    Order snippets by BM25 against the query (statistics from this result set),
+    plus a prior for answer boxes / knowledge panels and a small bonus for
+    SerpAPI's own ordering. Ties keep the original order.
+    """
+    snippets = list(snippets)
+    if not snippets:
+        return snippets
+    docs = [Counter(_terms(f"{s['title']} {s['text']}")) for s in snippets]
+    lengths = [sum(doc.values()) for doc in docs]
+    avg_length = sum(lengths) / len(lengths) or 1.0
+    query_terms = set(_terms(query))
+    n = len(docs)
+    idf = {t: math.log(1 + (n - df + 0.5) / (df + 0.5))
+           for t in query_terms for df in [sum(1 for doc in docs if t in doc)]}
+
+    def score(i: int) -> float:
+        doc, snippet = docs[i], snippets[i]
+        bm25 = sum(idf[t] * doc[t] * (k1 + 1) / (doc[t] + k1 * (1 - b + b * lengths[i] / avg_length))
+                   for t in query_terms if t in doc)
+        return bm25 + _KIND_PRIOR.get(snippet["kind"], 0.0) + 0.5 / (1 + snippet["position"])
+
+    order = sorted(range(n), key=lambda i: -score(i))
+    return [snippets[i] for i in order]
+
+
+def _line(number: int, snippet: Dict[str, Any], text: Optional[str] = None) -> str:
+    source = f" ({snippet['source']})" if snippet["source"] else ""
+    return f"{number}. {text if text is not None else snippet['text']}{source}"
+
+
+def truncate(snippets: Iterable[Dict[str, Any]], token_budget: int, min_tokens: int = 12) -> Iterator[str]:
+    """
+    Yield numbered result lines until `token_budget` is spent. The snippet that
+    crosses the budget is cut at a word boundary if at least `min_tokens` remain.
+    """
+    remaining = token_budget
+    for number, snippet in enumerate(snippets, start=1):
+        line = _line(number, snippet)
+        cost = estimate_tokens(line)
+        if cost > remaining:
+            if remaining >= min_tokens or number == 1:
+                yield _cut(number, snippet, remaining)
+            return
+        yield line
+        remaining -= cost
+
+
+def _cut(number: int, snippet: Dict[str, Any], tokens: int) -> str:
+    overhead = len(_line(number, snippet, "")) + 3
+    chars = max(0, tokens * 4 - overhead)
+    text = snippet["text"][:chars].rsplit(" ", 1)[0]
+    return _line(number, snippet, text + "...")
+
+
+def process_results(res: Dict[str, Any], query: str, token_budget: int = 300,
+                    dedupe_threshold: float = 0.6) -> str:
+    """SerpAPI JSON -> ranked, de-duplicated result text of at most about `token_budget` tokens."""
+    ranked = rank(dedupe(parse_results(res), dedupe_threshold), query)
+    lines = list(truncate(ranked, token_budget))
+    return "\n".join(lines) if lines else "No good search result found"
@@ -0,0 +1,182 @@
+"""
+Cross-process cache tier for the worker pool (nodes/worker_pool.py).
+A SQLite file in WAL mode with a large `mmap_size`: every process maps the
+same pages, so a read is a B-tree walk over shared memory and a value written
+by one worker is visible to the others on their next lookup. SharedSearchCache
+and SharedAnswerCache keep each process's in-memory tier in front of it and
+fall back to the shared store on a local miss.
+"""
+
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from nodes.answer_cache import SemanticAnswerCache
+from nodes.search_cache import SearchCache, normalize_query
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, stored_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_age ON entries (stored_at);
+"""
+
+
+class SharedStore:
+    """Namespaced key -> text store shared by every process that opens the same file."""
+
+    def __init__(self, path: str, mmap_bytes: int = 256 * 1024 * 1024, max_entries: int = 100000,
+                 busy_timeout: float = 5.0):
+        """
+        Args:
+            path: SQLite file the processes share.
+            mmap_bytes: Bytes of the file each process maps instead of reading through the page cache.
+            max_entries: Entries kept; the oldest are trimmed every `max_entries // 10` writes (0 keeps all).
+            busy_timeout: Seconds a writer waits for another process's write lock.
+        """
+        self.path = path
+        self.mmap_bytes = mmap_bytes
+        self.max_entries = max_entries
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._writes = 0
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+        with contextlib.closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+        return conn
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread and process - SQLite handles must not cross a fork."""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            local.conn, local.pid = self._connect(), os.getpid()
+        return local.conn
+
+    def get(self, namespace: str, key: str, max_age: Optional[float] = None) -> Optional[Tuple[str, float]]:
+        """(value, stored_at) if present and not older than max_age seconds, else None."""
+        try:
+            row = self._conn.execute("SELECT value, stored_at FROM entries WHERE namespace = ? AND key = ?",
+                                     (namespace, key)).fetchone()
+        except sqlite3.Error:
+            self._stats["errors"] += 1
+            return None
+        if row is None or (max_age is not None and time.time() - row[1] > max_age):
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return row[0], row[1]
+
+    def set(self, namespace: str, key: str, value: str, stored_at: Optional[float] = None) -> None:
+        """Store a value; a busy or failing database only costs this write, never the caller's answer."""
+        conn = self._conn
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                             (namespace, key, value, time.time() if stored_at is None else stored_at))
+            self._stats["writes"] += 1
+            self._writes += 1
+            if self.max_entries and self._writes % max(1, self.max_entries // 10) == 0:
+                self.trim()
+        except sqlite3.Error:
+            self._stats["errors"] += 1
+
+    def trim(self) -> None:
+        """Delete the oldest entries beyond max_entries."""
+        with self._conn as conn:
+            conn.execute("DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY stored_at DESC "
+                         "LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        with self._conn as conn:
+            if namespace is None:
+                conn.execute("DELETE FROM entries")
+            else:
+                conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        """This process's hit/miss/write counters."""
+        return dict(self._stats)
+
+
+class SharedSearchCache(SearchCache):
+    """SearchCache whose second tier is a SharedStore instead of a private SQLite file."""
+
+    def __init__(self, store: SharedStore, namespace: str = "search", **kwargs: Any):
+        """
+        Args:
+            store: The shared store.
+            namespace: Key namespace in the store.
+            **kwargs: SearchCache arguments for the in-process tier (max_entries, ttl, stale_ttl).
+        """
+        super().__init__(**kwargs)
+        self.shared = store
+        self.namespace = namespace
+        self._stats["shared_hits"] = 0
+
+    def _disk_lookup(self, key: str) -> Optional[Tuple[str, float]]:
+        shared = self.shared.get(self.namespace, key, max_age=self.ttl + self.stale_ttl)
+        if shared is not None:
+            with self._lock:
+                self._stats["shared_hits"] += 1
+        return shared
+
+    @property
+    def _has_disk_tier(self) -> bool:
+        return True
+
+    def _persist(self, key: str, value: str, stored_at: float) -> None:
+        self.shared.set(self.namespace, key, value, stored_at)
+
+    def clear(self) -> None:
+        super().clear()
+        self.shared.clear(self.namespace)
+
+
+class SharedAnswerCache(SemanticAnswerCache):
+    """
+    SemanticAnswerCache that also shares answers by normalized question text.
+    Paraphrases are matched by each process's own vector index; an exact
+    repeat of a question answered by another process is found in the store.
+    """
+
+    def __init__(self, store: SharedStore, namespace: str = "answer", **kwargs: Any):
+        super().__init__(**kwargs)
+        self.shared = store
+        self.namespace = namespace
+        self._stats["shared_hits"] = 0
+
+    def lookup(self, question: str) -> Optional[Dict[str, Any]]:
+        hit = super().lookup(question)
+        if hit is not None or not self.cacheable(question):
+            return hit
+        shared = self.shared.get(self.namespace, normalize_query(question), max_age=self.ttl)
+        if shared is None:
+            return None
+        entry = json.loads(shared[0])
+        super().store(question, entry["answer"])
+        with self._lock:
+            self._stats["shared_hits"] += 1
+        return {**entry, "similarity": 1.0}
+
+    def store(self, question: str, answer: str, **metadata: Any) -> bool:
+        # The in-process store refuses partial answers, so they never reach the other workers either
+        if not super().store(question, answer, **metadata):
+            return False
+        self.shared.set(self.namespace, normalize_query(question),
+                        json.dumps({"question": question, "answer": answer}))
+        return True
@@ -0,0 +1,153 @@
+"""
+Single-flight request coalescing for tool calls.
+Concurrent calls with the same key share one in-flight execution: the first
+caller runs it and every caller that arrives before it finishes gets the same
+result (or exception). Nothing is cached once the call completes.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from langchain_core.tools import BaseTool
+
+from nodes.search_cache import normalize_query
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class _AsyncCall:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls, for threads and for asyncio tasks."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Tuple[int, Hashable], _AsyncCall] = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn() unless an identical call is already running; then wait for its result."""
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["executions"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async variant of do(); calls are shared within one event loop.
+        The shared call runs as its own task, so cancelling the caller that
+        started it does not fail the others; it is cancelled only once every
+        caller waiting on it has been.
+        """
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._async_calls.get(loop_key)
+            if call is None:
+                self._stats["executions"] += 1
+                call = self._async_calls[loop_key] = _AsyncCall(loop.create_task(fn()))
+                call.task.add_done_callback(lambda _task, call=call: self._forget(loop_key, call))
+            else:
+                self._stats["coalesced"] += 1
+            call.waiters += 1
+        try:
+            # shield: one waiter being cancelled must not cancel the shared call
+            return await asyncio.shield(call.task)
+        finally:
+            with self._lock:
+                call.waiters -= 1
+                abandoned = call.waiters == 0 and not call.task.done()
+                if abandoned:
+                    self._forget_locked(loop_key, call)
+            if abandoned:
+                call.task.cancel()
+
+    def _forget(self, loop_key: Tuple[int, Hashable], call: "_AsyncCall") -> None:
+        with self._lock:
+            self._forget_locked(loop_key, call)
+
+    def _forget_locked(self, loop_key: Tuple[int, Hashable], call: "_AsyncCall") -> None:
+        # A new call may already be running under the key once this one was abandoned
+        if self._async_calls.get(loop_key) is call:
+            del self._async_calls[loop_key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._calls) + len(self._async_calls)}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = {"calls": 0, "executions": 0, "coalesced": 0}
+
+
+def _call_key(tool_name: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Hashable:
+    """Tool name plus normalized arguments - "Python 3.12 " and "python 3.12" share a key."""
+    def norm(value):
+        return normalize_query(value) if isinstance(value, str) else repr(value)
+    return (tool_name, tuple(norm(a) for a in args), tuple(sorted((k, norm(v)) for k, v in kwargs.items())))
+
+
+def coalesce_tool(tool: BaseTool, flight: "SingleFlight") -> BaseTool:
+    """Copy of a func/coroutine tool whose identical concurrent calls share one execution."""
+    update: Dict[str, Any] = {}
+    func, coroutine = getattr(tool, "func", None), getattr(tool, "coroutine", None)
+    if func:
+        def coalesced(*args, **kwargs):
+            return flight.do(_call_key(tool.name, args, kwargs), lambda: func(*args, **kwargs))
+        update["func"] = coalesced
+    if coroutine:
+        async def acoalesced(*args, **kwargs):
+            return await flight.ado(_call_key(tool.name, args, kwargs), lambda: coroutine(*args, **kwargs))
+        update["coroutine"] = acoalesced
+    return tool.model_copy(update=update)
+
+
+_default_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Process-wide coalescer shared by every tool set from get_tools()."""
+    return _default_flight
+
+
+def single_flight_enabled() -> bool:
+    return os.getenv("TOOL_SINGLE_FLIGHT", "1").lower() not in ("0", "false", "no")
@@ -0,0 +1,190 @@
+"""
+Streaming output for the compiled agent graphs.
+Turns a graph run into a flat sequence of events - answer tokens as they
+arrive, tool starts and ends, and a final event carrying the end state and
+time-to-first-token - so a CLI can print progressively and an HTTP front end
+can forward the same events as server-sent events.
+"""
+
+import json
+import sys
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+from nodes.answer_cache import is_partial
+
+# Event shapes:
+#   {"event": "token", "text": str}
+#   {"event": "tool_start", "name": str, "input": Any}
+#   {"event": "tool_end", "name": str, "output": str}
+#   {"event": "done", "result": dict, "ttft": Optional[float], "elapsed": float}
+Event = Dict[str, Any]
+
+
+def _chunk_text(chunk: Any) -> str:
+    """Text of a message chunk; Gemini may send content as a list of parts."""
+    content = getattr(chunk, "content", "")
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part.get("text", "") if isinstance(part, dict) else str(part)
+        for part in content
+    )
+
+
+def _cached(agent, inputs: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Answer-cache hit for agents fronted by a CachedAgent (streams it as a single token)."""
+    lookup = getattr(agent, "cached_result", None)
+    return lookup(inputs) if lookup and inputs is not None else None
+
+
+def _remember(agent, inputs: Optional[Dict[str, Any]], result: Dict[str, Any]) -> None:
+    remember = getattr(agent, "remember", None)
+    if remember and inputs is not None and result and not is_partial(result):
+        remember(inputs, result)
+
+
+class _Timer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.ttft: Optional[float] = None
+
+    def token(self, text: str) -> Event:
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+        return {"event": "token", "text": text}
+
+    def done(self, result: Dict[str, Any]) -> Event:
+        return {"event": "done", "result": result, "ttft": self.ttft,
+                "elapsed": time.perf_counter() - self.started}
+
+
+def stream_answer(agent, inputs: Optional[Dict[str, Any]], config: Optional[Dict[str, Any]] = None) -> Iterator[Event]:
+    """
+    Run the agent and yield events as the graph progresses.
+    Tokens come from stream_mode="messages" (a model that does not stream
+    yields its whole reply as one token event), tool starts from the tool
+    calls in each node update, and the end state from stream_mode="values".
+    """
+    timer = _Timer()
+    cached = _cached(agent, inputs)
+    if cached is not None:
+        yield timer.token(_chunk_text(cached["messages"][-1]))
+        yield timer.done(cached)
+        return
+    result: Dict[str, Any] = {}
+    modes = ["messages", "updates", "values"]
+    for mode, payload in agent.stream(inputs, config=config, stream_mode=modes):
+        if mode == "messages":
+            message, _ = payload
+            if isinstance(message, AIMessage):
+                text = _chunk_text(message)
+                if text:
+                    yield timer.token(text)
+            elif isinstance(message, ToolMessage):
+                yield {"event": "tool_end", "name": message.name, "output": message.content}
+        elif mode == "updates":
+            for update in (payload or {}).values():
+                if not isinstance(update, dict):
+                    continue
+                for message in update.get("messages", []):
+                    if isinstance(message, AIMessage):
+                        for call in message.tool_calls:
+                            yield {"event": "tool_start", "name": call["name"], "input": call["args"]}
+        else:
+            result = payload
+    _remember(agent, inputs, result)
+    yield timer.done(result)
+
+
+async def astream_answer(agent, inputs: Optional[Dict[str, Any]], config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Event]:
+    """Async variant of stream_answer built on astream_events (v2)."""
+    timer = _Timer()
+    cached = _cached(agent, inputs)
+    if cached is not None:
+        yield timer.token(_chunk_text(cached["messages"][-1]))
+        yield timer.done(cached)
+        return
+    result: Dict[str, Any] = {}
+    async for event in agent.astream_events(inputs, config=config, version="v2"):
+        kind = event["event"]
+        if kind == "on_chat_model_stream":
+            text = _chunk_text(event["data"].get("chunk"))
+            if text:
+                yield timer.token(text)
+        elif kind == "on_tool_start":
+            yield {"event": "tool_start", "name": event["name"], "input": event["data"].get("input")}
+        elif kind == "on_tool_end":
+            output = event["data"].get("output")
+            yield {"event": "tool_end", "name": event["name"],
+                   "output": output.content if isinstance(output, ToolMessage) else str(output)}
+        elif kind == "on_chain_end" and not event.get("parent_ids"):
+            result = event["data"].get("output") or {}
+    _remember(agent, inputs, result)
+    yield timer.done(result)
+
+
+def format_sse(event: Event) -> str:
+    """Encode an event as a server-sent-events frame (the end state is not sent)."""
+    payload = {k: v for k, v in event.items() if k not in ("event", "result")}
+    if event["event"] == "done":
+        messages = event["result"].get("messages", [])
+        payload["answer"] = _chunk_text(messages[-1]) if messages else ""
+    return f"event: {event['event']}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+class StreamPrinter:
+    """Prints stream events to the terminal as they arrive."""
+
+    def __init__(self, out=None, preview_chars: int = 80):
+        self.out = out or sys.stdout
+        self.preview_chars = preview_chars
+        self._in_answer = False
+
+    def _line(self, text: str) -> None:
+        if self._in_answer:
+            self.out.write("\n")
+            self._in_answer = False
+        self.out.write(text + "\n")
+        self.out.flush()
+
+    def __call__(self, event: Event) -> None:
+        kind = event["event"]
+        if kind == "token":
+            self._in_answer = True
+            self.out.write(event["text"])
+            self.out.flush()
+        elif kind == "tool_start":
+            self._line(f"🔧 {event['name']}({json.dumps(event['input'], default=str)[:self.preview_chars]})")
+        elif kind == "tool_end":
+            output = " ".join(str(event["output"]).split())
+            self._line(f"   ↳ {output[:self.preview_chars]}{'...' if len(output) > self.preview_chars else ''}")
+        elif kind == "done":
+            ttft = f"{event['ttft']:.2f}s" if event["ttft"] is not None else "n/a"
+            self._line(f"\n⚡ Time to first token: {ttft} | total: {event['elapsed']:.2f}s")
+
+
+def run_streaming(agent, inputs: Optional[Dict[str, Any]], config: Optional[Dict[str, Any]] = None,
+                  printer: Optional[StreamPrinter] = None) -> Dict[str, Any]:
+    """Stream one run to the terminal and return the final graph state."""
+    printer = printer or StreamPrinter()
+    result: Dict[str, Any] = {}
+    for event in stream_answer(agent, inputs, config):
+        printer(event)
+        if event["event"] == "done":
+            result = event["result"]
+    return result
+
+
+async def arun_streaming(agent, inputs: Optional[Dict[str, Any]], config: Optional[Dict[str, Any]] = None,
+                         printer: Optional[StreamPrinter] = None) -> Dict[str, Any]:
+    """Async variant of run_streaming."""
+    printer = printer or StreamPrinter()
+    result: Dict[str, Any] = {}
+    async for event in astream_answer(agent, inputs, config):
+        printer(event)
+        if event["event"] == "done":
+            result = event["result"]
+    return result
@@ -0,0 +1,126 @@
+"""
+Parallel tool execution for custom graph nodes.
+Dispatches every tool call from one LLM turn at once, with per-tool timeouts
+and concurrency limits, and returns ToolMessages in the original call order.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import BaseTool
+
+
+class ParallelToolExecutor:
+    """Runs a batch of tool calls concurrently on a bounded thread pool."""
+
+    def __init__(
+        self,
+        tools: Sequence[BaseTool],
+        max_workers: int = 8,
+        default_timeout: float = 30.0,
+        timeouts: Optional[Dict[str, float]] = None,
+        concurrency_limits: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Args:
+            tools: Tools that may be called, looked up by name.
+            max_workers: Size of the shared thread pool.
+            default_timeout: Seconds before a tool call's result is given up on. A timed-out
+                call gets an error ToolMessage, but a thread that is already running the
+                tool cannot be stopped: it keeps its pool thread (and concurrency slot)
+                until the tool returns. Async calls are cancelled.
+            timeouts: Per-tool overrides of default_timeout.
+            concurrency_limits: Max simultaneous calls per tool name.
+        """
+        self.tools = {tool.name: tool for tool in tools}
+        self.default_timeout = default_timeout
+        self.timeouts = timeouts or {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        limits = concurrency_limits or {}
+        self._limits = {name: threading.BoundedSemaphore(n) for name, n in limits.items()}
+        self._async_limits: Dict[str, asyncio.Semaphore] = {}
+        self._concurrency_limits = limits
+
+    def _timeout_for(self, name: str, cap: Optional[float] = None) -> float:
+        timeout = self.timeouts.get(name, self.default_timeout)
+        return timeout if cap is None else min(timeout, cap)
+
+    def _error_message(self, call: Dict[str, Any], error: str) -> ToolMessage:
+        return ToolMessage(content=error, name=call["name"], tool_call_id=call["id"], status="error")
+
+    def _run_one(self, call: Dict[str, Any]) -> ToolMessage:
+        tool = self.tools[call["name"]]
+        limit = self._limits.get(call["name"])
+        if limit is None:
+            return tool.invoke({**call, "type": "tool_call"})
+        with limit:
+            return tool.invoke({**call, "type": "tool_call"})
+
+    def execute(self, tool_calls: List[Dict[str, Any]], timeout: Optional[float] = None) -> List[ToolMessage]:
+        """
+        Run all tool calls at once; the batch takes as long as its slowest call.
+        `timeout` caps every call's timeout (e.g. the time left in a request budget).
+        """
+        futures = []
+        for call in tool_calls:
+            if call["name"] not in self.tools:
+                futures.append(None)
+            else:
+                futures.append((self._pool.submit(self._run_one, call), time.monotonic()))
+
+        results = []
+        for call, submitted in zip(tool_calls, futures):
+            if submitted is None:
+                results.append(self._error_message(call, f"Error: unknown tool '{call['name']}'."))
+                continue
+            future, started = submitted
+            limit = self._timeout_for(call["name"], timeout)
+            remaining = max(0.0, limit - (time.monotonic() - started))
+            try:
+                results.append(future.result(timeout=remaining))
+            except FutureTimeoutError:
+                # Only stops a call still queued for a thread; a running one finishes in the background
+                future.cancel()
+                results.append(self._error_message(call, f"Error: {call['name']} timed out after {limit:g}s."))
+            except Exception as e:
+                results.append(self._error_message(call, f"Error: {call['name']} failed: {e}"))
+        return results
+
+    async def _arun_one(self, call: Dict[str, Any], timeout: Optional[float] = None) -> ToolMessage:
+        tool = self.tools[call["name"]]
+        limit = self._async_limits.get(call["name"])
+        if limit is None and call["name"] in self._concurrency_limits:
+            limit = self._async_limits[call["name"]] = asyncio.Semaphore(self._concurrency_limits[call["name"]])
+        try:
+            if limit is None:
+                coro = tool.ainvoke({**call, "type": "tool_call"})
+            else:
+                async def limited():
+                    async with limit:
+                        return await tool.ainvoke({**call, "type": "tool_call"})
+                coro = limited()
+            return await asyncio.wait_for(coro, timeout=self._timeout_for(call["name"], timeout))
+        except asyncio.TimeoutError:
+            return self._error_message(
+                call, f"Error: {call['name']} timed out after {self._timeout_for(call['name'], timeout):g}s."
+            )
+        except Exception as e:
+            return self._error_message(call, f"Error: {call['name']} failed: {e}")
+
+    async def aexecute(self, tool_calls: List[Dict[str, Any]], timeout: Optional[float] = None) -> List[ToolMessage]:
+        """Async variant of execute using one task per tool call."""
+        async def run(call):
+            if call["name"] not in self.tools:
+                return self._error_message(call, f"Error: unknown tool '{call['name']}'.")
+            return await self._arun_one(call, timeout)
+
+        return list(await asyncio.gather(*(run(call) for call in tool_calls)))
+
+    def shutdown(self) -> None:
+        """Stop the worker threads."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -3,23 +3,131 @@ Tool definitions using LangChain tools for ReAct agent.
 Simplified and optimized for the ReAct pattern.
 """
 
+import json
 import os
-import requests
-from typing import List
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 from langchain_core.tools import Tool
-from langchain_community.utilities import SerpAPIWrapper
+from nodes.search_cache import SearchCache
+from nodes.local_index import LocalIndex, get_local_index
+from nodes.page_fetcher import PageFetcher, aclose_page_fetcher, get_page_fetcher, select_blocks
+from nodes.search_processing import truncate
+from nodes.search_client import SearchClient, aclose_search_client, get_search_client
+from nodes.calculator import CalculatorError, calculate, calculate_over, format_result
+from nodes.instrumentation import get_instrumentation
+from nodes.rate_limiter import rate_limit_metrics
+from nodes.single_flight import coalesce_tool, get_single_flight, single_flight_enabled
 
-def web_search_function(query: str) -> str:
-    """Perform web search using SerpAPI with better error handling."""
-    try:
-        api_key = os.getenv("SERPAPI_API_KEY")
-        if api_key:
-            search = SerpAPIWrapper(serpapi_api_key=api_key)
-            results = search.run(query)
-            return results
-        else:
-            # Enhanced mock search for demo purposes
-            return f"""Mock search results for: "{query}"
+def search_cache_settings() -> Dict[str, Any]:
+    """In-memory SearchCache arguments from the SEARCH_CACHE_* env vars."""
+    return {
+        "max_entries": int(os.getenv("SEARCH_CACHE_SIZE", "512")),
+        "ttl": float(os.getenv("SEARCH_CACHE_TTL", "900")),
+        "stale_ttl": float(os.getenv("SEARCH_CACHE_STALE_TTL", "0")),
+    }
+
+# Shared search result cache - repeated queries skip the SerpAPI round-trip.
+# Built on first use, so importing the tools opens no SQLite file
+_search_cache: Optional[SearchCache] = None
+_search_cache_lock = threading.Lock()
+
+_LOCAL_TOKEN_BUDGET = int(os.getenv("LOCAL_SEARCH_TOKEN_BUDGET", "400"))
+_FETCH_TOKEN_BUDGET = int(os.getenv("FETCH_TOKEN_BUDGET", "1200"))
+_FETCH_TOP_N = int(os.getenv("FETCH_PAGES_TOP_N", "3"))
+
+def configure_search_cache(cache: SearchCache) -> None:
+    """Replace the shared search cache (e.g. with a persistent or test instance)."""
+    global _search_cache
+    _search_cache = cache
+
+def build_search_cache() -> SearchCache:
+    """A new SearchCache from the SEARCH_CACHE_* env vars, including its SQLite tier."""
+    return SearchCache(
+        **search_cache_settings(),
+        db_path=os.getenv("SEARCH_CACHE_PATH") or None,
+        max_disk_entries=int(os.getenv("SEARCH_CACHE_DISK_SIZE", "100000")),
+    )
+
+def get_search_cache() -> SearchCache:
+    """Return the shared search cache, creating it on first use."""
+    global _search_cache
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                _search_cache = build_search_cache()
+    return _search_cache
+
+# Calculator input patterns - compiled once, not on every call
+_PREFIX_RE = re.compile(r'(?:calculate|what\s+is|compute|solve)\s+(.+)')
+_URL_RE = re.compile(r'https?://[^\s,<>"\']+')
+_PERCENT_OF_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(?:%|percent)\s*of\s*(\d+(?:\.\d+)?)')
+_PERCENT_SIGN_RE = re.compile(r'%(?!\s*[\d(.])')
+# "100 - 20%": 80 or 99.8? Refused rather than guessed
+_PERCENT_OFFSET_RE = re.compile(r'[+\-]\s*\d+(?:\.\d+)?\s*%(?!\s*[\d(.])')
+_MOD_RE = re.compile(r'\bmod(?:ulo)?\b')
+_THOUSANDS_RE = re.compile(r'(?<=\d),(?=\d{3}\b)')
+_TIMES_RE = re.compile(r'(?<=[\d)])\s*[x×]\s*(?=[\d(])')
+
+# Batch mode: "x**2 for x in [1, 2, 3]", "average of 3, 5, 7", "90th percentile of 1, 2, 3"
+_FOR_IN_RE = re.compile(r'^(.+?)\s+for\s+([a-z_]\w*)\s+in\s+(.+)$')
+_NUMBER_LIST = r'(-?\d+(?:\.\d+)?(?:\s*,?\s*(?:and\s+)?-?\d+(?:\.\d+)?)+)'
+_STATS_WORD_RE = re.compile(
+    r'\b(mean|average|avg|median|standard deviation|stdev|std|variance|sum|total|'
+    r'minimum|min|maximum|max|statistics|stats|summary)\s+(?:of\s+)?(?:the\s+)?(?:numbers\s+)?'
+    + _NUMBER_LIST + r'[\s?.!]*$'
+)
+_PERCENTILE_WORD_RE = re.compile(r'\b(\d+(?:\.\d+)?)(?:st|nd|rd|th)?\s+percentile\s+of\s+(?:the\s+)?' + _NUMBER_LIST)
+_SIGNED_NUMBER_RE = re.compile(r'-?\d+(?:\.\d+)?')
+_STATS_ALIASES = {
+    'standard deviation': 'std', 'minimum': 'min', 'maximum': 'max',
+    'statistics': 'describe', 'stats': 'describe', 'summary': 'describe',
+}
+
+def _batch_calculation(text: str) -> Optional[str]:
+    """Handle list/statistics requests in one call. Returns None if the text is not one."""
+    match = _FOR_IN_RE.match(text)
+    if match:
+        body, name, values_text = match.groups()
+        values_text = values_text.rstrip(' ?.!')
+        if not values_text.startswith(('[', 'range(')):
+            values_text = f"[{values_text}]"
+        result = calculate_over(body, name, calculate(values_text))
+        return f"Calculation: {body} for {name} in {values_text} = {format_result(result)}"
+    
+    match = _PERCENTILE_WORD_RE.search(text)
+    if match:
+        numbers = ', '.join(_SIGNED_NUMBER_RE.findall(match.group(2)))
+        expression = f"percentile([{numbers}], {match.group(1)})"
+        return f"Calculation: {expression} = {format_result(calculate(expression))}"
+    
+    match = _STATS_WORD_RE.search(text)
+    if match:
+        function = _STATS_ALIASES.get(match.group(1), match.group(1))
+        numbers = ', '.join(_SIGNED_NUMBER_RE.findall(match.group(2)))
+        expression = f"{function}([{numbers}])"
+        return f"Calculation: {expression} = {format_result(calculate(expression))}"
+    return None
+
+def _normalize_math(text: str) -> str:
+    """Normalize common notation: 1,000 -> 1000, 3 x 4 -> 3 * 4, 50% -> 50/100, trailing "?" / "="."""
+    # Cheap membership checks first - most inputs need none of the rewrites.
+    # Commas inside brackets separate arguments, so they are left alone there.
+    if ',' in text and '(' not in text and '[' not in text:
+        text = _THOUSANDS_RE.sub('', text)
+    if 'x' in text or '×' in text:
+        text = _TIMES_RE.sub('*', text)
+    if '÷' in text:
+        text = text.replace('÷', '/')
+    if 'mod' in text:
+        text = _MOD_RE.sub('%', text)
+    if '%' in text:
+        text = _PERCENT_SIGN_RE.sub('/100', text)
+    return text.rstrip(' ?.!=')
+
+def _mock_search_results(query: str) -> str:
+    """Enhanced mock search for demo purposes."""
+    return f"""Mock search results for: "{query}"
 
 Top Results:
 1. Recent information about {query} - This would contain current data from web search
@@ -27,65 +135,186 @@ Top Results:
 3. Latest developments in {query} - Up-to-date news and trends
 
 Note: Set SERPAPI_API_KEY environment variable for real web search results."""
+
+def web_search_function(query: str, client: Optional[SearchClient] = None) -> str:
+    """Perform web search using SerpAPI with better error handling."""
+    try:
+        client = client or get_search_client()
+        if client.enabled:
+            return get_search_cache().get_or_compute(query, client.search)
+        else:
+            return _mock_search_results(query)
+    except Exception as e:
+        return f"Web search encountered an error: {str(e)}. Please try rephrasing your query."
+
+async def aweb_search_function(query: str, client: Optional[SearchClient] = None) -> str:
+    """Async web search - awaits the network call instead of blocking the event loop."""
+    try:
+        client = client or get_search_client()
+        if client.enabled:
+            return await get_search_cache().aget_or_compute(query, client.asearch)
+        else:
+            return _mock_search_results(query)
     except Exception as e:
         return f"Web search encountered an error: {str(e)}. Please try rephrasing your query."
 
 def calculator_function(expression: str) -> str:
     """Perform safe mathematical calculations with enhanced capabilities."""
     try:
-        # Clean the expression - allow mathematical operations
-        import re
-        
         # Extract mathematical expressions from natural language
         # Handle common patterns like "calculate X", "what is X", etc.
         expression = expression.lower()
         
-        # Remove common words and extract mathematical parts
-        math_patterns = [
-            r'calculate\s+(.+)',
-            r'what\s+is\s+(.+)',
-            r'compute\s+(.+)',
-            r'solve\s+(.+)',
-            r'(\d+(?:\.\d+)?\s*[+\-*/]\s*\d+(?:\.\d+)?(?:\s*[+\-*/]\s*\d+(?:\.\d+)?)*)',
-            r'(\d+(?:\.\d+)?(?:\s*%|\s+percent))',
-        ]
-        
-        math_expression = None
-        for pattern in math_patterns:
-            match = re.search(pattern, expression)
-            if match:
-                math_expression = match.group(1).strip()
-                break
+        match = _PREFIX_RE.search(expression)
+        math_expression = match.group(1).strip() if match else expression
         
-        if not math_expression:
-            math_expression = expression
+        # Lists, statistics and "expr for x in values" - one call instead of many
+        batch_result = _batch_calculation(math_expression)
+        if batch_result is not None:
+            return batch_result
         
-        # Handle percentage calculations
-        if '%' in math_expression or 'percent' in math_expression:
-            # Extract numbers for percentage calculations
-            numbers = re.findall(r'\d+(?:\.\d+)?', math_expression)
-            if len(numbers) >= 2:
-                base = float(numbers[0])
-                percentage = float(numbers[1])
-                result = (base * percentage) / 100
-                return f"Result: {percentage}% of {base} = {result}"
+        # Handle percentage calculations ("15% of 250"); "a % b" is modulo
+        percent_of = ('%' in math_expression or 'percent ' in math_expression) and _PERCENT_OF_RE.search(math_expression)
+        if percent_of:
+            percentage = float(percent_of.group(1))
+            base = float(percent_of.group(2))
+            result = (base * percentage) / 100
+            return f"Result: {percentage}% of {base} = {result}"
         
-        # Clean expression for safe evaluation
-        allowed_chars = "0123456789+-*/.() "
-        clean_expression = ''.join(c for c in math_expression if c in allowed_chars)
+        if '%' in math_expression and _PERCENT_OFFSET_RE.search(math_expression):
+            raise CalculatorError(
+                "Ambiguous percentage in 'a - b%'; write 'a * (1 - b/100)' to take b% off, or 'a - b/100'")
         
+        clean_expression = _normalize_math(math_expression)
         if not clean_expression.strip():
             return "No valid mathematical expression found. Please provide a mathematical calculation."
         
-        # Safe evaluation
-        result = eval(clean_expression, {"__builtins__": {}})
-        return f"Calculation: {clean_expression} = {result}"
+        # Anything the engine can't parse is reported, not guessed at, so the LLM can rephrase it
+        result = calculate(clean_expression)
+        return f"Calculation: {clean_expression} = {format_result(result)}"
         
     except Exception as e:
         return f"Calculation error: {str(e)}. Please check your mathematical expression."
 
-def get_tools() -> List[Tool]:
-    """Get all available tools for the ReAct agent."""
+async def acalculator_function(expression: str) -> str:
+    """Async calculator - pure CPU and fast, so it runs inline on the event loop."""
+    return calculator_function(expression)
+
+def local_search_function(query: str, index: Optional[LocalIndex] = None, k: int = 5) -> str:
+    """Search the local document index - no network round-trip."""
+    try:
+        index = index or get_local_index()
+        if index is None:
+            return "Local knowledge base is not configured. Use web_search instead."
+        hits = index.search(query, k=k)
+        if not hits:
+            return "No matching documents in the local knowledge base. Try web_search."
+        snippets = [{"kind": "local", "text": hit["text"], "title": hit.get("title", ""),
+                     "source": hit.get("source", ""), "position": i} for i, hit in enumerate(hits)]
+        return "\n".join(truncate(snippets, _LOCAL_TOKEN_BUDGET))
+    except Exception as e:
+        return f"Local search encountered an error: {str(e)}. Try web_search instead."
+
+async def alocal_search_function(query: str, index: Optional[LocalIndex] = None) -> str:
+    """Async local search - memory-mapped and millisecond-fast, so it runs inline on the event loop."""
+    return local_search_function(query, index)
+
+def _fetch_targets(text: str) -> Tuple[str, List[str]]:
+    """(query, urls) from the tool input: explicit URLs, or a query whose top results are fetched."""
+    urls = [url.rstrip('.);]') for url in _URL_RE.findall(text)]
+    query = _URL_RE.sub(' ', text) if urls else text
+    return ' '.join(query.split()), urls
+
+def _search_links(query: str, client: SearchClient) -> List[str]:
+    # Result links are cached like search results, so fetching after web_search costs no extra SerpAPI call
+    return json.loads(get_search_cache().get_or_compute(
+        f"links: {query}", lambda _: json.dumps(client.top_links(query, _FETCH_TOP_N))))
+
+async def _asearch_links(query: str, client: SearchClient) -> List[str]:
+    async def compute(_: str) -> str:
+        return json.dumps(await client.atop_links(query, _FETCH_TOP_N))
+    return json.loads(await get_search_cache().aget_or_compute(f"links: {query}", compute))
+
+def _format_pages(pages: List[dict], query: str, token_budget: int) -> str:
+    """Relevant text of each fetched page; the token budget is split evenly between them."""
+    fetched = [page for page in pages if page.get("blocks")]
+    per_page = token_budget // max(1, len(fetched))
+    sections = []
+    for number, page in enumerate(pages, start=1):
+        if page.get("error") or not page.get("blocks"):
+            sections.append(f"{number}. {page['url']} - could not read page: {page.get('error', 'no text found')}")
+            continue
+        text = "\n".join(select_blocks(page, per_page, query))
+        sections.append(f"{number}. {page['title'] or page['url']} ({page['url']})\n{text}")
+    return "\n\n".join(sections)
+
+def fetch_pages_function(text: str, fetcher: Optional[PageFetcher] = None,
+                         client: Optional[SearchClient] = None) -> str:
+    """Fetch the given URLs (or the top results for a query) concurrently and return their main text."""
+    try:
+        fetcher = fetcher or get_page_fetcher()
+        query, urls = _fetch_targets(text)
+        if not urls:
+            client = client or get_search_client()
+            if not client.enabled:
+                return "Page fetching needs URLs or web search (set SERPAPI_API_KEY). Use web_search instead."
+            urls = _search_links(query, client)
+        if not urls:
+            return f"No pages found for: {query}. Try web_search with a different query."
+        return _format_pages(fetcher.fetch_many(urls), query, _FETCH_TOKEN_BUDGET)
+    except Exception as e:
+        return f"Page fetch encountered an error: {str(e)}. Use web_search instead."
+
+async def afetch_pages_function(text: str, fetcher: Optional[PageFetcher] = None,
+                                client: Optional[SearchClient] = None) -> str:
+    """Async page fetch - pages are streamed concurrently without blocking the event loop."""
+    try:
+        fetcher = fetcher or get_page_fetcher()
+        query, urls = _fetch_targets(text)
+        if not urls:
+            client = client or get_search_client()
+            if not client.enabled:
+                return "Page fetching needs URLs or web search (set SERPAPI_API_KEY). Use web_search instead."
+            urls = await _asearch_links(query, client)
+        if not urls:
+            return f"No pages found for: {query}. Try web_search with a different query."
+        return _format_pages(await fetcher.afetch_many(urls), query, _FETCH_TOKEN_BUDGET)
+    except Exception as e:
+        return f"Page fetch encountered an error: {str(e)}. Use web_search instead."
+
+async def aclose_tool_clients() -> None:
+    """Close the shared clients' async pools for the running event loop; call it before the loop ends."""
+    await aclose_search_client()
+    await aclose_page_fetcher()
+
+def get_tools(search_client: Optional[SearchClient] = None, single_flight: Optional[bool] = None,
+              local_index: Optional[LocalIndex] = None,
+              page_fetcher: Optional[PageFetcher] = None) -> List[Tool]:
+    """
+    Get all available tools for the ReAct agent.
+    Every tool set shares one pooled search client unless one is passed in.
+    Identical concurrent calls are coalesced unless `single_flight` is False
+    (default: TOOL_SINGLE_FLIGHT, on).
+    A local_search tool is added when `local_index` is given or LOCAL_INDEX_PATH
+    points at a built index. fetch_pages shares one pooled page fetcher unless
+    `page_fetcher` is given.
+    """
+    search_client = search_client or get_search_client()
+    local_index = local_index or get_local_index()
+    page_fetcher = page_fetcher or get_page_fetcher()
+
+    def web_search(query: str) -> str:
+        return web_search_function(query, client=search_client)
+
+    async def aweb_search(query: str) -> str:
+        return await aweb_search_function(query, client=search_client)
+
+    def fetch_pages(text: str) -> str:
+        return fetch_pages_function(text, fetcher=page_fetcher, client=search_client)
+
+    async def afetch_pages(text: str) -> str:
+        return await afetch_pages_function(text, fetcher=page_fetcher, client=search_client)
+
     tools = [
         Tool(
             name="web_search",
@@ -97,7 +326,17 @@ def get_tools() -> List[Tool]:
             - Verification of claims or statements
             - Latest developments in any field
             Input should be a clear, specific search query.""",
-            func=web_search_function
+            func=web_search,
+            coroutine=aweb_search
+        ),
+        Tool(
+            name="fetch_pages",
+            description=f"""Read the full text of web pages when search snippets are not detailed enough.
+            Input is either a search query - the top {_FETCH_TOP_N} results are fetched at once -
+            or one or more URLs separated by spaces. Returns the main text of each page,
+            focused on the query. Prefer one fetch_pages call over several follow-up searches.""",
+            func=fetch_pages,
+            coroutine=afetch_pages
         ),
         Tool(
             name="calculator",
@@ -107,10 +346,51 @@ def get_tools() -> List[Tool]:
             - Percentage calculations
             - Mathematical expressions and equations
             - Number conversions
-            - Statistical calculations
-            Input can be a mathematical expression or word problem.""",
-            func=calculator_function
+            - Statistical calculations: mean, median, std, variance, sum, min, max,
+              percentile([values], 90), describe([values]) for a full summary
+            - Many inputs at once: "x**2 + 1 for x in [1, 2, 3]" or "sqrt([4, 9, 16])"
+            Input can be a mathematical expression or word problem.
+            Pass whole lists in one call instead of calling the tool once per number.""",
+            func=calculator_function,
+            coroutine=acalculator_function
         )
     ]
     
-    return tools
\ No newline at end of file
+    if local_index is not None:
+        def local_search(query: str) -> str:
+            return local_search_function(query, index=local_index)
+
+        async def alocal_search(query: str) -> str:
+            return await alocal_search_function(query, index=local_index)
+
+        tools.insert(0, Tool(
+            name="local_search",
+            description="""Search the internal knowledge base (local documents) - fast and offline.
+            Try this first for questions about internal projects, policies, documentation
+            or anything that may be covered by local documents; fall back to web_search
+            when it finds nothing relevant or the question needs current information.
+            Input should be a short keyword query.""",
+            func=local_search,
+            coroutine=alocal_search
+        ))
+    
+    # Identical concurrent calls (many sessions searching one trending topic)
+    # share a single upstream request
+    if single_flight if single_flight is not None else single_flight_enabled():
+        flight = get_single_flight()
+        tools = [coalesce_tool(tool, flight) for tool in tools]
+    
+    # Per-tool latency/error metrics; a no-op unless instrumentation is enabled
+    instrumentation = get_instrumentation()
+    if instrumentation.enabled:
+        instrumentation.register_collector("search_cache", lambda: {
+            f"search_cache_{name}": value for name, value in get_search_cache().stats().items()
+        })
+        instrumentation.register_collector("single_flight", lambda: {
+            f"tool_single_flight_{name}": value for name, value in get_single_flight().stats().items()
+        })
+        instrumentation.register_collector("rate_limit", rate_limit_metrics)
+        instrumentation.register_collector("page_fetcher", lambda: {
+            f"page_fetch_{name}": value for name, value in page_fetcher.stats().items()
+        })
+    return instrumentation.wrap_tools(tools)
\ No newline at end of file
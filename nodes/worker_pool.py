@@ -0,0 +1,379 @@
+"""
+Pre-fork worker mode.
+One process is bound by the GIL for graph bookkeeping and tool
+post-processing, so WorkerPool runs N worker processes, each pinned to a
+core and holding its own agent (built from the same factories as
+nodes/agent_factory), with a few threads per worker to overlap LLM and search
+I/O. The agent modules are imported once in the parent before forking, so
+workers start with them loaded. A local dispatcher in the parent sends each
+question to the worker with the fewest in flight and resolves a Future when
+the answer comes back. Replacements for dead workers are forked from the
+dispatcher thread while other threads run, so a worker never uses the
+process-wide caches it inherited (their locks and SQLite handles belong to
+the parent): it builds its own, or joins the shared store. Workers share the search and answer caches through
+nodes/shared_cache.SharedStore, so a cache fill in one helps all of them.
+
+The pool has the agent's invoke/ainvoke interface, so BatchRunner and the
+HTTP server can use it in place of a single in-process agent.
+"""
+
+import asyncio
+import contextlib
+import functools
+import importlib
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import pickle
+import signal
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from nodes.agent_factory import ARCHITECTURES, get_agent
+from nodes.answer_cache import answer_cache_enabled, answer_cache_settings, configure_answer_cache
+from nodes.budget import request_budget, request_limits
+from nodes.rate_limiter import current_priority, priority
+from nodes.shared_cache import SharedAnswerCache, SharedSearchCache, SharedStore
+from nodes.tools import build_search_cache, configure_search_cache, search_cache_settings
+
+
+class WorkerCrashed(RuntimeError):
+    """A worker process exited while it had the question in flight."""
+
+
+def use_shared_caches(path: str, mmap_bytes: int = 256 * 1024 * 1024) -> SharedStore:
+    """Point this process's search cache (and answer cache, when enabled) at the shared store in `path`."""
+    store = SharedStore(path, mmap_bytes=mmap_bytes)
+    configure_search_cache(SharedSearchCache(store, **search_cache_settings()))
+    if answer_cache_enabled():
+        configure_answer_cache(SharedAnswerCache(store, **answer_cache_settings()))
+    return store
+
+
+def use_own_caches() -> None:
+    """Give this (forked) process fresh search and answer caches instead of the parent's."""
+    configure_search_cache(build_search_cache())
+    configure_answer_cache(None)  # rebuilt on first use, if enabled
+
+
+def _pack(result: Dict[str, Any]) -> bytes:
+    try:
+        return pickle.dumps(result)
+    except Exception:
+        # e.g. a model client object in state - keep whatever crosses the process boundary
+        kept = {}
+        for key, value in result.items():
+            try:
+                pickle.dumps(value)
+                kept[key] = value
+            except Exception:
+                continue
+        return pickle.dumps(kept)
+
+
+def _worker_main(index: int, cpu: Optional[int], tasks, results, factory: Callable[[], Any],
+                 cache_path: Optional[str], mmap_bytes: int, threads: int) -> None:
+    """Worker process: build the agent, then answer jobs from `tasks` on `threads` threads, replying on `results`."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C is the parent's to handle
+    send_lock = threading.Lock()
+
+    def send(message) -> None:
+        # The pipe is this worker's own, so only its threads need to take turns
+        with send_lock:
+            results.send(message)
+
+    if cpu is not None and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except OSError:
+            pass
+    try:
+        if cache_path:
+            use_shared_caches(cache_path, mmap_bytes)
+        else:
+            use_own_caches()
+        agent = factory()
+    except Exception as e:
+        send(("failed", index, f"{type(e).__name__}: {e}"))
+        return
+    send(("ready", index, os.getpid()))
+
+    def serve():
+        while True:
+            job = tasks.get()
+            if job is None:
+                return
+            job_id, inputs, level, limits = pickle.loads(job)
+            try:
+                with priority(level), request_budget(**limits) if limits is not None else contextlib.nullcontext():
+                    result = agent.invoke(inputs)
+                send(("done", index, job_id, _pack(result)))
+            except Exception as e:
+                send(("error", index, job_id, f"{type(e).__name__}: {e}"))
+
+    servers = [threading.Thread(target=serve, name=f"worker-{index}-{n}") for n in range(threads)]
+    for server in servers:
+        server.start()
+    for server in servers:
+        server.join()
+
+
+class _Worker:
+    __slots__ = ("index", "process", "tasks", "results", "in_flight", "ready", "served")
+
+    def __init__(self, index: int, process, tasks, results):
+        self.index = index
+        self.process = process
+        self.tasks = tasks
+        # Read end of the worker's own result pipe; a shared queue's cross-process
+        # lock could be left held by a worker that dies mid-send, wedging the rest
+        self.results = results
+        self.in_flight: Set[int] = set()
+        self.ready = False
+        self.served = 0
+
+
+class WorkerPool:
+    """N agent processes behind a least-loaded dispatcher; use as a context manager or call start()/close()."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        kind: str = "react",
+        factory: Optional[Callable[[], Any]] = None,
+        threads: int = 4,
+        cache_path: Optional[str] = None,
+        share_cache: bool = True,
+        mmap_bytes: int = 256 * 1024 * 1024,
+        pin: bool = True,
+        start_timeout: float = 120.0,
+    ):
+        """
+        Args:
+            workers: Worker processes (default: the number of usable cores).
+            kind: Architecture from nodes/agent_factory.ARCHITECTURES each worker builds.
+            factory: Zero-argument callable building the agent in the worker instead
+                (e.g. with a fake LLM); must be picklable where fork is unavailable.
+            threads: Questions each worker runs at once.
+            cache_path: SQLite file for the shared cache (default: a temporary file removed on close).
+            share_cache: Share the search/answer caches between workers (False: one cache per worker).
+            mmap_bytes: Bytes of the shared cache each worker memory-maps.
+            pin: Pin worker i to the i-th usable core (where the OS supports it).
+            start_timeout: Seconds to wait for every worker to build its agent.
+        """
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None
+        self.workers = workers or (len(cores) if cores else os.cpu_count() or 1)
+        self.kind = kind
+        self.factory = factory or functools.partial(get_agent, kind)
+        self.threads = threads
+        self.share_cache = share_cache
+        self.cache_path = cache_path
+        self._owns_cache = False
+        self.mmap_bytes = mmap_bytes
+        self.cores = cores if pin else None
+        self.start_timeout = start_timeout
+        self.restarts = 0
+
+        self._ctx = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._workers: List[_Worker] = []
+        self._jobs: Dict[int, Any] = {}
+        self._ids = itertools.count()
+        self._collector: Optional[threading.Thread] = None
+        self._closing = False
+        self._failure: Optional[str] = None
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def start(self) -> "WorkerPool":
+        """Fork the workers and wait until each has built its agent."""
+        if self._workers:
+            return self
+        if self.kind in ARCHITECTURES:
+            importlib.import_module(ARCHITECTURES[self.kind].split(":")[0])
+        if self.share_cache and not self.cache_path:
+            handle, self.cache_path = tempfile.mkstemp(prefix="agent-cache-", suffix=".sqlite3")
+            os.close(handle)
+            self._owns_cache = True
+        if self.share_cache:
+            SharedStore(self.cache_path, mmap_bytes=self.mmap_bytes)  # create the schema once, before the race
+        self._workers = [self._spawn(index) for index in range(self.workers)]
+        self._collector = threading.Thread(target=self._collect, name="worker-pool-dispatcher", daemon=True)
+        self._collector.start()
+        with self._ready:
+            self._ready.wait_for(lambda: self._failure or all(w.ready for w in self._workers), self.start_timeout)
+            failure = self._failure or (None if all(w.ready for w in self._workers) else
+                                        f"workers not ready after {self.start_timeout:g}s")
+        if failure:
+            self.close()
+            raise RuntimeError(f"Worker pool failed to start: {failure}")
+        return self
+
+    def _spawn(self, index: int) -> _Worker:
+        tasks = self._ctx.Queue()
+        reader, writer = self._ctx.Pipe(duplex=False)
+        cpu = self.cores[index % len(self.cores)] if self.cores else None
+        process = self._ctx.Process(
+            target=_worker_main, name=f"agent-worker-{index}", daemon=True,
+            args=(index, cpu, tasks, writer, self.factory,
+                  self.cache_path if self.share_cache else None, self.mmap_bytes, self.threads),
+        )
+        process.start()
+        writer.close()  # the worker holds the only write end, so its exit reads as EOF
+        return _Worker(index, process, tasks, reader)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Let in-flight questions finish (up to `timeout`), stop the workers and remove a temporary cache."""
+        self._closing = True
+        for worker in self._workers:
+            for _ in range(self.threads):
+                worker.tasks.put(None)
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join(1.0)
+        if self._collector is not None:
+            self._collector.join(2.0)
+        for worker in self._workers:
+            worker.results.close()
+        with self._lock:
+            jobs, self._jobs = self._jobs, {}
+        for future, _ in jobs.values():
+            if not future.done():
+                future.set_exception(WorkerCrashed("worker pool closed"))
+        if self._owns_cache:
+            for path in (self.cache_path, self.cache_path + "-wal", self.cache_path + "-shm"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def __enter__(self) -> "WorkerPool":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -- dispatching ---------------------------------------------------------
+
+    def submit(self, inputs: Dict[str, Any]) -> Future:
+        """Queue one agent run on the least-busy worker; the Future resolves to the result state."""
+        future: Future = Future()
+        job_id = next(self._ids)
+        job = pickle.dumps((job_id, inputs, current_priority(), request_limits()))
+        with self._lock:
+            if self._closing or not self._workers:
+                raise RuntimeError("Worker pool is not running")
+            candidates = [w for w in self._workers if w.ready] or self._workers
+            worker = min(candidates, key=lambda w: len(w.in_flight))
+            worker.in_flight.add(job_id)
+            self._jobs[job_id] = (future, worker.index)
+        worker.tasks.put(job)
+        return future
+
+    def invoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Dict[str, Any]:
+        """Run the agent in a worker. `config` stays in this process (checkpointers do not cross processes)."""
+        return self.submit(inputs).result()
+
+    async def ainvoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Dict[str, Any]:
+        return await asyncio.wrap_future(self.submit(inputs))
+
+    def _finish(self, index: int, job_id: int, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            future, _ = self._jobs.pop(job_id, (None, None))
+            worker = self._workers[index]
+            worker.in_flight.discard(job_id)
+            worker.served += error is None
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _collect(self) -> None:
+        """Dispatcher thread: resolve futures from worker results and replace dead workers."""
+        last_check = time.monotonic()
+        while not (self._closing and not self._jobs):
+            with self._lock:
+                readers = [w.results for w in self._workers if not w.results.closed]
+            if readers:
+                for reader in multiprocessing.connection.wait(readers, timeout=0.5):
+                    self._receive(reader)
+            else:
+                time.sleep(0.5)
+            if time.monotonic() - last_check >= 0.5:
+                last_check = time.monotonic()
+                self._replace_dead()
+
+    def _receive(self, reader) -> None:
+        """Handle one message from a worker's result pipe; EOF means the worker has exited."""
+        try:
+            message = reader.recv()
+        except (EOFError, OSError):
+            reader.close()  # _replace_dead fails its questions and starts another
+            return
+        kind, index = message[0], message[1]
+        if kind == "done":
+            self._finish(index, message[2], result=pickle.loads(message[3]))
+        elif kind == "error":
+            self._finish(index, message[2], error=RuntimeError(message[3]))
+        elif kind == "ready":
+            with self._ready:
+                self._workers[index].ready = True
+                self._ready.notify_all()
+        elif kind == "failed":
+            with self._ready:
+                self._failure = f"worker {index}: {message[2]}"
+                self._ready.notify_all()
+
+    def _replace_dead(self) -> None:
+        if self._closing:
+            return
+        for index, worker in enumerate(list(self._workers)):
+            if worker.process.is_alive() or not worker.ready:
+                continue
+            # Answers it sent before exiting still count
+            while not worker.results.closed and worker.results.poll():
+                self._receive(worker.results)
+            worker.results.close()
+            with self._lock:
+                lost = list(worker.in_flight)
+                worker.in_flight.clear()
+            for job_id in lost:
+                self._finish(index, job_id, error=WorkerCrashed(
+                    f"worker {index} (pid {worker.process.pid}) exited with code {worker.process.exitcode}"))
+            replacement = self._spawn(index)
+            with self._lock:
+                self._workers[index] = replacement
+            self.restarts += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "alive": sum(w.process.is_alive() for w in self._workers),
+                "in_flight": sum(len(w.in_flight) for w in self._workers),
+                "served": [w.served for w in self._workers],
+                "restarts": self.restarts,
+            }
+
+
+def create_worker_pool(workers: Optional[int] = None, kind: str = "react", **kwargs: Any) -> WorkerPool:
+    """
+    WorkerPool configured from AGENT_WORKERS (0: one per core), WORKER_THREADS,
+    WORKER_CACHE_PATH, WORKER_CACHE_MMAP_MB and WORKER_PIN; call start() on it.
+    """
+    settings: Dict[str, Any] = {
+        "workers": workers or int(os.getenv("AGENT_WORKERS", "0")) or None,
+        "threads": int(os.getenv("WORKER_THREADS", "4")),
+        "cache_path": os.getenv("WORKER_CACHE_PATH") or None,
+        "mmap_bytes": int(float(os.getenv("WORKER_CACHE_MMAP_MB", "256")) * 1024 * 1024),
+        "pin": os.getenv("WORKER_PIN", "1").lower() not in ("0", "false", "no", "off"),
+    }
+    return WorkerPool(kind=kind, **{**settings, **kwargs})
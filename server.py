@@ -0,0 +1,378 @@
+"""
+HTTP front end for the ReAct agent.
+A dependency-free ASGI app: the create_agent() graph is built once and shared
+by every request, each session keeps its own token-budgeted memory, and
+feedback is accepted on its own endpoint without blocking the answer path.
+
+Run with any ASGI server, e.g.:
+    python server.py --port 8000
+    uvicorn server:app --workers 1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import parse_qsl
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from main import create_memory
+from nodes.agent_factory import get_agent
+from nodes.instrumentation import get_instrumentation
+from nodes.interaction_log import InteractionLog, get_interaction_log
+from nodes.checkpoint import afinish_thread, aresumable_call, get_checkpointer, question_thread_id
+from nodes.memory import ConversationMemory
+from nodes.streaming import astream_answer, format_sse
+from nodes.tools import aclose_tool_clients
+
+
+class HTTPError(Exception):
+    """Raised inside a handler to return a JSON error response."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Session:
+    """One conversation: its memory, recent turns by id and a lock serializing its questions."""
+
+    def __init__(self, session_id: str, memory: ConversationMemory, max_tracked_turns: int = 100):
+        self.session_id = session_id
+        self.memory = memory
+        self.lock = asyncio.Lock()
+        self.turns: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.max_tracked_turns = max_tracked_turns
+        self.created = self.last_used = time.monotonic()
+
+    def track(self, turn: Dict[str, Any]) -> str:
+        """Remember a turn so feedback can find it later; returns its id."""
+        turn_id = turn["turn_id"] = uuid.uuid4().hex[:12]
+        self.turns[turn_id] = turn
+        while len(self.turns) > self.max_tracked_turns:
+            self.turns.popitem(last=False)
+        return turn_id
+
+
+class SessionStore:
+    """Sessions by id, evicted least-recently-used past max_sessions or after ttl seconds idle."""
+
+    def __init__(self, memory_factory: Callable[[], ConversationMemory] = create_memory,
+                 max_sessions: int = 10000, ttl: float = 3600.0):
+        self.memory_factory = memory_factory
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_used >= cutoff and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+    def create(self) -> Session:
+        session = Session(uuid.uuid4().hex, self.memory_factory())
+        self._sessions[session.session_id] = session
+        self._expire()
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def get_or_create(self, session_id: Optional[str]) -> Session:
+        session = self.get(session_id) if session_id else None
+        return session or self.create()
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+
+def _tools_used(messages: List[Any]) -> List[str]:
+    names = []
+    for msg in messages:
+        for call in getattr(msg, "tool_calls", None) or []:
+            if call.get("name") not in names:
+                names.append(call.get("name"))
+    return names
+
+
+class AgentServer:
+    """ASGI application serving one shared agent to many sessions."""
+
+    def __init__(self, agent=None, sessions: Optional[SessionStore] = None, checkpointer=None,
+                 max_concurrency: int = 64, interaction_log: Optional[InteractionLog] = None):
+        """
+        Args:
+            agent: Compiled agent graph; the shared create_agent() graph (nodes/agent_factory) if omitted.
+            sessions: Session store (default: in-memory, LRU + idle TTL).
+            checkpointer: Optional checkpointer the agent was compiled with, for resumable runs.
+            max_concurrency: Agent runs allowed in flight; extra requests wait their turn.
+            interaction_log: Where turns and feedback are logged (default: get_interaction_log()).
+        """
+        self.checkpointer = checkpointer
+        self._agent = agent
+        self.sessions = sessions or SessionStore()
+        self._interaction_log = interaction_log
+        self.max_concurrency = max_concurrency
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.started = time.monotonic()
+        self.requests = 0
+        self.feedback_count = 0
+        self.routes: Dict[Tuple[str, str], Callable] = {
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics,
+            ("POST", "/sessions"): self.create_session,
+            ("POST", "/chat"): self.chat,
+            ("POST", "/feedback"): self.feedback,
+            ("GET", "/interactions"): self.interactions,
+        }
+
+    @property
+    def agent(self):
+        if self._agent is None:
+            self.checkpointer = self.checkpointer or get_checkpointer()
+            self._agent = get_agent("react", checkpointer=self.checkpointer)
+        return self._agent
+
+    @property
+    def interaction_log(self) -> Optional[InteractionLog]:
+        if self._interaction_log is None:
+            self._interaction_log = get_interaction_log()
+        return self._interaction_log
+
+    # ASGI plumbing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        self.requests += 1
+        try:
+            body = await self._read_body(receive)
+            payload = json.loads(body) if body else {}
+            if scope.get("query_string"):
+                payload = {**dict(parse_qsl(scope["query_string"].decode())), **payload}
+            handler, params = self._route(scope["method"], scope["path"])
+            response = await handler(payload, send, **params)
+        except HTTPError as e:
+            response = (e.status, {"error": e.message})
+        except json.JSONDecodeError:
+            response = (400, {"error": "request body must be JSON"})
+        except Exception as e:
+            response = (500, {"error": str(e)})
+        if response is not None:
+            await self._send_json(send, *response)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # Build the graph before the first request instead of on it,
+                # off the event loop so the server stays responsive meanwhile
+                await asyncio.to_thread(lambda: (self.agent, self.interaction_log))
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                # The shared search/page clients' async pools belong to this loop
+                await aclose_tool_clients()
+                if self.interaction_log is not None:
+                    await asyncio.to_thread(self.interaction_log.close)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    def _route(self, method: str, path: str):
+        handler = self.routes.get((method, path))
+        if handler:
+            return handler, {}
+        if path.startswith("/sessions/"):
+            session_id = path[len("/sessions/"):]
+            if method == "GET":
+                return self.session_info, {"session_id": session_id}
+            if method == "DELETE":
+                return self.delete_session, {"session_id": session_id}
+        raise HTTPError(404, f"no route for {method} {path}")
+
+    @staticmethod
+    async def _send_json(send, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, default=str).encode()
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    # Handlers - return (status, payload), or None after writing their own response
+
+    async def health(self, payload, send):
+        return 200, {"status": "ok", "sessions": len(self.sessions), "requests": self.requests,
+                     "uptime": round(time.monotonic() - self.started, 1)}
+
+    async def metrics(self, payload, send):
+        """Prometheus scrape endpoint (empty unless METRICS_ENABLED / TRACE_PATH is set)."""
+        body = get_instrumentation().render_prometheus().encode()
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/plain; version=0.0.4"),
+                                (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+        return None
+
+    async def create_session(self, payload, send):
+        return 201, {"session_id": self.sessions.create().session_id}
+
+    async def session_info(self, payload, send, session_id: str):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HTTPError(404, "unknown session")
+        return 200, {"session_id": session_id, "memory": session.memory.stats(),
+                     "turns": [{"turn_id": t, "question": turn["question"], "feedback": turn.get("feedback")}
+                               for t, turn in session.turns.items()]}
+
+    async def delete_session(self, payload, send, session_id: str):
+        if not self.sessions.delete(session_id):
+            raise HTTPError(404, "unknown session")
+        return 200, {"deleted": session_id}
+
+    async def feedback(self, payload, send):
+        session = self.sessions.get(payload.get("session_id", ""))
+        turn = session.turns.get(payload.get("turn_id", "")) if session else None
+        if turn is None:
+            raise HTTPError(404, "unknown session or turn")
+        # Only attaches to the turn record and queues it for the log - never waits on the agent or disk
+        turn["feedback"] = str(payload.get("feedback", ""))
+        self.feedback_count += 1
+        if self.interaction_log is not None:
+            self.interaction_log.record_feedback(turn, turn["feedback"], session_id=session.session_id)
+        return 202, {"accepted": True}
+
+    async def interactions(self, payload, send):
+        """Logged turns and feedback, newest first: ?kind=&tool=&rating=&since=&until=&limit= (times in epoch seconds)."""
+        if self.interaction_log is None:
+            raise HTTPError(404, "interaction log is disabled")
+        try:
+            filters = {key: cast(payload[key]) for key, cast in
+                       (("kind", str), ("tool", str), ("rating", int), ("since", float), ("until", float),
+                        ("limit", int)) if payload.get(key) not in (None, "")}
+        except ValueError as e:
+            raise HTTPError(400, f"bad filter: {e}")
+        records = await asyncio.to_thread(self.interaction_log.query, **filters)
+        return 200, {"records": records, "log": self.interaction_log.stats()}
+
+    async def chat(self, payload, send):
+        question = str(payload.get("question", "")).strip()
+        if not question:
+            raise HTTPError(400, "question is required")
+        session = self.sessions.get_or_create(payload.get("session_id"))
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+
+        # One question at a time per session keeps its memory in order
+        async with session.lock, self._slots:
+            agent = self.agent
+            thread_id = question_thread_id(question, prefix=session.session_id)
+            inputs, config = await aresumable_call(
+                agent, {"messages": session.memory.build_messages(question)}, thread_id, self.checkpointer,
+            )
+            if payload.get("stream"):
+                if not hasattr(agent, "astream_events"):
+                    raise HTTPError(400, "streaming is not available in worker mode")
+                await self._stream_chat(send, session, question, agent, inputs, config, thread_id)
+                return None
+
+            started = time.perf_counter()
+            result = await agent.ainvoke(inputs, config)
+            await afinish_thread(result, thread_id, self.checkpointer)
+            messages = result.get("messages", [])
+            answer = messages[-1].content if messages else ""
+            turn = session.memory.add_turn(question, answer, tools_used=_tools_used(messages))
+            turn_id = session.track(turn)
+            elapsed = round(time.perf_counter() - started, 4)
+            if self.interaction_log is not None:
+                self.interaction_log.record_turn(turn, session_id=session.session_id, elapsed=elapsed,
+                                                 budget_exhausted=result.get("budget_exhausted"))
+        return 200, {"session_id": session.session_id, "turn_id": turn_id, "answer": answer,
+                     "tools_used": turn["tools_used"], "elapsed": elapsed,
+                     "budget_exhausted": result.get("budget_exhausted")}
+
+    async def _stream_chat(self, send, session: Session, question: str, agent, inputs, config,
+                           thread_id: str) -> None:
+        """Forward stream events as server-sent events, then record the turn."""
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")]})
+        try:
+            async for event in astream_answer(agent, inputs, config):
+                if event["event"] == "done":
+                    await afinish_thread(event["result"], thread_id, self.checkpointer)
+                    messages = event["result"].get("messages", [])
+                    answer = messages[-1].content if messages else ""
+                    turn = session.memory.add_turn(question, answer, tools_used=_tools_used(messages))
+                    event = {**event, "session_id": session.session_id, "turn_id": session.track(turn)}
+                    if self.interaction_log is not None:
+                        self.interaction_log.record_turn(turn, session_id=session.session_id)
+                await send({"type": "http.response.body", "body": format_sse(event).encode(), "more_body": True})
+        except Exception as e:
+            # Headers are already out, so report the failure in-band
+            frame = f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            await send({"type": "http.response.body", "body": frame.encode(), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+
+def create_app(agent=None, **kwargs) -> AgentServer:
+    """Build the ASGI app; pass a prebuilt agent (e.g. with a fake LLM) for tests and benchmarks."""
+    return AgentServer(agent=agent, **kwargs)
+
+
+# `uvicorn server:app` - the agent is built on the lifespan startup event
+app = create_app(max_concurrency=int(os.getenv("SERVER_MAX_CONCURRENCY", "64")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the ReAct agent over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("AGENT_WORKERS", "0")),
+                        help="Run the agent in this many worker processes sharing one cache (0: in this process)")
+    args = parser.parse_args()
+    try:
+        import uvicorn
+    except ImportError:
+        print("❌ uvicorn is required to run the server: pip install uvicorn")
+        return
+    server, pool = app, None
+    if args.workers:
+        from nodes.worker_pool import create_worker_pool
+        # Fork before uvicorn starts its loop and threads
+        pool = create_worker_pool(args.workers).start()
+        server = create_app(agent=pool, max_concurrency=app.max_concurrency)
+        print(f"👷 {args.workers} agent workers started")
+    print(f"🌐 Serving the agent on http://{args.host}:{args.port}")
+    try:
+        uvicorn.run(server, host=args.host, port=args.port, log_level="warning")
+    finally:
+        if pool is not None:
+            pool.close()
+
+
+if __name__ == "__main__":
+    main()
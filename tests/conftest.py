@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules are imported as `nodes.*` from the repository root, as the entry scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
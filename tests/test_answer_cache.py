@@ -0,0 +1,69 @@
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import Tool
+
+from benchmarks.fakes import ScriptedChatModel
+from main import create_agent
+from nodes.answer_cache import CachedAgent, SemanticAnswerCache, is_partial
+from nodes.budget import request_budget
+from nodes.streaming import stream_answer
+
+QUESTION = "What is the population of Paris?"
+
+
+def make_agent(cache: SemanticAnswerCache):
+    search = Tool(name="web_search", func=lambda query: f"Results for {query}", description="Search the web")
+    return create_agent(llm=ScriptedChatModel(searches=2), tools=[search], answer_cache=cache)
+
+
+def ask(agent):
+    return agent.invoke({"messages": [HumanMessage(content=QUESTION)]})
+
+
+def test_budget_stopped_answer_is_not_cached():
+    cache = SemanticAnswerCache()
+    agent = make_agent(cache)
+    with request_budget(max_llm_calls=1):
+        partial = ask(agent)
+    assert is_partial(partial)
+    assert cache.lookup(QUESTION) is None
+
+    # Budget lifted: the question runs again instead of replaying the partial answer
+    full = ask(agent)
+    assert "cache_hit" not in full and not is_partial(full)
+    assert cache.lookup(QUESTION)["answer"] == full["messages"][-1].content
+
+
+def test_partial_results_are_refused_by_the_cache():
+    cache = SemanticAnswerCache()
+    inputs = {"messages": [HumanMessage(content=QUESTION)]}
+    partial = {"messages": [AIMessage(content="So far...", response_metadata={"partial": True})]}
+    CachedAgent(None, cache).remember(inputs, partial)
+    assert not cache.store(QUESTION, "So far...", partial=True)
+    assert cache.lookup(QUESTION) is None
+
+
+def test_streamed_partial_result_is_not_remembered():
+    remembered = []
+
+    class Agent:
+        def stream(self, inputs, config=None, stream_mode=None):
+            yield "values", {"messages": inputs["messages"], "budget_exhausted": "llm_calls"}
+
+        def remember(self, inputs, result):
+            remembered.append(result)
+
+    events = list(stream_answer(Agent(), {"messages": [HumanMessage(content=QUESTION)]}))
+    assert events[-1]["event"] == "done"
+    assert remembered == []
+
+
+def test_question_with_an_extra_word_is_not_a_hit():
+    cache = SemanticAnswerCache(threshold=0.85)
+    cached, asked = ("who was the first president of the united states of america",
+                     "who was the first vice president of the united states of america")
+    cache.store(cached, "George Washington")
+    # Close enough to pass the threshold, but "vice" changes the answer
+    assert cache.embedder(asked) @ cache.embedder(cached) > 0.85
+    assert cache.lookup(asked) is None
+    assert cache.lookup("Who was the first president of the United States of America?")["answer"] == \
+        "George Washington"
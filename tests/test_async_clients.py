@@ -0,0 +1,38 @@
+import asyncio
+
+from benchmarks.fakes import FakeSerpAPIServer
+from nodes.async_runner import run_async
+from nodes.search_client import SearchClient
+import nodes.search_client as search_client
+
+
+def test_async_pool_is_closed_with_its_loop():
+    with FakeSerpAPIServer() as server:
+        client = SearchClient(api_key="test", base_url=server.url)
+
+        async def ask(query):
+            try:
+                return await client.asearch(query)
+            finally:
+                await client.aclose()
+
+        for i in range(3):
+            assert asyncio.run(ask(f"question {i}"))
+            assert client._async_clients == {}
+
+
+def test_pools_of_finished_loops_are_not_kept():
+    with FakeSerpAPIServer() as server:
+        client = SearchClient(api_key="test", base_url=server.url)
+        for i in range(3):
+            asyncio.run(client.asearch(f"question {i}"))
+        # Each new loop forgets the pools of loops that have already ended
+        assert len(client._async_clients) == 1
+
+
+def test_run_async_closes_the_shared_client(monkeypatch):
+    with FakeSerpAPIServer() as server:
+        client = SearchClient(api_key="test", base_url=server.url)
+        monkeypatch.setattr(search_client, "_default_client", client)
+        assert run_async(client.asearch("question"))
+        assert client._async_clients == {}
@@ -0,0 +1,44 @@
+import logging
+import time
+
+from langchain_core.messages import HumanMessage, ToolMessage
+
+from benchmarks.fakes import ScriptedChatModel
+from nodes import budget as budget_module
+from nodes.budget import LLM_CALLS, Budget, BudgetedAgent, default_budget
+
+
+def stopped_state():
+    return {"messages": [
+        HumanMessage(content="What is the capital of France?"),
+        ToolMessage(content="Paris is the capital of France.", name="web_search", tool_call_id="call_1"),
+    ]}
+
+
+def test_sync_partial_answer_stops_at_the_time_limit():
+    agent = BudgetedAgent(agent=None, llm=ScriptedChatModel(latency=5.0))
+    budget = Budget(time_limit=0.3).start()
+    budget.exhaust(LLM_CALLS)
+
+    started = time.monotonic()
+    result = agent.partial_result(stopped_state(), budget)
+
+    assert time.monotonic() - started < 2.0
+    assert "Here is what I found so far" in result["final_answer"]
+    assert "Paris is the capital of France." in result["final_answer"]
+
+
+def test_malformed_env_limit_is_ignored_with_a_warning(monkeypatch, caplog):
+    monkeypatch.setenv("AGENT_TIME_LIMIT", "30s")
+    monkeypatch.setenv("AGENT_MAX_LLM_CALLS", "4")
+    budget_module._env_limits.cache_clear()
+    try:
+        with caplog.at_level(logging.WARNING, logger="nodes.budget"):
+            budget = default_budget()
+            default_budget()
+        assert budget.time_limit is None
+        assert budget.max_llm_calls == 4
+        # Parsed once, so the warning is not repeated on every run
+        assert sum("AGENT_TIME_LIMIT" in record.getMessage() for record in caplog.records) == 1
+    finally:
+        budget_module._env_limits.cache_clear()
@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+import pytest
+
+from nodes.calculator import CalculatorError, calculate, calculate_over, format_result
+from nodes.tools import calculator_function
+
+
+@pytest.mark.parametrize("expression", [
+    "((2**10000)**10000)**100",  # nested powers, each exponent small on its own
+    "pow(pow(2, 10000), 10000)",
+    "2**(10**400)",
+    "0.5**-1000000",
+])
+def test_power_result_size_is_bounded(expression):
+    start = time.perf_counter()
+    with pytest.raises(CalculatorError):
+        calculate(expression)
+    assert time.perf_counter() - start < 1
+
+
+def test_power_within_bound():
+    assert calculate("2**10") == 1024
+    assert calculate("2**-2") == 0.25
+    assert calculate("2**10000").bit_length() == 10001
+
+
+def test_integer_powers_stay_integers():
+    result = calculate_over("x**2", "x", [1, 2, 3])
+    assert result.dtype.kind == "i"
+    assert result.tolist() == [1, 4, 9]
+    # Negative exponents and results beyond int64 fall back to floats
+    assert calculate("[1, 2]**-1").tolist() == [1.0, 0.5]
+    assert calculate("[2]**70").dtype.kind == "f"
+
+
+def test_range_length_checked_before_allocating():
+    with pytest.raises(CalculatorError):
+        calculate("range(300000000)")
+    with pytest.raises(CalculatorError):
+        calculate("range(0, 10, 0)")
+    assert calculate("range(1, 10, 2)").tolist() == [1, 3, 5, 7, 9]
+
+
+def test_list_size_is_capped():
+    with pytest.raises(CalculatorError):
+        calculate("[range(600000), range(600000)]")
+    assert np.array_equal(calculate("[range(3), 5]"), [0, 1, 2, 5])
+
+
+def test_long_integers_are_shown_in_scientific_notation():
+    assert format_result(calculate("2**100")) == "1267650600228229401496703205376"
+    assert format_result(calculate("2**20000")) == "3.980276840337966e+6020"
+    assert format_result(calculate("-(10**5000)")) == "-1.0e+5000"
+    assert calculator_function("2**20000") == "Calculation: 2**20000 = 3.980276840337966e+6020"
+
+
+@pytest.mark.parametrize("expression", [
+    "factorial(5)",
+    "what is the square root of 16",
+    "100 - 20%",
+])
+def test_unparseable_input_is_an_error_not_a_guess(expression):
+    assert calculator_function(expression).startswith("Calculation error:")
+
+
+def test_supported_notations():
+    assert calculator_function("what is 1,000 x 3?") == "Calculation: 1000*3 = 3000"
+    assert calculator_function("20% of 150") == "Result: 20.0% of 150.0 = 30.0"
+    assert calculator_function("50% * 80") == "Calculation: 50/100 * 80 = 40.0"
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+
+from langchain_core.messages import HumanMessage
+from langchain_core.tools import Tool
+
+from benchmarks.fakes import ScriptedChatModel
+from main import create_agent
+from nodes.answer_cache import is_partial
+from nodes.budget import request_budget
+from nodes.checkpoint import (SqliteCheckpointer, afinish_thread, aresumable_call, finish_thread,
+                              question_thread_id, resumable_call)
+
+QUESTION = "What is the population of Paris?"
+
+
+class RecordingConnection:
+    """sqlite3 connection wrapper that records which threads used it."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.threads = set()
+
+    def __getattr__(self, name):
+        self.threads.add(threading.current_thread())
+        return getattr(self.conn, name)
+
+    def __enter__(self):
+        self.threads.add(threading.current_thread())
+        return self.conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self.conn.__exit__(*exc)
+
+
+def make_agent(tmp_path):
+    checkpointer = SqliteCheckpointer(str(tmp_path / "checkpoints.sqlite3"))
+    search = Tool(name="web_search", func=lambda query: f"Results for {query}", description="Search the web")
+    return create_agent(llm=ScriptedChatModel(searches=2), tools=[search], checkpointer=checkpointer), checkpointer
+
+
+def test_budget_stopped_run_is_not_resumed(tmp_path):
+    agent, checkpointer = make_agent(tmp_path)
+    thread_id = question_thread_id(QUESTION)
+    inputs, config = resumable_call(agent, {"messages": [HumanMessage(content=QUESTION)]}, thread_id, checkpointer)
+    with request_budget(max_llm_calls=1):
+        result = agent.invoke(inputs, config)
+    assert is_partial(result)
+    # The stopped run still has steps left, so it would look interrupted
+    assert agent.get_state(config).next
+
+    finish_thread(result, thread_id, checkpointer)
+    inputs, _ = resumable_call(agent, {"messages": [HumanMessage(content=QUESTION)]}, thread_id, checkpointer)
+    assert inputs is not None
+    checkpointer.close()
+
+
+def test_async_helpers_run_off_the_event_loop(tmp_path):
+    agent, checkpointer = make_agent(tmp_path)
+    thread_id = question_thread_id(QUESTION, prefix="session")
+    checkpointer._conn = RecordingConnection(checkpointer._conn)
+
+    async def ask(limit):
+        inputs, config = await aresumable_call(
+            agent, {"messages": [HumanMessage(content=QUESTION)]}, thread_id, checkpointer)
+        with request_budget(max_llm_calls=limit):
+            result = await agent.ainvoke(inputs, config)
+        await afinish_thread(result, thread_id, checkpointer)
+        return inputs, result
+
+    checkpointer._conn.threads.clear()
+
+    _, partial = asyncio.run(ask(1))
+    assert is_partial(partial)
+    inputs, full = asyncio.run(ask(None))
+    assert inputs is not None and not is_partial(full)
+    # Loading, flushing and deleting threads never touched SQLite from the event loop
+    assert checkpointer._conn.threads and threading.main_thread() not in checkpointer._conn.threads
+    checkpointer.close()
@@ -0,0 +1,12 @@
+from nodes.instrumentation import _error_text
+
+
+def test_tool_failure_messages_count_as_errors():
+    assert _error_text("Web search encountered an error: timeout. Please try rephrasing your query.")
+    assert _error_text("Calculation error: division by zero. Please check your mathematical expression.")
+
+
+def test_results_mentioning_error_are_not_errors():
+    assert _error_text("Type I error: rejecting a true null hypothesis (Wikipedia)") is None
+    assert _error_text("Error bars show one standard deviation.") is None
+    assert _error_text(42) is None
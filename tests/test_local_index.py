@@ -0,0 +1,58 @@
+import os
+import threading
+
+from nodes.local_index import LocalIndex
+
+
+def write(path, text, mtime):
+    with open(path, "w") as f:
+        f.write(text)
+    os.utime(path, (mtime, mtime))
+
+
+def test_emptied_file_is_removed_from_search(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    write(docs / "a.md", "# Paris\nParis is the capital of France.", 1000)
+    index = LocalIndex(str(tmp_path / "index"))
+    assert index.index_directory(str(docs))["added"] == 1
+    assert index.search("paris")
+
+    write(docs / "a.md", "", 2000)
+    assert index.index_directory(str(docs))["updated"] == 1
+    assert index.search("paris") == []
+    # The new mtime is recorded, so the next run sees nothing to do
+    assert index.index_directory(str(docs))["unchanged"] == 1
+    assert LocalIndex(str(tmp_path / "index")).search("paris") == []
+
+
+def test_merge_waits_for_running_searches(tmp_path):
+    index = LocalIndex(str(tmp_path / "index"))
+    for i in range(20):
+        index.add_documents([{"text": f"{'paris' if i % 4 == 0 else 'london'} document {i}", "source": f"doc{i}"}])
+        index.commit()
+
+    errors = []
+    stop = threading.Event()
+
+    def search():
+        while not stop.is_set():
+            try:
+                assert index.search("paris", k=3)
+            except Exception as e:
+                errors.append(e)
+                return
+
+    searchers = [threading.Thread(target=search) for _ in range(4)]
+    for searcher in searchers:
+        searcher.start()
+    for i in range(20):
+        index.add_documents([{"text": f"{'paris' if i % 4 == 0 else 'london'} update {i}", "source": f"doc{i}"}])
+        index.commit()
+        index.merge()
+    stop.set()
+    for searcher in searchers:
+        searcher.join()
+
+    assert errors == []
+    assert sorted(os.listdir(tmp_path / "index")) == ["manifest.json", index._manifest["segments"][0], "sources.json"]
@@ -0,0 +1,31 @@
+from langchain_core.messages import HumanMessage
+from langchain_core.tools import Tool
+
+from benchmarks.fakes import ScriptedChatModel
+from main import create_agent
+from nodes.answer_cache import is_partial
+from nodes.budget import request_budget
+from nodes.model_router import routed_llm
+
+
+def make_agent():
+    search = Tool(name="web_search", func=lambda query: f"Results for {query}", description="Search the web")
+    llm = routed_llm(ScriptedChatModel(searches=1), ScriptedChatModel(searches=1), strategy="cascade")
+    return create_agent(llm=llm, tools=[search]), llm
+
+
+def test_discarded_draft_and_answer_are_both_charged():
+    # Turn 1: the draft's tool call is used (1 call). Turn 2: the draft is discarded
+    # and the strong model answers (2 calls), which a limit of 2 must not allow
+    agent, _ = make_agent()
+    with request_budget(max_llm_calls=2):
+        result = agent.invoke({"messages": [HumanMessage(content="What is the capital of France?")]})
+    assert is_partial(result)
+
+
+def test_cascade_fits_a_budget_that_counts_every_call():
+    agent, llm = make_agent()
+    with request_budget(max_llm_calls=3):
+        result = agent.invoke({"messages": [HumanMessage(content="What is the capital of France?")]})
+    assert not is_partial(result)
+    assert sum(entry["calls"] for entry in llm.stats().values()) == 3
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import nodes.page_fetcher as page_fetcher
+from nodes.page_fetcher import BlockedURL, PageFetcher, check_public_url
+
+TEXT = "A paragraph long enough to count as main content of the page."
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/redirect":
+            self.send_response(302)
+            self.send_header("Location", f"http://127.0.0.1:{self.server.server_address[1]}/page")
+            self.end_headers()
+            return
+        body = f"<p>{TEXT}</p>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/", "http://localhost/", "http://169.254.169.254/latest/meta-data/", "http://10.1.2.3/",
+    "http://[::1]/", "http://[::ffff:127.0.0.1]/", "http://0.0.0.0/", "file:///etc/passwd",
+])
+def test_non_public_urls_are_refused(url):
+    with pytest.raises(BlockedURL):
+        check_public_url(url)
+
+
+def test_fetch_refuses_loopback(server):
+    assert "non-public" in PageFetcher().fetch(f"{server}/page")["error"]
+    assert "non-public" in asyncio.run(PageFetcher().afetch(f"{server}/page"))["error"]
+    assert PageFetcher(allow_private=True).fetch(f"{server}/redirect")["blocks"] == [TEXT]
+
+
+def test_every_redirect_hop_is_checked(server, monkeypatch):
+    # Let the first URL through as if it were public; the redirect to loopback must still be refused
+    checked = []
+
+    def first_is_public(url):
+        checked.append(url)
+        if len(checked) > 1:
+            check_public_url(url)
+
+    async def afirst_is_public(url):
+        first_is_public(url)
+
+    monkeypatch.setattr(page_fetcher, "check_public_url", first_is_public)
+    monkeypatch.setattr(page_fetcher, "acheck_public_url", afirst_is_public)
+    assert "non-public" in PageFetcher().fetch(f"{server}/redirect")["error"]
+    assert checked == [f"{server}/redirect", f"{server}/page"]
+    checked.clear()
+    assert "non-public" in asyncio.run(PageFetcher().afetch(f"{server}/redirect"))["error"]
+    assert checked == [f"{server}/redirect", f"{server}/page"]
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeSerpAPIServer
+from nodes.rate_limiter import HIGH, LOW, NORMAL, AdaptiveLimiter, priority
+from nodes.search_client import SearchClient, SearchError
+
+
+def make_client(server, limiter):
+    return SearchClient(api_key="test", base_url=server.url, max_retries=0, rate_limiter=limiter)
+
+
+def test_429_cuts_rate_and_concurrency():
+    limiter = AdaptiveLimiter("test", rate=10.0, burst=10, max_concurrency=8)
+    with FakeSerpAPIServer(error_rate=1.0) as server:
+        with pytest.raises(SearchError):
+            make_client(server, limiter).search_json("question")
+        # Retry-After: 1 holds back the next request
+        assert limiter.paused_until > time.monotonic() + 0.5
+
+    stats = limiter.stats()
+    assert stats["overloads"] == 1
+    assert stats["rate"] == 5.0 and stats["limit"] == 4.0
+
+
+def test_successes_raise_rate_and_concurrency_back():
+    limiter = AdaptiveLimiter("test", rate=10.0, burst=10, max_concurrency=8)
+    limiter.feedback(overloaded=True)
+    with FakeSerpAPIServer(error_rate=0.0) as server:
+        client = make_client(server, limiter)
+        for i in range(5):
+            client.search_json(f"question {i}")
+
+    stats = limiter.stats()
+    assert stats["successes"] == 5
+    assert 5.0 < stats["rate"] <= 10.0 and 4.0 < stats["limit"] <= 8.0
+
+
+def test_waiters_are_admitted_by_priority():
+    limiter = AdaptiveLimiter("test", rate=100.0, burst=10, max_concurrency=1)
+    order = []
+
+    def search(client, level, name):
+        with priority(level):
+            client.search_json(name)
+        order.append(name)
+
+    with FakeSerpAPIServer(latency=0.05, error_rate=0.0) as server:
+        client = make_client(server, limiter)
+        limiter.acquire()  # hold the only slot while the others queue up
+        threads = []
+        for level, name in [(LOW, "batch"), (NORMAL, "normal"), (HIGH, "interactive")]:
+            thread = threading.Thread(target=search, args=(client, level, name))
+            thread.start()
+            threads.append(thread)
+            while limiter.stats()["queued"] < len(threads):
+                time.sleep(0.005)
+        limiter.release()
+        for thread in threads:
+            thread.join(10)
+
+    assert order == ["interactive", "normal", "batch"]
+
+
+def test_tokens_refill_at_the_configured_rate():
+    limiter = AdaptiveLimiter("test", rate=20.0, burst=2, max_concurrency=8)
+    with FakeSerpAPIServer(error_rate=0.0) as server:
+        client = make_client(server, limiter)
+        started = time.monotonic()
+        for i in range(6):
+            client.search_json(f"question {i}")
+        elapsed = time.monotonic() - started
+        # Every token was spent as soon as it arrived; idling refills the bucket
+        assert not limiter.acquire(needs_slot=False, timeout=0)
+        time.sleep(0.1)
+        assert limiter.acquire(needs_slot=False, timeout=0)
+
+    # The burst covers two requests; the other four wait for a token each (1/20 s)
+    assert elapsed >= 0.18
@@ -0,0 +1,76 @@
+import asyncio
+import gc
+import sqlite3
+import time
+
+from nodes.search_cache import SearchCache
+
+
+def test_async_disk_tier_round_trip(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    calls = []
+
+    async def compute(query):
+        calls.append(query)
+        return f"results for {query}"
+
+    assert asyncio.run(SearchCache(db_path=path).aget_or_compute("Paris", compute)) == "results for Paris"
+    # A new process-level cache finds it on disk
+    assert asyncio.run(SearchCache(db_path=path).aget_or_compute("paris?", compute)) == "results for Paris"
+    assert calls == ["Paris"]
+
+
+def test_stale_refresh_task_is_kept_until_done():
+    cache = SearchCache(ttl=0.01, stale_ttl=60)
+    cache.set("paris", "old")
+    time.sleep(0.02)
+
+    async def compute(query):
+        await asyncio.sleep(0.05)
+        return "new"
+
+    async def run():
+        assert await cache.aget_or_compute("paris", compute) == "old"
+        assert len(cache._tasks) == 1
+        gc.collect()
+        await asyncio.sleep(0.1)
+        assert not cache._tasks
+        return await cache.aget_or_compute("paris", compute)
+
+    assert asyncio.run(run()) == "new"
+
+
+def test_disk_tier_is_opened_on_first_use(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = SearchCache(db_path=str(path))
+    assert not path.exists()
+    cache.set("paris", "results")
+    assert path.exists()
+
+
+def test_disk_tier_drops_expired_and_surplus_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr("nodes.search_cache.PRUNE_EVERY", 5)
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SearchCache(ttl=60, db_path=path, max_disk_entries=3)
+    with cache._db_lock:
+        cache._connection().execute("INSERT INTO search_cache VALUES ('old', 'expired', ?)", (time.time() - 3600,))
+    for number in range(5):
+        cache.set(f"query {number}", f"results {number}")
+    rows = [key for (key,) in sqlite3.connect(path).execute("SELECT key FROM search_cache ORDER BY stored_at")]
+    assert rows == ["query 2", "query 3", "query 4"]
+
+
+def test_clear_empties_both_tiers(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SearchCache(db_path=path)
+    cache.set("paris", "results")
+    cache.clear()
+    assert cache.get("paris") is None
+    assert SearchCache(db_path=path).get("paris") is None
+
+
+def test_memory_hits_do_not_wait_on_the_disk_tier(tmp_path):
+    cache = SearchCache(db_path=str(tmp_path / "cache.sqlite3"))
+    cache.set("paris", "results")
+    with cache._db_lock:  # a slow disk read or write in another thread
+        assert cache.get("paris") == "results"
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import httpx
+from langchain_core.tools import Tool
+
+from benchmarks.fakes import FakeSerpAPIServer, ScriptedChatModel
+from main import create_agent
+from nodes.interaction_log import InteractionLog
+from nodes.search_client import SearchClient
+import nodes.search_client as search_client
+from server import create_app
+
+
+def make_app(tmp_path, latency=0.0):
+    search = Tool(name="web_search", func=lambda query: f"Results for {query}", description="Search the web")
+    agent = create_agent(llm=ScriptedChatModel(latency=latency), tools=[search])
+    return create_app(agent=agent, interaction_log=InteractionLog(str(tmp_path / "interactions")))
+
+
+def client_for(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=30)
+
+
+def test_sessions_are_served_concurrently(tmp_path):
+    app = make_app(tmp_path, latency=0.2)
+
+    async def run():
+        async with client_for(app) as client:
+            started = time.perf_counter()
+            responses = await asyncio.gather(*(
+                client.post("/chat", json={"question": f"What is the population of city {i}?"}) for i in range(8)
+            ))
+            return responses, time.perf_counter() - started
+
+    responses, elapsed = asyncio.run(run())
+    app.interaction_log.close()
+
+    assert [r.status_code for r in responses] == [200] * 8
+    assert len({r.json()["session_id"] for r in responses}) == 8
+    assert all(r.json()["tools_used"] == ["web_search"] for r in responses)
+    # Two 0.2 s LLM calls per question: one after another would take 3.2 s
+    assert elapsed < 1.6
+
+
+def test_feedback_is_attached_to_its_turn(tmp_path):
+    app = make_app(tmp_path)
+
+    async def run():
+        async with client_for(app) as client:
+            answer = (await client.post("/chat", json={"question": "Who wrote Hamlet?"})).json()
+            accepted = await client.post("/feedback", json={"session_id": answer["session_id"],
+                                                            "turn_id": answer["turn_id"], "feedback": "yes"})
+            unknown = await client.post("/feedback", json={"session_id": answer["session_id"],
+                                                           "turn_id": "missing", "feedback": "no"})
+            info = (await client.get(f"/sessions/{answer['session_id']}")).json()
+            return accepted, unknown, info
+
+    accepted, unknown, info = asyncio.run(run())
+    app.interaction_log.close()
+
+    assert accepted.status_code == 202
+    assert unknown.status_code == 404
+    assert [turn["feedback"] for turn in info["turns"]] == ["yes"]
+
+
+def test_bad_requests_get_json_errors(tmp_path):
+    app = make_app(tmp_path)
+
+    async def run():
+        async with client_for(app) as client:
+            return await client.post("/chat", json={"question": " "}), await client.get("/nowhere")
+
+    empty, missing = asyncio.run(run())
+    app.interaction_log.close()
+
+    assert empty.status_code == 400 and empty.json() == {"error": "question is required"}
+    assert missing.status_code == 404
+
+
+def test_shutdown_closes_the_shared_search_pool(tmp_path, monkeypatch):
+    app = make_app(tmp_path)
+    with FakeSerpAPIServer() as server:
+        client = SearchClient(api_key="test", base_url=server.url)
+        monkeypatch.setattr(search_client, "_default_client", client)
+
+        async def run():
+            messages = asyncio.Queue()
+            sent = []
+
+            async def send(message):
+                sent.append(message["type"])
+
+            await messages.put({"type": "lifespan.startup"})
+            lifespan = asyncio.ensure_future(app({"type": "lifespan"}, messages.get, send))
+            await client.asearch("question")
+            assert client._async_clients
+            await messages.put({"type": "lifespan.shutdown"})
+            await lifespan
+            return sent
+
+        sent = asyncio.run(run())
+
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert client._async_clients == {}
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from nodes.single_flight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight, executions, release = SingleFlight(), [], threading.Event()
+
+    def slow():
+        executions.append(1)
+        release.wait(5)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", slow))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["calls"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["result"] * 4 and len(executions) == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_leader_does_not_fail_followers():
+    async def scenario():
+        flight, executions = SingleFlight(), []
+
+        async def search():
+            executions.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        leader = asyncio.create_task(flight.ado("key", search))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flight.ado("key", search)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await asyncio.gather(*followers) == ["result"] * 3
+        assert len(executions) == 1 and flight.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_call_is_cancelled_once_every_waiter_is():
+    async def scenario():
+        flight, cancelled = SingleFlight(), asyncio.Event()
+
+        async def search():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiters = [asyncio.create_task(flight.ado("key", search)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert flight.stats()["in_flight"] == 0
+
+        # The key is free again: a new call runs rather than joining the cancelled one
+        async def quick():
+            return "fresh"
+        assert await flight.ado("key", quick) == "fresh"
+
+    asyncio.run(scenario())
+
+
+def test_errors_reach_every_waiter():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("search failed")
+
+        results = await asyncio.gather(*(flight.ado("key", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert flight.stats()["executions"] == 1
+
+    asyncio.run(scenario())
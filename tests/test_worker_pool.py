@@ -0,0 +1,68 @@
+import os
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langchain_core.tools import Tool
+
+from benchmarks.fakes import ScriptedChatModel
+from main import create_agent
+from nodes.tools import configure_search_cache, get_search_cache
+from nodes.worker_pool import WorkerCrashed, WorkerPool
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="the pool's tests fork")
+
+
+def fake_agent():
+    search = Tool(name="web_search", func=lambda query: f"Results for {query}", description="Search the web")
+    return create_agent(llm=ScriptedChatModel(searches=1), tools=[search])
+
+
+class CacheProbe:
+    """Agent stand-in that reports whether the worker's search cache is its own."""
+
+    def invoke(self, inputs):
+        cache = get_search_cache()
+        cache.set("probe", str(os.getpid()))
+        if inputs.get("crash"):
+            os._exit(3)
+        time.sleep(inputs.get("sleep", 0))
+        return {"pid": os.getpid(), "connection_pid": cache._db_pid, "value": cache.get("probe")}
+
+
+def ask(question):
+    return {"messages": [HumanMessage(content=question)]}
+
+
+def test_questions_are_answered_across_workers():
+    with WorkerPool(2, factory=fake_agent, threads=2, pin=False) as pool:
+        futures = [pool.submit(ask(f"Question {n}?")) for n in range(8)]
+        answers = [future.result(30)["messages"][-1].content for future in futures]
+        assert all(answer.startswith("Answer based on 1 tool results") for answer in answers)
+        assert sum(pool.stats()["served"]) == 8
+
+
+def test_unshared_workers_open_their_own_sqlite_handle(tmp_path, monkeypatch):
+    monkeypatch.setenv("SEARCH_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    parent_cache = get_search_cache()
+    configure_search_cache(None)
+    try:
+        get_search_cache().set("warm", "opened in the parent before the fork")
+        with WorkerPool(2, factory=CacheProbe, threads=1, share_cache=False, pin=False) as pool:
+            results = [pool.invoke({}) for _ in range(4)]
+        for result in results:
+            assert result["connection_pid"] == result["pid"] != os.getpid()
+            assert result["value"] == str(result["pid"])
+    finally:
+        configure_search_cache(parent_cache)
+
+
+def test_dead_worker_fails_its_question_and_is_replaced():
+    with WorkerPool(1, factory=CacheProbe, threads=1, share_cache=False, pin=False) as pool:
+        with pytest.raises(WorkerCrashed):
+            pool.submit({"crash": True}).result(30)
+        deadline = time.monotonic() + 30
+        while pool.stats()["restarts"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert pool.stats()["restarts"] == 1
+        assert pool.invoke({})["pid"] != os.getpid()